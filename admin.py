@@ -1,15 +1,26 @@
 import sqlite3
 import tkinter as tk
-from tkinter import ttk, messagebox, Listbox
+from tkinter import ttk, messagebox, filedialog, Listbox
 import datetime
-from common import get_db_connection, center_window
+from common import db_session, center_window
+from reference_data import REFERENCE_DATA
+from db_tasks import TkTaskRunner
+from write_queue import execute_statement
+from query_profiler import QUERY_PROFILER
+
+def fetch_admin_lists(conn):
+    """Background task: returns the rows for the Jobs, Interviewers and Hiring Classes tabs."""
+    jobs = conn.execute("SELECT job_id, department, shift, pay_structure, employment_type FROM Jobs WHERE department IS NOT NULL AND department != '' ORDER BY department, shift").fetchall()
+    interviewers = conn.execute("SELECT interviewer_id, interviewer_name FROM Interviewers ORDER BY interviewer_name").fetchall()
+    classes = conn.execute("SELECT class_id, strftime('%Y-%m-%d', class_date) FROM Hiring_Classes ORDER BY class_date DESC").fetchall()
+    return jobs, interviewers, classes
 
 # ==================================================================
 # ADMIN MODULE
 # ==================================================================
 # This class defines the main "System Administration" window.
 # It provides a UI for managing the core lookup tables of the database:
-# Jobs, Interviewers, and Hiring_Classes.
+# Jobs, Interviewers, and Hiring_Classes, plus the query statistics (see query_profiler.py).
 class AdminApp(tk.Toplevel):
     def __init__(self, parent):
         super().__init__(parent)
@@ -19,6 +30,9 @@ class AdminApp(tk.Toplevel):
         self.transient(parent)
         self.grab_set()
         
+        self.tasks = TkTaskRunner(self)
+        self.interviewers_map = {}
+        self.classes_map = {}
         self.create_tabs()
         self.refresh_all_tabs()
         
@@ -32,20 +46,38 @@ class AdminApp(tk.Toplevel):
         jobs_frame = ttk.Frame(notebook, padding="10")
         interviewers_frame = ttk.Frame(notebook, padding="10")
         classes_frame = ttk.Frame(notebook, padding="10")
+        query_stats_frame = ttk.Frame(notebook, padding="10")
         
         notebook.add(jobs_frame, text='Manage Jobs')
         notebook.add(interviewers_frame, text='Manage Interviewers')
         notebook.add(classes_frame, text='Manage Hiring Classes')
+        notebook.add(query_stats_frame, text='Query Stats')
         
         self.create_jobs_tab(jobs_frame)
         self.create_interviewers_tab(interviewers_frame)
         self.create_classes_tab(classes_frame)
+        self.create_query_stats_tab(query_stats_frame)
 
     def refresh_all_tabs(self):
-        """Helper function to reload data in all tabs simultaneously."""
-        self.load_jobs()
-        self.load_interviewers()
-        self.load_classes()
+        """Helper function to reload data in all tabs simultaneously, in the background."""
+        self.tasks.run("refresh", fetch_admin_lists, on_done=self.show_all_tabs, error_message="Failed to load data")
+
+    def run_delete(self, sql, params, error_message):
+        """Runs a DELETE as a background write, then reloads the lists."""
+        self.tasks.run("delete", execute_statement, sql, params, on_done=lambda rowcount: self.on_lookup_changed(),
+                       error_message=error_message, message="Saving...", interruptible=False)
+
+    def on_lookup_changed(self):
+        """Reloads every tab after a job, interviewer or class was added, changed or deleted."""
+        REFERENCE_DATA.invalidate()
+        self.refresh_all_tabs()
+
+    def show_all_tabs(self, lists):
+        """Fills all three tabs with the results of fetch_admin_lists."""
+        jobs, interviewers, classes = lists
+        self.show_jobs(jobs)
+        self.show_interviewers(interviewers)
+        self.show_classes(classes)
 
     def create_action_panel(self, parent, add_cmd, edit_cmd, delete_cmd):
         """Creates the reusable 'Add New', 'Edit Selected', 'Delete Selected' button panel."""
@@ -74,19 +106,11 @@ class AdminApp(tk.Toplevel):
         self.jobs_tree.bind("<Double-1>", self.open_edit_job_window)
         self.create_action_panel(parent_frame, self.open_add_job_window, self.open_edit_job_window, self.delete_job)
 
-    def load_jobs(self):
-        """Clears and reloads the data in the Jobs Treeview from the database."""
-        for item in self.jobs_tree.get_children():
-            self.jobs_tree.delete(item)
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT job_id, department, shift, pay_structure, employment_type FROM Jobs WHERE department IS NOT NULL AND department != '' ORDER BY department, shift")
-            for row in cursor.fetchall():
-                self.jobs_tree.insert('', tk.END, iid=row[0], values=row[1:])
-            conn.close()
-        except sqlite3.Error as e:
-            messagebox.showerror("DB Error", f"Failed to load jobs: {e}", parent=self)
+    def show_jobs(self, rows):
+        """Clears and refills the Jobs Treeview."""
+        self.jobs_tree.delete(*self.jobs_tree.get_children())
+        for row in rows:
+            self.jobs_tree.insert('', tk.END, iid=row[0], values=row[1:])
 
     def open_add_job_window(self):
         """Launches the AddJobWindow pop-up."""
@@ -109,22 +133,13 @@ class AdminApp(tk.Toplevel):
             return
         job_id = selection[0]
         # Safety check: Query the database to see if any candidates are linked to this job.
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM Candidates WHERE fk_job_id = ?", (job_id,))
-        count = cursor.fetchone()[0]
-        conn.close()
+        with db_session() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM Candidates WHERE fk_job_id = ?", (job_id,))
+            count = cursor.fetchone()[0]
         msg = f"Are you sure you want to delete the selected job?\n\nThis job is currently linked to {count} candidate(s)."
         if messagebox.askyesno("Confirm Deletion", msg, icon='warning', parent=self):
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM Jobs WHERE job_id = ?", (job_id,))
-                conn.commit()
-                conn.close()
-                self.refresh_all_tabs()
-            except sqlite3.Error as e:
-                messagebox.showerror("DB Error", f"Failed to delete job: {e}", parent=self)
+            self.run_delete("DELETE FROM Jobs WHERE job_id = ?", (job_id,), "Failed to delete job")
 
     # --- Interviewers Tab ---
     def create_interviewers_tab(self, parent_frame):
@@ -136,20 +151,13 @@ class AdminApp(tk.Toplevel):
         self.interviewers_listbox.bind("<Double-1>", self.open_edit_interviewer_window)
         self.create_action_panel(parent_frame, self.open_add_interviewer_window, self.open_edit_interviewer_window, self.delete_interviewer)
 
-    def load_interviewers(self):
-        """Clears and reloads the data in the Interviewers Listbox."""
+    def show_interviewers(self, rows):
+        """Clears and refills the Interviewers Listbox."""
         self.interviewers_listbox.delete(0, tk.END)
         self.interviewers_map = {}
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT interviewer_id, interviewer_name FROM Interviewers ORDER BY interviewer_name")
-            for id, name in cursor.fetchall():
-                self.interviewers_listbox.insert(tk.END, name)
-                self.interviewers_map[name] = id
-            conn.close()
-        except sqlite3.Error as e:
-            messagebox.showerror("DB Error", f"Failed to load interviewers: {e}", parent=self)
+        for id, name in rows:
+            self.interviewers_listbox.insert(tk.END, name)
+            self.interviewers_map[name] = id
 
     def open_add_interviewer_window(self):
         """Launches the AddEditInterviewerWindow pop-up in 'add' mode."""
@@ -174,22 +182,13 @@ class AdminApp(tk.Toplevel):
             return
         name = self.interviewers_listbox.get(selection[0])
         interviewer_id = self.interviewers_map.get(name)
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM Candidate_Interviewers WHERE fk_interviewer_id = ?", (interviewer_id,))
-        count = cursor.fetchone()[0]
-        conn.close()
+        with db_session() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM Candidate_Interviewers WHERE fk_interviewer_id = ?", (interviewer_id,))
+            count = cursor.fetchone()[0]
         msg = f"Are you sure you want to delete '{name}'?\n\nThis person is linked to {count} candidate interview(s)."
         if messagebox.askyesno("Confirm Deletion", msg, icon='warning', parent=self):
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM Interviewers WHERE interviewer_id = ?", (interviewer_id,))
-                conn.commit()
-                conn.close()
-                self.refresh_all_tabs()
-            except sqlite3.Error as e:
-                messagebox.showerror("DB Error", f"Failed to delete interviewer: {e}", parent=self)
+            self.run_delete("DELETE FROM Interviewers WHERE interviewer_id = ?", (interviewer_id,), "Failed to delete interviewer")
 
     # --- Classes Tab ---
     def create_classes_tab(self, parent_frame):
@@ -201,20 +200,13 @@ class AdminApp(tk.Toplevel):
         self.classes_listbox.bind("<Double-1>", self.open_edit_class_window)
         self.create_action_panel(parent_frame, self.open_add_class_window, self.open_edit_class_window, self.delete_class)
 
-    def load_classes(self):
-        """Clears and reloads the data in the Hiring Classes Listbox."""
+    def show_classes(self, rows):
+        """Clears and refills the Hiring Classes Listbox."""
         self.classes_listbox.delete(0, tk.END)
         self.classes_map = {}
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT class_id, strftime('%Y-%m-%d', class_date) FROM Hiring_Classes ORDER BY class_date DESC")
-            for id, date_str in cursor.fetchall():
-                self.classes_listbox.insert(tk.END, date_str)
-                self.classes_map[date_str] = id
-            conn.close()
-        except sqlite3.Error as e:
-            messagebox.showerror("DB Error", f"Failed to load classes: {e}", parent=self)
+        for id, date_str in rows:
+            self.classes_listbox.insert(tk.END, date_str)
+            self.classes_map[date_str] = id
             
     def open_add_class_window(self):
         """Launches the AddEditClassWindow pop-up in 'add' mode."""
@@ -239,30 +231,144 @@ class AdminApp(tk.Toplevel):
             return
         date_str = self.classes_listbox.get(selection[0])
         class_id = self.classes_map.get(date_str)
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM Candidates WHERE fk_class_id = ?", (class_id,))
-        count = cursor.fetchone()[0]
-        conn.close()
+        with db_session() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM Candidates WHERE fk_class_id = ?", (class_id,))
+            count = cursor.fetchone()[0]
         msg = f"Are you sure you want to delete the class on '{date_str}'?\n\nThis class is linked to {count} candidate(s)."
         if messagebox.askyesno("Confirm Deletion", msg, icon='warning', parent=self):
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM Hiring_Classes WHERE class_id = ?", (class_id,))
-                conn.commit()
-                conn.close()
-                self.refresh_all_tabs()
-            except sqlite3.Error as e:
-                messagebox.showerror("DB Error", f"Failed to delete class: {e}", parent=self)
+            self.run_delete("DELETE FROM Hiring_Classes WHERE class_id = ?", (class_id,), "Failed to delete class")
+
+    # --- Query Stats Tab ---
+    def create_query_stats_tab(self, parent_frame):
+        """Builds the UI content for the 'Query Stats' tab."""
+        controls_frame = ttk.Frame(parent_frame)
+        controls_frame.pack(fill=tk.X, pady=(0, 10))
+        self.profiling_var = tk.BooleanVar(value=QUERY_PROFILER.enabled)
+        ttk.Checkbutton(controls_frame, text="Record query statistics", variable=self.profiling_var, command=self.toggle_profiling).pack(side=tk.LEFT)
+        ttk.Label(controls_frame, text="Log queries slower than (ms):").pack(side=tk.LEFT, padx=(20, 5))
+        self.slow_query_ms_var = tk.StringVar(value=f"{QUERY_PROFILER.slow_query_ms:g}")
+        slow_entry = ttk.Entry(controls_frame, textvariable=self.slow_query_ms_var, width=8)
+        slow_entry.pack(side=tk.LEFT)
+        slow_entry.bind("<Return>", self.set_slow_query_threshold)
+        slow_entry.bind("<FocusOut>", self.set_slow_query_threshold)
+        ttk.Button(controls_frame, text="Export JSON...", command=self.export_query_stats).pack(side=tk.RIGHT)
+        ttk.Button(controls_frame, text="Reset", command=self.reset_query_stats).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(controls_frame, text="Refresh", command=self.show_query_stats).pack(side=tk.RIGHT)
+
+        paned_window = ttk.PanedWindow(parent_frame, orient=tk.VERTICAL)
+        paned_window.pack(fill=tk.BOTH, expand=True)
+        tree_frame = ttk.Frame(paned_window)
+        paned_window.add(tree_frame, weight=3)
+        cols = ('caller', 'count', 'total_ms', 'mean_ms', 'p95_ms', 'max_ms', 'rows', 'statements', 'slow', 'query')
+        self.query_stats_tree = ttk.Treeview(tree_frame, columns=cols, show='headings')
+        for col, width in zip(cols, (260, 60, 80, 70, 70, 70, 70, 80, 50, 500)):
+            self.query_stats_tree.heading(col, text=col.replace('_', ' ').title().replace(' Ms', ' (ms)'))
+            self.query_stats_tree.column(col, width=width, anchor=tk.W if col in ('caller', 'query') else tk.E, stretch=col == 'query')
+        v_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.query_stats_tree.yview)
+        self.query_stats_tree.configure(yscroll=v_scroll.set)
+        h_scroll = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL, command=self.query_stats_tree.xview)
+        self.query_stats_tree.configure(xscroll=h_scroll.set)
+        v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        h_scroll.pack(side=tk.BOTTOM, fill=tk.X)
+        self.query_stats_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.query_stats_tree.bind("<<TreeviewSelect>>", self.show_query_details)
+        self.query_details_text = tk.Text(paned_window, height=8, wrap=tk.WORD, state=tk.DISABLED)
+        paned_window.add(self.query_details_text, weight=1)
+        self.query_stats = []
+        self.show_query_stats()
+
+    def show_query_stats(self):
+        """Clears and refills the query statistics, slowest total time first."""
+        self.query_stats = QUERY_PROFILER.snapshot()
+        self.query_stats_tree.delete(*self.query_stats_tree.get_children())
+        for index, stats in enumerate(self.query_stats):
+            p95 = stats['p95_ms']
+            values = (stats['caller'], stats['count'], f"{stats['total_ms']:.1f}", f"{stats['mean_ms']:.2f}",
+                      f"<={p95}" if p95 is not None else "slower", f"{stats['max_ms']:.1f}", stats['rows'],
+                      stats['statements'], stats['slow'], stats['query'])
+            self.query_stats_tree.insert('', tk.END, iid=index, values=values)
+        self.show_query_details()
+
+    def show_query_details(self, event=None):
+        """Shows the latency histogram and query plan of the selected row."""
+        selection = self.query_stats_tree.selection()
+        lines = []
+        if selection:
+            stats = self.query_stats[int(selection[0])]
+            lines.append(stats['query'])
+            lines.append("Latency: " + "  ".join(f"{bucket}: {count}" for bucket, count in stats['histogram'].items() if count))
+            lines.append("Query plan (captured when it was first slow):" if stats['plan'] is not None else "No query plan captured (it has not been slow).")
+            lines.extend(f"    {detail}" for detail in stats['plan'] or [])
+        elif not QUERY_PROFILER.enabled:
+            lines.append("Query statistics are not being recorded. Tick \"Record query statistics\" and use the application as usual, then press Refresh.")
+        self.query_details_text.config(state=tk.NORMAL)
+        self.query_details_text.delete('1.0', tk.END)
+        self.query_details_text.insert('1.0', "\n".join(lines))
+        self.query_details_text.config(state=tk.DISABLED)
+
+    def toggle_profiling(self):
+        if self.profiling_var.get():
+            QUERY_PROFILER.enable()
+        else:
+            QUERY_PROFILER.disable()
+        self.show_query_stats()
+
+    def set_slow_query_threshold(self, event=None):
+        try:
+            slow_query_ms = float(self.slow_query_ms_var.get())
+            if slow_query_ms < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Input Error", "The slow query threshold must be a number of milliseconds.", parent=self)
+            self.slow_query_ms_var.set(f"{QUERY_PROFILER.slow_query_ms:g}")
+            return
+        QUERY_PROFILER.slow_query_ms = slow_query_ms
+
+    def reset_query_stats(self):
+        QUERY_PROFILER.reset()
+        self.show_query_stats()
+
+    def export_query_stats(self):
+        """Saves the query statistics as a JSON file."""
+        filename = filedialog.asksaveasfilename(parent=self, title="Export Query Stats", defaultextension=".json",
+                                                initialfile="query_stats.json", filetypes=[("JSON files", "*.json")])
+        if not filename:
+            return
+        try:
+            QUERY_PROFILER.export_json(filename)
+            messagebox.showinfo("Export Complete", f"Query statistics saved to {filename}", parent=self)
+        except OSError as e:
+            messagebox.showerror("Export Error", f"Failed to save query statistics: {e}", parent=self)
 
 # ==================================================================
 # POP-UP WINDOW CLASSES
 # ==================================================================
 # These are smaller Toplevel windows that are opened by the main AdminApp.
-# Each one is a self-contained form for a single purpose.
+# Each one is a self-contained form for a single purpose. They save through their
+# own TkTaskRunner as background writes and close once the write has committed.
+
+class AdminFormWindow(tk.Toplevel):
+    """Base class for the pop-up forms: runs their single write in the background."""
+    def save_in_background(self, sql, params, success_message=None, error_message="Failed to save", duplicate_message=None):
+        """Submits the write, then tells the AdminApp to reload and closes the form.
+
+        A unique-constraint failure shows duplicate_message, if given, as an input error."""
+        if self.tasks.is_running("save"):
+            return
+        def on_saved(rowcount):
+            if success_message:
+                messagebox.showinfo("Success", success_message, parent=self)
+            self.parent.on_lookup_changed()
+            self.destroy()
+        def on_error(e):
+            if duplicate_message and isinstance(e, sqlite3.IntegrityError):
+                messagebox.showerror("Input Error", duplicate_message, parent=self)
+            else:
+                messagebox.showerror("DB Error", f"{error_message}: {e}", parent=self)
+        self.tasks.run("save", execute_statement, sql, params, on_done=on_saved, on_error=on_error, message="Saving...", interruptible=False)
 
-class AddJobWindow(tk.Toplevel):
+class AddJobWindow(AdminFormWindow):
     """A pop-up window with a form to add a new job."""
     def __init__(self, parent):
         super().__init__(parent)
@@ -272,6 +378,7 @@ class AddJobWindow(tk.Toplevel):
         self.geometry("400x350")
         self.transient(parent)
         self.grab_set()
+        self.tasks = TkTaskRunner(self)
         self.create_widgets()
         center_window(self, parent)
 
@@ -301,19 +408,10 @@ class AddJobWindow(tk.Toplevel):
         if not all([dept, pay, emp_type]):
             messagebox.showwarning("Input Error", "Department, Pay Structure, and Employment Type are required.", parent=self)
             return
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO Jobs (department, shift, pay_structure, employment_type) VALUES (?, ?, ?, ?)", (dept, shift or None, pay, emp_type))
-            conn.commit()
-            conn.close()
-            messagebox.showinfo("Success", "Job added successfully.", parent=self)
-            self.parent.refresh_all_tabs()
-            self.destroy()
-        except sqlite3.Error as e:
-            messagebox.showerror("DB Error", f"Failed to add job: {e}", parent=self)
+        self.save_in_background("INSERT INTO Jobs (department, shift, pay_structure, employment_type) VALUES (?, ?, ?, ?)", (dept, shift or None, pay, emp_type),
+                                success_message="Job added successfully.", error_message="Failed to add job")
 
-class EditJobWindow(tk.Toplevel):
+class EditJobWindow(AdminFormWindow):
     """A pop-up window with a form to edit an existing job."""
     def __init__(self, parent, job_id):
         super().__init__(parent)
@@ -324,6 +422,7 @@ class EditJobWindow(tk.Toplevel):
         self.geometry("400x350")
         self.transient(parent)
         self.grab_set()
+        self.tasks = TkTaskRunner(self)
         self.create_widgets()
         self.load_job_data()
         center_window(self, parent)
@@ -348,12 +447,11 @@ class EditJobWindow(tk.Toplevel):
     def load_job_data(self):
         """Fetches the data for the selected job and populates the form."""
         try:
-            conn = get_db_connection()
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM Jobs WHERE job_id = ?", (self.job_id,))
-            data = cursor.fetchone()
-            conn.close()
+            with db_session() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM Jobs WHERE job_id = ?", (self.job_id,))
+                data = cursor.fetchone()
             if data:
                 self.dept_var.set(data['department'])
                 self.shift_var.set(data['shift'] or '')
@@ -372,19 +470,10 @@ class EditJobWindow(tk.Toplevel):
         if not all([dept, pay, emp_type]):
             messagebox.showwarning("Input Error", "Department, Pay Structure, and Employment Type are required.", parent=self)
             return
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("UPDATE Jobs SET department = ?, shift = ?, pay_structure = ?, employment_type = ? WHERE job_id = ?", (dept, shift or None, pay, emp_type, self.job_id))
-            conn.commit()
-            conn.close()
-            messagebox.showinfo("Success", "Job details updated successfully.", parent=self)
-            self.parent.refresh_all_tabs()
-            self.destroy()
-        except sqlite3.Error as e:
-            messagebox.showerror("DB Error", f"Failed to update job: {e}", parent=self)
+        self.save_in_background("UPDATE Jobs SET department = ?, shift = ?, pay_structure = ?, employment_type = ? WHERE job_id = ?", (dept, shift or None, pay, emp_type, self.job_id),
+                                success_message="Job details updated successfully.", error_message="Failed to update job")
 
-class AddEditInterviewerWindow(tk.Toplevel):
+class AddEditInterviewerWindow(AdminFormWindow):
     """A pop-up window for adding or editing an interviewer."""
     def __init__(self, parent, interviewer_id=None, interviewer_name=""):
         super().__init__(parent)
@@ -395,6 +484,7 @@ class AddEditInterviewerWindow(tk.Toplevel):
         self.geometry("400x150")
         self.transient(parent)
         self.grab_set()
+        self.tasks = TkTaskRunner(self)
         self.name_var = tk.StringVar(value=interviewer_name)
         main_frame = ttk.Frame(self, padding="20")
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -409,23 +499,14 @@ class AddEditInterviewerWindow(tk.Toplevel):
         if not name:
             messagebox.showwarning("Input Error", "Interviewer name cannot be empty.", parent=self)
             return
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            if self.interviewer_id:
-                cursor.execute("UPDATE Interviewers SET interviewer_name = ? WHERE interviewer_id = ?", (name, self.interviewer_id))
-            else:
-                cursor.execute("INSERT INTO Interviewers (interviewer_name) VALUES (?)", (name,))
-            conn.commit()
-            conn.close()
-            self.parent.refresh_all_tabs()
-            self.destroy()
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Input Error", f"An interviewer named '{name}' already exists.", parent=self)
-        except sqlite3.Error as e:
-            messagebox.showerror("DB Error", f"Failed to save interviewer: {e}", parent=self)
+        if self.interviewer_id:
+            sql, params = "UPDATE Interviewers SET interviewer_name = ? WHERE interviewer_id = ?", (name, self.interviewer_id)
+        else:
+            sql, params = "INSERT INTO Interviewers (interviewer_name) VALUES (?)", (name,)
+        self.save_in_background(sql, params, error_message="Failed to save interviewer",
+                                duplicate_message=f"An interviewer named '{name}' already exists.")
 
-class AddEditClassWindow(tk.Toplevel):
+class AddEditClassWindow(AdminFormWindow):
     """A pop-up window for adding or editing a hiring class date."""
     def __init__(self, parent, class_id=None, class_date=""):
         super().__init__(parent)
@@ -436,6 +517,7 @@ class AddEditClassWindow(tk.Toplevel):
         self.geometry("400x150")
         self.transient(parent)
         self.grab_set()
+        self.tasks = TkTaskRunner(self)
         self.date_var = tk.StringVar(value=class_date)
         main_frame = ttk.Frame(self, padding="20")
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -452,18 +534,9 @@ class AddEditClassWindow(tk.Toplevel):
         except ValueError:
             messagebox.showwarning("Input Error", "Invalid date format. Please use YYYY-MM-DD.", parent=self)
             return
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            if self.class_id:
-                cursor.execute("UPDATE Hiring_Classes SET class_date = ? WHERE class_id = ?", (date_str, self.class_id))
-            else:
-                cursor.execute("INSERT INTO Hiring_Classes (class_date) VALUES (?)", (date_str,))
-            conn.commit()
-            conn.close()
-            self.parent.refresh_all_tabs()
-            self.destroy()
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Input Error", f"The class date '{date_str}' already exists.", parent=self)
-        except sqlite3.Error as e:
-            messagebox.showerror("DB Error", f"Failed to save class date: {e}", parent=self)
\ No newline at end of file
+        if self.class_id:
+            sql, params = "UPDATE Hiring_Classes SET class_date = ? WHERE class_id = ?", (date_str, self.class_id)
+        else:
+            sql, params = "INSERT INTO Hiring_Classes (class_date) VALUES (?)", (date_str,)
+        self.save_in_background(sql, params, error_message="Failed to save class date",
+                                duplicate_message=f"The class date '{date_str}' already exists.")
\ No newline at end of file
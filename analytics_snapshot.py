@@ -0,0 +1,312 @@
+import argparse
+import bisect
+import datetime
+import json
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from itertools import compress
+from common import DB_PATH, DB_POOL, db_session
+from change_log import get_change_version, get_changes_since
+
+# ==================================================================
+# ANALYTICS SNAPSHOT
+# ==================================================================
+# The leaderboard, department and class reports group every candidate, so each run
+# read all of Candidates (joined to Jobs and Hiring_Classes) again. The snapshot keeps
+# the few columns they group and filter on in memory instead, one array per column
+# rather than one object per row:
+#
+#   candidate_id                  array of 64-bit ints, in candidate_id order
+#   job, hiring class, status,    dictionary-encoded: one small code per row (a byte
+#   referrer, interview date      while there are at most 256 distinct values), plus
+#                                 the list of distinct values
+#   is_cleared                    array of bytes
+#
+# which is about 16 bytes per candidate. Jobs and Hiring_Classes are small and re-read
+# on every refresh, so a department or class date edited in the admin window shows up
+# straight away without touching the candidate columns.
+#
+# The unfiltered reports (leaderboard, counts by department and by class) read running
+# counts that are kept by code as rows are loaded and changed, so they cost one pass
+# over a few thousand groups. A filtered one (hires in a date range) builds a mask,
+# bytes of 0/1 with one per row, and counts through itertools.compress and
+# collections.Counter; those loops run in C, over the column arrays.
+#
+# The reports in batch_reports.py use the snapshot once a long-running process has
+# loaded it (the API server does at start-up) and run their SQL otherwise.
+#
+# refresh() asks the change log (see change_log.py) which candidates changed since the
+# last refresh and re-reads only those; when nothing changed it costs one index lookup.
+# More than SNAPSHOT_RELOAD_LIMIT changes (e.g. after an import) reload everything.
+#
+# Command line (timings and memory against a database, e.g. one from synthetic_data.py):
+#   python analytics_snapshot.py --db bench.db
+
+SNAPSHOT_RELOAD_LIMIT = 5000
+SNAPSHOT_FETCH_SIZE = 50000
+NO_DEPARTMENT = None
+
+SNAPSHOT_COLUMNS = "candidate_id, fk_job_id, fk_class_id, candidate_status, referred_by, interview_date, is_cleared"
+SNAPSHOT_QUERY = f"SELECT {SNAPSHOT_COLUMNS} FROM Candidates ORDER BY candidate_id;"
+SNAPSHOT_ROWS_QUERY = f"SELECT {SNAPSHOT_COLUMNS} FROM Candidates WHERE candidate_id IN (SELECT value FROM json_each(?));"
+SNAPSHOT_JOBS_QUERY = "SELECT job_id, department FROM Jobs;"
+SNAPSHOT_CLASSES_QUERY = "SELECT class_id, class_date FROM Hiring_Classes;"
+# The dictionary-encoded columns, in SNAPSHOT_COLUMNS order after candidate_id.
+ENCODED_COLUMNS = ("job", "hiring_class", "status", "referrer", "interview_date")
+
+CODE_TYPES = ("B", "H", "I")
+
+class EncodedColumn:
+    """A dictionary-encoded column: a code per row, and the distinct values the codes stand for."""
+    def __init__(self):
+        self.values = []
+        self.codes_by_value = {}
+        self.codes = array(CODE_TYPES[0])
+
+    def encode(self, values):
+        """Returns the codes of values, adding the ones not seen before (and widening the codes if needed)."""
+        for value in set(values).difference(self.codes_by_value):
+            self.codes_by_value[value] = len(self.values)
+            self.values.append(value)
+        while len(self.values) > 1 << (8 * self.codes.itemsize):
+            self.codes = array(CODE_TYPES[CODE_TYPES.index(self.codes.typecode) + 1], self.codes)
+        return map(self.codes_by_value.__getitem__, values)
+
+    def matching_codes(self, predicate):
+        return {code for code, value in enumerate(self.values) if predicate(value)}
+
+    def mask(self, predicate):
+        """Returns the mask of the rows whose value satisfies predicate."""
+        matching = self.matching_codes(predicate)
+        if self.codes.typecode == "B":
+            # One bytes.translate over the whole column.
+            return self.codes.tobytes().translate(bytes(code in matching for code in range(256)))
+        return bytes(map(matching.__contains__, self.codes))
+
+    def count(self, codes=None):
+        """Returns Counter({value: rows}) over codes (e.g. compress(column.codes, mask)), or over the whole column."""
+        return Counter({self.values[code]: rows for code, rows in Counter(self.codes if codes is None else codes).items()})
+
+    def memory_size(self):
+        return self.codes.itemsize * len(self.codes) + sys.getsizeof(self.values) + sys.getsizeof(self.codes_by_value)
+
+
+class CandidateSnapshot:
+    """Columnar in-memory copy of the Candidates columns the analytics group on. Thread-safe."""
+    def __init__(self, reload_limit=SNAPSHOT_RELOAD_LIMIT):
+        self.reload_limit = reload_limit
+        self._lock = threading.Lock()
+        self.version = None
+        self._clear()
+
+    def _clear(self):
+        self.candidate_ids = array("q")
+        self.columns = {name: EncodedColumn() for name in ENCODED_COLUMNS}
+        self.is_cleared = array("B")
+        self.departments = {}
+        self.class_dates = {}
+        # Running counts for the unfiltered reports, by code.
+        self.referrer_counts = Counter()
+        self.job_status_counts = Counter()
+        self.class_status_counts = Counter()
+        self.class_status_cleared = Counter()
+
+    def refresh(self, conn):
+        """Brings the snapshot up to date (loading it the first time). Returns the snapshot."""
+        with self._lock:
+            if self.version is not None:
+                version, changed_ids = get_changes_since(conn, self.version)
+                if len(changed_ids) > self.reload_limit:
+                    self.version = None
+                elif changed_ids:
+                    self._apply_changes(conn, changed_ids)
+                    self.version = version
+            if self.version is None:
+                self._load(conn)
+            self.departments = dict(conn.execute(SNAPSHOT_JOBS_QUERY).fetchall())
+            self.class_dates = dict(conn.execute(SNAPSHOT_CLASSES_QUERY).fetchall())
+        return self
+
+    def _load(self, conn):
+        # The version is read first, so a change made during the load is applied again by the next refresh.
+        version = get_change_version(conn)
+        self._clear()
+        cursor = conn.execute(SNAPSHOT_QUERY)
+        while True:
+            rows = cursor.fetchmany(SNAPSHOT_FETCH_SIZE)
+            if not rows:
+                break
+            candidate_ids, *encoded, is_cleared = zip(*rows)
+            self.candidate_ids.extend(candidate_ids)
+            for name, values in zip(ENCODED_COLUMNS, encoded):
+                column = self.columns[name]
+                # encode() may widen column.codes, so it runs before the array is looked up.
+                codes = column.encode(values)
+                column.codes.extend(codes)
+            self.is_cleared.extend(is_cleared)
+
+        job, hiring_class, status = self.columns["job"].codes, self.columns["hiring_class"].codes, self.columns["status"].codes
+        self.referrer_counts = Counter(self.columns["referrer"].codes)
+        self.job_status_counts = Counter(zip(job, status))
+        self.class_status_counts = Counter(zip(hiring_class, status))
+        self.class_status_cleared = Counter(compress(zip(hiring_class, status), self.is_cleared))
+        self.version = version
+
+    def _count_row(self, index, delta):
+        """Adds delta (+1 or -1) to the running counts the candidate at index falls in."""
+        job, hiring_class, status, referrer = (self.columns[name].codes[index] for name in ("job", "hiring_class", "status", "referrer"))
+        self.referrer_counts[referrer] += delta
+        self.job_status_counts[(job, status)] += delta
+        self.class_status_counts[(hiring_class, status)] += delta
+        self.class_status_cleared[(hiring_class, status)] += delta * self.is_cleared[index]
+
+    def _apply_changes(self, conn, changed_ids):
+        rows = {row[0]: row for row in conn.execute(SNAPSHOT_ROWS_QUERY, (json.dumps(changed_ids),))}
+        for candidate_id in changed_ids:
+            index = bisect.bisect_left(self.candidate_ids, candidate_id)
+            exists = index < len(self.candidate_ids) and self.candidate_ids[index] == candidate_id
+            if exists:
+                self._count_row(index, -1)
+            row = rows.get(candidate_id)
+            if row is None:
+                # Deleted.
+                if exists:
+                    del self.candidate_ids[index], self.is_cleared[index]
+                    for column in self.columns.values():
+                        del column.codes[index]
+                continue
+            _, *values, is_cleared = row
+            codes = [next(self.columns[name].encode([value])) for name, value in zip(ENCODED_COLUMNS, values)]
+            if not exists:
+                self.candidate_ids.insert(index, candidate_id)
+                self.is_cleared.insert(index, is_cleared)
+                for name, code in zip(ENCODED_COLUMNS, codes):
+                    self.columns[name].codes.insert(index, code)
+            else:
+                self.is_cleared[index] = is_cleared
+                for name, code in zip(ENCODED_COLUMNS, codes):
+                    self.columns[name].codes[index] = code
+            self._count_row(index, 1)
+
+    def memory_size(self):
+        """Approximate bytes held by the columns."""
+        return (self.candidate_ids.itemsize * len(self.candidate_ids) + len(self.is_cleared)
+                + sum(column.memory_size() for column in self.columns.values()))
+
+    def __len__(self):
+        return len(self.candidate_ids)
+
+    # --- Analytics ---
+    # The same rows, in the same order, as the matching SQL in queries.py.
+
+    def referral_leaderboard(self):
+        """[(referred_by, total_referrals)], most referrals first (REFERRAL_LEADERBOARD)."""
+        with self._lock:
+            referrers = self.columns["referrer"].values
+            rows = [(referrers[code], count) for code, count in self.referrer_counts.items() if count and referrers[code]]
+        return sorted(rows, key=lambda row: (-row[1], row[0]))
+
+    def hires_by_department(self, start=None, end=None):
+        """[(department, total_hires)] of the candidates hired with an interview date in the range, most first
+        (build_hires_by_department_query). Candidates without a job are left out, as the JOIN leaves them out."""
+        with self._lock:
+            job, status, interview_date = self.columns["job"], self.columns["status"], self.columns["interview_date"]
+            if not start and not end:
+                hired = status.codes_by_value.get("Hired")
+                job_counts = Counter({job.values[job_code]: count for (job_code, status_code), count in self.job_status_counts.items() if status_code == hired})
+            else:
+                # Narrowed to the hires first, so the date test only runs on those.
+                hired = status.mask(lambda value: value == "Hired")
+                in_range = interview_date.matching_codes(lambda day: day is not None and (not start or day >= start) and (not end or day <= end))
+                job_counts = job.count(compress(compress(job.codes, hired), map(in_range.__contains__, compress(interview_date.codes, hired))))
+            departments = self.departments
+        totals = Counter()
+        for job_id, count in job_counts.items():
+            if job_id in departments and count:
+                totals[departments[job_id]] += count
+        return sorted(totals.items(), key=lambda row: (-row[1], row[0]))
+
+    def department_counts(self):
+        """[(department, candidate_status, candidates)], by department and status. Candidates without a job count under None."""
+        with self._lock:
+            jobs, statuses = self.columns["job"].values, self.columns["status"].values
+            totals = Counter()
+            for (job_code, status_code), count in self.job_status_counts.items():
+                totals[(self.departments.get(jobs[job_code], NO_DEPARTMENT), statuses[status_code])] += count
+        return sorted(((department, status, count) for (department, status), count in totals.items() if count),
+                      key=lambda row: (row[0] is not None, row[0] or "", row[1]))
+
+    def class_breakdown(self):
+        """[(class_date, candidate_status, candidates, cleared)] for every hiring class, latest class first (as Pipeline_Class_Counts)."""
+        with self._lock:
+            classes, statuses = self.columns["hiring_class"].values, self.columns["status"].values
+            rows = [(self.class_dates.get(classes[class_code]), statuses[status_code], count, self.class_status_cleared[(class_code, status_code)])
+                    for (class_code, status_code), count in self.class_status_counts.items() if count]
+        # Candidates without a class (or with one since deleted) have no class date.
+        rows = sorted((row for row in rows if row[0] is not None), key=lambda row: row[1])
+        return sorted(rows, key=lambda row: row[0], reverse=True)
+
+
+ANALYTICS_SNAPSHOT = CandidateSnapshot()
+
+def get_analytics_snapshot(conn):
+    """The shared snapshot, brought up to date (loading it if needed)."""
+    return ANALYTICS_SNAPSHOT.refresh(conn)
+
+def get_loaded_snapshot(conn):
+    """The shared snapshot brought up to date, or None if this process has not loaded it yet. A one-off
+    report is quicker run as SQL than by loading the snapshot first, so the reports only use it once loaded."""
+    if ANALYTICS_SNAPSHOT.version is None:
+        return None
+    return ANALYTICS_SNAPSHOT.refresh(conn)
+
+# ==================================================================
+# COMMAND LINE
+# ==================================================================
+
+def time_call(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Loads the analytics snapshot and times its reports against the SQL queries.")
+    parser.add_argument("--db", default=DB_PATH, help="Database to run against (default: the application's database).")
+    options = parser.parse_args(argv)
+
+    from queries import REFERRAL_LEADERBOARD, build_hires_by_department_query
+    DB_POOL.db_path = options.db
+    try:
+        with db_session() as conn:
+            snapshot = CandidateSnapshot()
+            _, load_ms = time_call(snapshot.refresh, conn)
+            print(f"Loaded {len(snapshot):,} candidates in {load_ms:.0f} ms; {snapshot.memory_size() / 1024 / 1024:.1f} MB of columns.")
+            _, refresh_ms = time_call(snapshot.refresh, conn)
+            print(f"  {'refresh (no changes)':<24} {refresh_ms:9.2f} ms")
+            hires_query, hires_params = build_hires_by_department_query()
+            year_ago = (datetime.date.today() - datetime.timedelta(days=365)).isoformat()
+            year_query, year_params = build_hires_by_department_query(year_ago)
+            for name, function, sql, params in [
+                ("referral_leaderboard", snapshot.referral_leaderboard, REFERRAL_LEADERBOARD, ()),
+                ("hires_by_department", snapshot.hires_by_department, hires_query, hires_params),
+                ("hires_last_year", lambda: snapshot.hires_by_department(year_ago), year_query, year_params),
+                ("department_counts", snapshot.department_counts, None, ()),
+                ("class_breakdown", snapshot.class_breakdown, None, ()),
+            ]:
+                rows, snapshot_ms = time_call(function)
+                line = f"  {name:<24} {snapshot_ms:9.2f} ms   {len(rows):,} rows"
+                if sql:
+                    _, sql_ms = time_call(lambda: conn.execute(sql, params).fetchall())
+                    line += f"   (SQL: {sql_ms:.2f} ms)"
+                print(line)
+    except sqlite3.Error as e:
+        print(f"Failed to load the snapshot: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
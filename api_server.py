@@ -0,0 +1,550 @@
+import argparse
+import asyncio
+import base64
+import binascii
+import datetime
+import hashlib
+import io
+import json
+import sqlite3
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+from common import DB_PATH, ConnectionPool
+from db_migrations import run_migrations
+from candidate_search import SEARCH_QUERY, SEARCH_ORDER, build_match_query
+from queries import DASHBOARD_PENDING_HOT_LIST, DASHBOARD_PENDING_HOT_LIST_ORDER, PAGE_SIZE, fetch_page, fetch_kpis, fetch_class_roster
+from change_log import get_change_version
+from daily_metrics import ALL_DEPARTMENTS, fetch_daily_log, fetch_daily_logs, save_daily_log, save_daily_logs, invalidate_funnel_weeks
+from batch_reports import REPORTS, write_report
+from analytics_snapshot import get_analytics_snapshot
+from write_queue import WriteQueue, is_busy_error
+
+# ==================================================================
+# HR DATA API
+# ==================================================================
+# A small HTTP/JSON service over the same queries the windows run, for the web front
+# end (see server/) and anything else that should not open the database file over the
+# share. Only this process touches the SQLite file, so it can live on a local disk:
+#
+#   python api_server.py --db C:\HR\HR_Hiring_DB.db --port 3002
+#
+# Requests are read on one asyncio event loop. Queries run on API_READERS threads,
+# each with its own pooled connection (WAL lets them read side by side), and every
+# write goes through a write queue (see write_queue.py) with one connection, which
+# commits the saves that arrive together as one transaction. The endpoints:
+#
+#   GET  /api/candidates/search?q=smith          Candidate search (FTS5), paged.
+#   GET  /api/hiring-classes/<id>/roster         A class roster, with clearance.
+#   GET  /api/dashboard                          The KPIs and the first page of the hot list.
+#   GET  /api/dashboard/hot-list?after=...       The next page of the hot list.
+#   GET  /api/reports                            The report names.
+#   GET  /api/reports/<name>?format=csv          A report (json, csv or html), with the
+#                                                batch_reports.py options as parameters.
+#   GET  /api/metrics?date=2025-06-02&department=Grocery
+#                                                One day of the Applicant Tracker (department
+#                                                omitted: the site-wide entry).
+#   POST /api/metrics                            Saves one day, as ApplicantTrackerApp does.
+#   GET  /api/metrics/days?start=...&end=...     The days entered from start to end (at most
+#                                                API_MAX_METRIC_DAYS), of the departments given
+#                                                as &department=... (default: all).
+#   POST /api/metrics/days                       Saves {"days": [day, ...]} in one transaction,
+#                                                as the week grid does.
+#
+# Lists are paged with keyset paging (see build_page_query in queries.py): a page holds
+# up to ?limit= rows (API_MAX_PAGE_SIZE at most) and "next", a cursor to pass back as
+# ?after= for the following page, or null on the last one.
+#
+# Every GET answer carries an ETag, and a request whose If-None-Match matches it gets
+# an empty 304. Answers built from candidates (search and dashboard) are tagged with the
+# change log version (see change_log.py) and the date, so a client polling for changes
+# costs one index lookup and no query; the dashboard and hot list also show hiring
+# class dates, so their tag includes the Jobs and Hiring_Classes change counters too.
+# The others are tagged with a hash of the body.
+#
+# At start-up the server loads the analytics snapshot, so the reports that group every
+# candidate (leaderboard, hires and counts by department, class breakdown) are worked
+# out in memory rather than by a scan of Candidates.
+
+API_HOST = "127.0.0.1"
+API_PORT = 3002
+API_READERS = 4
+API_MAX_PAGE_SIZE = 1000
+API_MAX_BODY_BYTES = 1024 * 1024
+API_MAX_HEADERS = 100
+API_KEEPALIVE_SECONDS = 30
+API_MAX_METRIC_DAYS = 93
+# Far above any real day, and small enough that the weekly and monthly rollups cannot overflow.
+API_MAX_COUNT = 1_000_000
+
+METRIC_COUNT_FIELDS = ("apps_reviewed", "interviews_scheduled", "hires_confirmed")
+REPORT_CONTENT_TYPES = {"json": "application/json", "csv": "text/csv; charset=utf-8", "html": "text/html; charset=utf-8"}
+# Parameters of GET /api/reports/<name>, as batch_reports.py option names.
+REPORT_OPTIONS = ("start", "end", "referrer", "class_date")
+CANDIDATE_VALIDATOR = "SELECT (SELECT COALESCE(MAX(change_version), 0) FROM Candidate_Changes) || '-' || date('now');"
+DASHBOARD_VALIDATOR = ("SELECT (SELECT COALESCE(MAX(change_version), 0) FROM Candidate_Changes) || '-' || "
+                       "(SELECT COALESCE(SUM(change_version), 0) FROM Lookup_Changes) || '-' || date('now');")
+
+
+class HttpError(Exception):
+    """Ends a request with an HTTP error status and a JSON {"error": message} body."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class NotModified(Exception):
+    """Ends a GET with an empty 304: the client's copy, tagged etag, is still current."""
+    def __init__(self, etag):
+        super().__init__(etag)
+        self.etag = etag
+
+
+def run_task(pool, task, args):
+    """Runs task(conn, *args) on a connection from pool, committing on success (as db_session does)."""
+    conn = pool.acquire()
+    try:
+        result = task(conn, *args)
+        conn.commit()
+        return result
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# ==================================================================
+# REQUEST PARAMETERS
+# ==================================================================
+
+def get_param(query, name, default=None):
+    values = query.get(name)
+    return values[0] if values and values[0] else default
+
+def parse_date(value, name="date"):
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be a date, YYYY-MM-DD.") from None
+
+def parse_day(data):
+    """Checks one Applicant Tracker day sent as JSON. Returns (date, department, counts, breakdowns)."""
+    metric_date = parse_date(data.get("date"))
+    department = data.get("department", ALL_DEPARTMENTS)
+    if not isinstance(department, str):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "department must be text.")
+    counts = [data.get(field, 0) for field in METRIC_COUNT_FIELDS]
+    breakdowns = data.get("breakdowns", [])
+    if not isinstance(breakdowns, list) or not all(isinstance(item, dict) for item in breakdowns):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "breakdowns must be a list of {category, reason, count}.")
+    breakdowns = [(item.get("category"), item.get("reason"), item.get("count")) for item in breakdowns]
+    if not all(isinstance(category, str) and isinstance(reason, str) for category, reason, _ in breakdowns):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Each breakdown needs a category and a reason.")
+    if not all(type(count) is int and 0 <= count <= API_MAX_COUNT for count in [*counts, *(count for _, _, count in breakdowns)]):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"The counts must be whole numbers from 0 to {API_MAX_COUNT}.")
+    return metric_date, department, counts, breakdowns
+
+def parse_limit(query):
+    try:
+        limit = int(get_param(query, "limit", PAGE_SIZE))
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "limit must be a number.") from None
+    if not 1 <= limit <= API_MAX_PAGE_SIZE:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"limit must be between 1 and {API_MAX_PAGE_SIZE}.")
+    return limit
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, order_by):
+    """Turns an ?after= cursor back into the sort key it was made from."""
+    if cursor is None:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        key = None
+    # The key is bound into the page query, so each part must be a value SQLite can compare.
+    if (not isinstance(key, list) or len(key) != len(order_by)
+            or not all(part is None or isinstance(part, (str, int, float)) for part in key)):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "after is not a cursor from this list.")
+    return key
+
+# ==================================================================
+# QUERIES
+# ==================================================================
+# The tasks run on a reader (or the writer) thread and return JSON-ready values.
+
+def fetch_page_json(conn, query, params, order_by, after, limit):
+    """One page of a list query as {"rows": [{column: value}], "next": cursor or None}."""
+    conn.row_factory = sqlite3.Row
+    rows, keys, has_more = fetch_page(conn, query, params, order_by, after=after, page_size=limit)
+    return {"rows": [dict(row) for row in rows], "next": encode_cursor(keys[-1]) if has_more else None}
+
+def get_candidate_validator(conn):
+    return conn.execute(CANDIDATE_VALIDATOR).fetchone()[0]
+
+def get_dashboard_validator(conn):
+    return conn.execute(DASHBOARD_VALIDATOR).fetchone()[0]
+
+def search_candidates(conn, match_query, after, limit):
+    if match_query is None:
+        return {"rows": [], "next": None}
+    return fetch_page_json(conn, SEARCH_QUERY, (match_query,), SEARCH_ORDER, after, limit)
+
+def get_dashboard(conn, limit):
+    # The version is read first, as DashboardApp does, so a change made during the load shows up in the next one.
+    version = get_change_version(conn)
+    month_activity, pending, cleared_next_week = fetch_kpis(conn)
+    return {
+        "version": version,
+        "kpis": {"month_activity": month_activity, "pending": pending, "cleared_next_week": cleared_next_week},
+        "hot_list": fetch_page_json(conn, DASHBOARD_PENDING_HOT_LIST, (), DASHBOARD_PENDING_HOT_LIST_ORDER, None, limit),
+    }
+
+def get_hot_list_page(conn, after, limit):
+    return fetch_page_json(conn, DASHBOARD_PENDING_HOT_LIST, (), DASHBOARD_PENDING_HOT_LIST_ORDER, after, limit)
+
+def get_class_roster(conn, class_id):
+    hiring_class = conn.execute("SELECT class_date FROM Hiring_Classes WHERE class_id = ?;", (class_id,)).fetchone()
+    if hiring_class is None:
+        return None
+    return {"class_id": class_id, "class_date": hiring_class[0], "rows": [dict(row) for row in fetch_class_roster(conn, class_id)]}
+
+def get_daily_metrics(conn, metric_date, department):
+    """One day of the Applicant Tracker for a department; a day not entered yet reads as all zeros, as in the window."""
+    metric_data, breakdowns = fetch_daily_log(conn, metric_date, department)
+    day = dict(metric_data) if metric_data is not None else {"metric_id": None, "metric_date": metric_date, "department": department,
+                                                             **dict.fromkeys(METRIC_COUNT_FIELDS, 0)}
+    day["breakdowns"] = [{"category": row["category"], "reason": row["reason"], "count": row["count"]} for row in breakdowns]
+    return day
+
+def save_daily_metrics(conn, metric_date, department, counts, breakdowns):
+    save_daily_log(conn, metric_date, department, *counts, breakdowns)
+    return get_daily_metrics(conn, metric_date, department)
+
+def get_daily_metrics_range(conn, start, end, departments):
+    days = fetch_daily_logs(conn, start, end, departments)
+    return [{"metric_id": day["metric_id"], "metric_date": metric_date, "department": department,
+             **{field: day[field] for field in METRIC_COUNT_FIELDS},
+             "breakdowns": [{"category": category, "reason": reason, "count": count} for (category, reason), count in day["breakdowns"].items()]}
+            for (metric_date, department), day in days.items()]
+
+def save_daily_metrics_range(conn, days):
+    save_daily_logs(conn, days)
+    dates = [day[0] for day in days]
+    return get_daily_metrics_range(conn, min(dates), max(dates), sorted({day[1] for day in days}))
+
+def generate_report(conn, name, output_format, options):
+    output = io.StringIO()
+    write_report(conn, name, output_format, output, options)
+    return output.getvalue()
+
+# ==================================================================
+# SERVER
+# ==================================================================
+
+class ApiServer:
+    """Answers the API requests; see the endpoint list at the top of this file."""
+    def __init__(self, db_path=None, readers=API_READERS):
+        self.read_pool = ConnectionPool(db_path, max_size=readers)
+        self.write_pool = ConnectionPool(db_path, max_size=1)
+        self._read_executor = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="api-read")
+        self.write_queue = WriteQueue(self.write_pool)
+        # (method, path segments with "{}" for a parameter, handler)
+        self.routes = [
+            ("GET", ("api", "candidates", "search"), self.handle_search),
+            ("GET", ("api", "hiring-classes", "{}", "roster"), self.handle_roster),
+            ("GET", ("api", "dashboard"), self.handle_dashboard),
+            ("GET", ("api", "dashboard", "hot-list"), self.handle_hot_list),
+            ("GET", ("api", "reports"), self.handle_report_list),
+            ("GET", ("api", "reports", "{}"), self.handle_report),
+            ("GET", ("api", "metrics"), self.handle_get_metrics),
+            ("POST", ("api", "metrics"), self.handle_save_metrics),
+            ("GET", ("api", "metrics", "days"), self.handle_get_metrics_range),
+            ("POST", ("api", "metrics", "days"), self.handle_save_metrics_range),
+        ]
+
+    async def read(self, task, *args):
+        """Runs a task on a reader thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, run_task, self.read_pool, task, args)
+
+    async def write(self, task, *args):
+        """Runs a task through the write queue; saves arriving together commit as one transaction."""
+        return await asyncio.wrap_future(self.write_queue.submit(task, *args))
+
+    def preload_snapshot(self):
+        """Starts loading the analytics snapshot (see analytics_snapshot.py) in the background."""
+        return self._read_executor.submit(run_task, self.read_pool, get_analytics_snapshot, ())
+
+    def close(self):
+        self._read_executor.shutdown()
+        self.write_queue.shutdown()
+        self.read_pool.close_all()
+        self.write_pool.close_all()
+
+    # --- Handlers ---
+    # Each returns (status, body, content type, etag validator). body is a JSON-ready
+    # value unless a content type is given. With a validator, the handler has already
+    # checked If-None-Match against it (see not_modified); without one the ETag is a hash of the body.
+
+    async def not_modified(self, request, validator_task):
+        """Reads the validator; returns it, or raises a 304 when the client already has that version."""
+        validator = await self.read(validator_task)
+        if make_etag(validator) in request.if_none_match:
+            raise NotModified(make_etag(validator))
+        return validator
+
+    async def handle_search(self, request):
+        match_query = build_match_query(get_param(request.query, "q", ""))
+        after, limit = decode_cursor(get_param(request.query, "after"), SEARCH_ORDER), parse_limit(request.query)
+        validator = await self.not_modified(request, get_candidate_validator)
+        return HTTPStatus.OK, await self.read(search_candidates, match_query, after, limit), None, validator
+
+    async def handle_dashboard(self, request):
+        limit = parse_limit(request.query)
+        validator = await self.not_modified(request, get_dashboard_validator)
+        return HTTPStatus.OK, await self.read(get_dashboard, limit), None, validator
+
+    async def handle_hot_list(self, request):
+        after, limit = decode_cursor(get_param(request.query, "after"), DASHBOARD_PENDING_HOT_LIST_ORDER), parse_limit(request.query)
+        validator = await self.not_modified(request, get_dashboard_validator)
+        return HTTPStatus.OK, await self.read(get_hot_list_page, after, limit), None, validator
+
+    async def handle_roster(self, request, class_id):
+        if not class_id.isdigit():
+            raise HttpError(HTTPStatus.NOT_FOUND, "No such hiring class.")
+        roster = await self.read(get_class_roster, int(class_id))
+        if roster is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, "No such hiring class.")
+        return HTTPStatus.OK, roster, None, None
+
+    async def handle_report_list(self, request):
+        return HTTPStatus.OK, [{"name": name, "title": title} for name, (title, _, _) in REPORTS.items()], None, None
+
+    async def handle_report(self, request, name):
+        if name not in REPORTS:
+            raise HttpError(HTTPStatus.NOT_FOUND, "No such report.")
+        output_format = get_param(request.query, "format", "json")
+        if output_format not in REPORT_CONTENT_TYPES:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"format must be one of {', '.join(REPORT_CONTENT_TYPES)}.")
+        options = SimpleNamespace(**{option: get_param(request.query, option) for option in REPORT_OPTIONS})
+        for option in ("start", "end", "class_date"):
+            if getattr(options, option):
+                parse_date(getattr(options, option), option)
+        if name == "referrer-search" and not options.referrer:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "referrer-search needs referrer.")
+        if name == "class-week-referrals" and not options.class_date:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "class-week-referrals needs class_date.")
+        try:
+            report = await self.read(generate_report, name, output_format, options)
+        except ValueError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, str(e)) from None
+        return HTTPStatus.OK, report.encode(), REPORT_CONTENT_TYPES[output_format], None
+
+    async def handle_get_metrics(self, request):
+        metric_date = parse_date(get_param(request.query, "date"))
+        department = get_param(request.query, "department", ALL_DEPARTMENTS)
+        return HTTPStatus.OK, await self.read(get_daily_metrics, metric_date, department), None, None
+
+    async def handle_save_metrics(self, request):
+        metric_date, department, counts, breakdowns = parse_day(request.json())
+        day = await self.write(save_daily_metrics, metric_date, department, counts, breakdowns)
+        invalidate_funnel_weeks([metric_date])
+        return HTTPStatus.OK, day, None, None
+
+    async def handle_get_metrics_range(self, request):
+        start, end = parse_date(get_param(request.query, "start"), "start"), parse_date(get_param(request.query, "end"), "end")
+        if not 0 <= (datetime.date.fromisoformat(end) - datetime.date.fromisoformat(start)).days < API_MAX_METRIC_DAYS:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"start must be on or before end, at most {API_MAX_METRIC_DAYS} days apart.")
+        departments = request.query.get("department")
+        return HTTPStatus.OK, await self.read(get_daily_metrics_range, start, end, departments), None, None
+
+    async def handle_save_metrics_range(self, request):
+        days = request.json().get("days")
+        if not isinstance(days, list) or not days or not all(isinstance(day, dict) for day in days):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "days must be a list of days, as POST /api/metrics takes them.")
+        days = [(metric_date, department, *counts, breakdowns) for metric_date, department, counts, breakdowns in map(parse_day, days)]
+        saved = await self.write(save_daily_metrics_range, days)
+        invalidate_funnel_weeks(day[0] for day in days)
+        return HTTPStatus.OK, saved, None, None
+
+    # --- HTTP ---
+
+    def find_route(self, method, path):
+        """Returns (handler, path parameters); raises 404 or 405."""
+        segments = tuple(segment for segment in path.split("/") if segment)
+        allowed = []
+        for route_method, pattern, handler in self.routes:
+            if len(pattern) != len(segments) or any(part != "{}" and part != segment for part, segment in zip(pattern, segments)):
+                continue
+            if route_method == method:
+                return handler, [segment for part, segment in zip(pattern, segments) if part == "{}"]
+            allowed.append(route_method)
+        if allowed:
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"Use {', '.join(allowed)}.")
+        raise HttpError(HTTPStatus.NOT_FOUND, "Not found.")
+
+    async def respond(self, request):
+        """Runs the request's handler and returns (status, headers, body bytes)."""
+        try:
+            handler, params = self.find_route(request.method, request.path)
+            status, body, content_type, validator = await handler(request, *params)
+        except NotModified as e:
+            return HTTPStatus.NOT_MODIFIED, {"ETag": e.etag}, b""
+        except HttpError as e:
+            return e.status, {"Content-Type": "application/json"}, json.dumps({"error": str(e)}).encode()
+        except sqlite3.Error as e:
+            print(f"{request.method} {request.target}: {e}", file=sys.stderr)
+            if is_busy_error(e):
+                # Most likely the lock held by a desktop client still writing to the file directly.
+                return HTTPStatus.SERVICE_UNAVAILABLE, {"Content-Type": "application/json", "Retry-After": "1"}, json.dumps({"error": "The database is busy."}).encode()
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"Content-Type": "application/json"}, json.dumps({"error": "Database error."}).encode()
+        except Exception:
+            # Answer with a 500 rather than dropping the connection without a response.
+            print(f"{request.method} {request.target}:", file=sys.stderr)
+            traceback.print_exc()
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"Content-Type": "application/json"}, json.dumps({"error": "Internal server error."}).encode()
+
+        if content_type is None:
+            body = json.dumps(body, default=str).encode()
+            content_type = "application/json"
+        headers = {"Content-Type": content_type}
+        if request.method == "GET":
+            etag = make_etag(validator if validator is not None else hashlib.sha1(body).hexdigest())
+            if etag in request.if_none_match:
+                return HTTPStatus.NOT_MODIFIED, {"ETag": etag}, b""
+            # Clients may keep the answer, but must check it is still current before using it.
+            headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+        return status, headers, body
+
+    async def handle_connection(self, reader, writer):
+        """Serves the requests of one client connection, keeping it open between requests (HTTP/1.1)."""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), API_KEEPALIVE_SECONDS)
+                except HttpError as e:
+                    writer.write(format_response(e.status, {"Content-Type": "application/json", "Connection": "close"},
+                                                 json.dumps({"error": str(e)}).encode()))
+                    break
+                if request is None:
+                    break
+                status, headers, body = await self.respond(request)
+                if not request.keep_alive:
+                    headers["Connection"] = "close"
+                writer.write(format_response(status, headers, body))
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def make_etag(validator):
+    return f'"{validator}"'
+
+
+class Request:
+    """One parsed HTTP request."""
+    def __init__(self, method, target, version, headers, body):
+        self.method = method
+        self.target = target
+        parts = urlsplit(target)
+        self.path = parts.path
+        # Blank values are kept for &department= (the site-wide entries); get_param reads them as missing.
+        self.query = parse_qs(parts.query, keep_blank_values=True)
+        self.headers = headers
+        self.body = body
+        connection = headers.get("connection", "").lower()
+        self.keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        # Weak and strong tags compare the same for GET (RFC 9110, section 13.1.2).
+        self.if_none_match = {tag.strip().removeprefix("W/") for tag in headers.get("if-none-match", "").split(",") if tag.strip()}
+
+    def json(self):
+        """The body as a JSON object."""
+        try:
+            data = json.loads(self.body)
+        except (UnicodeDecodeError, ValueError):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "The body is not valid JSON.") from None
+        if not isinstance(data, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "The body must be a JSON object.")
+        return data
+
+
+async def read_request(reader):
+    """Reads one request from the connection. Returns None when the client has closed it."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line.") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= API_MAX_HEADERS:
+            raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers.")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "transfer-encoding" in headers:
+        raise HttpError(HTTPStatus.NOT_IMPLEMENTED, "Send the body with a Content-Length.")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Bad Content-Length.") from None
+    if not 0 <= length <= API_MAX_BODY_BYTES:
+        raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "The body is too large.")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target, version, headers, body)
+
+def format_response(status, headers, body):
+    status = HTTPStatus(status)
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}", *(f"{name}: {value}" for name, value in headers.items())]
+    if status != HTTPStatus.NOT_MODIFIED:
+        lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+# ==================================================================
+# COMMAND LINE
+# ==================================================================
+
+async def serve(server, host, port):
+    listener = await asyncio.start_server(server.handle_connection, host, port)
+    print(f"Serving the HR data API on http://{host}:{port}/api/", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serves the HR data as a JSON API.")
+    parser.add_argument("--db", default=DB_PATH, help="Database file (default: HR_Hiring_DB.db next to this script).")
+    parser.add_argument("--host", default=API_HOST, help=f"Address to listen on (default: {API_HOST}; use 0.0.0.0 for every interface).")
+    parser.add_argument("--port", type=int, default=API_PORT, help=f"Port to listen on (default: {API_PORT}).")
+    parser.add_argument("--readers", type=int, default=API_READERS, help=f"Reader threads and connections (default: {API_READERS}).")
+    options = parser.parse_args(argv)
+
+    server = ApiServer(options.db, options.readers)
+    try:
+        run_task(server.write_pool, run_migrations, ())
+        # Loaded on a reader thread while the server starts; the reports use it from then on.
+        server.preload_snapshot()
+        asyncio.run(serve(server, options.host, options.port))
+    except KeyboardInterrupt:
+        pass
+    except (sqlite3.Error, OSError) as e:
+        print(f"Failed to start the API server: {e}", file=sys.stderr)
+        return 1
+    finally:
+        server.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
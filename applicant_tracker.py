@@ -2,14 +2,18 @@ import sqlite3
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
-from common import get_db_connection, center_window
+from common import center_window
+from db_tasks import TkTaskRunner
+from daily_metrics import ALL_DEPARTMENTS, ALL_DEPARTMENTS_LABEL, REJECTION_REASONS_PRE, REJECTION_REASONS_POST, WITHDRAWAL_REASONS, fetch_daily_log, save_daily_log, invalidate_funnel_weeks
+from reference_data import REFERENCE_DATA
+from week_grid import WeekGridApp
 
 # ==================================================================
 # APPLICANT TRACKER MODULE
 # ==================================================================
 # This class defines the "Applicant Tracker" window, which serves as a data entry
 # form for daily recruitment metrics. It is not tied to individual candidates
-# but rather tracks aggregate numbers for a given day.
+# but rather tracks aggregate numbers for a given day and department.
 class ApplicantTrackerApp(tk.Toplevel):
     def __init__(self, parent):
         super().__init__(parent)
@@ -27,9 +31,9 @@ class ApplicantTrackerApp(tk.Toplevel):
 
         # --- Data Definitions ---
         # These lists define the static reasons that will appear in the UI.
-        self.rejection_reasons_pre = ["Not eligible for Rehire", "Background", "Not a good Fit"]
-        self.rejection_reasons_post = ["Not eligible for Rehire", "Background", "Not a good Fit", "NCNS"]
-        self.withdrawal_reasons = ["Schedule", "Other Job Offer", "Pay", "Other"]
+        self.rejection_reasons_pre = REJECTION_REASONS_PRE
+        self.rejection_reasons_post = REJECTION_REASONS_POST
+        self.withdrawal_reasons = WITHDRAWAL_REASONS
         
         # --- Variable Holders ---
         # Dictionaries to hold the Tkinter variables linked to the UI entry fields.
@@ -37,7 +41,10 @@ class ApplicantTrackerApp(tk.Toplevel):
         self.breakdown_vars = {}
         # Dictionary to store the last known valid value for each entry field, used for validation.
         self.previous_values = {}
+        # The (date, department) whose counts the form shows; None until they have loaded.
+        self.shown_day = None
 
+        self.tasks = TkTaskRunner(self)
         self.create_widgets()
         self.load_data_for_date()
         center_window(self, parent)
@@ -55,6 +62,17 @@ class ApplicantTrackerApp(tk.Toplevel):
         self.date_entry.pack(side=tk.LEFT)
         # Binds the date selection event to the data loading function.
         self.date_entry.bind("<<DateEntrySelected>>", self.load_data_for_date)
+        ttk.Label(date_frame, text="Department:", font=("Segoe UI", 11, 'bold')).pack(side=tk.LEFT, padx=(20, 10))
+        self.department_combobox = ttk.Combobox(date_frame, state="readonly", width=20)
+        self.department_combobox.pack(side=tk.LEFT)
+        self.department_combobox.bind("<<ComboboxSelected>>", self.load_data_for_date)
+        try:
+            departments = REFERENCE_DATA.get().departments
+        except sqlite3.Error as e:
+            messagebox.showerror("Database Error", f"Failed to load departments: {e}", parent=self)
+            departments = []
+        self.department_combobox['values'] = [ALL_DEPARTMENTS_LABEL, *departments]
+        self.department_combobox.set(ALL_DEPARTMENTS_LABEL)
 
         # --- UI Sections ---
         # The UI is built programmatically by looping through the reason lists.
@@ -101,7 +119,10 @@ class ApplicantTrackerApp(tk.Toplevel):
             self.breakdown_vars[key] = tk.StringVar(value='0')
             self.create_metric_row(withdrawal_frame, reason, self.breakdown_vars[key])
 
-        ttk.Button(main_frame, text="Save Log for Selected Date", command=self.save_data).pack(pady=(20, 0))
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(pady=(20, 0))
+        ttk.Button(button_frame, text="Save Log for Selected Date", command=self.save_data).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Enter a Whole Week...", command=self.open_week_grid).pack(side=tk.LEFT, padx=5)
 
     def _validate_and_revert(self, var, key):
         """Validates entry fields on focus out to ensure they are non-negative integers."""
@@ -157,96 +178,86 @@ class ApplicantTrackerApp(tk.Toplevel):
         ttk.Button(frame, text="-", style='Minus.Small.TButton', width=2, command=decrement).pack(side=tk.LEFT)
         ttk.Button(frame, text="+", style='Small.TButton', width=2, command=increment).pack(side=tk.LEFT)
 
+    def open_week_grid(self):
+        """Opens the week grid on the selected date's week and department, then reloads the day, which it may have changed."""
+        week_grid = WeekGridApp(self, self.date_entry.get_date(), self.get_selected_department())
+        self.wait_window(week_grid)
+        self.grab_set()
+        self.load_data_for_date()
+
+    def get_selected_department(self):
+        department = self.department_combobox.get()
+        return ALL_DEPARTMENTS if department == ALL_DEPARTMENTS_LABEL else department
+
     def load_data_for_date(self, event=None):
-        """Fetches and displays the metric data for the currently selected date."""
+        """Fetches the metric data for the currently selected date and department in the background."""
         selected_date = self.date_entry.get_date().strftime("%Y-%m-%d")
-        
-        # Reset all fields to 0 before loading new data.
+        department = self.get_selected_department()
+        self.tasks.run("load", fetch_daily_log, selected_date, department,
+                       on_done=lambda data: self.show_daily_log(data, (selected_date, department)), error_message="Failed to load data")
+
+    def show_daily_log(self, data, day):
+        """Displays the results of fetch_daily_log for day, a (date, department) pair."""
+        metric_data, breakdown_data = data
+        self.shown_day = day
+
+        # Reset all fields to 0 before showing the loaded data.
         for var in self.metric_vars.values():
             var.set('0')
         for var in self.breakdown_vars.values():
             var.set('0')
 
-        try:
-            conn = get_db_connection()
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM Daily_Metrics WHERE metric_date = ?", (selected_date,))
-            metric_data = cursor.fetchone()
-
-            if metric_data:
-                # If data exists, populate the main metric fields.
-                self.metric_vars["Apps Reviewed"].set(str(metric_data["apps_reviewed"]))
-                self.metric_vars["Interviews Scheduled"].set(str(metric_data["interviews_scheduled"]))
-                self.metric_vars["Hires Confirmed"].set(str(metric_data["hires_confirmed"]))
-
-                # Fetch and populate the breakdown data for that day.
-                cursor.execute("SELECT * FROM Daily_Breakdowns WHERE fk_metric_id = ?", (metric_data["metric_id"],))
-                breakdown_data = cursor.fetchall()
-                for row in breakdown_data:
-                    key = f"{row['category']}_{row['reason']}"
-                    if key in self.breakdown_vars:
-                        self.breakdown_vars[key].set(str(row['count']))
-            
-            # Store the loaded values as the "last known good" values for validation.
-            for key, var in self.metric_vars.items():
-                self.previous_values[key.replace(" ", "_")] = var.get()
-            for key, var in self.breakdown_vars.items():
-                self.previous_values[key] = var.get()
+        if metric_data:
+            # If data exists, populate the main metric fields.
+            self.metric_vars["Apps Reviewed"].set(str(metric_data["apps_reviewed"]))
+            self.metric_vars["Interviews Scheduled"].set(str(metric_data["interviews_scheduled"]))
+            self.metric_vars["Hires Confirmed"].set(str(metric_data["hires_confirmed"]))
 
-            conn.close()
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Failed to load data: {e}", parent=self)
+            # Populate the breakdown data for that day.
+            for row in breakdown_data:
+                key = f"{row['category']}_{row['reason']}"
+                if key in self.breakdown_vars:
+                    self.breakdown_vars[key].set(str(row['count']))
+
+        # Store the loaded values as the "last known good" values for validation.
+        for key, var in self.metric_vars.items():
+            self.previous_values[key.replace(" ", "_")] = var.get()
+        for key, var in self.breakdown_vars.items():
+            self.previous_values[key] = var.get()
 
     def save_data(self):
-        """Saves the current data in the form to the database."""
+        """Saves the current data in the form to the database in the background."""
         selected_date = self.date_entry.get_date().strftime("%Y-%m-%d")
-        
+        department = self.get_selected_department()
+
+        # The form may still hold the previous day's counts: saving them would overwrite this day.
+        if self.tasks.is_running("load") or self.shown_day != (selected_date, department):
+            messagebox.showwarning("Still Loading", f"The data for {selected_date} has not loaded yet. Please try again in a moment.", parent=self)
+            return
+
         # Run a final validation on all fields before saving.
         for key, var in {**self.metric_vars, **self.breakdown_vars}.items():
             self._validate_and_revert(var, key.replace(" ", "_"))
 
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Use an UPSERT-like logic: check if a record exists, then either UPDATE or INSERT.
-            cursor.execute("SELECT metric_id FROM Daily_Metrics WHERE metric_date = ?", (selected_date,))
-            result = cursor.fetchone()
-            
-            apps_reviewed = int(self.metric_vars["Apps Reviewed"].get())
-            interviews_scheduled = int(self.metric_vars["Interviews Scheduled"].get())
-            hires_confirmed = int(self.metric_vars["Hires Confirmed"].get())
-
-            if result:
-                metric_id = result[0]
-                cursor.execute("UPDATE Daily_Metrics SET apps_reviewed = ?, interviews_scheduled = ?, hires_confirmed = ? WHERE metric_id = ?", 
-                               (apps_reviewed, interviews_scheduled, hires_confirmed, metric_id))
-            else:
-                cursor.execute("INSERT INTO Daily_Metrics (metric_date, apps_reviewed, interviews_scheduled, hires_confirmed) VALUES (?, ?, ?, ?)", 
-                               (selected_date, apps_reviewed, interviews_scheduled, hires_confirmed))
-                metric_id = cursor.lastrowid
-
-            # Clear old breakdown data for this date to prevent duplicates before inserting new data.
-            cursor.execute("DELETE FROM Daily_Breakdowns WHERE fk_metric_id = ?", (metric_id,))
-
-            # Build a list of all breakdown data to be inserted.
-            breakdown_data = []
-            for key, var in self.breakdown_vars.items():
-                count = int(var.get())
-                if count > 0:
-                    parts = key.split('_')
-                    category = f"{parts[0]}_{parts[1]}_{parts[2]}"
-                    reason = " ".join(parts[3:])
-                    breakdown_data.append((metric_id, category, reason, count))
-            
-            if breakdown_data:
-                # Use executemany for an efficient bulk insert of all breakdown records.
-                cursor.executemany("INSERT INTO Daily_Breakdowns (fk_metric_id, category, reason, count) VALUES (?, ?, ?, ?)", breakdown_data)
+        apps_reviewed = int(self.metric_vars["Apps Reviewed"].get())
+        interviews_scheduled = int(self.metric_vars["Interviews Scheduled"].get())
+        hires_confirmed = int(self.metric_vars["Hires Confirmed"].get())
 
-            conn.commit()
-            conn.close()
+        # Build a list of all breakdown data to be inserted.
+        breakdown_counts = []
+        for key, var in self.breakdown_vars.items():
+            count = int(var.get())
+            if count > 0:
+                parts = key.split('_')
+                category = f"{parts[0]}_{parts[1]}_{parts[2]}"
+                reason = " ".join(parts[3:])
+                breakdown_counts.append((category, reason, count))
+
+        def on_saved(result):
+            invalidate_funnel_weeks([selected_date])
             messagebox.showinfo("Success", f"Data for {selected_date} saved successfully.", parent=self)
             self.load_data_for_date() # Reload data to update 'previous_values'.
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Failed to save data: {e}", parent=self)
+
+        # A save is never cancelled, so it finishes even if the window is closed straight away.
+        self.tasks.run(f"save {selected_date} {department}", save_daily_log, selected_date, department, apps_reviewed, interviews_scheduled, hires_confirmed, breakdown_counts,
+                       on_done=on_saved, error_message="Failed to save data", message="Saving...", interruptible=False)
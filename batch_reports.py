@@ -0,0 +1,250 @@
+import argparse
+import contextlib
+import csv
+import datetime
+import itertools
+import json
+import os
+import sqlite3
+import sys
+from common import db_session
+from queries import (REFERRAL_LEADERBOARD, REFERRAL_LEADERBOARD_ORDER, REFERRER_SEARCH, REFERRER_SEARCH_ORDER, LAST_WEEK_REFERRALS,
+                     CLASS_WEEK_REFERRALS, REFERRALS_ORDER, HIRES_BY_DEPARTMENT_ORDER, DEPARTMENT_COUNTS, CLASS_BREAKDOWN,
+                     build_hires_by_department_query, build_page_query)
+from report_writer import HtmlReportWriter, open_output
+from metric_rollups import sum_activity, sum_breakdowns
+from funnel_trend import FUNNEL_TREND_HEADERS, funnel_counts, get_funnel_trend
+from analytics_snapshot import get_loaded_snapshot
+
+# ==================================================================
+# BATCH REPORTS
+# ==================================================================
+# The report logic, without any Tkinter. MainApp and ReportsApp call the writers
+# below, and the same reports can be produced from the command line (e.g. from a
+# scheduled task) as HTML, CSV or JSON:
+#
+#   python batch_reports.py weekly --out weekly_report.html
+#   python batch_reports.py referral-leaderboard --format csv > leaderboard.csv
+#   python batch_reports.py hires-by-department --start 2025-01-01 --end 2025-06-30 --out hires.json
+#   python batch_reports.py funnel-trend --start 2025-01-01 --out funnel.csv
+#
+# Run "python batch_reports.py --help" for the full list.
+
+WEEKLY_REPORT_CSS = """  body { font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif; color: #333; } .container { padding: 20px; }
+  table { border-collapse: collapse; width: auto; margin-top: 20px; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }
+  th, td { border: 1px solid #dddddd; text-align: left; padding: 12px; white-space: nowrap; }
+  thead th { background-color: #004a99; color: white; font-weight: bold; } tbody tr:nth-child(even) { background-color: #f2f7fc; }
+  tbody tr:hover { background-color: #e6f0fa; } p { font-size: 1.1em; margin-bottom: 1em; }"""
+
+WEEKLY_ACTIVITY_CSS = """    body { font-family: 'Segoe UI', sans-serif; color: #333; }
+    .container { padding: 20px; border: 1px solid #6b92c2; width: 350px; margin: 20px; box-shadow: 0 2px 5px rgba(0,0,0,0.1); background-color: #cedbeb; }
+    h2 { color: #084999; text-align: center; }
+    p { text-align: center; margin-top: -10px; color: #396dad; }
+    table { border-collapse: collapse; width: 100%; margin-top: 20px; }
+    th, td { border: 1px solid #6b92c2; text-align: left; padding: 10px; font-size: 1.1em; }
+    th { background-color: #396dad; color: white; }
+    td:nth-child(2) { text-align: center; font-weight: bold; }
+    tbody tr:nth-child(even) { background-color: #ffffff; }
+    tbody tr:nth-child(odd) { background-color: #e8eef4; }"""
+
+CLEARED_HIRES_QUERY = "SELECT * FROM V_Cleared_Hires_Next_Week;"
+NEW_SELECTORS_COUNT = "SELECT COUNT(*) FROM V_Cleared_Hires_Next_Week WHERE Department IN ('Perishables', 'Grocery', 'Freezer');"
+HAS_SPANISH_ONLY = "SELECT EXISTS (SELECT 1 FROM V_Cleared_Hires_Next_Week WHERE Lang = 'S');"
+
+# ==================================================================
+# REPORT DATA
+# ==================================================================
+# Each report function returns (headers, rows); rows may be a live cursor. The
+# reports that group every candidate read the analytics snapshot instead of running
+# their SQL when this process has it loaded (see analytics_snapshot.py).
+
+def cursor_table(cursor):
+    return [description[0] for description in cursor.description], cursor
+
+def run_list_query(conn, query, params, order_by, where=None):
+    """Runs one of the list queries from queries.py in full, in its display order."""
+    sql, _ = build_page_query(query, order_by, where)
+    # LIMIT -1 means no limit in SQLite.
+    return cursor_table(conn.execute(sql, (*params, -1)))
+
+def get_cleared_hires(conn, options=None):
+    return cursor_table(conn.execute(CLEARED_HIRES_QUERY))
+
+def get_weekly_activity_period(today=None):
+    """Returns (first_day, last_day) of last week, Sunday to Saturday."""
+    today = today or datetime.date.today()
+    # weekday() is Monday=0...Sunday=6. To get to last Saturday, we subtract (today.weekday() + 2) days.
+    last_saturday = today - datetime.timedelta(days=today.weekday() + 2)
+    last_sunday = last_saturday - datetime.timedelta(days=6)
+    return last_sunday, last_saturday
+
+def get_weekly_activity(conn, options=None):
+    """Totals from Daily_Metrics and Daily_Breakdowns for last week, as (Categories, Total) rows."""
+    last_sunday, last_saturday = get_weekly_activity_period()
+    # A Sunday-Saturday week is a single row of the weekly rollups (see metric_rollups.py).
+    data = funnel_counts(sum_activity(conn, last_sunday, last_saturday), sum_breakdowns(conn, last_sunday, last_saturday))
+    return ['Categories', 'Total'], list(data.items())
+
+def get_referral_leaderboard(conn, options=None):
+    snapshot = get_loaded_snapshot(conn)
+    if snapshot is not None:
+        return ['referred_by', 'total_referrals'], snapshot.referral_leaderboard()
+    return run_list_query(conn, REFERRAL_LEADERBOARD, (), REFERRAL_LEADERBOARD_ORDER)
+
+def get_hires_by_department(conn, options):
+    snapshot = get_loaded_snapshot(conn)
+    if snapshot is not None:
+        return ['department', 'total_hires'], snapshot.hires_by_department(options.start, options.end)
+    query, params = build_hires_by_department_query(options.start, options.end)
+    return run_list_query(conn, query, params, HIRES_BY_DEPARTMENT_ORDER)
+
+def get_department_counts(conn, options=None):
+    snapshot = get_loaded_snapshot(conn)
+    if snapshot is not None:
+        return ['department', 'candidate_status', 'candidates'], snapshot.department_counts()
+    return cursor_table(conn.execute(DEPARTMENT_COUNTS))
+
+def get_class_breakdown(conn, options=None):
+    snapshot = get_loaded_snapshot(conn)
+    if snapshot is not None:
+        return ['class_date', 'candidate_status', 'candidates', 'cleared'], snapshot.class_breakdown()
+    return cursor_table(conn.execute(CLASS_BREAKDOWN))
+
+def get_referrer_search(conn, options):
+    return run_list_query(conn, REFERRER_SEARCH, (f"%{options.referrer}%",), REFERRER_SEARCH_ORDER)
+
+def get_last_week_referrals(conn, options=None):
+    return run_list_query(conn, LAST_WEEK_REFERRALS, (), REFERRALS_ORDER)
+
+def get_class_week_referrals(conn, options):
+    return run_list_query(conn, CLASS_WEEK_REFERRALS, (options.class_date,), REFERRALS_ORDER)
+
+def get_funnel_trend_report(conn, options):
+    return FUNNEL_TREND_HEADERS, get_funnel_trend(conn, options.start, options.end)
+
+# ==================================================================
+# HTML REPORTS
+# ==================================================================
+
+def write_weekly_new_hire_report(conn, report):
+    """Writes the weekly new hire email report (the cleared hires starting next week)."""
+    new_selectors_count = conn.execute(NEW_SELECTORS_COUNT).fetchone()[0]
+    # The Lang column is only shown when someone on the list is Spanish-only. Asking up
+    # front lets the rows be written straight from the cursor.
+    has_spanish_only = conn.execute(HAS_SPANISH_ONLY).fetchone()[0]
+    headers, cursor = get_cleared_hires(conn)
+    columns = [i for i, header in enumerate(headers) if header != 'Lang' or has_spanish_only]
+
+    report.begin("Weekly New Hire Report", WEEKLY_REPORT_CSS)
+    report.write(f"<p>Happy Friday,</p><p>This coming week, we will be having the following ({new_selectors_count}) New Selectors.</p>\n")
+    first_row = cursor.fetchone()
+    if first_row is None:
+        report.write("<p style='font-style: italic; color: #555;'>No new hires are fully cleared to start for the upcoming week.</p>\n")
+    else:
+        report.write("<hr style='margin-top: 20px; margin-bottom: 20px; border: 0; border-top: 1px solid #ddd;'>\n")
+        report.write_table(headers, itertools.chain([first_row], cursor), columns)
+    report.end()
+
+def write_weekly_activity_report(conn, report):
+    """Writes the Weekly Activity Snapshot for last week."""
+    last_sunday, last_saturday = get_weekly_activity_period()
+    date_range_str = f"{last_sunday.strftime('%B %d, %Y')} - {last_saturday.strftime('%B %d, %Y')}"
+    headers, rows = get_weekly_activity(conn)
+    report.begin("Weekly Activity Snapshot", WEEKLY_ACTIVITY_CSS)
+    report.write(f"<h2>Weekly Activity Snapshot</h2><p>{date_range_str}</p>\n")
+    report.write_table(headers, rows)
+    report.end()
+
+def write_html_table_report(report, title, headers, rows):
+    """Writes any tabular report as a plain HTML page."""
+    report.begin(title, WEEKLY_REPORT_CSS)
+    report.write(f"<h2>{title}</h2>\n")
+    report.write_table(headers, rows)
+    report.end()
+
+# ==================================================================
+# COMMAND LINE
+# ==================================================================
+
+# name -> (title, data function, HTML writer or None for the plain table page)
+REPORTS = {
+    "weekly": ("Weekly New Hire Report", get_cleared_hires, write_weekly_new_hire_report),
+    "weekly-activity": ("Weekly Activity Snapshot", get_weekly_activity, write_weekly_activity_report),
+    "referral-leaderboard": ("Referral Leaderboard", get_referral_leaderboard, None),
+    "hires-by-department": ("Hires by Department", get_hires_by_department, None),
+    "department-counts": ("Candidates by Department", get_department_counts, None),
+    "class-breakdown": ("Hiring Class Breakdown", get_class_breakdown, None),
+    "referrer-search": ("Search by Referrer", get_referrer_search, None),
+    "last-week-referrals": ("Last Week's Referrals", get_last_week_referrals, None),
+    "class-week-referrals": ("Referrals by Class Week", get_class_week_referrals, None),
+    "funnel-trend": ("Applicant Funnel Trend", get_funnel_trend_report, None),
+}
+OUTPUT_FORMATS = ("html", "csv", "json")
+
+def write_csv(file, headers, rows):
+    writer = csv.writer(file)
+    writer.writerow(headers)
+    writer.writerows(rows)
+
+def write_json(file, headers, rows):
+    """Writes a JSON list of objects, one row at a time."""
+    file.write("[")
+    separator = "\n"
+    for row in rows:
+        file.write(separator + json.dumps(dict(zip(headers, row)), default=str))
+        separator = ",\n"
+    file.write("\n]\n")
+
+def write_report(conn, name, output_format, file, options):
+    title, get_rows, write_html = REPORTS[name]
+    if output_format == "html":
+        report = HtmlReportWriter(file)
+        if write_html is not None:
+            write_html(conn, report)
+        else:
+            write_html_table_report(report, title, *get_rows(conn, options))
+    elif output_format == "csv":
+        write_csv(file, *get_rows(conn, options))
+    else:
+        write_json(file, *get_rows(conn, options))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generates HR reports without opening the application.")
+    parser.add_argument("report", choices=list(REPORTS))
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="Output format (default: from the --out extension, otherwise html).")
+    parser.add_argument("--out", help="File to write (default: standard output).")
+    parser.add_argument("--start", help="hires-by-department: first interview date; funnel-trend: first day (default: 12 weeks ago). YYYY-MM-DD.")
+    parser.add_argument("--end", help="hires-by-department: last interview date; funnel-trend: last day (default: today). YYYY-MM-DD.")
+    parser.add_argument("--referrer", help="referrer-search: part of the referrer's name.")
+    parser.add_argument("--class-date", help="class-week-referrals: the class date, YYYY-MM-DD.")
+    parser.add_argument("--profile", metavar="FILE", help="Also write the query statistics (see query_profiler.py) to FILE as JSON.")
+    options = parser.parse_args(argv)
+    if options.report == "referrer-search" and not options.referrer:
+        parser.error("referrer-search needs --referrer")
+    if options.report == "class-week-referrals" and not options.class_date:
+        parser.error("class-week-referrals needs --class-date")
+
+    output_format = options.format
+    if output_format is None:
+        extension = os.path.splitext(options.out or "")[1].lstrip(".").lower()
+        output_format = extension if extension in OUTPUT_FORMATS else "html"
+
+    if options.profile:
+        from query_profiler import QUERY_PROFILER
+        QUERY_PROFILER.enable()
+    try:
+        if options.out:
+            output = open_output(options.out, newline="" if output_format == "csv" else None)
+        else:
+            output = contextlib.nullcontext(sys.stdout)
+        with db_session() as conn, output as file:
+            write_report(conn, options.report, output_format, file, options)
+        if options.profile:
+            QUERY_PROFILER.export_json(options.profile)
+    except (sqlite3.Error, OSError, ValueError) as e:
+        print(f"Failed to generate {options.report}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
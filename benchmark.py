@@ -0,0 +1,292 @@
+import argparse
+import datetime
+import io
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+from common import DB_PATH, DB_POOL, db_session, script_dir
+from db_migrations import run_migrations
+from queries import DASHBOARD_PENDING_HOT_LIST, DASHBOARD_PENDING_HOT_LIST_ORDER, fetch_page, fetch_kpis, fetch_class_roster
+from candidate_search import SEARCH_QUERY, SEARCH_ORDER, build_match_query
+from change_log import get_change_version
+from batch_reports import REPORTS, write_report
+from report_writer import open_output
+from synthetic_data import count_rows
+from daily_metrics import fetch_daily_log, fetch_daily_logs
+from metric_rollups import week_start
+from analytics_snapshot import CandidateSnapshot
+
+# ==================================================================
+# QUERY BENCHMARK
+# ==================================================================
+# Times the queries each window runs, through the same functions the windows call, so
+# a change that slows one of them down shows up before it reaches the office. No window
+# is opened. Point it at a database made by synthetic_data.py to see how the queries
+# hold up as the data grows:
+#
+#   python synthetic_data.py bench.db --candidates 1000000 --years 5
+#   python benchmark.py --db bench.db --save-baseline       Records the timings.
+#   python benchmark.py --db bench.db                       Compares with them.
+#
+# Each case runs BENCHMARK_WARMUP_RUNS times untimed (to load the pages it reads into
+# the cache, as a window that has been open a while would have them) and then --runs
+# times, cycling through inputs sampled from the database (search terms, classes,
+# dates). The p50 and p95 of the timed runs are compared with the baseline file; a
+# case is a regression when its p50 is more than --tolerance slower (or its p95 more
+# than twice that) and also at least REGRESSION_MIN_MS slower, so sub-millisecond
+# noise is not flagged. The exit status is 1 when there is a regression, for use in a
+# scheduled check.
+
+BENCHMARK_BASELINE = os.path.join(script_dir, "benchmark_baseline.json")
+BENCHMARK_RUNS = 30
+BENCHMARK_WARMUP_RUNS = 2
+BENCHMARK_SAMPLE_SIZE = 50
+REGRESSION_TOLERANCE = 0.25
+REGRESSION_MIN_MS = 1.0
+
+# ==================================================================
+# CASES
+# ==================================================================
+# Each case is (name, function(conn, sample), key of the inputs in the samples dict).
+# The GUI modules are imported when their cases run, so a missing optional library
+# only skips those cases.
+
+def sample_inputs(conn, seed=7):
+    """Picks realistic inputs for the cases from the database itself."""
+    rng = random.Random(seed)
+    def pick(sql, params=()):
+        rows = conn.execute(sql, params).fetchall()
+        return rng.sample(rows, min(BENCHMARK_SAMPLE_SIZE, len(rows)))
+    candidates = pick("SELECT first_name, last_name, phone_number, pn_number FROM Candidates WHERE candidate_id IN (SELECT candidate_id FROM Candidates ORDER BY random() LIMIT 1000);")
+    today = datetime.date.today().isoformat()
+    first_page = fetch_page(conn, DASHBOARD_PENDING_HOT_LIST, (), DASHBOARD_PENDING_HOT_LIST_ORDER)
+    return {
+        'names': [f"{last_name} {first_name[:3]}" for first_name, last_name, _, _ in candidates],
+        'phones': [phone[:9] for _, _, phone, _ in candidates if phone],
+        'pn_numbers': [pn_number for _, _, _, pn_number in candidates if pn_number],
+        'past_classes': [class_id for class_id, in pick("SELECT class_id FROM Hiring_Classes WHERE class_date < ?;", (today,))],
+        'upcoming_classes': [class_id for class_id, in pick("SELECT class_id FROM Hiring_Classes WHERE class_date >= ?;", (today,))],
+        'class_dates': [class_date for class_date, in pick("SELECT class_date FROM Hiring_Classes WHERE class_date < ?;", (today,))],
+        'metric_days': pick("SELECT metric_date, department FROM Daily_Metrics;"),
+        'referrers': [referrer for referrer, in pick("SELECT DISTINCT referred_by FROM Candidates WHERE referred_by != '' LIMIT 1000;")],
+        'hot_list_keys': first_page[1][-1:],
+        'change_versions': [get_change_version(conn)],
+        'none': [None],
+    }
+
+def search_first_page(conn, term):
+    return fetch_page(conn, SEARCH_QUERY, (build_match_query(term),), SEARCH_ORDER)
+
+def dashboard_kpis(conn, _):
+    return fetch_kpis(conn)
+
+def dashboard_load(conn, _):
+    from dashboard import fetch_dashboard_data
+    return fetch_dashboard_data(conn)
+
+def dashboard_sync(conn, version):
+    from dashboard import fetch_dashboard_changes
+    return fetch_dashboard_changes(conn, version)
+
+def dashboard_next_page(conn, after):
+    return fetch_page(conn, DASHBOARD_PENDING_HOT_LIST, (), DASHBOARD_PENDING_HOT_LIST_ORDER, after=after)
+
+def class_roster(conn, class_id):
+    return fetch_class_roster(conn, class_id)
+
+def daily_log(conn, day):
+    return fetch_daily_log(conn, *day)
+
+def week_grid(conn, day):
+    week = week_start(day[0])
+    return fetch_daily_logs(conn, week.isoformat(), (week + datetime.timedelta(days=6)).isoformat())
+
+def report_case(name, option=None):
+    """Generates a batch_reports report in full (as CSV, or HTML for the two weekly reports) into memory.
+
+    The sampled input, if any, is passed as the named command-line option."""
+    output_format = "csv" if REPORTS[name][2] is None else "html"
+    def run(conn, value):
+        options = SimpleNamespace(start=None, end=None, referrer=None, class_date=None)
+        if option:
+            setattr(options, option, value)
+        write_report(conn, name, output_format, io.StringIO(), options)
+    return run
+
+def hires_by_department(conn, _):
+    year_ago = (datetime.date.today() - datetime.timedelta(days=365)).isoformat()
+    write_report(conn, "hires-by-department", "csv", io.StringIO(), SimpleNamespace(start=year_ago, end=datetime.date.today().isoformat()))
+
+def funnel_trend_year(conn, _, cached=False):
+    from funnel_trend import FUNNEL_CACHE, get_funnel_trend
+    if not cached:
+        FUNNEL_CACHE.clear()
+    return get_funnel_trend(conn, datetime.date.today() - datetime.timedelta(days=365))
+
+# Its own snapshot, so the report cases above keep timing their SQL. The first
+# warm-up run loads it; the timed runs are a refresh with nothing changed plus the work.
+BENCHMARK_SNAPSHOT = CandidateSnapshot()
+
+def snapshot_case(name, *args):
+    def run(conn, _):
+        return getattr(BENCHMARK_SNAPSHOT.refresh(conn), name)(*args)
+    return run
+
+BENCHMARK_CASES = [
+    ("dashboard.kpis", dashboard_kpis, 'none'),
+    ("dashboard.load", dashboard_load, 'none'),
+    ("dashboard.sync_unchanged", dashboard_sync, 'change_versions'),
+    ("dashboard.hot_list_next_page", dashboard_next_page, 'hot_list_keys'),
+    ("search.name", search_first_page, 'names'),
+    ("search.phone", search_first_page, 'phones'),
+    ("search.pn_number", search_first_page, 'pn_numbers'),
+    ("roster.past_class", class_roster, 'past_classes'),
+    ("roster.upcoming_class", class_roster, 'upcoming_classes'),
+    ("reports.weekly", report_case("weekly"), 'none'),
+    ("reports.weekly_activity", report_case("weekly-activity"), 'none'),
+    ("reports.referral_leaderboard", report_case("referral-leaderboard"), 'none'),
+    ("reports.hires_by_department", hires_by_department, 'none'),
+    ("reports.department_counts", report_case("department-counts"), 'none'),
+    ("reports.class_breakdown", report_case("class-breakdown"), 'none'),
+    ("reports.referrer_search", report_case("referrer-search", 'referrer'), 'referrers'),
+    ("reports.last_week_referrals", report_case("last-week-referrals"), 'none'),
+    ("reports.class_week_referrals", report_case("class-week-referrals", 'class_date'), 'class_dates'),
+    ("reports.funnel_trend_year", funnel_trend_year, 'none'),
+    ("reports.funnel_trend_year_cached", lambda conn, value: funnel_trend_year(conn, value, cached=True), 'none'),
+    ("applicant_tracker.daily_log", daily_log, 'metric_days'),
+    ("applicant_tracker.week_grid", week_grid, 'metric_days'),
+    ("snapshot.referral_leaderboard", snapshot_case("referral_leaderboard"), 'none'),
+    ("snapshot.hires_by_department", snapshot_case("hires_by_department"), 'none'),
+    ("snapshot.hires_last_year", snapshot_case("hires_by_department", (datetime.date.today() - datetime.timedelta(days=365)).isoformat()), 'none'),
+    ("snapshot.department_counts", snapshot_case("department_counts"), 'none'),
+    ("snapshot.class_breakdown", snapshot_case("class_breakdown"), 'none'),
+]
+
+# ==================================================================
+# RUNNING AND COMPARING
+# ==================================================================
+
+def percentiles(timings):
+    """Returns (p50, p95) of a list of timings."""
+    p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+    return statistics.median(timings), p95
+
+def run_case(conn, function, inputs, runs):
+    """Returns the timings of runs calls in milliseconds, cycling through inputs."""
+    for i in range(BENCHMARK_WARMUP_RUNS):
+        function(conn, inputs[i % len(inputs)])
+    timings = []
+    for i in range(runs):
+        started = time.perf_counter()
+        function(conn, inputs[i % len(inputs)])
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def run_benchmarks(conn, runs=BENCHMARK_RUNS, only=None, progress=print):
+    """Runs the cases whose names start with one of only (or all of them).
+
+    Returns {name: {'p50_ms', 'p95_ms', 'runs'}, or {'skipped': reason}}."""
+    samples = sample_inputs(conn)
+    results = {}
+    for name, function, inputs_key in BENCHMARK_CASES:
+        if only and not name.startswith(tuple(only)):
+            continue
+        inputs = samples[inputs_key]
+        if not inputs:
+            results[name] = {'skipped': "no data to run it on"}
+        else:
+            try:
+                p50, p95 = percentiles(run_case(conn, function, inputs, runs))
+                results[name] = {'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3), 'runs': runs}
+            except ImportError as e:
+                results[name] = {'skipped': str(e)}
+            # Some fetch functions switch the connection to sqlite3.Row; put it back for the next case.
+            conn.row_factory = None
+        progress(format_result(name, results[name]))
+    return results
+
+def compare_with_baseline(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """Returns {name: (p50 change, p95 change, is_regression)} for the cases in both, the changes as fractions."""
+    comparison = {}
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name, {})
+        if 'p50_ms' not in result or 'p50_ms' not in before:
+            continue
+        changes, is_regression = [], False
+        # The p95 of a few dozen runs moves more from run to run, so it is allowed twice the slack.
+        for key, allowed in (('p50_ms', tolerance), ('p95_ms', tolerance * 2)):
+            change = (result[key] - before[key]) / before[key] if before[key] else 0.0
+            changes.append(change)
+            is_regression |= change > allowed and result[key] - before[key] >= REGRESSION_MIN_MS
+        comparison[name] = (*changes, is_regression)
+    return comparison
+
+def format_result(name, result, comparison=None):
+    if 'skipped' in result:
+        return f"  {name:<34} skipped ({result['skipped']})"
+    line = f"  {name:<34} p50 {result['p50_ms']:9.2f} ms   p95 {result['p95_ms']:9.2f} ms"
+    if comparison:
+        p50_change, p95_change, is_regression = comparison
+        line += f"   vs baseline: p50 {p50_change:+7.1%}  p95 {p95_change:+7.1%}{'  REGRESSION' if is_regression else ''}"
+    return line
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+def save_baseline(path, results, table_counts):
+    with open_output(path) as file:
+        json.dump({'recorded': datetime.datetime.now().isoformat(timespec="seconds"), 'tables': table_counts, 'results': results}, file, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Times the application's queries and compares them with a stored baseline.")
+    parser.add_argument("--db", default=DB_PATH, help="Database to run against (default: the application's database).")
+    parser.add_argument("--runs", type=int, default=BENCHMARK_RUNS, help=f"Timed runs per case. Default: {BENCHMARK_RUNS}.")
+    parser.add_argument("--only", nargs="+", metavar="PREFIX", help="Only run the cases whose names start with these, e.g. search reports.weekly")
+    parser.add_argument("--baseline", default=BENCHMARK_BASELINE, help="Baseline file to compare with (default: benchmark_baseline.json).")
+    parser.add_argument("--save-baseline", action="store_true", help="Record these timings as the new baseline instead of comparing.")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE, help=f"How much slower a p50 may get, as a fraction (twice that for the p95). Default: {REGRESSION_TOLERANCE}.")
+    options = parser.parse_args(argv)
+    if options.runs < 1:
+        parser.error("--runs must be at least 1")
+
+    DB_POOL.db_path = options.db
+    try:
+        with db_session() as conn:
+            run_migrations(conn)
+            table_counts = count_rows(conn)
+            print(f"{options.db}: {table_counts['Candidates']:,} candidates, {table_counts['Daily_Metrics']:,} days of metrics; {options.runs} runs per case")
+            results = run_benchmarks(conn, options.runs, options.only)
+    except sqlite3.Error as e:
+        print(f"Benchmark failed: {e}", file=sys.stderr)
+        return 1
+
+    if options.save_baseline:
+        save_baseline(options.baseline, results, table_counts)
+        print(f"Baseline saved to {options.baseline}.")
+        return 0
+    try:
+        baseline = load_baseline(options.baseline)
+    except FileNotFoundError:
+        print(f"No baseline at {options.baseline}; run with --save-baseline to record one.")
+        return 0
+    if baseline.get('tables') != table_counts:
+        print(f"Note: the baseline was recorded on a database of a different size ({baseline.get('tables')}).")
+    comparison = compare_with_baseline(results, baseline, options.tolerance)
+    print(f"\nCompared with the baseline of {baseline.get('recorded', 'unknown date')}:")
+    for name, result in results.items():
+        print(format_result(name, result, comparison.get(name)))
+    regressions = [name for name, (_, _, is_regression) in comparison.items() if is_regression]
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("No regressions.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
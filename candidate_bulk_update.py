@@ -0,0 +1,80 @@
+import json
+
+# ==================================================================
+# BULK CANDIDATE UPDATES
+# ==================================================================
+# Recruiters used to open EditWindow once per candidate to clear a whole class's
+# BG/DS flags, each save being its own UPDATE and commit. bulk_update_candidates
+# applies the same field changes to a selection of candidates -- a list of ids (e.g.
+# the rows picked in the search results) or everyone in a hiring class -- with one
+# set-based UPDATE in one transaction. The ids are passed as a single JSON array read
+# with json_each, so the number of statements is the same for 5 candidates or 5,000
+# and there is no limit on bound parameters to run into.
+#
+# Rows that already hold the new values are left out of the UPDATE, so the search
+# index and pipeline-count triggers only fire for candidates that actually change.
+
+# The columns that can be bulk-edited, with their labels.
+BULK_UPDATE_FIELDS = {
+    'candidate_status': "Candidate Status",
+    'screening_status': "Screening Status",
+    'rejection_reason': "Rejection Reason",
+    'bg_ds_clear': "BG/DS Clear",
+    'pre_board_complete': "Pre-Board Complete",
+    'myinfo_ready': "MyInfo Ready",
+    'orientation_letter_sent': "Orientation Letter Sent",
+    'fk_class_id': "Hiring Class",
+}
+FLAG_FIELDS = ('bg_ds_clear', 'pre_board_complete', 'myinfo_ready', 'orientation_letter_sent')
+
+# The choices EditWindow and BulkEditWindow offer for the text fields. They live here,
+# not in search_update.py, so scripts such as synthetic_data.py need not import tkinter.
+CANDIDATE_STATUSES = ['Pending', 'Hired', 'Rejected', 'On Hold']
+SCREENING_STATUSES = ['', 'BG', 'DS', 'elink', 'DS/BG']
+REJECTION_REASONS = ['', 'DS', 'BG', 'NCNS', 'elink', 'Other']
+
+SELECTED_IDS_WHERE = "candidate_id IN (SELECT value FROM json_each(?))"
+CLASS_WHERE = "fk_class_id = ?"
+
+class BulkUpdateError(Exception):
+    """The bulk update was not understood (no selection, or a field that cannot be bulk-edited)."""
+
+def build_bulk_update(changes, where):
+    """Returns the UPDATE statement and its leading parameters for changes ({column: value})."""
+    unknown = [column for column in changes if column not in BULK_UPDATE_FIELDS]
+    if unknown:
+        raise BulkUpdateError(f"These fields cannot be bulk-edited: {', '.join(unknown)}")
+    if not changes:
+        raise BulkUpdateError("No changes were given.")
+    columns = list(changes)
+    values = [int(bool(changes[column])) if column in FLAG_FIELDS else changes[column] for column in columns]
+    assignments = ", ".join(f"{column} = ?" for column in columns)
+    # IS NOT treats NULL as a value, so a NULL flag still counts as different from 0.
+    differs = " OR ".join(f"{column} IS NOT ?" for column in columns)
+    sql = f"UPDATE Candidates SET {assignments} WHERE {where} AND ({differs});"
+    return sql, values
+
+def bulk_update_candidates(conn, changes, candidate_ids=None, class_id=None):
+    """Applies changes ({column: value}) to the given candidates, or to everyone in class_id.
+
+    Runs in its own transaction. Returns {'selected': candidates matched, 'updated': candidates
+    changed}; the difference already had the new values."""
+    if candidate_ids is not None:
+        where, selection = SELECTED_IDS_WHERE, json.dumps([int(candidate_id) for candidate_id in candidate_ids])
+    elif class_id is not None:
+        where, selection = CLASS_WHERE, class_id
+    else:
+        raise BulkUpdateError("No candidates were selected.")
+    sql, values = build_bulk_update(changes, where)
+    # BEGIN cannot start inside the transaction a nested db_session leaves open.
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        selected = conn.execute(f"SELECT COUNT(*) FROM Candidates WHERE {where};", (selection,)).fetchone()[0]
+        updated = conn.execute(sql, (*values, selection, *values)).rowcount
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return {'selected': selected, 'updated': updated}
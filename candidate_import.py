@@ -0,0 +1,333 @@
+import argparse
+import contextlib
+import csv
+import datetime
+import os
+import re
+import sqlite3
+import sys
+from common import db_session, format_phone_number, format_date
+from reference_data import REFERENCE_DATA
+from report_writer import open_output
+from candidate_search import INDEX_CANDIDATE_RANGE
+from pipeline_stats import ADD_RANGE_COUNTS
+from change_log import RECORD_RANGE_CHANGES
+
+# ==================================================================
+# BULK CANDIDATE IMPORT
+# ==================================================================
+# Loads applicant lists exported as CSV or Excel (.xlsx) into Candidates. Rows are
+# streamed through the file one at a time, so the whole sheet is never held in memory:
+#
+#   read rows -> normalize -> validate -> resolve lookups -> insert (in chunks)
+#
+# Each row becomes a 'Pending' candidate, exactly as if it had been typed into the
+# New Candidate Entry form: phones and dates go through the same formatting as the
+# form, and Jobs, Hiring Classes and Interviewers are matched against the cached
+# reference data. A row that fails any stage is skipped and written, with the reason,
+# to a rejects CSV. Accepted rows are inserted with executemany, IMPORT_CHUNK_SIZE rows
+# per transaction.
+#
+# The insert triggers on Candidates (search index, pipeline counts, change log) cost
+# several times more than the insert itself when run once per row. For each chunk they
+# are dropped inside the chunk's transaction, the same bookkeeping is done once for the
+# whole chunk with set-based statements, and they are recreated before the commit, so
+# no other connection ever sees Candidates without them.
+#
+#   python candidate_import.py applicants.csv --rejects applicants_rejected.csv
+#
+# Columns are matched by header, ignoring case, spaces and punctuation; see
+# IMPORT_COLUMNS. Only First Name and Last Name are required. Interviewers may hold
+# several names separated by ";" or ",".
+
+IMPORT_CHUNK_SIZE = 5000
+REJECT_SAMPLE_SIZE = 20
+
+# field -> accepted column headers
+IMPORT_COLUMNS = {
+    'first_name': ('First Name', 'First'),
+    'last_name': ('Last Name', 'Last'),
+    'phone_number': ('Phone Number', 'Phone'),
+    'coc_number': ('COC#', 'COC Number', 'COC'),
+    'interview_date': ('Interview Date',),
+    'rehire_date': ('Original Hire Date', 'Rehire Date'),
+    'original_term_date': ('Original Term Date', 'Term Date'),
+    'referred_by': ('Referred By', 'Referrer'),
+    'notes': ('Notes',),
+    'department': ('Department',),
+    'shift': ('Shift',),
+    'employment_type': ('Employment Type',),
+    'pay_structure': ('Pay Structure', 'Pay'),
+    'hiring_class': ('Hiring Class', 'Class Date', 'Class'),
+    'is_spanish_only': ('Spanish Only', 'Spanish Only Speaker', 'Spanish'),
+    'interviewers': ('Interviewers', 'Interviewer'),
+}
+DATE_FIELDS = ('interview_date', 'rehire_date', 'original_term_date')
+YES_VALUES = {'y', 'yes', 'true', '1', 'x'}
+NO_VALUES = {'', 'n', 'no', 'false', '0'}
+INTERVIEWER_SEPARATOR = re.compile(r'\s*[;,]\s*')
+
+INSERT_CANDIDATE = """INSERT INTO Candidates (candidate_id, first_name, last_name, phone_number, coc_number, interview_date, rehire_date, original_term_date, referred_by, notes, fk_job_id, fk_class_id, is_spanish_only, candidate_status, bg_ds_clear, pre_board_complete, myinfo_ready, orientation_letter_sent) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'Pending', 0, 0, 0, 0);"""
+INSERT_INTERVIEWER_LINK = "INSERT INTO Candidate_Interviewers (fk_candidate_id, fk_interviewer_id) VALUES (?, ?);"
+
+# (insert trigger, statements doing its work for candidate_id BETWEEN ? AND ?)
+BULK_INSERT_TRIGGERS = [
+    ("trg_candidates_fts_insert", [INDEX_CANDIDATE_RANGE]),
+    ("trg_candidates_pipeline_insert", ADD_RANGE_COUNTS),
+    ("trg_candidates_changes_insert", [RECORD_RANGE_CHANGES]),
+]
+
+
+class CandidateImportError(Exception):
+    """The file as a whole cannot be imported (unreadable, or missing required columns)."""
+
+
+class RowRejected(Exception):
+    """One row cannot be imported. The message is the reason given in the rejects file."""
+
+# ==================================================================
+# READING
+# ==================================================================
+
+def read_csv_rows(path):
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        yield from csv.reader(file)
+
+def read_excel_rows(path):
+    """Streams the first worksheet of an .xlsx file. Needs openpyxl (pip install openpyxl)."""
+    try:
+        import openpyxl
+    except ImportError:
+        raise CandidateImportError("Importing Excel files needs the openpyxl library (pip install openpyxl). Alternatively, save the sheet as CSV.")
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield [cell_to_text(value) for value in row]
+    finally:
+        workbook.close()
+
+def cell_to_text(value):
+    """Turns an Excel cell value into the text a CSV export would have held."""
+    if value is None:
+        return ""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, float) and value.is_integer():
+        # Phone numbers and COC numbers typed into Excel come back as floats.
+        return str(int(value))
+    return str(value)
+
+def read_rows(path):
+    """Yields each row of a CSV or .xlsx file as a list of strings, header row first."""
+    if os.path.splitext(path)[1].lower() in ('.xlsx', '.xlsm'):
+        return read_excel_rows(path)
+    return read_csv_rows(path)
+
+def header_key(header):
+    return re.sub(r'[^a-z0-9#]', '', str(header).lower())
+
+HEADER_FIELDS = {header_key(header): field for field, headers in IMPORT_COLUMNS.items() for header in headers}
+
+def map_columns(header_row):
+    """Returns {field: column index} for the recognised columns of a header row."""
+    columns = {}
+    for index, header in enumerate(header_row):
+        field = HEADER_FIELDS.get(header_key(header))
+        if field is not None and field not in columns:
+            columns[field] = index
+    missing = [IMPORT_COLUMNS[field][0] for field in ('first_name', 'last_name') if field not in columns]
+    if missing:
+        raise CandidateImportError(f"The file has no {' or '.join(missing)} column. The first row must hold the column headers.")
+    return columns
+
+# ==================================================================
+# NORMALIZE, VALIDATE, RESOLVE
+# ==================================================================
+
+def normalize_record(row, columns):
+    """Picks the known fields out of a row, trimmed, with phones and dates formatted as the entry form does."""
+    record = {field: (row[index].strip() if index < len(row) else "") for field, index in columns.items()}
+    for field in IMPORT_COLUMNS:
+        record.setdefault(field, "")
+    for field in DATE_FIELDS + ('hiring_class',):
+        if record[field]:
+            formatted = format_date(record[field])
+            if formatted is None:
+                raise RowRejected(f"Could not understand {field.replace('_', ' ')} '{record[field]}'")
+            record[field] = formatted
+    record['phone_digits'] = re.sub(r'\D', '', record['phone_number'])
+    record['phone_number'] = format_phone_number(record['phone_number'])
+    return record
+
+def validate_record(record):
+    """Checks the rules the form enforces, plus the ones a form does not need (e.g. a 10-digit phone)."""
+    if not record['first_name'] or not record['last_name']:
+        raise RowRejected("First Name and Last Name are required")
+    if record['phone_digits'] and len(record['phone_digits']) != 10:
+        raise RowRejected(f"Phone number '{record['phone_digits']}' does not have 10 digits")
+    spanish = record['is_spanish_only'].lower()
+    if spanish not in YES_VALUES and spanish not in NO_VALUES:
+        raise RowRejected(f"Spanish Only should be Yes or No, not '{record['is_spanish_only']}'")
+    record['is_spanish_only'] = spanish in YES_VALUES
+    return record
+
+
+class ImportLookups:
+    """In-memory, case-insensitive maps from the names used in a spreadsheet to Jobs, Hiring_Classes and Interviewers ids."""
+    def __init__(self, reference):
+        # department -> [(shift, employment type, pay structure, job_id)], all lower case.
+        self.jobs_by_department = {}
+        for department, job_details in reference.job_details_by_department.items():
+            jobs = self.jobs_by_department.setdefault(department.lower(), [])
+            for label, job_id in job_details.items():
+                shift, employment_type, pay_structure = (part.lower() for part in label.split(' | '))
+                jobs.append((shift, employment_type, pay_structure, job_id))
+        self.classes_map = reference.classes_map
+        self.interviewers_map = {name.lower(): interviewer_id for name, interviewer_id in reference.interviewers_map.items()}
+
+    def resolve_job(self, record):
+        """Returns the job_id matching the row's Department and whichever of Shift, Employment Type and Pay Structure it gives."""
+        wanted = (record['shift'].lower(), record['employment_type'].lower(), record['pay_structure'].lower())
+        if not record['department']:
+            if any(wanted):
+                raise RowRejected("Shift, Employment Type or Pay Structure given without a Department")
+            return None
+        jobs = self.jobs_by_department.get(record['department'].lower())
+        if jobs is None:
+            raise RowRejected(f"Unknown department '{record['department']}'")
+        matches = [job[3] for job in jobs if all(not value or value == job_value for value, job_value in zip(wanted, job))]
+        if len(matches) == 1:
+            return matches[0]
+        if not matches:
+            raise RowRejected(f"No {record['department']} job matches the Shift, Employment Type and Pay Structure given")
+        raise RowRejected(f"{record['department']} has {len(matches)} matching jobs; add Shift, Employment Type or Pay Structure to pick one")
+
+    def resolve(self, record):
+        """Returns (candidate values for INSERT_CANDIDATE without the id, interviewer ids)."""
+        fk_job_id = self.resolve_job(record)
+        fk_class_id = None
+        if record['hiring_class']:
+            fk_class_id = self.classes_map.get(record['hiring_class'])
+            if fk_class_id is None:
+                raise RowRejected(f"No hiring class on {record['hiring_class']}")
+        interviewer_ids = []
+        for name in INTERVIEWER_SEPARATOR.split(record['interviewers']) if record['interviewers'] else ():
+            interviewer_id = self.interviewers_map.get(name.lower())
+            if interviewer_id is None:
+                raise RowRejected(f"Unknown interviewer '{name}'")
+            interviewer_ids.append(interviewer_id)
+        values = (record['first_name'], record['last_name'], record['phone_number'], record['coc_number'],
+                  record['interview_date'] or None, record['rehire_date'] or None, record['original_term_date'] or None,
+                  record['referred_by'], record['notes'], fk_job_id, fk_class_id, record['is_spanish_only'])
+        return values, list(dict.fromkeys(interviewer_ids))
+
+# ==================================================================
+# INSERTING
+# ==================================================================
+
+def insert_chunk(conn, chunk):
+    """Inserts a list of (values, interviewer ids) in one transaction."""
+    # BEGIN IMMEDIATE takes the write lock up front, so the ids handed out below
+    # cannot be taken by another workstation before the insert. A db_session nested on
+    # this connection (REFERENCE_DATA reloading a cold cache, say) leaves its read
+    # transaction open, and BEGIN cannot start inside it, so that one is ended first.
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        next_id = conn.execute("SELECT COALESCE(MAX(candidate_id), 0) + 1 FROM Candidates").fetchone()[0]
+        candidates, links = [], []
+        for candidate_id, (values, interviewer_ids) in enumerate(chunk, start=next_id):
+            candidates.append((candidate_id, *values))
+            links.extend((candidate_id, interviewer_id) for interviewer_id in interviewer_ids)
+
+        bypassed = []
+        for name, statements in BULK_INSERT_TRIGGERS:
+            row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)).fetchone()
+            if row is not None:
+                conn.execute(f"DROP TRIGGER {name}")
+                bypassed.append((row[0], statements))
+        conn.executemany(INSERT_CANDIDATE, candidates)
+        id_range = (next_id, next_id + len(candidates) - 1)
+        for trigger_sql, statements in bypassed:
+            for statement in statements:
+                conn.execute(statement, id_range)
+            conn.execute(trigger_sql)
+
+        if links:
+            conn.executemany(INSERT_INTERVIEWER_LINK, links)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+def import_candidates(conn, path, rejects_path=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Imports a CSV or .xlsx file. Returns a summary dict: imported, rejected and rejected_samples ((row, reason) pairs).
+
+    Rejected rows are written to rejects_path, if given, with their row number and reason (the
+    file is removed again if nothing was rejected). Chunks already committed stay imported if a
+    later chunk fails."""
+    rows = read_rows(path)
+    header_row = next(rows, None)
+    if header_row is None:
+        raise CandidateImportError("The file is empty.")
+    columns = map_columns(header_row)
+    lookups = ImportLookups(REFERENCE_DATA.get())
+    summary = {'imported': 0, 'rejected': 0, 'rejected_samples': []}
+
+    if rejects_path:
+        rejects_output = open_output(rejects_path, newline='')
+    else:
+        rejects_output = contextlib.nullcontext()
+    with rejects_output as rejects_file:
+        rejects_writer = None
+        if rejects_file is not None:
+            rejects_writer = csv.writer(rejects_file)
+            rejects_writer.writerow(["Row", "Reason", *header_row])
+        chunk = []
+        # Row 1 is the header, so data rows are numbered as in the spreadsheet.
+        for row_number, row in enumerate(rows, start=2):
+            if not any(cell.strip() for cell in row):
+                continue
+            try:
+                chunk.append(lookups.resolve(validate_record(normalize_record(row, columns))))
+            except RowRejected as e:
+                summary['rejected'] += 1
+                if len(summary['rejected_samples']) < REJECT_SAMPLE_SIZE:
+                    summary['rejected_samples'].append((row_number, str(e)))
+                if rejects_writer is not None:
+                    rejects_writer.writerow([row_number, str(e), *row])
+                continue
+            if len(chunk) >= chunk_size:
+                insert_chunk(conn, chunk)
+                summary['imported'] += len(chunk)
+                chunk = []
+        if chunk:
+            insert_chunk(conn, chunk)
+            summary['imported'] += len(chunk)
+    if rejects_path and not summary['rejected']:
+        os.remove(rejects_path)
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Imports candidates from a CSV or Excel (.xlsx) file.")
+    parser.add_argument("file")
+    parser.add_argument("--rejects", help="CSV file to write the rejected rows to (default: <file>_rejected.csv).")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Rows inserted per transaction.")
+    options = parser.parse_args(argv)
+    rejects_path = options.rejects or os.path.splitext(options.file)[0] + "_rejected.csv"
+    try:
+        with db_session() as conn:
+            summary = import_candidates(conn, options.file, rejects_path, options.chunk_size)
+    except (CandidateImportError, sqlite3.Error, OSError) as e:
+        print(f"Import failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Imported {summary['imported']} candidate(s), rejected {summary['rejected']}.")
+    for row_number, reason in summary['rejected_samples']:
+        print(f"  row {row_number}: {reason}")
+    if summary['rejected']:
+        print(f"All rejected rows are in {rejects_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import re
+import sqlite3
+import sys
+import time
+from common import db_session
+from queries import build_page_query
+
+# ==================================================================
+# CANDIDATE SEARCH ENGINE
+# ==================================================================
+# SearchApp used to run LIKE '%term%' against five columns, which always reads the
+# whole Candidates table. Instead, an FTS5 full-text index (Candidates_FTS) holds a
+# copy of the searchable fields, keyed by candidate_id, and is kept in sync by
+# triggers (see the migration in db_migrations.py). Phone numbers are stored as
+# digits only, so "(555) 123-" and "555123" find the same candidate.
+#
+# Command line:
+#   python candidate_search.py rebuild                 Rebuilds the index from Candidates.
+#   python candidate_search.py benchmark [rows]        Compares FTS5 with the old LIKE scan.
+
+# Strips the punctuation people type in phone numbers. SQLite has no regex replace,
+# so the triggers use the same nested replace() calls.
+PHONE_DIGITS_SQL = "replace(replace(replace(replace(replace(replace({column}, '(', ''), ')', ''), '-', ''), ' ', ''), '.', ''), '+', '')"
+
+SEARCH_INDEX_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS Candidates_FTS USING fts5(first_name, last_name, phone_digits, pn_number, euid, tokenize = 'unicode61', prefix = '2 3');",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_candidates_fts_insert AFTER INSERT ON Candidates BEGIN
+    INSERT INTO Candidates_FTS (rowid, first_name, last_name, phone_digits, pn_number, euid)
+    VALUES (new.candidate_id, new.first_name, new.last_name, {PHONE_DIGITS_SQL.format(column='new.phone_number')}, new.pn_number, new.euid);
+END;""",
+    """CREATE TRIGGER IF NOT EXISTS trg_candidates_fts_delete AFTER DELETE ON Candidates BEGIN
+    DELETE FROM Candidates_FTS WHERE rowid = old.candidate_id;
+END;""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_candidates_fts_update AFTER UPDATE OF candidate_id, first_name, last_name, phone_number, pn_number, euid ON Candidates BEGIN
+    DELETE FROM Candidates_FTS WHERE rowid = old.candidate_id;
+    INSERT INTO Candidates_FTS (rowid, first_name, last_name, phone_digits, pn_number, euid)
+    VALUES (new.candidate_id, new.first_name, new.last_name, {PHONE_DIGITS_SQL.format(column='new.phone_number')}, new.pn_number, new.euid);
+END;""",
+]
+
+POPULATE_SEARCH_INDEX = f"INSERT INTO Candidates_FTS (rowid, first_name, last_name, phone_digits, pn_number, euid) SELECT candidate_id, first_name, last_name, {PHONE_DIGITS_SQL.format(column='phone_number')}, pn_number, euid FROM Candidates;"
+# Indexes the candidates with candidate_id BETWEEN ? AND ?, for bulk loads that bypass the insert trigger.
+INDEX_CANDIDATE_RANGE = POPULATE_SEARCH_INDEX.rstrip(";") + " WHERE candidate_id BETWEEN ? AND ?;"
+
+# Best matches first (bm25, with name hits weighted above ID hits), then alphabetical.
+# Like the list queries in queries.py, the order is kept separate so results can be paged.
+SEARCH_QUERY = "SELECT c.candidate_id, c.last_name, c.first_name, c.phone_number, c.pn_number, c.euid, bm25(Candidates_FTS, 2.0, 2.0, 1.0, 1.0, 1.0) AS match_rank FROM Candidates_FTS JOIN Candidates c ON c.candidate_id = Candidates_FTS.rowid WHERE Candidates_FTS MATCH ?"
+SEARCH_ORDER = (('match_rank', 'ASC'), ('last_name', 'ASC'), ('first_name', 'ASC'), ('candidate_id', 'ASC'))
+
+# The pre-FTS search, kept for the benchmark comparison.
+LIKE_SEARCH_QUERY = "SELECT candidate_id, last_name, first_name, phone_number, pn_number, euid FROM Candidates WHERE first_name LIKE ? OR last_name LIKE ? OR pn_number LIKE ? OR euid LIKE ? OR phone_number LIKE ? ORDER BY last_name, first_name"
+
+PHONE_INPUT_PATTERN = re.compile(r'[\d\s().+-]+')
+WORD_PATTERN = re.compile(r'\w+')
+
+def build_match_query(search_term):
+    """Turns what the user typed into an FTS5 prefix query, or None if there is nothing to search for."""
+    search_term = search_term.strip()
+    digits = re.sub(r'\D', '', search_term)
+    if digits and PHONE_INPUT_PATTERN.fullmatch(search_term):
+        # Looks like (part of) a phone number or a numeric PN/EUID: search on the digits alone.
+        return f'"{digits}"*'
+    words = WORD_PATTERN.findall(search_term)
+    if not words:
+        return None
+    # Every word must match the start of some indexed field (implicit AND).
+    return " ".join(f'"{word}"*' for word in words)
+
+def find_candidates(conn, search_term, limit=None):
+    """Returns (candidate_id, last_name, first_name, phone, pn_number, euid, match_rank) rows, best match first."""
+    match_query = build_match_query(search_term)
+    if match_query is None:
+        return []
+    sql, _ = build_page_query(SEARCH_QUERY, SEARCH_ORDER)
+    # LIMIT -1 means no limit in SQLite.
+    return conn.execute(sql, (match_query, -1 if limit is None else limit)).fetchall()
+
+def rebuild_search_index(conn):
+    """Re-creates the index contents from the Candidates table, e.g. after a bulk load with triggers off."""
+    conn.execute("DELETE FROM Candidates_FTS;")
+    conn.execute(POPULATE_SEARCH_INDEX)
+    conn.execute("INSERT INTO Candidates_FTS (Candidates_FTS) VALUES ('optimize');")
+    return conn.execute("SELECT COUNT(*) FROM Candidates_FTS;").fetchone()[0]
+
+# ==================================================================
+# BENCHMARK
+# ==================================================================
+# Builds a throw-away in-memory database of synthetic candidates and times the
+# same lookups through FTS5 and through the old LIKE scan.
+
+FIRST_NAMES = ["James", "Maria", "Robert", "Linda", "Michael", "Ana", "David", "Karen", "Jose", "Lisa", "Daniel", "Rosa", "Kevin", "Sandra", "Luis", "Angela", "Brian", "Carmen", "Jason", "Diana"]
+SYLLABLES = ["mar", "tin", "gar", "cia", "ro", "dri", "guez", "wil", "son", "an", "der", "lo", "pez", "her", "nan", "dez", "mo", "ore", "tho", "mas", "jack", "ram", "ir", "ez", "cla", "rk"]
+
+def build_benchmark_database(row_count, seed=7):
+    """Creates an in-memory database with row_count synthetic candidates. Returns (conn, sample_rows)."""
+    import random
+    from db_migrations import run_migrations
+    rng = random.Random(seed)
+    conn = sqlite3.connect(":memory:")
+    run_migrations(conn)
+    samples = []
+    batch = []
+    for candidate_id in range(1, row_count + 1):
+        last_name = "".join(rng.choice(SYLLABLES) for _ in range(3)).title()
+        first_name = rng.choice(FIRST_NAMES)
+        phone = f"({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}"
+        pn_number = str(rng.randint(10_000_000, 99_999_999))
+        euid = f"E{rng.randint(100_000, 999_999)}"
+        batch.append((candidate_id, first_name, last_name, phone, pn_number, euid))
+        if candidate_id % 997 == 0:
+            samples.append(batch[-1])
+        if len(batch) == 10_000:
+            conn.executemany("INSERT INTO Candidates (candidate_id, first_name, last_name, phone_number, pn_number, euid, candidate_status) VALUES (?, ?, ?, ?, ?, ?, 'Pending');", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO Candidates (candidate_id, first_name, last_name, phone_number, pn_number, euid, candidate_status) VALUES (?, ?, ?, ?, ?, ?, 'Pending');", batch)
+    conn.commit()
+    return conn, samples
+
+def time_queries(run_one, terms):
+    """Runs run_one(term) for each term and returns the timings in milliseconds."""
+    timings = []
+    for term in terms:
+        started = time.perf_counter()
+        run_one(term)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def run_benchmark(row_count=500_000, lookups=200):
+    """Prints median/p95 lookup times for FTS5 and for the LIKE scan."""
+    import statistics
+    print(f"Building {row_count:,} synthetic candidates...")
+    conn, samples = build_benchmark_database(row_count)
+    samples = samples[:lookups]
+    # A realistic mix: "last first", the start of a phone number as typed, and an exact PN.
+    terms = []
+    for _, first_name, last_name, phone, pn_number, _ in samples:
+        terms.extend([f"{last_name} {first_name[:3]}", phone[:9], pn_number])
+
+    fts = time_queries(lambda term: find_candidates(conn, term), terms)
+    # The LIKE scan is far slower, so it is timed on a smaller slice of the same terms.
+    like_terms = terms[:30]
+    like = time_queries(lambda term: conn.execute(LIKE_SEARCH_QUERY, (f"%{term}%",) * 5).fetchall(), like_terms)
+    for label, timings in (("FTS5 search", fts), ("LIKE scan", like)):
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        print(f"{label:12} {len(timings):4} lookups   median {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms")
+    conn.close()
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "rebuild":
+        with db_session() as conn:
+            print(f"Search index rebuilt: {rebuild_search_index(conn)} candidates indexed.")
+    elif command == "benchmark":
+        run_benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 500_000)
+    else:
+        print("Usage: python candidate_search.py rebuild | benchmark [rows]")
@@ -0,0 +1,93 @@
+# ==================================================================
+# CANDIDATE CHANGE LOG
+# ==================================================================
+# Lets a window keep a list of candidates up to date without re-running its query.
+# Candidate_Changes holds one row per candidate with the change_version of its last
+# insert, update or delete; triggers bump the version on every change (and for every
+# candidate in a hiring class whose date is edited, since the lists show it). The
+# versions only ever go up, so a window remembers the highest one it has seen and
+# asks for the candidates changed since. When nothing has changed that is a single
+# index lookup that returns no rows, cheap enough to poll every few seconds from
+# several workstations sharing the database file.
+#
+# The table has at most one row per candidate ever created, so it never needs pruning.
+
+CHANGE_LOG_TABLES = [
+    """CREATE TABLE IF NOT EXISTS Candidate_Changes (
+    candidate_id INTEGER PRIMARY KEY,
+    change_version INTEGER NOT NULL
+);""",
+    "CREATE INDEX IF NOT EXISTS idx_candidate_changes_version ON Candidate_Changes (change_version);",
+]
+
+NEXT_VERSION_SQL = "(SELECT COALESCE(MAX(change_version), 0) + 1 FROM Candidate_Changes)"
+
+def build_record_change(source):
+    """Trigger statement recording a change for the candidates selected by source (a SELECT of candidate ids)."""
+    # SQLite needs a WHERE before ON CONFLICT in an INSERT ... SELECT, or it reads it as part of a join.
+    return (f"INSERT INTO Candidate_Changes (candidate_id, change_version) SELECT candidate_id, {NEXT_VERSION_SQL} FROM ({source}) WHERE true "
+            "ON CONFLICT (candidate_id) DO UPDATE SET change_version = excluded.change_version;")
+
+CHANGE_LOG_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_candidates_changes_insert AFTER INSERT ON Candidates BEGIN
+    {build_record_change("SELECT new.candidate_id AS candidate_id")}
+END;""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_candidates_changes_delete AFTER DELETE ON Candidates BEGIN
+    {build_record_change("SELECT old.candidate_id AS candidate_id")}
+END;""",
+    # old.candidate_id as well, in case the id itself was changed.
+    f"""CREATE TRIGGER IF NOT EXISTS trg_candidates_changes_update AFTER UPDATE ON Candidates BEGIN
+    {build_record_change("SELECT new.candidate_id AS candidate_id UNION SELECT old.candidate_id")}
+END;""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_hiring_classes_changes_update AFTER UPDATE OF class_date ON Hiring_Classes BEGIN
+    {build_record_change("SELECT candidate_id FROM Candidates WHERE fk_class_id = new.class_id")}
+END;""",
+]
+
+# Records the candidates with candidate_id BETWEEN ? AND ?, for bulk loads that bypass the insert trigger.
+RECORD_RANGE_CHANGES = build_record_change("SELECT candidate_id FROM Candidates WHERE candidate_id BETWEEN ? AND ?")
+
+CURRENT_CHANGE_VERSION = "SELECT COALESCE(MAX(change_version), 0) FROM Candidate_Changes;"
+CHANGES_SINCE = "SELECT candidate_id, change_version FROM Candidate_Changes WHERE change_version > ?;"
+
+def get_change_version(conn):
+    """The version of the latest change. Read it before a full load, then ask for the changes since."""
+    return conn.execute(CURRENT_CHANGE_VERSION).fetchone()[0]
+
+def get_changes_since(conn, version):
+    """Returns (new_version, changed candidate_ids); the version is unchanged and the list empty if nothing changed."""
+    changes = conn.execute(CHANGES_SINCE, (version,)).fetchall()
+    if not changes:
+        return version, []
+    return max(change_version for _, change_version in changes), [candidate_id for candidate_id, _ in changes]
+
+# ==================================================================
+# LOOKUP TABLE CHANGE COUNTERS
+# ==================================================================
+# Jobs and Hiring_Classes feed the dashboard too (a class date decides whether a
+# candidate is on the hot list or cleared for next week), and a new or deleted row
+# changes no candidate. Lookup_Changes keeps one counter per table, bumped by a
+# trigger on every insert, update or delete, so a cached answer built from these
+# tables can tell whether it is still current.
+
+LOOKUP_CHANGE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS Lookup_Changes (
+    table_name TEXT PRIMARY KEY,
+    change_version INTEGER NOT NULL
+);""",
+]
+
+LOOKUP_CHANGE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_lookup_{event.lower()} AFTER {event} ON {table} BEGIN
+    INSERT INTO Lookup_Changes (table_name, change_version) VALUES ('{table}', 1)
+    ON CONFLICT (table_name) DO UPDATE SET change_version = change_version + 1;
+END;"""
+    for table in ("Jobs", "Hiring_Classes") for event in ("INSERT", "UPDATE", "DELETE")
+]
+
+# The counters only go up, so their sum changes whenever either table does.
+CURRENT_LOOKUP_VERSION = "SELECT COALESCE(SUM(change_version), 0) FROM Lookup_Changes;"
+
+def get_lookup_version(conn):
+    """A number that changes whenever a row of Jobs or Hiring_Classes is inserted, updated or deleted."""
+    return conn.execute(CURRENT_LOOKUP_VERSION).fetchone()[0]
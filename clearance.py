@@ -0,0 +1,81 @@
+# ==================================================================
+# CANDIDATE CLEARANCE
+# ==================================================================
+# The single definition of "cleared to start". The class roster used to work it out in
+# Python, the orientation-letter update and the V_Cleared_Hires_Next_Week view each
+# spelled it out again in SQL, and they did not quite agree (only the view required a
+# job). Candidates now has two generated columns:
+#   missing_items   a bitmask of what is still outstanding (the MISSING_* bits below)
+#   is_cleared      1 when nothing is missing
+# SQLite computes them from the row itself, so they are always current without
+# triggers, and idx_candidates_class_cleared lets "cleared candidates in these
+# classes" be read straight from the index.
+
+MISSING_BG_DS = 1
+MISSING_PRE_BOARD = 2
+MISSING_MYINFO = 4
+MISSING_PN_EUID = 8
+MISSING_JOB = 16
+
+# (bit, label shown on the roster), in display order.
+MISSING_ITEM_LABELS = [
+    (MISSING_BG_DS, "BG/DS Clear"),
+    (MISSING_PRE_BOARD, "Pre-Board"),
+    (MISSING_MYINFO, "MyInfo Ready"),
+    (MISSING_PN_EUID, "PN/EUID"),
+    (MISSING_JOB, "Job"),
+]
+
+# {row} is '' for the column itself, or 'new.' / 'old.' inside a trigger.
+MISSING_ITEMS_SQL = (
+    f"(CASE WHEN {{row}}bg_ds_clear = 1 THEN 0 ELSE {MISSING_BG_DS} END"
+    f" + CASE WHEN {{row}}pre_board_complete = 1 THEN 0 ELSE {MISSING_PRE_BOARD} END"
+    f" + CASE WHEN {{row}}myinfo_ready = 1 THEN 0 ELSE {MISSING_MYINFO} END"
+    f" + CASE WHEN {{row}}pn_number IS NOT NULL AND {{row}}pn_number != '' AND {{row}}euid IS NOT NULL AND {{row}}euid != '' THEN 0 ELSE {MISSING_PN_EUID} END"
+    f" + CASE WHEN {{row}}fk_job_id IS NOT NULL THEN 0 ELSE {MISSING_JOB} END)"
+)
+
+# Generated columns can only be added as VIRTUAL, which costs nothing to store; the
+# index holds the computed value.
+CLEARANCE_SCHEMA = [
+    f"ALTER TABLE Candidates ADD COLUMN missing_items INTEGER GENERATED ALWAYS AS {MISSING_ITEMS_SQL.format(row='')} VIRTUAL;",
+    "ALTER TABLE Candidates ADD COLUMN is_cleared INTEGER GENERATED ALWAYS AS (missing_items = 0) VIRTUAL;",
+    "CREATE INDEX IF NOT EXISTS idx_candidates_class_cleared ON Candidates (fk_class_id, is_cleared);",
+    "DROP VIEW IF EXISTS V_Cleared_Hires_Next_Week;",
+    """CREATE VIEW V_Cleared_Hires_Next_Week AS
+SELECT
+    j.department AS "Department",
+    j.shift AS "Shift",
+    c.last_name AS "Last Name",
+    c.first_name AS "First Name",
+    CASE
+        WHEN c.is_spanish_only = 1 THEN 'S'
+        ELSE ''
+    END AS "Lang",
+    c.phone_number AS "Phone",
+    c.pn_number AS "Person Number",
+    c.euid AS "EUID"
+FROM
+    Candidates c
+JOIN
+    Jobs j ON c.fk_job_id = j.job_id
+JOIN
+    Hiring_Classes hc ON c.fk_class_id = hc.class_id
+WHERE
+    hc.class_date BETWEEN date('now', 'weekday 1') AND date('now', 'weekday 1', '+6 days')
+    AND c.is_cleared = 1
+ORDER BY
+    CASE
+        WHEN j.department = 'Grocery' THEN 1
+        WHEN j.department = 'Perishables' THEN 2
+        WHEN j.department = 'Freezer' THEN 3
+        ELSE 4
+    END,
+    j.department,
+    j.shift,
+    c.last_name;""",
+]
+
+def describe_missing_items(missing_items):
+    """Turns a missing_items bitmask into the roster's "BG/DS Clear, PN/EUID" text."""
+    return ", ".join(label for bit, label in MISSING_ITEM_LABELS if missing_items & bit)
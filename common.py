@@ -1,6 +1,11 @@
 import sqlite3
 import os
-import tkinter as tk # Imported to provide type hints and access to Tkinter constants/methods if needed.  # noqa: F401
+import re
+import datetime
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
 
 # --- Version 2.0.1 ---
 
@@ -10,12 +15,254 @@ script_dir = os.path.dirname(os.path.realpath(__file__))
 # Join the script directory with the database filename
 DB_PATH = os.path.join(script_dir, 'HR_Hiring_DB.db')
 
+# --- Connection Tuning ---
+# These PRAGMAs are applied once, when a pooled connection is first opened.
+# A negative cache_size is measured in KiB, so -16000 is roughly 16 MB of page cache.
+DB_POOL_SIZE = 4
+DB_JOURNAL_MODE = 'WAL'
+DB_SYNCHRONOUS = 'NORMAL'
+DB_CACHE_SIZE = -16000
+DB_MMAP_SIZE = 64 * 1024 * 1024
+DB_BUSY_TIMEOUT_MS = 5000
+
+# ==================================================================
+# CONNECTION POOL
+# ==================================================================
+# Opening a connection and running the PRAGMA setup on every button click adds up,
+# so connections are kept open and handed out again. A thread that asks for a
+# connection while it already holds one gets the same connection back, which keeps
+# nested helpers (e.g. a loader calling an event handler) on a single connection.
+# Only the thread that acquired a connection may release it; a release from any
+# other thread is a bug and raises RuntimeError.
+class PooledConnection(sqlite3.Connection):
+    """A sqlite3 connection whose close() returns it to its pool instead of closing it."""
+    pool = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            super().close()
+
+    def close_for_real(self):
+        """Closes the underlying SQLite handle, bypassing the pool."""
+        sqlite3.Connection.close(self)
+
+
+class ConnectionPool:
+    """A thread-safe pool of tuned, persistent SQLite connections."""
+    def __init__(self, db_path=None, max_size=DB_POOL_SIZE):
+        self.db_path = db_path
+        self.max_size = max_size
+        self._lock = threading.Condition()
+        self._idle = []
+        self._all = []
+        self._leases = threading.local()
+        self.stats = {'hits': 0, 'opens': 0, 'waits': 0, 'wait_time': 0.0}
+        self.connection_factory = PooledConnection
+
+    def _open(self):
+        """Opens a new connection and applies the one-time PRAGMA setup."""
+        conn = sqlite3.connect(self.db_path or DB_PATH, factory=self.connection_factory, check_same_thread=False, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+        conn.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE};")
+        conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS};")
+        conn.execute(f"PRAGMA cache_size = {DB_CACHE_SIZE};")
+        conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE};")
+        conn.execute("PRAGMA foreign_keys = ON;")
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        """Returns a connection for the calling thread, reusing an idle one when possible."""
+        lease = getattr(self._leases, 'lease', None)
+        if lease is not None:
+            lease[1] += 1
+            with self._lock:
+                self.stats['hits'] += 1
+            return lease[0]
+
+        conn = None
+        with self._lock:
+            if self._idle:
+                conn = self._idle.pop()
+                self.stats['hits'] += 1
+            elif len(self._all) < self.max_size:
+                # Reserve the slot now; the connection itself is opened outside the lock.
+                self._all.append(None)
+                self.stats['opens'] += 1
+            else:
+                started = time.perf_counter()
+                self.stats['waits'] += 1
+                # A slot can also free up when a connection is closed (see set_connection_factory).
+                while not self._idle and len(self._all) >= self.max_size:
+                    self._lock.wait()
+                self.stats['wait_time'] += time.perf_counter() - started
+                if self._idle:
+                    conn = self._idle.pop()
+                    self.stats['hits'] += 1
+                else:
+                    self._all.append(None)
+                    self.stats['opens'] += 1
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except sqlite3.Error:
+                with self._lock:
+                    self._all.remove(None)
+                    self._lock.notify()
+                raise
+            with self._lock:
+                self._all[self._all.index(None)] = conn
+
+        self._leases.lease = [conn, 1]
+        return conn
+
+    def holds_connection(self):
+        """True if the calling thread already has a connection from this pool."""
+        return getattr(self._leases, 'lease', None) is not None
+
+    def release(self, conn):
+        """Hands a connection back. Only the outermost release returns it to the idle list."""
+        lease = getattr(self._leases, 'lease', None)
+        if lease is None or lease[0] is not conn:
+            # Released twice, or by a thread that never acquired it: the lease count would be wrong.
+            raise RuntimeError("This connection is not held by the calling thread.")
+        lease[1] -= 1
+        if lease[1] > 0:
+            return
+        self._leases.lease = None
+        # Match the old close() semantics: anything left uncommitted is discarded,
+        # and per-caller settings do not leak into the next borrower.
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = None
+        with self._lock:
+            if type(conn) is not self.connection_factory:
+                # Opened before set_connection_factory(); make room for one of the new class.
+                self._all.remove(conn)
+                conn.close_for_real()
+            else:
+                self._idle.append(conn)
+            self._lock.notify()
+
+    def close_all(self):
+        """Closes every idle connection, e.g. before the database file is replaced."""
+        with self._lock:
+            for conn in self._idle:
+                self._all.remove(conn)
+                conn.close_for_real()
+            self._idle.clear()
+            self._lock.notify_all()
+
+    def set_connection_factory(self, factory):
+        """Switches the class of connection the pool opens (a PooledConnection subclass, e.g. for profiling).
+
+        Idle connections are closed now, and ones in use when they are released."""
+        with self._lock:
+            self.connection_factory = factory
+        self.close_all()
+
+    def get_stats(self):
+        """Returns a snapshot of the pool counters."""
+        with self._lock:
+            return {**self.stats, 'size': len(self._all), 'idle': len(self._idle)}
+
+
+DB_POOL = ConnectionPool()
+
 # --- Helper function for database connection ---
 def get_db_connection():
-    """Establishes a database connection and enables foreign key support."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+    """Borrows a pooled database connection. Calling close() on it returns it to the pool."""
+    return DB_POOL.acquire()
+
+@contextmanager
+def db_session():
+    """Context manager around a pooled connection that commits on success and rolls back on error.
+
+    A session opened while the thread already holds a connection shares it, so it must not
+    end the outer transaction: it runs inside a savepoint instead, which it releases on
+    success and rolls back to on error, and the outermost session commits or rolls back."""
+    nested = DB_POOL.holds_connection()
+    conn = DB_POOL.acquire()
+    try:
+        if nested:
+            yield from nested_session(conn)
+        else:
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+    finally:
+        conn.close()
+
+def nested_session(conn):
+    # BEGIN first, or releasing the savepoint would commit when no transaction was open.
+    if not conn.in_transaction:
+        conn.execute("BEGIN;")
+    conn.execute("SAVEPOINT db_session;")
+    try:
+        yield conn
+    except BaseException:
+        # A task that commits on its own may already have ended the transaction.
+        if conn.in_transaction:
+            conn.execute("ROLLBACK TO db_session;")
+            conn.execute("RELEASE db_session;")
+        raise
+    if conn.in_transaction:
+        conn.execute("RELEASE db_session;")
+
+# ==================================================================
+# FIELD FORMATTING
+# ==================================================================
+# Shared by the entry forms (on focus-out) and the bulk importer, so typed and
+# imported values are stored the same way.
+# The accepted date formats: MM/DD/YYYY, MM-DD-YYYY and MM.DD.YYYY, each also with a
+# 2-digit year. Rather than trying strptime once per format, a single precompiled
+# pattern picks out month, separator (the same one twice), day and year. The month
+# and day alternatives are the ones strptime uses for %m and %d.
+DATE_INPUT_PATTERN = re.compile(r'(1[0-2]|0[1-9]|[1-9])([/.-])(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])\2(\d{4}|\d{2})')
+ISO_DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+NON_DIGITS_PATTERN = re.compile(r'\D')
+
+def expand_two_digit_year(year):
+    """Same rule as strptime's %y: 69-99 are 1900s, 00-68 are 2000s."""
+    return year + (1900 if year >= 69 else 2000)
+
+def format_phone_number(text):
+    """Formats up to 10 digits as (555) 123-4567; anything that is not a digit is dropped."""
+    digits = NON_DIGITS_PATTERN.sub('', text)
+    if len(digits) > 10:
+        digits = digits[:10]
+    if not digits:
+        return ""
+    if len(digits) > 6:
+        return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
+    if len(digits) > 3:
+        return f"({digits[:3]}) {digits[3:]}"
+    return f"({digits[:3]}"
+
+# Imports see the same few hundred dates over and over.
+@lru_cache(maxsize=4096)
+def format_date(text):
+    """Converts a date such as 3/7/2025 to YYYY-MM-DD. Returns "" for blank input and None if it is not understood."""
+    date_str = text.strip()
+    if not date_str:
+        return ""
+    match = DATE_INPUT_PATTERN.fullmatch(date_str)
+    if match:
+        month, _, day, year = match.groups()
+        year_number = int(year) if len(year) == 4 else expand_two_digit_year(int(year))
+        try:
+            return datetime.date(year_number, int(month), int(day)).isoformat()
+        except ValueError:
+            # Out of range for the month, e.g. 02/30/2025.
+            pass
+    if ISO_DATE_PATTERN.match(date_str):
+        return date_str
+    return None
 
 # --- Helper function for centering windows ---
 def center_window(win, parent=None):
@@ -0,0 +1,142 @@
+import json
+import sqlite3
+from funnel_trend import FUNNEL_CACHE
+from metric_rollups import METRIC_COLUMNS, ROLLUP_TRIGGERS, DROP_ROLLUP_TRIGGERS, week_start
+
+# ==================================================================
+# DAILY METRICS
+# ==================================================================
+# Loading and saving one day of the Applicant Tracker, without any Tkinter, so the
+# same code serves ApplicantTrackerApp and the API service (see api_server.py).
+#
+# A day is kept per department: one Daily_Metrics row per (metric_date, department),
+# as in the web schema (database_setup.sql). Entries made before departments were
+# tracked have department '' (ALL_DEPARTMENTS) and cover the whole site. The weekly
+# and monthly rollups add up every department.
+#
+# Saving is two upserts rather than select-then-update-or-insert plus deleting and
+# re-inserting every breakdown: the day's row is written only if a count changed, each
+# breakdown only if its count changed, and the reasons now at 0 are deleted. Saving a
+# day unchanged writes nothing, so the rollup triggers do not fire either.
+#
+# fetch_daily_logs and save_daily_logs do the same for any number of days and
+# departments at once (the week grid, see week_grid.py): one query to load them and
+# one transaction, with each statement run once per batch, to save them.
+
+ALL_DEPARTMENTS = ''
+# How the site-wide entries are shown in the windows' department lists.
+ALL_DEPARTMENTS_LABEL = "(All departments)"
+
+# The reasons the Applicant Tracker counts, by Daily_Breakdowns category.
+REJECTION_REASONS_PRE = ["Not eligible for Rehire", "Background", "Not a good Fit"]
+REJECTION_REASONS_POST = ["Not eligible for Rehire", "Background", "Not a good Fit", "NCNS"]
+WITHDRAWAL_REASONS = ["Schedule", "Other Job Offer", "Pay", "Other"]
+BREAKDOWN_CATEGORIES = [
+    ("pre_interview_rejection", REJECTION_REASONS_PRE),
+    ("post_interview_rejection", REJECTION_REASONS_POST),
+    ("pre_interview_withdrawal", WITHDRAWAL_REASONS),
+    ("post_interview_withdrawal", WITHDRAWAL_REASONS),
+]
+
+UPSERT_DAILY_METRICS = """INSERT INTO Daily_Metrics (metric_date, department, apps_reviewed, interviews_scheduled, hires_confirmed) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (metric_date, department) DO UPDATE SET apps_reviewed = excluded.apps_reviewed, interviews_scheduled = excluded.interviews_scheduled, hires_confirmed = excluded.hires_confirmed
+WHERE (apps_reviewed, interviews_scheduled, hires_confirmed) IS NOT (excluded.apps_reviewed, excluded.interviews_scheduled, excluded.hires_confirmed);"""
+UPSERT_BREAKDOWN = """INSERT INTO Daily_Breakdowns (fk_metric_id, category, reason, count) VALUES (?, ?, ?, ?)
+ON CONFLICT (fk_metric_id, category, reason) DO UPDATE SET count = excluded.count WHERE count IS NOT excluded.count;"""
+# Deletes the day's breakdowns whose [category, reason] is not in the JSON list.
+DELETE_OTHER_BREAKDOWNS = """DELETE FROM Daily_Breakdowns WHERE fk_metric_id = ?
+AND NOT EXISTS (SELECT 1 FROM json_each(?) WHERE json_extract(value, '$[0]') = category AND json_extract(value, '$[1]') = reason);"""
+# The metric_ids of the JSON list of [metric_date, department] days.
+METRIC_IDS_QUERY = """SELECT metric_date, department, metric_id FROM Daily_Metrics
+WHERE (metric_date, department) IN (SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?));"""
+# Every day from start to end with its breakdowns, one row per breakdown (a day without any has one row of NULLs).
+# With a JSON list of departments only those are read; with NULL, all of them.
+DAILY_LOGS_QUERY = f"""SELECT m.metric_id, m.metric_date, m.department, {', '.join('m.' + column for column in METRIC_COLUMNS)}, b.category, b.reason, b.count
+FROM Daily_Metrics m LEFT JOIN Daily_Breakdowns b ON b.fk_metric_id = m.metric_id
+WHERE m.metric_date BETWEEN ? AND ? AND (?3 IS NULL OR m.department IN (SELECT value FROM json_each(?3)))
+ORDER BY m.metric_date, m.department;"""
+
+# Migration 8. SQLite cannot drop the old UNIQUE (metric_date), so Daily_Metrics is
+# rebuilt (run_migrations turns foreign keys off for this) with the same metric_ids.
+# The rollup triggers refer to the table and are recreated around it. Breakdowns get
+# a unique (day, category, reason) for the upsert; any duplicates are merged first,
+# which leaves the rollups' totals unchanged.
+DAILY_METRICS_BY_DEPARTMENT = DROP_ROLLUP_TRIGGERS + [
+    """CREATE TABLE Daily_Metrics_New (
+    metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    metric_date DATE NOT NULL,
+    department TEXT NOT NULL DEFAULT '',
+    apps_reviewed INTEGER DEFAULT 0,
+    interviews_scheduled INTEGER DEFAULT 0,
+    hires_confirmed INTEGER DEFAULT 0,
+    UNIQUE (metric_date, department)
+);""",
+    "INSERT INTO Daily_Metrics_New (metric_id, metric_date, apps_reviewed, interviews_scheduled, hires_confirmed) "
+    "SELECT metric_id, metric_date, apps_reviewed, interviews_scheduled, hires_confirmed FROM Daily_Metrics;",
+    "DROP TABLE Daily_Metrics;",
+    "ALTER TABLE Daily_Metrics_New RENAME TO Daily_Metrics;",
+    """UPDATE Daily_Breakdowns SET count = (SELECT SUM(d.count) FROM Daily_Breakdowns d WHERE d.fk_metric_id = Daily_Breakdowns.fk_metric_id
+                                             AND d.category = Daily_Breakdowns.category AND d.reason = Daily_Breakdowns.reason)
+WHERE breakdown_id IN (SELECT MIN(breakdown_id) FROM Daily_Breakdowns GROUP BY fk_metric_id, category, reason HAVING COUNT(*) > 1);""",
+    "DELETE FROM Daily_Breakdowns WHERE breakdown_id NOT IN (SELECT MIN(breakdown_id) FROM Daily_Breakdowns GROUP BY fk_metric_id, category, reason);",
+    "DROP INDEX IF EXISTS idx_daily_breakdowns_metric;",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_breakdowns_reason ON Daily_Breakdowns (fk_metric_id, category, reason);",
+] + ROLLUP_TRIGGERS
+
+def fetch_daily_log(conn, selected_date, department=ALL_DEPARTMENTS):
+    """Background task: returns the Daily_Metrics row for a date and department (or None) and its Daily_Breakdowns rows."""
+    conn.row_factory = sqlite3.Row
+    metric_data = conn.execute("SELECT * FROM Daily_Metrics WHERE metric_date = ? AND department = ?", (selected_date, department)).fetchone()
+    if metric_data is None:
+        return None, []
+    return metric_data, conn.execute("SELECT * FROM Daily_Breakdowns WHERE fk_metric_id = ?", (metric_data["metric_id"],)).fetchall()
+
+def save_daily_log(conn, selected_date, department, apps_reviewed, interviews_scheduled, hires_confirmed, breakdown_counts):
+    """Write task: saves one day's metrics for a department and its breakdowns, given as (category, reason, count) tuples.
+
+    Reasons left out (or with a count of 0) are removed. Returns the day's metric_id."""
+    day = (selected_date, department, apps_reviewed, interviews_scheduled, hires_confirmed, breakdown_counts)
+    return save_daily_logs(conn, [day])[(selected_date, department)]
+
+def fetch_daily_logs(conn, start, end, departments=None):
+    """Background task: reads every day from start to end (of the given departments, or all) in one query.
+
+    Returns {(metric_date, department): {"metric_id": ..., "apps_reviewed": ..., ..., "breakdowns": {(category, reason): count}}}
+    for the days that have been entered."""
+    departments_json = json.dumps(list(departments)) if departments is not None else None
+    days = {}
+    for metric_id, metric_date, department, *row in conn.execute(DAILY_LOGS_QUERY, (start, end, departments_json)):
+        metrics, (category, reason, count) = row[:len(METRIC_COLUMNS)], row[len(METRIC_COLUMNS):]
+        day = days.get((metric_date, department))
+        if day is None:
+            day = days[(metric_date, department)] = {"metric_id": metric_id, **dict(zip(METRIC_COLUMNS, metrics)), "breakdowns": {}}
+        if category is not None:
+            day["breakdowns"][(category, reason)] = count
+    return days
+
+def save_daily_logs(conn, days):
+    """Write task: saves several days at once, as one transaction. days holds (date, department, apps_reviewed,
+    interviews_scheduled, hires_confirmed, breakdown_counts) tuples, as save_daily_log takes them.
+
+    Returns {(metric_date, department): metric_id}."""
+    days = {(day[0], day[1]): day for day in days}
+    conn.executemany(UPSERT_DAILY_METRICS, [day[:5] for day in days.values()])
+    metric_ids = {(metric_date, department): metric_id for metric_date, department, metric_id
+                  in conn.execute(METRIC_IDS_QUERY, (json.dumps(list(days)),))}
+
+    upserts, deletes = [], []
+    for key, day in days.items():
+        counts = {(category, reason): count for category, reason, count in day[5] if count}
+        upserts.extend((metric_ids[key], category, reason, count) for (category, reason), count in counts.items())
+        deletes.append((metric_ids[key], json.dumps(list(counts))))
+    conn.executemany(UPSERT_BREAKDOWN, upserts)
+    conn.executemany(DELETE_OTHER_BREAKDOWNS, deletes)
+    return metric_ids
+
+def invalidate_funnel_weeks(dates):
+    """Makes the funnel trend re-read the weeks of the given dates. Call once a save has committed.
+
+    Not done inside the write task: a funnel read between the save and the commit still sees
+    the old weekly rollups, and would put them straight back in the cache."""
+    for week in {week_start(date) for date in dates}:
+        FUNNEL_CACHE.invalidate(week)
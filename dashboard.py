@@ -1,8 +1,37 @@
-import sqlite3
+import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox
-from common import get_db_connection, center_window
+from common import center_window
 from search_update import EditWindow
+from paged_treeview import PagedTreeview
+from db_tasks import TkTaskRunner
+from change_log import get_change_version, get_changes_since
+from queries import DASHBOARD_PENDING_HOT_LIST, DASHBOARD_PENDING_HOT_LIST_ORDER, fetch_kpis, fetch_page, fetch_rows
+
+# The dashboard keeps itself up to date: every DASHBOARD_SYNC_MS it asks the change log
+# (see change_log.py) which candidates changed since it last looked, on this workstation
+# or any other. Nothing changed costs one index lookup. Otherwise the KPIs are re-read
+# from the pipeline count tables and only the changed candidates are fetched and patched
+# into the hot list, keeping its scroll position and selection.
+DASHBOARD_SYNC_MS = 5000
+DASHBOARD_PATCH_LIMIT = 500     # With more changed candidates than this, reload the hot list instead.
+
+def fetch_dashboard_data(conn):
+    """Background task: returns the change version, the three KPI values and the first page of the hot list."""
+    # Read the version first, so anything changed during the load is picked up by the next sync.
+    version = get_change_version(conn)
+    return version, fetch_kpis(conn), fetch_page(conn, DASHBOARD_PENDING_HOT_LIST, (), DASHBOARD_PENDING_HOT_LIST_ORDER)
+
+def fetch_dashboard_changes(conn, version):
+    """Background task: returns None if no candidate changed since version, otherwise
+    (new_version, kpis, changed_ids, changed_rows). changed_rows is None when too many changed to patch."""
+    new_version, changed_ids = get_changes_since(conn, version)
+    if not changed_ids:
+        return None
+    if len(changed_ids) > DASHBOARD_PATCH_LIMIT:
+        return new_version, None, changed_ids, None
+    changed_rows = fetch_rows(conn, DASHBOARD_PENDING_HOT_LIST, (), DASHBOARD_PENDING_HOT_LIST_ORDER, 'candidate_id', changed_ids)
+    return new_version, fetch_kpis(conn), changed_ids, changed_rows
 
 # ==================================================================
 # DASHBOARD MODULE
@@ -19,8 +48,14 @@ class DashboardApp(tk.Toplevel):
         self.transient(parent)
         self.grab_set()
         
+        self.status_var = tk.StringVar()
+        self.tasks = TkTaskRunner(self, self.status_var)
+        self.change_version = None
+        self.loaded_on = None
+        self.sync_id = None
         self.create_widgets()
         self.refresh_dashboard()
+        self.sync_id = self.after(DASHBOARD_SYNC_MS, self.sync_dashboard)
         
         center_window(self, parent)
 
@@ -34,6 +69,7 @@ class DashboardApp(tk.Toplevel):
         header_frame.pack(fill=tk.X, pady=(0, 10))
         ttk.Label(header_frame, text="Hiring Pipeline Overview", font=('Helvetica', 16, 'bold')).pack(side=tk.LEFT)
         ttk.Button(header_frame, text="Refresh Dashboard", command=self.refresh_dashboard).pack(side=tk.RIGHT)
+        ttk.Label(header_frame, textvariable=self.status_var, foreground="gray").pack(side=tk.RIGHT, padx=10)
         
         # --- KPI Section ---
         kpi_frame = ttk.Frame(main_frame)
@@ -52,7 +88,7 @@ class DashboardApp(tk.Toplevel):
         for col, width in zip(columns, [150, 150, 120, 150, 300]):
             self.pending_tree.column(col, width=width, anchor=tk.W)
         v_scroll = ttk.Scrollbar(hotlist_frame, orient=tk.VERTICAL, command=self.pending_tree.yview)
-        self.pending_tree.configure(yscroll=v_scroll.set)
+        self.pending_pager = PagedTreeview(self.pending_tree, v_scroll, self.tasks, empty_values=("No pending candidates found.", "", "", "", ""))
         h_scroll = ttk.Scrollbar(hotlist_frame, orient=tk.HORIZONTAL, command=self.pending_tree.xview)
         self.pending_tree.configure(xscroll=h_scroll.set)
         v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
@@ -74,36 +110,60 @@ class DashboardApp(tk.Toplevel):
         return value_label
 
     def refresh_dashboard(self):
-        """Fetches fresh data from the database and updates all UI elements."""
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # --- KPI Queries ---
-            cursor.execute("SELECT COUNT(*) FROM Candidates WHERE candidate_status != 'Rejected' AND strftime('%Y-%m', interview_date) = strftime('%Y-%m', 'now');")
-            self.hires_this_month_kpi.config(text=str(cursor.fetchone()[0]))
-            
-            cursor.execute("SELECT COUNT(*) FROM Candidates WHERE candidate_status = 'Pending';")
-            self.pending_candidates_kpi.config(text=str(cursor.fetchone()[0]))
-            
-            cursor.execute("SELECT COUNT(*) FROM V_Cleared_Hires_Next_Week;")
-            self.cleared_next_week_kpi.config(text=str(cursor.fetchone()[0]))
-            
-            # --- Hot List Query ---
-            for item in self.pending_tree.get_children():
-                self.pending_tree.delete(item)
-            pending_query = "SELECT c.candidate_id, c.last_name, c.first_name, hc.class_date, c.screening_status, c.notes FROM Candidates c JOIN Hiring_Classes hc ON c.fk_class_id = hc.class_id WHERE c.candidate_status = 'Pending' AND hc.class_date >= date('now') ORDER BY hc.class_date, c.last_name;"
-            cursor.execute(pending_query)
-            pending_candidates = cursor.fetchall()
-            
-            if not pending_candidates:
-                self.pending_tree.insert('', tk.END, values=("No pending candidates found.", "", "", "", ""))
+        """Fetches fresh data from the database in the background; show_dashboard updates the UI."""
+        # A sync still running would patch in rows older than the reload.
+        self.tasks.cancel("sync")
+        self.tasks.run("refresh", fetch_dashboard_data, on_done=self.show_dashboard,
+                       error_message="Failed to refresh dashboard", message="Refreshing...")
+
+    def show_kpis(self, kpis):
+        month_activity, pending, cleared_next_week = kpis
+        self.hires_this_month_kpi.config(text=str(month_activity))
+        self.pending_candidates_kpi.config(text=str(pending))
+        self.cleared_next_week_kpi.config(text=str(cleared_next_week))
+
+    def show_dashboard(self, data):
+        """Updates all UI elements with the results of fetch_dashboard_data."""
+        self.change_version, kpis, first_page = data
+        self.loaded_on = datetime.date.today()
+        self.show_kpis(kpis)
+        self.pending_pager.load(DASHBOARD_PENDING_HOT_LIST, order_by=DASHBOARD_PENDING_HOT_LIST_ORDER,
+                                row_to_values=lambda row: row[1:], row_to_iid=lambda row: row[0], first_page=first_page)
+
+    def sync_dashboard(self):
+        """Timer: picks up candidate changes made since the last load or sync."""
+        busy = self.tasks.is_running("refresh") or self.tasks.is_running("sync")
+        if self.change_version is not None and not busy:
+            if self.loaded_on != datetime.date.today():
+                # The hot list and KPIs are relative to today, so start over after midnight.
+                self.refresh_dashboard()
             else:
-                for row in pending_candidates:
-                    self.pending_tree.insert('', tk.END, iid=row[0], values=row[1:])
-            conn.close()
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Failed to refresh dashboard: {e}", parent=self)
+                self.tasks.run("sync", fetch_dashboard_changes, self.change_version, on_done=self.apply_dashboard_changes,
+                               on_error=self.on_sync_failed, message=None)
+        self.sync_id = self.after(DASHBOARD_SYNC_MS, self.sync_dashboard)
+
+    def apply_dashboard_changes(self, changes):
+        """Shows the results of fetch_dashboard_changes."""
+        if changes is None:
+            return
+        version, kpis, changed_ids, changed_rows = changes
+        if changed_rows is None:
+            self.refresh_dashboard()
+            return
+        self.change_version = version
+        self.show_kpis(kpis)
+        self.pending_pager.patch(changed_ids, *changed_rows)
+
+    def on_sync_failed(self, error):
+        # Keep quiet (no message box every few seconds); the next sync tries again.
+        self.status_var.set(f"Auto-refresh failed: {error}")
+
+    def destroy(self):
+        """Stops the sync timer before the window goes away."""
+        if self.sync_id is not None:
+            self.after_cancel(self.sync_id)
+            self.sync_id = None
+        super().destroy()
 
     def open_edit_window(self, event=None):
         """Opens the EditWindow for the candidate selected in the pending_tree."""
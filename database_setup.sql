@@ -76,4 +76,13 @@ CREATE TABLE "Daily_Breakdowns" (
 
 -- Add Foreign Key Constraints to Candidates Table
 ALTER TABLE "Candidates" ADD FOREIGN KEY ("fk_job_id") REFERENCES "Jobs"("job_id");
-ALTER TABLE "Candidates" ADD FOREIGN KEY ("fk_class_id") REFERENCES "Hiring_Classes"("class_id");
\ No newline at end of file
+ALTER TABLE "Candidates" ADD FOREIGN KEY ("fk_class_id") REFERENCES "Hiring_Classes"("class_id");
+
+-- Indexes for the filters used by the dashboard, class rosters and reports
+CREATE INDEX "idx_candidates_status_class" ON "Candidates" ("candidate_status", "fk_class_id");
+CREATE INDEX "idx_candidates_class_name" ON "Candidates" ("fk_class_id", "last_name", "first_name");
+CREATE INDEX "idx_candidates_job" ON "Candidates" ("fk_job_id");
+CREATE INDEX "idx_candidates_referred_by" ON "Candidates" ("referred_by") WHERE "referred_by" <> '';
+CREATE INDEX "idx_candidates_interview_date" ON "Candidates" ("interview_date", "candidate_status");
+CREATE INDEX "idx_candidate_interviewers_interviewer" ON "Candidate_Interviewers" ("fk_interviewer_id");
+CREATE INDEX "idx_daily_breakdowns_metric" ON "Daily_Breakdowns" ("fk_metric_id");
\ No newline at end of file
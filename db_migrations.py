@@ -0,0 +1,256 @@
+import sqlite3
+import sys
+from common import db_session
+from candidate_search import SEARCH_INDEX_SCHEMA, POPULATE_SEARCH_INDEX
+from pipeline_stats import PIPELINE_TABLES, PIPELINE_TRIGGERS, POPULATE_PIPELINE_TABLES
+from change_log import CHANGE_LOG_TABLES, CHANGE_LOG_TRIGGERS, LOOKUP_CHANGE_TABLES, LOOKUP_CHANGE_TRIGGERS
+from clearance import CLEARANCE_SCHEMA
+from daily_metrics import DAILY_METRICS_BY_DEPARTMENT
+from metric_rollups import ROLLUP_TABLES, ROLLUP_TRIGGERS, POPULATE_ROLLUP_TABLES, RANGE_ACTIVITY_QUERY, RANGE_BREAKDOWNS_QUERY, range_parameters
+from queries import (DASHBOARD_MONTH_ACTIVITY_COUNT, DASHBOARD_PENDING_COUNT, DASHBOARD_CLEARED_NEXT_WEEK_COUNT,
+                     DASHBOARD_PENDING_HOT_LIST, DASHBOARD_PENDING_HOT_LIST_ORDER, CLASS_ROSTER, REFERRAL_LEADERBOARD,
+                     REFERRAL_LEADERBOARD_ORDER, LAST_WEEK_REFERRALS, CLASS_WEEK_REFERRALS, REFERRALS_ORDER, HAS_REFERRER,
+                     HIRES_BY_DEPARTMENT_ORDER, ORIENTATION_LETTER_UPDATE, build_hires_by_department_query, build_page_query)
+
+# ==================================================================
+# SCHEMA MIGRATIONS
+# ==================================================================
+# Schema changes to the SQLite database are listed here in order. The number of the
+# last migration that was applied is stored in the database file itself
+# (PRAGMA user_version), so run_migrations() can be called on every start-up and
+# only does work when a newer version of the application is opened for the first time.
+# Every statement is also written to be safe to re-run (IF NOT EXISTS), except ALTER
+# TABLE ... ADD COLUMN and table rebuilds, which SQLite cannot make conditional; the
+# version re-check under the write lock (see run_migrations) keeps them from running twice.
+#
+# Migrations run with foreign keys off, as SQLite's procedure for rebuilding a table
+# requires: otherwise dropping the old table would cascade-delete its child rows.
+
+BASELINE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS Jobs (
+    job_id INTEGER PRIMARY KEY,
+    department TEXT NOT NULL,
+    shift TEXT,
+    pay_structure TEXT NOT NULL,
+    employment_type TEXT NOT NULL
+);""",
+    """CREATE TABLE IF NOT EXISTS Interviewers (
+    interviewer_id INTEGER PRIMARY KEY,
+    interviewer_name TEXT NOT NULL UNIQUE
+);""",
+    """CREATE TABLE IF NOT EXISTS Hiring_Classes (
+    class_id INTEGER PRIMARY KEY,
+    class_date DATE NOT NULL UNIQUE
+);""",
+    """CREATE TABLE IF NOT EXISTS Candidates (
+    candidate_id INTEGER PRIMARY KEY,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    phone_number TEXT,
+    is_spanish_only BOOLEAN NOT NULL DEFAULT 0,
+    candidate_status TEXT NOT NULL,
+    screening_status TEXT,
+    rejection_reason TEXT,
+    interview_date DATE,
+    bg_ds_clear BOOLEAN NOT NULL DEFAULT 0,
+    pre_board_complete BOOLEAN NOT NULL DEFAULT 0,
+    myinfo_ready BOOLEAN NOT NULL DEFAULT 0,
+    orientation_letter_sent BOOLEAN NOT NULL DEFAULT 0,
+    coc_number TEXT,
+    pn_number TEXT,
+    euid TEXT,
+    rehire_date DATE,
+    original_term_date DATE,
+    referred_by TEXT,
+    notes TEXT,
+    fk_job_id INTEGER,
+    fk_class_id INTEGER,
+    FOREIGN KEY (fk_job_id) REFERENCES Jobs(job_id),
+    FOREIGN KEY (fk_class_id) REFERENCES Hiring_Classes(class_id)
+);""",
+    """CREATE TABLE IF NOT EXISTS Candidate_Interviewers (
+    fk_candidate_id INTEGER NOT NULL,
+    fk_interviewer_id INTEGER NOT NULL,
+    PRIMARY KEY (fk_candidate_id, fk_interviewer_id),
+    FOREIGN KEY (fk_candidate_id) REFERENCES Candidates(candidate_id),
+    FOREIGN KEY (fk_interviewer_id) REFERENCES Interviewers(interviewer_id)
+);""",
+    """CREATE TABLE IF NOT EXISTS Daily_Metrics (
+    metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    metric_date DATE NOT NULL UNIQUE,
+    apps_reviewed INTEGER DEFAULT 0,
+    interviews_scheduled INTEGER DEFAULT 0,
+    hires_confirmed INTEGER DEFAULT 0
+);""",
+    """CREATE TABLE IF NOT EXISTS Daily_Breakdowns (
+    breakdown_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fk_metric_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    count INTEGER DEFAULT 0,
+    FOREIGN KEY (fk_metric_id) REFERENCES Daily_Metrics (metric_id) ON DELETE CASCADE
+);""",
+    """CREATE VIEW IF NOT EXISTS V_Cleared_Hires_Next_Week AS
+SELECT
+    j.department AS "Department",
+    j.shift AS "Shift",
+    c.last_name AS "Last Name",
+    c.first_name AS "First Name",
+    CASE
+        WHEN c.is_spanish_only = 1 THEN 'S'
+        ELSE ''
+    END AS "Lang",
+    c.phone_number AS "Phone",
+    c.pn_number AS "Person Number",
+    c.euid AS "EUID"
+FROM
+    Candidates c
+JOIN
+    Jobs j ON c.fk_job_id = j.job_id
+JOIN
+    Hiring_Classes hc ON c.fk_class_id = hc.class_id
+WHERE
+    hc.class_date BETWEEN date('now', 'weekday 1') AND date('now', 'weekday 1', '+6 days')
+    AND c.bg_ds_clear = 1
+    AND c.pre_board_complete = 1
+    AND c.myinfo_ready = 1
+    AND c.pn_number IS NOT NULL AND c.pn_number != ''
+    AND c.euid IS NOT NULL AND c.euid != ''
+ORDER BY
+    CASE
+        WHEN j.department = 'Grocery' THEN 1
+        WHEN j.department = 'Perishables' THEN 2
+        WHEN j.department = 'Freezer' THEN 3
+        ELSE 4
+    END,
+    j.department,
+    j.shift,
+    c.last_name;""",
+]
+
+# Each index matches a filter used by one of the modules:
+# - status + class: the dashboard's pending KPI and hot list.
+# - class + name: the class roster (filter on the class, already sorted by name) and the cleared-hires view.
+# - job: the "is this job in use" check in AdminApp and any Jobs -> Candidates lookup.
+# - referred_by (partial): the referral leaderboard only ever looks at candidates that have a referrer.
+# - interview date + status: the monthly KPI, "Hires by Department" and "Last Week's Referrals".
+HOT_PATH_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_candidates_status_class ON Candidates (candidate_status, fk_class_id);",
+    "CREATE INDEX IF NOT EXISTS idx_candidates_class_name ON Candidates (fk_class_id, last_name, first_name);",
+    "CREATE INDEX IF NOT EXISTS idx_candidates_job ON Candidates (fk_job_id);",
+    "CREATE INDEX IF NOT EXISTS idx_candidates_referred_by ON Candidates (referred_by) WHERE referred_by != '';",
+    "CREATE INDEX IF NOT EXISTS idx_candidates_interview_date ON Candidates (interview_date, candidate_status);",
+    "CREATE INDEX IF NOT EXISTS idx_candidate_interviewers_interviewer ON Candidate_Interviewers (fk_interviewer_id);",
+    "CREATE INDEX IF NOT EXISTS idx_daily_breakdowns_metric ON Daily_Breakdowns (fk_metric_id);",
+]
+
+# (version, description, statements)
+MIGRATIONS = [
+    (1, "Baseline schema", BASELINE_SCHEMA),
+    (2, "Indexes for hot-path Candidates queries", HOT_PATH_INDEXES),
+    (3, "Full-text search index for candidate search", SEARCH_INDEX_SCHEMA + ["DELETE FROM Candidates_FTS;", POPULATE_SEARCH_INDEX]),
+    (4, "Trigger-maintained hiring pipeline counts for the dashboard", PIPELINE_TABLES + PIPELINE_TRIGGERS + POPULATE_PIPELINE_TABLES),
+    (5, "Candidate change log for live-updating lists", CHANGE_LOG_TABLES + CHANGE_LOG_TRIGGERS),
+    (6, "Generated is_cleared / missing_items columns on Candidates", CLEARANCE_SCHEMA),
+    (7, "Weekly and monthly rollups of the applicant tracker metrics", ROLLUP_TABLES + ROLLUP_TRIGGERS + POPULATE_ROLLUP_TABLES),
+    (8, "Applicant tracker metrics per department", DAILY_METRICS_BY_DEPARTMENT),
+    (9, "Change counters for Jobs and Hiring_Classes", LOOKUP_CHANGE_TABLES + LOOKUP_CHANGE_TRIGGERS),
+]
+
+def get_schema_version(conn):
+    """Returns the number of the last migration applied to the database."""
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+def run_migrations(conn=None):
+    """Applies any pending migrations, each in its own transaction. Returns the versions applied."""
+    if conn is None:
+        with db_session() as conn:
+            return run_migrations(conn)
+
+    applied = []
+    pending = [migration for migration in MIGRATIONS if migration[0] > get_schema_version(conn)]
+    if not pending:
+        return applied
+    # PRAGMA foreign_keys has no effect inside a transaction, so it is set around them.
+    foreign_keys = conn.execute("PRAGMA foreign_keys;").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF;")
+    try:
+        for version, description, statements in pending:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workstations starting at the
+            # same time cannot both apply the same migration. The version is re-read under the lock.
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                if version <= get_schema_version(conn):
+                    conn.rollback()
+                    continue
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version};")
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            applied.append(version)
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {foreign_keys};")
+    return applied
+
+# ==================================================================
+# QUERY PLAN CHECK
+# ==================================================================
+# Runs EXPLAIN QUERY PLAN for the module queries and flags any that fall back to a
+# full table scan. Run it with: python db_migrations.py --check-plans
+
+def get_plan_check_queries():
+    """Returns (label, sql, params) for every module query that is expected to use an index."""
+    def first_page(query, params, order_by, where=None):
+        # List views run their queries through build_page_query, so check that form.
+        sql, _ = build_page_query(query, order_by, where)
+        return sql, (*params, 200)
+    hires_query, hires_params = build_hires_by_department_query('2024-01-01', '2024-12-31')
+    return [
+        ("DashboardApp.refresh_dashboard:Hiring Activity This Month", DASHBOARD_MONTH_ACTIVITY_COUNT, ()),
+        ("DashboardApp.refresh_dashboard:Total Pending Candidates", DASHBOARD_PENDING_COUNT, ()),
+        ("DashboardApp.refresh_dashboard:Cleared for Next Week", DASHBOARD_CLEARED_NEXT_WEEK_COUNT, ()),
+        ("DashboardApp.refresh_dashboard:Pending Hot List", *first_page(DASHBOARD_PENDING_HOT_LIST, (), DASHBOARD_PENDING_HOT_LIST_ORDER)),
+        ("HistoricalViewerApp.view_class_roster", CLASS_ROSTER, (1,)),
+        ("SearchApp.bulk_update_orientation_letter", ORIENTATION_LETTER_UPDATE, ()),
+        ("ReportsApp.run_report:Referral Leaderboard", *first_page(REFERRAL_LEADERBOARD, (), REFERRAL_LEADERBOARD_ORDER)),
+        ("ReportsApp.run_report:Hires by Department", *first_page(hires_query, hires_params, HIRES_BY_DEPARTMENT_ORDER)),
+        ("ReportsApp.run_report:Last Week's Referrals", *first_page(LAST_WEEK_REFERRALS, (), REFERRALS_ORDER, HAS_REFERRER)),
+        ("ReportsApp.run_report:Referrals by Class Week", *first_page(CLASS_WEEK_REFERRALS, ('2024-01-01',), REFERRALS_ORDER, HAS_REFERRER)),
+        ("ReportsApp.generate_weekly_activity_report:Metrics", RANGE_ACTIVITY_QUERY, range_parameters('2024-01-07', '2024-01-13')),
+        ("ReportsApp.generate_weekly_activity_report:Breakdowns", RANGE_BREAKDOWNS_QUERY, range_parameters('2024-01-07', '2024-01-13')),
+    ]
+
+def is_full_scan(plan_detail, derived_names=()):
+    """True if a query plan step reads a whole table rather than an index."""
+    if not plan_detail.startswith("SCAN ") or " USING " in plan_detail:
+        return False
+    # Scanning the output of a view/subquery co-routine, a constant row or a table-valued
+    # function such as json_each (the list of ids or dates passed in) is not a table scan.
+    scanned = plan_detail[len("SCAN "):].split(" ")[0]
+    return scanned not in derived_names and plan_detail != "SCAN CONSTANT ROW" and " VIRTUAL TABLE " not in plan_detail
+
+def check_query_plans(conn):
+    """Returns (label, uses_index, plan_details) for each module query."""
+    results = []
+    for label, sql, params in get_plan_check_queries():
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+        derived_names = {detail.split(" ")[1] for detail in plan if detail.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+        uses_index = not any(is_full_scan(detail, derived_names) for detail in plan)
+        results.append((label, uses_index, plan))
+    return results
+
+if __name__ == "__main__":
+    with db_session() as conn:
+        applied = run_migrations(conn)
+        print(f"Schema version {get_schema_version(conn)} (applied now: {applied or 'none'})")
+        if "--check-plans" in sys.argv:
+            failures = 0
+            for label, uses_index, plan in check_query_plans(conn):
+                print(f"[{'OK' if uses_index else 'SCAN'}] {label}")
+                for detail in plan:
+                    print(f"        {detail}")
+                failures += not uses_index
+            sys.exit(1 if failures else 0)
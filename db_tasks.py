@@ -0,0 +1,180 @@
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from tkinter import messagebox
+from common import db_session
+from write_queue import WRITE_QUEUE
+
+# ==================================================================
+# BACKGROUND DATABASE TASKS
+# ==================================================================
+# The windows used to run their queries straight from button handlers, so a busy
+# database (another workstation writing, or a slow network share) froze the whole
+# UI. DB_TASKS runs a task -- a plain function that takes a connection -- on a small
+# pool of worker threads, each call in its own db_session(), and returns a DbTask
+# wrapping its future. Writes go to WRITE_QUEUE (see write_queue.py), which applies
+# them in order on its single writer thread. Tk must only be touched from the main thread, so TkTaskRunner
+# polls a window's tasks with after() and calls their callbacks on the Tk thread,
+# shows a busy cursor (and optional status text) while any are running, and cancels
+# them when the window is destroyed.
+#
+# Keep DB_TASK_WORKERS + 1 (the writer) below DB_POOL_SIZE so the Tk thread can still
+# get a connection.
+
+DB_TASK_WORKERS = 2
+DB_TASK_POLL_MS = 30
+
+class DbTask:
+    """A task submitted to DbTaskExecutor. Cancelling a read interrupts its query if it is already running."""
+    def __init__(self, interruptible):
+        self.interruptible = interruptible
+        self.future = None
+        self.cancelled = False
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def run(self, task, args):
+        with db_session() as conn:
+            with self._lock:
+                if self.cancelled:
+                    raise CancelledError()
+                self._conn = conn
+            try:
+                return task(conn, *args)
+            finally:
+                with self._lock:
+                    self._conn = None
+
+    def cancel(self):
+        """Stops the task, aborting its query if it is running. Writes (interruptible=False) always run to the end."""
+        if not self.interruptible:
+            return
+        with self._lock:
+            self.cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()
+        self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self):
+        """The task's return value; raises whatever the task raised. Only call once done()."""
+        return self.future.result()
+
+
+class DbTaskExecutor:
+    """Runs database tasks on background threads."""
+    def __init__(self, max_workers=DB_TASK_WORKERS, write_queue=WRITE_QUEUE):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-task")
+        self._write_queue = write_queue
+
+    def submit(self, task, *args, interruptible=True, grouped=True):
+        """Runs task(conn, *args) on a worker thread inside db_session(). Returns a DbTask.
+
+        Pass interruptible=False for writes: they go to the write queue, run in the order
+        submitted, and closing a window cannot abort or drop them. A write that commits on
+        its own also needs grouped=False (see WriteQueue.submit)."""
+        db_task = DbTask(interruptible)
+        if interruptible:
+            db_task.future = self._executor.submit(db_task.run, task, args)
+        else:
+            db_task.future = self._write_queue.submit(task, *args, grouped=grouped)
+        return db_task
+
+
+DB_TASKS = DbTaskExecutor()
+
+
+class TkTaskRunner:
+    """Runs database tasks for one window and delivers their results on the Tk thread."""
+    def __init__(self, window, status_var=None, executor=DB_TASKS):
+        self.window = window
+        self.status_var = status_var
+        self.executor = executor
+        # name -> (DbTask, on_done, on_error, error_message, errors); one task per name, the newest wins.
+        self.pending = {}
+        self.poll_id = None
+        window.bind("<Destroy>", self.on_window_destroyed, add="+")
+
+    def run(self, name, task, *args, on_done, on_error=None, error_message="Database task failed", message="Loading...",
+            interruptible=True, grouped=True, errors=(sqlite3.Error,)):
+        """Submits task(conn, *args) and calls on_done(result) on the Tk thread when it finishes.
+
+        A task still pending under the same name is cancelled and its callbacks dropped.
+        Exceptions of the types in errors (database errors by default) go to on_error(exception)
+        if given, otherwise to an error message box reading "<error_message>: <exception>"."""
+        self.cancel(name)
+        db_task = self.executor.submit(task, *args, interruptible=interruptible, grouped=grouped)
+        self.pending[name] = (db_task, on_done, on_error, error_message, errors)
+        self.show_busy(message)
+        if self.poll_id is None:
+            self.poll_id = self.window.after(DB_TASK_POLL_MS, self.poll)
+        return db_task
+
+    def poll(self):
+        """Runs on the Tk thread: calls back for every finished task."""
+        self.poll_id = None
+        finished = [name for name, (db_task, *_) in self.pending.items() if db_task.done()]
+        # Take them all off the pending list first: a callback may start new tasks or open a
+        # message box, which runs a nested event loop.
+        finished = [self.pending.pop(name) for name in finished]
+        if self.pending:
+            self.poll_id = self.window.after(DB_TASK_POLL_MS, self.poll)
+        else:
+            self.show_busy(None)
+        # Any exception is reported and the loop goes on, so one bad task cannot leave the
+        # others undelivered or the busy cursor stuck.
+        for db_task, on_done, on_error, error_message, errors in finished:
+            if not self.window.winfo_exists():
+                return
+            try:
+                result = db_task.result()
+            except CancelledError:
+                continue
+            except Exception as e:
+                self.report_error(e, on_error, error_message, errors)
+                continue
+            # A failing callback must not stop the other results being delivered.
+            try:
+                on_done(result)
+            except Exception as e:
+                self.report_error(e, None, error_message, errors)
+
+    def report_error(self, e, on_error, error_message, errors):
+        """Passes an expected error (one of errors) to on_error if given; anything else gets a message box."""
+        if on_error is not None and isinstance(e, errors):
+            on_error(e)
+        elif isinstance(e, errors):
+            messagebox.showerror("Database Error", f"{error_message}: {e}", parent=self.window)
+        else:
+            messagebox.showerror("Error", f"{error_message}: {e!r}", parent=self.window)
+
+    def is_running(self, name):
+        """True while the named task has been submitted and its result not yet delivered."""
+        return name in self.pending
+
+    def cancel(self, name):
+        """Cancels the named task, if pending, and drops its callbacks."""
+        if name in self.pending:
+            self.pending.pop(name)[0].cancel()
+
+    def show_busy(self, message):
+        """Shows a busy cursor and status message, or clears them when message is None."""
+        self.window.config(cursor="watch" if message else "")
+        if self.status_var is not None:
+            self.status_var.set(message or "")
+
+    def cancel_all(self):
+        """Cancels every pending task and drops its callbacks. Writes still run, see DbTask.cancel."""
+        if self.poll_id is not None:
+            self.window.after_cancel(self.poll_id)
+            self.poll_id = None
+        for db_task, *_ in self.pending.values():
+            db_task.cancel()
+        self.pending.clear()
+
+    def on_window_destroyed(self, event):
+        # <Destroy> also reaches the window's bindings for each child widget.
+        if event.widget is self.window:
+            self.cancel_all()
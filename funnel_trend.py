@@ -0,0 +1,127 @@
+import datetime
+import json
+import threading
+import time
+from metric_rollups import METRIC_COLUMNS, as_date, week_start
+
+# ==================================================================
+# APPLICANT FUNNEL TREND
+# ==================================================================
+# The Weekly Activity Snapshot shows one week. The funnel trend shows the same six
+# counts for every week of a range, with the conversion rate between stages:
+#
+#   Apps Received -> Interviews -> Offers, plus Withdrew, Decline and NCNS
+#
+# The counts come from the weekly rollups (see metric_rollups.py), one row per week,
+# and each week's counts are kept in FUNNEL_CACHE once read, so redrawing or exporting
+# a year of weeks does not go back to the database. ApplicantTrackerApp invalidates the
+# week of a day when it saves it; weeks saved on another workstation are re-read after
+# FUNNEL_CACHE_MAX_AGE seconds.
+
+FUNNEL_CACHE_MAX_AGE = 300
+FUNNEL_DEFAULT_WEEKS = 12
+
+FUNNEL_STAGES = ("Apps Received", "Interviews", "Offers", "Withdrew", "Decline", "NCNS")
+# (column title, numerator stage, denominator stage), shown as percentages.
+CONVERSION_RATIOS = [
+    ("Interview %", "Interviews", "Apps Received"),
+    ("Offer %", "Offers", "Interviews"),
+    ("Apps to Offer %", "Offers", "Apps Received"),
+    ("Withdrawal %", "Withdrew", "Apps Received"),
+]
+FUNNEL_TREND_HEADERS = ["Week Of", *FUNNEL_STAGES, *(title for title, _, _ in CONVERSION_RATIOS)]
+
+WEEK_METRICS_QUERY = f"SELECT period_start, {', '.join(METRIC_COLUMNS)} FROM Metrics_Weekly WHERE period_start IN (SELECT value FROM json_each(?));"
+WEEK_BREAKDOWNS_QUERY = "SELECT period_start, category, reason, count FROM Breakdowns_Weekly WHERE period_start IN (SELECT value FROM json_each(?));"
+
+def funnel_counts(metrics, breakdowns):
+    """Turns (apps_reviewed, interviews_scheduled, hires_confirmed) and (category, reason, count)
+    breakdowns into the six funnel counts, as {stage: count}."""
+    apps_reviewed, interviews_scheduled, hires_confirmed = metrics
+    counts = dict.fromkeys(FUNNEL_STAGES, 0)
+    counts.update({"Apps Received": apps_reviewed or 0, "Interviews": interviews_scheduled or 0, "Offers": hires_confirmed or 0})
+    for category, reason, count in breakdowns:
+        if 'withdrawal' in category:
+            counts["Withdrew"] += count
+        elif 'rejection' in category:
+            if reason == 'NCNS':
+                counts["NCNS"] += count
+            else:
+                counts["Decline"] += count
+    return counts
+
+def conversion_ratios(counts):
+    """Returns the CONVERSION_RATIOS as percentages (one decimal), or None where the denominator is 0."""
+    return [round(100 * counts[numerator] / counts[denominator], 1) if counts[denominator] else None
+            for _, numerator, denominator in CONVERSION_RATIOS]
+
+def load_weeks(conn, weeks):
+    """Reads the funnel counts of the given week starts from the weekly rollups. Returns {week start: counts}."""
+    weeks_json = json.dumps([week.isoformat() for week in weeks])
+    metrics = {period_start: row for period_start, *row in conn.execute(WEEK_METRICS_QUERY, (weeks_json,))}
+    breakdowns = {}
+    for period_start, category, reason, count in conn.execute(WEEK_BREAKDOWNS_QUERY, (weeks_json,)):
+        breakdowns.setdefault(period_start, []).append((category, reason, count))
+    return {week: funnel_counts(metrics.get(week.isoformat(), (0, 0, 0)), breakdowns.get(week.isoformat(), [])) for week in weeks}
+
+
+class FunnelWeekCache:
+    """Thread-safe cache of the funnel counts per week, keyed by the week's Sunday."""
+    def __init__(self, max_age=FUNNEL_CACHE_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._weeks = {}
+        self._version = 0
+        self._invalidated = {}
+
+    def invalidate(self, day):
+        """Forgets the week containing day. Call after a day's metrics are saved."""
+        week = week_start(day)
+        with self._lock:
+            self._version += 1
+            self._weeks.pop(week, None)
+            self._invalidated[week] = self._version
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._weeks.clear()
+            self._invalidated.clear()
+
+    def get_weeks(self, conn, first_week, last_week):
+        """Returns [(week start, counts)] for every week from first_week to last_week, reading only the weeks not cached."""
+        weeks = [first_week + datetime.timedelta(weeks=i) for i in range((last_week - first_week).days // 7 + 1)]
+        now = time.monotonic()
+        with self._lock:
+            cached = {week: entry[0] for week, entry in self._weeks.items() if now - entry[1] <= self.max_age}
+            version = self._version
+        missing = [week for week in weeks if week not in cached]
+        if missing:
+            loaded = load_weeks(conn, missing)
+            with self._lock:
+                for week, counts in loaded.items():
+                    # A week invalidated while it was being read may hold the old counts.
+                    if self._invalidated.get(week, 0) <= version:
+                        self._weeks[week] = (counts, now)
+            cached.update(loaded)
+        return [(week, cached[week]) for week in weeks]
+
+
+FUNNEL_CACHE = FunnelWeekCache()
+
+def get_funnel_trend(conn, start=None, end=None, cache=FUNNEL_CACHE):
+    """Returns the FUNNEL_TREND_HEADERS rows for every week touching start..end (default: the last
+    FUNNEL_DEFAULT_WEEKS weeks), followed by a Total row for the whole range."""
+    end = as_date(end) if end else datetime.date.today()
+    start = as_date(start) if start else end - datetime.timedelta(weeks=FUNNEL_DEFAULT_WEEKS - 1)
+    if start > end:
+        raise ValueError("The start date is after the end date.")
+    weeks = cache.get_weeks(conn, week_start(start), week_start(end))
+    totals = dict.fromkeys(FUNNEL_STAGES, 0)
+    rows = []
+    for week, counts in weeks:
+        rows.append((week.isoformat(), *counts.values(), *conversion_ratios(counts)))
+        for stage, count in counts.items():
+            totals[stage] += count
+    rows.append(("Total", *totals.values(), *conversion_ratios(totals)))
+    return rows
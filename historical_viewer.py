@@ -2,8 +2,12 @@ import sqlite3
 import tkinter as tk
 from tkinter import ttk, messagebox
 import datetime
-from common import get_db_connection, center_window
+from common import center_window
 from search_update import EditWindow
+from queries import fetch_class_roster
+from reference_data import REFERENCE_DATA
+from db_tasks import TkTaskRunner
+from clearance import describe_missing_items
 
 # ==================================================================
 # HISTORICAL VIEWER MODULE
@@ -21,6 +25,8 @@ class HistoricalViewerApp(tk.Toplevel):
         self.transient(parent)
         self.grab_set()
         self.classes_map = {}
+        self.status_var = tk.StringVar()
+        self.tasks = TkTaskRunner(self, self.status_var)
         self.create_widgets()
         self.load_hiring_classes()
         center_window(self, parent)
@@ -37,6 +43,7 @@ class HistoricalViewerApp(tk.Toplevel):
         self.class_combobox.pack(side=tk.LEFT, padx=5)
         ttk.Button(selection_frame, text="View Class Roster", command=self.view_class_roster).pack(side=tk.LEFT, padx=10)
         ttk.Button(selection_frame, text="Edit Selected Candidate", command=self.open_edit_window).pack(side=tk.LEFT, padx=10)
+        ttk.Label(selection_frame, textvariable=self.status_var, foreground="gray").pack(side=tk.LEFT, padx=10)
         
         # A PanedWindow is a widget that allows the user to resize the two sections.
         paned_window = ttk.PanedWindow(main_frame, orient=tk.VERTICAL)
@@ -79,80 +86,62 @@ class HistoricalViewerApp(tk.Toplevel):
     def load_hiring_classes(self):
         """Fetches all hiring class dates to populate the dropdown menu."""
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT strftime('%Y-%m-%d', class_date), class_id FROM Hiring_Classes ORDER BY class_date DESC;")
-            self.classes_map = {date_str: class_id for date_str, class_id in cursor.fetchall()}
-            conn.close()
+            self.classes_map = REFERENCE_DATA.get().classes_map
             self.class_combobox['values'] = list(self.classes_map.keys())
         except sqlite3.Error as e:
             messagebox.showerror("Database Error", f"Failed to load hiring classes: {e}", parent=self)
 
     def clear_trees(self):
         """Clears all existing data from both result tables."""
-        for item in self.started_tree.get_children():
-            self.started_tree.delete(item)
-        for item in self.not_started_tree.get_children():
-            self.not_started_tree.delete(item)
+        self.started_tree.delete(*self.started_tree.get_children())
+        self.not_started_tree.delete(*self.not_started_tree.get_children())
 
     def view_class_roster(self):
-        """Main logic function. Fetches and sorts candidates for a selected date."""
+        """Main logic function. Fetches the candidates for the selected date in the background."""
         selected_date = self.class_combobox.get()
         if not selected_date:
             messagebox.showwarning("Selection Error", "Please select a hiring class date.", parent=self)
             return
         class_id = self.classes_map.get(selected_date)
         self.clear_trees()
-        
+        self.tasks.run("roster", fetch_class_roster, class_id, on_done=lambda rows: self.show_class_roster(selected_date, rows),
+                       error_message="Failed to fetch roster", message="Loading roster...")
+
+    def show_class_roster(self, selected_date, all_candidates):
+        """Sorts the fetched candidates into the two tables."""
         # Determines if the selected date is in the future or past to adjust the UI.
         is_future_view = selected_date >= datetime.datetime.now().strftime('%Y-%m-%d')
-        
-        try:
-            conn = get_db_connection()
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            query = "SELECT c.candidate_id, c.first_name, c.last_name, c.candidate_status, c.rejection_reason, c.notes, c.bg_ds_clear, c.pre_board_complete, c.myinfo_ready, c.pn_number, c.euid, j.department, j.shift FROM Candidates c LEFT JOIN Jobs j ON c.fk_job_id = j.job_id WHERE c.fk_class_id = ? ORDER BY c.last_name, c.first_name;"
-            cursor.execute(query, (class_id,))
-            all_candidates = cursor.fetchall()
-            conn.close()
-            
-            if not all_candidates:
-                messagebox.showinfo("No Data", "No candidates found for the selected class date.", parent=self)
-                return
 
-            # Dynamically change the labels and column headers based on the view mode.
+        if not all_candidates:
+            messagebox.showinfo("No Data", "No candidates found for the selected class date.", parent=self)
+            return
+
+        # Dynamically change the labels and column headers based on the view mode.
+        if is_future_view:
+            self.started_frame.config(text="Cleared to Start")
+            self.not_started_frame.config(text="Action Required")
+            self.not_started_tree.heading('status', text='Missing Items')
+        else:
+            self.started_frame.config(text="Started Candidates")
+            self.not_started_frame.config(text="Did Not Start / Rejected Candidates")
+            self.not_started_tree.heading('status', text='Final Status / Rejection Reason')
+
+        # Sort candidates into the appropriate table based on their status and the view mode.
+        for candidate in all_candidates:
+            base_values = (candidate['last_name'], candidate['first_name'], candidate['department'] or 'N/A', candidate['shift'] or 'N/A')
+            notes = candidate['notes'] or ''
+            candidate_id = candidate['candidate_id']
             if is_future_view:
-                self.started_frame.config(text="Cleared to Start")
-                self.not_started_frame.config(text="Action Required")
-                self.not_started_tree.heading('status', text='Missing Items')
+                if candidate['is_cleared']:
+                    self.started_tree.insert('', tk.END, iid=candidate_id, values=(*base_values, "Cleared", notes))
+                else:
+                    missing_items = describe_missing_items(candidate['missing_items'])
+                    self.not_started_tree.insert('', tk.END, iid=candidate_id, values=(*base_values, missing_items, notes))
             else:
-                self.started_frame.config(text="Started Candidates")
-                self.not_started_frame.config(text="Did Not Start / Rejected Candidates")
-                self.not_started_tree.heading('status', text='Final Status / Rejection Reason')
-
-            # Sort candidates into the appropriate table based on their status and the view mode.
-            for candidate in all_candidates:
-                base_values = (candidate['last_name'], candidate['first_name'], candidate['department'] or 'N/A', candidate['shift'] or 'N/A')
-                notes = candidate['notes'] or ''
-                candidate_id = candidate['candidate_id']
-                if is_future_view:
-                    is_cleared = (candidate['bg_ds_clear'] and candidate['pre_board_complete'] and candidate['myinfo_ready'] and candidate['pn_number'] and candidate['euid'])
-                    if is_cleared:
-                        self.started_tree.insert('', tk.END, iid=candidate_id, values=(*base_values, "Cleared", notes))
-                    else:
-                        missing_items = []
-                        if not candidate['bg_ds_clear']: missing_items.append("BG/DS Clear")  # noqa: E701
-                        if not candidate['pre_board_complete']: missing_items.append("Pre-Board")  # noqa: E701
-                        if not candidate['myinfo_ready']: missing_items.append("MyInfo Ready")  # noqa: E701
-                        if not candidate['pn_number'] or not candidate['euid']: missing_items.append("PN/EUID")  # noqa: E701
-                        self.not_started_tree.insert('', tk.END, iid=candidate_id, values=(*base_values, ", ".join(missing_items), notes))
+                if candidate['candidate_status'] == 'Hired':
+                    self.started_tree.insert('', tk.END, iid=candidate_id, values=(*base_values, "Hired", notes))
                 else:
-                    if candidate['candidate_status'] == 'Hired':
-                        self.started_tree.insert('', tk.END, iid=candidate_id, values=(*base_values, "Hired", notes))
-                    else:
-                        self.not_started_tree.insert('', tk.END, iid=candidate_id, values=(*base_values, candidate['rejection_reason'] or candidate['candidate_status'], notes))
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Failed to fetch roster: {e}", parent=self)
+                    self.not_started_tree.insert('', tk.END, iid=candidate_id, values=(*base_values, candidate['rejection_reason'] or candidate['candidate_status'], notes))
 
     def open_edit_window(self, event=None):
         """Opens the EditWindow for the candidate selected in either of the two tables."""
@@ -1,20 +1,35 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import webbrowser
+import importlib
 import os
+import sys
+import time
 import datetime  # noqa: F401
 import sqlite3
-from common import center_window, get_db_connection
-from new_candidate import NewCandidateApp
-from search_update import SearchApp
-from historical_viewer import HistoricalViewerApp
-from dashboard import DashboardApp
-from applicant_tracker import ApplicantTrackerApp
-from reports import ReportsApp
-from admin import AdminApp
+from common import center_window, db_session
+from db_migrations import run_migrations
 
 # --- Version 2.0.1 ---
 
+# --- Window Modules ---
+# The module windows are imported the first time their button is pressed, not at
+# start-up, so the main menu appears without loading every module (and their own
+# dependencies, such as tkcalendar) first. See startup_profile.py for measurements.
+WINDOW_CLASSES = {
+    'new_candidate': ('new_candidate', 'NewCandidateApp'),
+    'search': ('search_update', 'SearchApp'),
+    'historical_viewer': ('historical_viewer', 'HistoricalViewerApp'),
+    'dashboard': ('dashboard', 'DashboardApp'),
+    'applicant_tracker': ('applicant_tracker', 'ApplicantTrackerApp'),
+    'reports': ('reports', 'ReportsApp'),
+    'admin': ('admin', 'AdminApp'),
+}
+
+def load_window_class(name):
+    """Imports (on first use) and returns the window class registered under name."""
+    module_name, class_name = WINDOW_CLASSES[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
 # ==================================================================
 # MAIN APPLICATION CLASS
 # ==================================================================
@@ -26,6 +41,17 @@ class MainApp(tk.Tk):
         self.withdraw()
         self.title("HR Management System")
         self.geometry("500x620")
+
+        # --- Database Setup ---
+        # HR_PROFILE_QUERIES=1 records query statistics for the whole session (see query_profiler.py).
+        if os.environ.get("HR_PROFILE_QUERIES") == "1":
+            from query_profiler import QUERY_PROFILER
+            QUERY_PROFILER.enable()
+        # Brings the database schema (tables and indexes) up to date before any module uses it.
+        try:
+            run_migrations()
+        except sqlite3.Error as e:
+            messagebox.showerror("Database Error", f"Failed to update the database schema: {e}")
         
         # --- Styling ---
         # This section sets up the visual theme and color palette for the entire application.
@@ -67,83 +93,45 @@ class MainApp(tk.Tk):
         
         center_window(self)
 
-    def open_window(self, window_class):
-        """Generic function to open any module window."""
+    def open_window(self, name):
+        """Generic function to open any module window, importing its module on first use."""
         try:
-            window_class(self)
+            load_window_class(name)(self)
         except Exception as e:
             messagebox.showerror("Application Error", f"Could not open window: {e}")
 
     # --- Module Launching Functions ---
     def open_new_candidate_window(self):
-        self.open_window(NewCandidateApp)
+        self.open_window('new_candidate')
 
     def open_search_window(self):
-        self.open_window(SearchApp)
+        self.open_window('search')
 
     def open_historical_viewer_window(self):
-        self.open_window(HistoricalViewerApp)
+        self.open_window('historical_viewer')
 
     def open_dashboard_window(self):
-        self.open_window(DashboardApp)
+        self.open_window('dashboard')
 
     def open_admin_window(self):
-        self.open_window(AdminApp)
+        self.open_window('admin')
 
     def open_reports_window(self):
-        self.open_window(ReportsApp)
+        self.open_window('reports')
 
     def open_applicant_tracker_window(self):
-        self.open_window(ApplicantTrackerApp)
+        self.open_window('applicant_tracker')
     
     def generate_weekly_report(self):
         """Generates and displays the weekly new hire HTML report."""
+        # Only needed here, so kept out of start-up.
+        import webbrowser
+        from batch_reports import write_weekly_new_hire_report
+        from report_writer import open_report
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            selector_query = "SELECT COUNT(*) FROM V_Cleared_Hires_Next_Week WHERE Department IN ('Perishables', 'Grocery', 'Freezer');"
-            cursor.execute(selector_query)
-            new_selectors_count = cursor.fetchone()[0]
-            cursor.execute("SELECT * FROM V_Cleared_Hires_Next_Week;")
-            rows = cursor.fetchall()
-            headers = [description[0] for description in cursor.description]
-            conn.close()
-            display_headers, display_rows = headers, rows
-            if 'Lang' in headers:
-                lang_column_index = headers.index('Lang')
-                if not any(row[lang_column_index] == 'S' for row in rows):
-                    display_headers = [h for h in headers if h != 'Lang']
-                    display_rows = [tuple(cell for i, cell in enumerate(row) if i != lang_column_index) for row in rows]
-            
-            html_content = f"""
-            <!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><title>Weekly New Hire Report</title>
-            <style>
-              body {{ font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif; color: #333; }} .container {{ padding: 20px; }}
-              table {{ border-collapse: collapse; width: auto; margin-top: 20px; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }}
-              th, td {{ border: 1px solid #dddddd; text-align: left; padding: 12px; white-space: nowrap; }}
-              thead th {{ background-color: #004a99; color: white; font-weight: bold; }} tbody tr:nth-child(even) {{ background-color: #f2f7fc; }}
-              tbody tr:hover {{ background-color: #e6f0fa; }} p {{ font-size: 1.1em; margin-bottom: 1em; }}
-            </style></head><body><div class="container">
-            <p>Happy Friday,</p><p>This coming week, we will be having the following ({new_selectors_count}) New Selectors.</p>
-            """
-            if not display_rows:
-                html_content += "<p style='font-style: italic; color: #555;'>No new hires are fully cleared to start for the upcoming week.</p>"
-            else:
-                html_content += "<hr style='margin-top: 20px; margin-bottom: 20px; border: 0; border-top: 1px solid #ddd;'>"
-                html_content += "<table><thead><tr>"
-                for header in display_headers:
-                    html_content += f"<th>{header}</th>"
-                html_content += "</tr></thead><tbody>"
-                for row in display_rows:
-                    html_content += "<tr>"
-                    for cell in row:
-                        html_content += f"<td>{str(cell).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')}</td>"
-                    html_content += "</tr>"
-                html_content += "</tbody></table>"
-            html_content += "</div></body></html>"
             output_filename = 'weekly_report.html'
-            with open(output_filename, 'w', encoding='utf-8') as file:
-                file.write(html_content)
+            with db_session() as conn, open_report(output_filename) as report:
+                write_weekly_new_hire_report(conn, report)
             full_path = os.path.abspath(output_filename)
             webbrowser.open_new_tab(f"file://{full_path}")
             messagebox.showinfo("Success", f"Report generated successfully and opened in your browser!\n\nSaved as: {full_path}")
@@ -159,6 +147,14 @@ class MainApp(tk.Tk):
 # runs when the script is executed directly.
 if __name__ == "__main__":
     app = MainApp()
+    if "--startup-benchmark" in sys.argv:
+        # Used by startup_profile.py, which passes the time.time() at which it launched this
+        # process: draw the main menu once, report how long it took, and exit.
+        launched_at = float(sys.argv[sys.argv.index("--startup-benchmark") + 1])
+        app.update()
+        print(f"time-to-first-window {time.time() - launched_at:.4f}")
+        app.destroy()
+        sys.exit(0)
     # This line starts the Tkinter event loop, which makes the window appear and
     # listen for user actions like button clicks until the window is closed.
     app.mainloop()
@@ -0,0 +1,219 @@
+import datetime
+import json
+import sys
+from common import db_session
+from pipeline_stats import find_count_mismatches
+
+# ==================================================================
+# APPLICANT TRACKER ROLLUPS
+# ==================================================================
+# The applicant tracker stores one Daily_Metrics row per day and department, with its Daily_Breakdowns.
+# Totals over a period used to be summed from the daily rows each time, so a trend over
+# a few years would read thousands of them. Four small tables hold running totals per
+# week and per month, kept up to date by triggers whenever a day is saved:
+#   Metrics_Weekly / Metrics_Monthly        apps reviewed, interviews and hires
+#   Breakdowns_Weekly / Breakdowns_Monthly  counts per category and reason
+# Weeks run Sunday to Saturday, like the Weekly Activity Snapshot, and are keyed by
+# their Sunday; months by their first day. The rollups add up all departments.
+#
+# sum_activity() and sum_breakdowns() answer any date range from the coarsest rollups
+# that fit inside it (see split_date_range): whole months, then whole weeks, then the
+# odd days at either end. A multi-year range reads a few dozen rows.
+#
+# Command line:
+#   python metric_rollups.py check      Compares the rollups with a full recompute.
+#   python metric_rollups.py rebuild    Recomputes the rollups from the daily rows.
+
+WEEK_START_SQL = "date({date}, '-' || strftime('%w', {date}) || ' days')"
+MONTH_START_SQL = "date({date}, 'start of month')"
+
+# (table suffix, function giving the period start of a date expression)
+ROLLUP_PERIODS = [
+    ("Weekly", lambda date: WEEK_START_SQL.format(date=date)),
+    ("Monthly", lambda date: MONTH_START_SQL.format(date=date)),
+]
+METRIC_COLUMNS = ("apps_reviewed", "interviews_scheduled", "hires_confirmed")
+
+ROLLUP_TABLES = []
+for suffix, _ in ROLLUP_PERIODS:
+    ROLLUP_TABLES += [
+        f"""CREATE TABLE IF NOT EXISTS Metrics_{suffix} (
+    period_start DATE PRIMARY KEY,
+    apps_reviewed INTEGER NOT NULL DEFAULT 0,
+    interviews_scheduled INTEGER NOT NULL DEFAULT 0,
+    hires_confirmed INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;""",
+        f"""CREATE TABLE IF NOT EXISTS Breakdowns_{suffix} (
+    period_start DATE NOT NULL,
+    category TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (period_start, category, reason)
+) WITHOUT ROWID;""",
+    ]
+
+ADD_METRICS = ", ".join(f"{column} = {column} + excluded.{column}" for column in METRIC_COLUMNS)
+
+def build_metrics_statements(row, delta):
+    """Trigger statements adding delta (+1 or -1) times a Daily_Metrics row ('new.' or 'old.') to its week and month."""
+    values = ", ".join(f"{delta} * COALESCE({row}{column}, 0)" for column in METRIC_COLUMNS)
+    return [f"INSERT INTO Metrics_{suffix} (period_start, {', '.join(METRIC_COLUMNS)}) VALUES ({period_start(f'{row}metric_date')}, {values}) "
+            f"ON CONFLICT (period_start) DO UPDATE SET {ADD_METRICS};"
+            for suffix, period_start in ROLLUP_PERIODS]
+
+def build_breakdown_statements(row, delta):
+    """Trigger statements adding delta times a Daily_Breakdowns row to the week and month of its day.
+
+    A breakdown whose Daily_Metrics row is gone (being deleted with it) is left alone;
+    the Daily_Metrics delete trigger takes all of its breakdowns out at once."""
+    return [f"INSERT INTO Breakdowns_{suffix} (period_start, category, reason, count) "
+            f"SELECT {period_start('dm.metric_date')}, {row}category, {row}reason, {delta} * COALESCE({row}count, 0) FROM Daily_Metrics dm WHERE dm.metric_id = {row}fk_metric_id "
+            "ON CONFLICT (period_start, category, reason) DO UPDATE SET count = count + excluded.count;"
+            for suffix, period_start in ROLLUP_PERIODS]
+
+def build_day_breakdowns_statements(row, delta):
+    """Trigger statements adding delta times all the breakdowns of a Daily_Metrics row to its week and month."""
+    return [f"INSERT INTO Breakdowns_{suffix} (period_start, category, reason, count) "
+            f"SELECT {period_start(f'{row}metric_date')}, category, reason, {delta} * SUM(COALESCE(count, 0)) FROM Daily_Breakdowns WHERE fk_metric_id = {row}metric_id GROUP BY category, reason "
+            "ON CONFLICT (period_start, category, reason) DO UPDATE SET count = count + excluded.count;"
+            for suffix, period_start in ROLLUP_PERIODS]
+
+def build_trigger(name, timing, event, table, statements, when=None):
+    body = "\n    ".join(statements)
+    condition = f" WHEN {when}" if when else ""
+    return f"CREATE TRIGGER IF NOT EXISTS {name} {timing} {event} ON {table}{condition} BEGIN\n    {body}\nEND;"
+
+ROLLUP_TRIGGERS = [
+    build_trigger("trg_daily_metrics_rollup_insert", "AFTER", "INSERT", "Daily_Metrics", build_metrics_statements("new.", 1)),
+    build_trigger("trg_daily_metrics_rollup_update", "AFTER", f"UPDATE OF metric_date, {', '.join(METRIC_COLUMNS)}", "Daily_Metrics",
+                  build_metrics_statements("old.", -1) + build_metrics_statements("new.", 1)),
+    # Moving a day to another date moves its breakdowns with it.
+    build_trigger("trg_daily_metrics_rollup_move", "AFTER", "UPDATE OF metric_date", "Daily_Metrics",
+                  build_day_breakdowns_statements("old.", -1) + build_day_breakdowns_statements("new.", 1),
+                  when="old.metric_date IS NOT new.metric_date"),
+    # BEFORE, so the breakdowns are still there to be taken out: ON DELETE CASCADE removes
+    # them after the day itself, when their own trigger can no longer find its date.
+    build_trigger("trg_daily_metrics_rollup_delete", "BEFORE", "DELETE", "Daily_Metrics",
+                  build_metrics_statements("old.", -1) + build_day_breakdowns_statements("old.", -1)),
+    build_trigger("trg_daily_breakdowns_rollup_insert", "AFTER", "INSERT", "Daily_Breakdowns", build_breakdown_statements("new.", 1)),
+    build_trigger("trg_daily_breakdowns_rollup_delete", "AFTER", "DELETE", "Daily_Breakdowns", build_breakdown_statements("old.", -1)),
+    build_trigger("trg_daily_breakdowns_rollup_update", "AFTER", "UPDATE OF fk_metric_id, category, reason, count", "Daily_Breakdowns",
+                  build_breakdown_statements("old.", -1) + build_breakdown_statements("new.", 1)),
+]
+# For migrations that rebuild Daily_Metrics (see daily_metrics.py): a table cannot be
+# renamed into place while triggers elsewhere still refer to the old one.
+DROP_ROLLUP_TRIGGERS = [f"DROP TRIGGER IF EXISTS {trigger.split()[5]};" for trigger in ROLLUP_TRIGGERS]
+
+# Full recomputes from the daily rows, used to populate the tables and by the checker.
+def recompute_metrics(period_start):
+    sums = ", ".join(f"SUM(COALESCE({column}, 0))" for column in METRIC_COLUMNS)
+    return f"SELECT {period_start('metric_date')} AS period_start, {sums} FROM Daily_Metrics GROUP BY period_start"
+
+def recompute_breakdowns(period_start):
+    return (f"SELECT {period_start('dm.metric_date')} AS period_start, b.category, b.reason, SUM(COALESCE(b.count, 0)) "
+            "FROM Daily_Breakdowns b JOIN Daily_Metrics dm ON dm.metric_id = b.fk_metric_id GROUP BY period_start, b.category, b.reason")
+
+POPULATE_ROLLUP_TABLES = []
+CONSISTENCY_CHECKS = []
+for suffix, period_start in ROLLUP_PERIODS:
+    POPULATE_ROLLUP_TABLES += [
+        f"DELETE FROM Metrics_{suffix};",
+        f"DELETE FROM Breakdowns_{suffix};",
+        f"INSERT INTO Metrics_{suffix} (period_start, {', '.join(METRIC_COLUMNS)}) {recompute_metrics(period_start)};",
+        f"INSERT INTO Breakdowns_{suffix} (period_start, category, reason, count) {recompute_breakdowns(period_start)};",
+    ]
+    CONSISTENCY_CHECKS += [
+        (f"Metrics_{suffix}", f"SELECT period_start, {', '.join(METRIC_COLUMNS)} FROM Metrics_{suffix}", recompute_metrics(period_start), 1),
+        (f"Breakdowns_{suffix}", f"SELECT period_start, category, reason, count FROM Breakdowns_{suffix}", recompute_breakdowns(period_start), 3),
+    ]
+
+# ==================================================================
+# RANGE QUERIES
+# ==================================================================
+
+def split_date_range(start, end):
+    """Splits the days from start to end (inclusive) into whole months, whole Sunday-Saturday weeks and single days.
+
+    Returns (month starts, week starts, days) as lists of dates; together they cover each day exactly once."""
+    def next_month(day):
+        return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    def split_weeks(first, last):
+        weeks, days = [], []
+        day = first
+        while day <= last:
+            # weekday() is Monday=0...Sunday=6.
+            if day.weekday() == 6 and day + datetime.timedelta(days=6) <= last:
+                weeks.append(day)
+                day += datetime.timedelta(days=7)
+            else:
+                days.append(day)
+                day += datetime.timedelta(days=1)
+        return weeks, days
+
+    months = []
+    month = start if start.day == 1 else next_month(start)
+    while next_month(month) - datetime.timedelta(days=1) <= end:
+        months.append(month)
+        month = next_month(month)
+    if not months:
+        return ([], *split_weeks(start, end))
+    weeks_before, days_before = split_weeks(start, months[0] - datetime.timedelta(days=1))
+    weeks_after, days_after = split_weeks(month, end)
+    return months, weeks_before + weeks_after, days_before + days_after
+
+def as_date(value):
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(value)
+
+def week_start(day):
+    """The Sunday starting the week of day (a date or "YYYY-MM-DD"), as WEEK_START_SQL works it out."""
+    day = as_date(day)
+    return day - datetime.timedelta(days=(day.weekday() + 1) % 7)
+
+def range_parameters(start, end):
+    """The JSON arrays of month starts, week starts and days for the range queries below."""
+    return tuple(json.dumps([day.isoformat() for day in part]) for part in split_date_range(as_date(start), as_date(end)))
+
+RANGE_ACTIVITY_QUERY = f"""SELECT {', '.join(f'COALESCE(SUM({column}), 0)' for column in METRIC_COLUMNS)} FROM (
+    SELECT {', '.join(METRIC_COLUMNS)} FROM Metrics_Monthly WHERE period_start IN (SELECT value FROM json_each(?))
+    UNION ALL SELECT {', '.join(METRIC_COLUMNS)} FROM Metrics_Weekly WHERE period_start IN (SELECT value FROM json_each(?))
+    UNION ALL SELECT {', '.join(METRIC_COLUMNS)} FROM Daily_Metrics WHERE metric_date IN (SELECT value FROM json_each(?)))"""
+
+RANGE_BREAKDOWNS_QUERY = """SELECT category, reason, SUM(count) FROM (
+    SELECT category, reason, count FROM Breakdowns_Monthly WHERE period_start IN (SELECT value FROM json_each(?))
+    UNION ALL SELECT category, reason, count FROM Breakdowns_Weekly WHERE period_start IN (SELECT value FROM json_each(?))
+    UNION ALL SELECT b.category, b.reason, b.count FROM Daily_Breakdowns b JOIN Daily_Metrics dm ON dm.metric_id = b.fk_metric_id
+              WHERE dm.metric_date IN (SELECT value FROM json_each(?)))
+GROUP BY category, reason HAVING SUM(count) != 0"""
+
+def sum_activity(conn, start, end):
+    """Returns (apps_reviewed, interviews_scheduled, hires_confirmed) totals for the days from start to end."""
+    return tuple(conn.execute(RANGE_ACTIVITY_QUERY, range_parameters(start, end)).fetchone())
+
+def sum_breakdowns(conn, start, end):
+    """Returns (category, reason, count) totals for the days from start to end."""
+    return conn.execute(RANGE_BREAKDOWNS_QUERY, range_parameters(start, end)).fetchall()
+
+def rebuild_metric_rollups(conn):
+    """Recomputes all four tables from Daily_Metrics and Daily_Breakdowns."""
+    for statement in POPULATE_ROLLUP_TABLES:
+        conn.execute(statement)
+
+def check_metric_rollups(conn):
+    """Compares the stored rollups with a full recompute. Returns (table, key, stored, expected) for each mismatch."""
+    return find_count_mismatches(conn, CONSISTENCY_CHECKS)
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "check":
+        with db_session() as conn:
+            mismatches = check_metric_rollups(conn)
+        for table, key, stored, expected in mismatches:
+            print(f"{table} {key}: stored {stored}, expected {expected}")
+        print(f"{len(mismatches)} mismatch(es) found." if mismatches else "Rollups match the daily metrics.")
+        sys.exit(1 if mismatches else 0)
+    elif command == "rebuild":
+        with db_session() as conn:
+            rebuild_metric_rollups(conn)
+        print("Rollups rebuilt.")
+    else:
+        print("Usage: python metric_rollups.py check | rebuild")
@@ -1,9 +1,23 @@
 import sqlite3
+import os
 import tkinter as tk
-from tkinter import ttk, messagebox, Listbox
-import datetime
-import re
-from common import get_db_connection, center_window
+from tkinter import ttk, messagebox, filedialog, Listbox
+from common import center_window, format_phone_number, format_date
+from reference_data import REFERENCE_DATA
+from db_tasks import TkTaskRunner
+from candidate_import import import_candidates, CandidateImportError
+
+INSERT_NEW_CANDIDATE = """INSERT INTO Candidates (first_name, last_name, phone_number, coc_number, interview_date, rehire_date, original_term_date, referred_by, notes, fk_job_id, fk_class_id, is_spanish_only, candidate_status, bg_ds_clear, pre_board_complete, myinfo_ready, orientation_letter_sent) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'Pending', 0, 0, 0, 0);"""
+
+def insert_candidate(conn, data, interviewer_ids):
+    """Write task: inserts one candidate from the form and links the interviewers. Returns the new candidate_id."""
+    cursor = conn.cursor()
+    cursor.execute(INSERT_NEW_CANDIDATE, data)
+    new_candidate_id = cursor.lastrowid
+    links = [(new_candidate_id, i_id) for i_id in interviewer_ids if i_id]
+    if links:
+        cursor.executemany("INSERT INTO Candidate_Interviewers (fk_candidate_id, fk_interviewer_id) VALUES (?, ?);", links)
+    return new_candidate_id
 
 # ==================================================================
 # NEW CANDIDATE MODULE
@@ -23,6 +37,7 @@ class NewCandidateApp(tk.Toplevel):
         self.classes_map = {}
         self.interviewers_map = {}
         self.is_spanish_only_var = tk.BooleanVar()
+        self.tasks = TkTaskRunner(self)
         self.create_widgets()
         self.load_initial_data()
         center_window(self, parent)
@@ -30,19 +45,14 @@ class NewCandidateApp(tk.Toplevel):
     def load_initial_data(self):
         """Fetches initial data from the database to populate the dropdowns and listbox."""
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT department FROM Jobs ORDER BY department;")
-            self.department_combobox['values'] = [row[0] for row in cursor.fetchall()]
-            cursor.execute("SELECT strftime('%Y-%m-%d', class_date), class_id FROM Hiring_Classes ORDER BY class_date DESC;")
-            self.classes_map = {row[0]: row[1] for row in cursor.fetchall()}
+            reference = REFERENCE_DATA.get()
+            self.department_combobox['values'] = reference.departments
+            self.classes_map = reference.classes_map
             self.class_combobox['values'] = list(self.classes_map.keys())
-            cursor.execute("SELECT interviewer_name, interviewer_id FROM Interviewers ORDER BY interviewer_name;")
-            self.interviewers_map = {row[0]: row[1] for row in cursor.fetchall()}
+            self.interviewers_map = reference.interviewers_map
             self.interviewer_listbox.delete(0, tk.END)
             for name in self.interviewers_map.keys():
                 self.interviewer_listbox.insert(tk.END, name)
-            conn.close()
         except Exception as e:
             messagebox.showerror("Database Error", f"Failed to load initial data: {e}", parent=self)
 
@@ -52,13 +62,7 @@ class NewCandidateApp(tk.Toplevel):
         self.job_detail_combobox.set('')
         self.job_detail_combobox['state'] = 'readonly'
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            query = "SELECT shift, employment_type, pay_structure, job_id FROM Jobs WHERE department = ? ORDER BY shift;"
-            cursor.execute(query, (selected_dept,))
-            job_details_data = cursor.fetchall()
-            conn.close()
-            self.job_details_map = {f"{row[0] or 'N/A'} | {row[1]} | {row[2]}": row[3] for row in job_details_data}
+            self.job_details_map = REFERENCE_DATA.get().get_job_details(selected_dept)
             self.job_detail_combobox['values'] = list(self.job_details_map.keys())
         except Exception as e:
             messagebox.showerror("Database Error", f"Failed to load job details: {e}", parent=self)
@@ -66,18 +70,7 @@ class NewCandidateApp(tk.Toplevel):
     def format_phone_on_focus_out(self, event):
         """Automatically formats the phone number field when the user clicks away."""
         widget = event.widget
-        digits = re.sub(r'\D', '', widget.get())
-        if len(digits) > 10:
-            digits = digits[:10]
-        if digits:
-            if len(digits) > 6:
-                formatted = f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
-            elif len(digits) > 3:
-                formatted = f"({digits[:3]}) {digits[3:]}"
-            else:
-                formatted = f"({digits[:3]}"
-        else:
-            formatted = ""
+        formatted = format_phone_number(widget.get())
         widget.delete(0, tk.END)
         widget.insert(0, formatted)
 
@@ -87,18 +80,11 @@ class NewCandidateApp(tk.Toplevel):
         date_str = widget.get().strip()
         if not date_str:
             return
-        formats_to_try = ['%m/%d/%Y', '%m-%d-%Y', '%m.%d.%Y', '%m/%d/%y', '%m-%d-%y', '%m.%d.%y']
-        parsed_date = None
-        for fmt in formats_to_try:
-            try:
-                parsed_date = datetime.datetime.strptime(date_str, fmt)
-                break
-            except ValueError:
-                continue
-        if parsed_date:
+        formatted = format_date(date_str)
+        if formatted is not None:
             widget.delete(0, tk.END)
-            widget.insert(0, parsed_date.strftime('%Y-%m-%d'))
-        elif not re.match(r'\d{4}-\d{2}-\d{2}', date_str):
+            widget.insert(0, formatted)
+        else:
             messagebox.showwarning("Invalid Date", f"Could not understand date: '{date_str}'.\nPlease use a format like MM/DD/YYYY.", parent=self)
 
     def create_widgets(self):
@@ -141,6 +127,8 @@ class NewCandidateApp(tk.Toplevel):
         ttk.Button(main_frame, text="Save New Candidate", command=self.save_candidate).grid(row=current_row, column=0, columnspan=2, pady=20)
         current_row += 1
         ttk.Button(main_frame, text="Clear Form", command=self.clear_form).grid(row=current_row, column=0, columnspan=2, pady=5)
+        current_row += 1
+        ttk.Button(main_frame, text="Import from File...", command=self.import_from_file).grid(row=current_row, column=0, columnspan=2, pady=5)
 
     def save_candidate(self):
         """Validates form data and saves the new candidate to the database."""
@@ -152,22 +140,14 @@ class NewCandidateApp(tk.Toplevel):
         fk_job_id = self.job_details_map.get(self.job_detail_combobox.get())
         fk_class_id = self.classes_map.get(self.class_combobox.get())
         selected_interviewer_ids = [self.interviewers_map.get(self.interviewer_listbox.get(i)) for i in self.interviewer_listbox.curselection()]
-        sql = """INSERT INTO Candidates (first_name, last_name, phone_number, coc_number, interview_date, rehire_date, original_term_date, referred_by, notes, fk_job_id, fk_class_id, is_spanish_only, candidate_status, bg_ds_clear, pre_board_complete, myinfo_ready, orientation_letter_sent) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'Pending', 0, 0, 0, 0);"""
         data = (first_name, last_name, self.entries["Phone Number:"].get().strip(), self.entries["COC#:"].get().strip(), self.entries["Interview Date:"].get().strip() or None, self.entries["Original Hire Date:"].get().strip() or None, self.entries["Original Term Date:"].get().strip() or None, self.entries["Referred By:"].get().strip(), self.entries["Notes:"].get().strip(), fk_job_id, fk_class_id, self.is_spanish_only_var.get())
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql, data)
-            new_candidate_id = cursor.lastrowid
-            if selected_interviewer_ids:
-                links = [(new_candidate_id, i_id) for i_id in selected_interviewer_ids if i_id]
-                cursor.executemany("INSERT INTO Candidate_Interviewers (fk_candidate_id, fk_interviewer_id) VALUES (?, ?);", links)
-            conn.commit()
-            conn.close()
+        if self.tasks.is_running("save"):
+            return
+        def on_saved(result):
             messagebox.showinfo("Success", f"Successfully saved candidate: {first_name} {last_name}", parent=self)
             self.clear_form()
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Failed to save candidate: {e}", parent=self)
+        self.tasks.run("save", insert_candidate, data, selected_interviewer_ids,
+                       on_done=on_saved, error_message="Failed to save candidate", message="Saving...", interruptible=False)
 
     def clear_form(self):
         """Resets all fields on the form to their default state."""
@@ -179,3 +159,27 @@ class NewCandidateApp(tk.Toplevel):
         self.class_combobox.set('')
         self.interviewer_listbox.selection_clear(0, tk.END)
         self.is_spanish_only_var.set(False)
+
+    def import_from_file(self):
+        """Imports a CSV or Excel list of candidates in the background (see candidate_import.py)."""
+        path = filedialog.askopenfilename(parent=self, title="Import Candidates",
+                                          filetypes=[("Spreadsheets", "*.csv *.xlsx"), ("CSV files", "*.csv"), ("Excel files", "*.xlsx")])
+        if not path:
+            return
+        if self.tasks.is_running("import"):
+            messagebox.showwarning("Import Running", "Please wait for the current import to finish.", parent=self)
+            return
+        rejects_path = os.path.splitext(path)[0] + "_rejected.csv"
+
+        def on_imported(summary):
+            message = f"Imported {summary['imported']} candidate(s)."
+            if summary['rejected']:
+                samples = "\n".join(f"Row {row_number}: {reason}" for row_number, reason in summary['rejected_samples'][:5])
+                message += f"\n\n{summary['rejected']} row(s) were rejected and saved to:\n{rejects_path}\n\n{samples}"
+            messagebox.showinfo("Import Complete", message, parent=self)
+
+        def on_error(e):
+            messagebox.showerror("Import Failed", f"Failed to import candidates: {e}", parent=self)
+
+        self.tasks.run("import", import_candidates, path, rejects_path, on_done=on_imported, on_error=on_error,
+                       message="Importing...", interruptible=False, grouped=False, errors=(sqlite3.Error, CandidateImportError, OSError))
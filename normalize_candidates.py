@@ -0,0 +1,161 @@
+import argparse
+import sqlite3
+import sys
+import time
+from common import db_session, format_date, format_phone_number, NON_DIGITS_PATTERN
+
+# ==================================================================
+# BATCH NORMALIZATION
+# ==================================================================
+# The entry forms format dates and phone numbers as they are typed, but older rows
+# still hold whatever was entered at the time ("3/4/25", "555.123.4567", ...), which
+# breaks date filters and the month buckets. This module rewrites interview_date,
+# rehire_date, original_term_date and phone_number across the whole Candidates table
+# in one pass, in the same format the forms produce:
+#
+#   python normalize_candidates.py            Dry run: prints what would change.
+#   python normalize_candidates.py --apply    Makes the changes (in one transaction,
+#                                             holding the write lock from the first read).
+#
+# Rows are read a batch at a time and each column of a batch is normalized as a whole:
+# every distinct value goes through common.format_date / format_phone_number once
+# (format_date matches a single precompiled pattern rather than trying each format
+# with strptime). Values that cannot be understood are left as they are and listed,
+# as are phone numbers without exactly 10 digits (rather than being truncated as the
+# form does).
+
+NORMALIZE_BATCH_SIZE = 20000
+DATE_COLUMNS = ('interview_date', 'rehire_date', 'original_term_date')
+PHONE_COLUMN = 'phone_number'
+NORMALIZED_COLUMNS = DATE_COLUMNS + (PHONE_COLUMN,)
+CANDIDATE_VALUES_QUERY = f"SELECT candidate_id, {', '.join(NORMALIZED_COLUMNS)} FROM Candidates"
+
+# Marks a value that is left unchanged because it could not be understood.
+UNRECOGNISED = object()
+
+def is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+# ==================================================================
+# NORMALIZERS
+# ==================================================================
+# normalize_dates and normalize_phones take a list of column values and return a list
+# of the same length holding each normalized value, or UNRECOGNISED. Blank values are
+# returned unchanged.
+
+def normalize_date_value(value):
+    if is_blank(value):
+        return value
+    formatted = format_date(str(value))
+    return UNRECOGNISED if formatted is None else formatted
+
+def normalize_phone_value(value):
+    if is_blank(value):
+        return value
+    text = str(value)
+    if len(NON_DIGITS_PATTERN.sub('', text)) != 10:
+        return UNRECOGNISED
+    return format_phone_number(text)
+
+def normalize_values(values, normalize_value):
+    # Columns repeat the same values a lot, so each distinct value is only worked out once.
+    cache = {}
+    results = []
+    for value in values:
+        if value not in cache:
+            cache[value] = normalize_value(value)
+        results.append(cache[value])
+    return results
+
+def normalize_dates(values):
+    return normalize_values(values, normalize_date_value)
+
+def normalize_phones(values):
+    return normalize_values(values, normalize_phone_value)
+
+# ==================================================================
+# WHOLE-TABLE PASS
+# ==================================================================
+
+def find_changes(conn, batch_size=NORMALIZE_BATCH_SIZE):
+    """Reads Candidates once. Returns (changes, unrecognised).
+
+    changes maps candidate_id to {column: (old, new)}; unrecognised lists (candidate_id, column, value)."""
+    changes, unrecognised = {}, []
+    cursor = conn.execute(CANDIDATE_VALUES_QUERY)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        candidate_ids, *columns = zip(*rows)
+        for column, old_values in zip(NORMALIZED_COLUMNS, columns):
+            normalize = normalize_phones if column == PHONE_COLUMN else normalize_dates
+            for candidate_id, old, new in zip(candidate_ids, old_values, normalize(list(old_values))):
+                if new is UNRECOGNISED:
+                    unrecognised.append((candidate_id, column, old))
+                elif new != old:
+                    changes.setdefault(candidate_id, {})[column] = (old, new)
+    return changes, unrecognised
+
+def apply_changes(conn, changes):
+    """Writes the changes, one executemany per combination of changed columns.
+
+    Only the changed columns are set, so the update triggers (search index, pipeline
+    counts) only fire for rows whose relevant columns actually changed."""
+    by_columns = {}
+    for candidate_id, column_changes in changes.items():
+        columns = tuple(column for column in NORMALIZED_COLUMNS if column in column_changes)
+        by_columns.setdefault(columns, []).append((*(column_changes[column][1] for column in columns), candidate_id))
+    for columns, rows in by_columns.items():
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        conn.executemany(f"UPDATE Candidates SET {assignments} WHERE candidate_id = ?", rows)
+
+def print_report(changes, unrecognised, limit):
+    counts = {column: 0 for column in NORMALIZED_COLUMNS}
+    shown = 0
+    for candidate_id in sorted(changes):
+        for column, (old, new) in changes[candidate_id].items():
+            counts[column] += 1
+            if not limit or shown < limit:
+                print(f"  {candidate_id:>8}  {column:<18} {old!r} -> {new!r}")
+                shown += 1
+    if limit and shown < sum(counts.values()):
+        print(f"  ... {sum(counts.values()) - shown} more (use --limit 0 to list them all)")
+    if unrecognised:
+        print("Not understood (left unchanged):")
+        for candidate_id, column, value in unrecognised[:limit or None]:
+            print(f"  {candidate_id:>8}  {column:<18} {value!r}")
+        if limit and len(unrecognised) > limit:
+            print(f"  ... {len(unrecognised) - limit} more")
+    print(", ".join(f"{column}: {count} to change" for column, count in counts.items()))
+    print(f"{len(changes)} candidate(s) to update, {len(unrecognised)} value(s) not understood.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Normalizes candidate dates and phone numbers across the Candidates table.")
+    parser.add_argument("--apply", action="store_true", help="Write the changes. Without it, only shows what would change.")
+    parser.add_argument("--limit", type=int, default=100, help="Changes to list (0 = all). Default: 100.")
+    options = parser.parse_args(argv)
+    try:
+        with db_session() as conn:
+            if options.apply:
+                # Takes the write lock before reading, so an edit saved between find_changes and
+                # apply_changes cannot be overwritten with the value read here.
+                conn.execute("BEGIN IMMEDIATE")
+            started = time.perf_counter()
+            changes, unrecognised = find_changes(conn)
+            elapsed = time.perf_counter() - started
+            print_report(changes, unrecognised, options.limit)
+            print(f"Checked in {elapsed:.2f}s.")
+            if options.apply and changes:
+                apply_changes(conn, changes)
+    except sqlite3.Error as e:
+        print(f"Normalization failed: {e}", file=sys.stderr)
+        return 1
+    if options.apply:
+        print(f"Updated {len(changes)} candidate(s)." if changes else "Nothing to update.")
+    else:
+        print("Dry run: nothing was changed. Run with --apply to make these changes.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
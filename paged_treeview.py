@@ -0,0 +1,213 @@
+import tkinter as tk
+from tkinter import messagebox
+from common import db_session
+from queries import PAGE_SIZE, fetch_page
+from db_tasks import TkTaskRunner
+
+# ==================================================================
+# PAGED TREEVIEW
+# ==================================================================
+# A ttk.Treeview slows down badly with thousands of rows, and fetchall() holds the
+# whole result in memory first. PagedTreeview fills an existing Treeview one page
+# at a time with keyset paging (see build_page_query in queries.py), fetching the
+# next page as the user scrolls near the bottom. Those pages are fetched in the
+# background by the window's TkTaskRunner, so scrolling never waits on the database.
+# It keeps at most MAX_RESIDENT_ROWS rows in the widget; rows that scroll far out of
+# view are dropped and fetched again if the user scrolls back. The queries themselves
+# run through fetch_page and fetch_rows in queries.py, which do not need Tk and are
+# shared with the JSON API.
+
+MAX_RESIDENT_ROWS = 1000
+LOAD_MORE_THRESHOLD = 0.1   # Fetch another page when within 10% of either end.
+
+# SQLite sorts NULL first, then numbers, then text, then blobs.
+def sort_value(value):
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, value)
+
+def sorts_before(key, other, order_by):
+    """True if a row with sort key key comes before one with other in the query's order."""
+    for (_, direction), value, other_value in zip(order_by, key, other):
+        value, other_value = sort_value(value), sort_value(other_value)
+        if value != other_value:
+            return (value < other_value) == (direction == 'ASC')
+    return False
+
+
+class PagedTreeview:
+    """Shows the results of a list query in a Treeview, fetching pages as the user scrolls.
+
+    Pages are fetched through tasks, the window's TkTaskRunner; without one, the pager runs its own."""
+    def __init__(self, tree, v_scroll, tasks=None, empty_values=("No results found.",), page_size=PAGE_SIZE, max_rows=MAX_RESIDENT_ROWS):
+        self.tree = tree
+        self.v_scroll = v_scroll
+        self.tasks = tasks if tasks is not None else TkTaskRunner(tree.winfo_toplevel())
+        # One page fetch at a time per tree; the widget path tells the trees of a window apart.
+        self.page_task = f"page {tree}"
+        self.empty_values = empty_values
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.source = None
+        self.keys = []
+        self.has_before = False
+        self.has_after = False
+        self.page_pending = False
+        self.tree.configure(yscrollcommand=self.on_tree_scrolled)
+
+    def clear(self):
+        """Removes every row and forgets the current query, dropping any page still being fetched for it."""
+        self.tasks.cancel(self.page_task)
+        self.page_pending = False
+        self.tree.delete(*self.tree.get_children())
+        self.source = None
+        self.keys = []
+        self.has_before = False
+        self.has_after = False
+
+    def load(self, query, params=(), order_by=(), where=None, row_to_values=tuple, row_to_iid=None, first_page=None):
+        """Shows the first page of a query. first_page can be passed in if it was already fetched, e.g. on a worker thread.
+
+        row_to_values turns a row into the Treeview values; row_to_iid, if given, picks the item id.
+        Returns (rows_shown, has_more).
+        """
+        self.clear()
+        self.source = (query, tuple(params), order_by, where, row_to_values, row_to_iid)
+        if first_page is None:
+            first_page = self.fetch()
+        rows, keys, has_more = first_page
+        if not rows:
+            if self.empty_values:
+                self.tree.insert('', tk.END, values=self.empty_values)
+            return 0, False
+        self.insert_rows(tk.END, rows)
+        self.keys = keys
+        self.has_after = has_more
+        self.tree.yview_moveto(0)
+        return len(rows), has_more
+
+    def patch(self, changed_iids, rows, keys):
+        """Brings the resident rows up to date after the rows in changed_iids changed, without reloading.
+
+        rows and keys are what fetch_rows returned for changed_iids (needs row_to_iid). Rows whose
+        place in the order is unchanged are updated in place; others are moved, removed, or
+        inserted if they now fall within the loaded rows (paging fetches them otherwise).
+        """
+        if self.source is None:
+            return
+        order_by = self.source[2]
+        row_to_values, row_to_iid = self.source[4:]
+        if not self.keys:
+            # Remove the "No results" row.
+            self.tree.delete(*self.tree.get_children())
+        fresh = {str(row_to_iid(row)): (row, key) for row, key in zip(rows, keys)}
+        selection = self.tree.selection()
+        for iid in map(str, changed_iids):
+            if not self.tree.exists(iid):
+                continue
+            index = self.tree.index(iid)
+            if iid in fresh and fresh[iid][1] == self.keys[index]:
+                self.tree.item(iid, values=row_to_values(fresh.pop(iid)[0]))
+            else:
+                self.tree.delete(iid)
+                del self.keys[index]
+        for iid, (row, key) in fresh.items():
+            index = next((i for i, resident in enumerate(self.keys) if sorts_before(key, resident, order_by)), len(self.keys))
+            if (index == len(self.keys) and self.has_after) or (index == 0 and self.has_before):
+                continue
+            self.tree.insert('', index, iid=iid, values=row_to_values(row))
+            self.keys.insert(index, key)
+        self.tree.selection_set([iid for iid in selection if self.tree.exists(iid)])
+        if not self.keys and self.empty_values and not (self.has_before or self.has_after):
+            self.tree.insert('', tk.END, values=self.empty_values)
+
+    def fetch(self):
+        """Fetches the first page of the current query here, on the Tk thread, for load() callers that did not pass it in."""
+        query, params, order_by, where = self.source[:4]
+        with db_session() as conn:
+            return fetch_page(conn, query, params, order_by, where, page_size=self.page_size)
+
+    def fetch_adjacent(self, on_page, after=None, before=None):
+        """Fetches the page after or before a key in the background, then calls on_page(rows, keys, has_more)."""
+        query, params, order_by, where = self.source[:4]
+
+        def on_done(page):
+            self.page_pending = False
+            on_page(*page)
+
+        def on_error(e):
+            # Stop paging rather than retrying on every scroll event.
+            self.page_pending = False
+            self.has_before = self.has_after = False
+            messagebox.showerror("Database Error", f"Failed to load more rows: {e}", parent=self.tree.winfo_toplevel())
+
+        self.tasks.run(self.page_task, fetch_page, query, params, order_by, where, after, before, self.page_size,
+                       on_done=on_done, on_error=on_error, message="Loading more rows...")
+
+    def insert_rows(self, index, rows):
+        """Inserts rows starting at index (or tk.END)."""
+        row_to_values, row_to_iid = self.source[4:]
+        for offset, row in enumerate(rows):
+            position = index if index == tk.END else index + offset
+            if row_to_iid is None:
+                self.tree.insert('', position, values=row_to_values(row))
+            else:
+                self.tree.insert('', position, iid=row_to_iid(row), values=row_to_values(row))
+
+    def on_tree_scrolled(self, first, last):
+        """yscrollcommand for the tree: updates the scrollbar and asks for a page near either end."""
+        self.v_scroll.set(first, last)
+        if self.source is None or self.page_pending:
+            return
+        near_end = float(last) >= 1 - LOAD_MORE_THRESHOLD and self.has_after
+        near_start = float(first) <= LOAD_MORE_THRESHOLD and self.has_before
+        if near_end or near_start:
+            # Changing the tree from inside its own scroll callback confuses Tk, so wait for idle.
+            # page_pending stays set until the page has arrived.
+            self.page_pending = True
+            self.tree.after_idle(self.load_adjacent_page)
+
+    def load_adjacent_page(self):
+        if self.source is None or not self.tree.winfo_exists():
+            self.page_pending = False
+            return
+        first, last = self.tree.yview()
+        if last >= 1 - LOAD_MORE_THRESHOLD and self.has_after:
+            self.fetch_adjacent(self.show_next_page, after=self.keys[-1])
+        elif first <= LOAD_MORE_THRESHOLD and self.has_before:
+            self.fetch_adjacent(self.show_previous_page, before=self.keys[0])
+        else:
+            self.page_pending = False
+
+    def top_index(self):
+        """Index of the first visible row."""
+        return int(self.tree.yview()[0] * len(self.keys))
+
+    def show_next_page(self, rows, keys, has_more):
+        top = self.top_index()
+        self.insert_rows(tk.END, rows)
+        self.keys.extend(keys)
+        self.has_after = has_more
+        overflow = len(self.keys) - self.max_rows
+        if overflow > 0:
+            self.tree.delete(*self.tree.get_children()[:overflow])
+            del self.keys[:overflow]
+            self.has_before = True
+            # Keep the same row at the top of the view.
+            self.tree.yview_moveto(max(top - overflow, 0) / len(self.keys))
+
+    def show_previous_page(self, rows, keys, has_more):
+        top = self.top_index()
+        self.insert_rows(0, rows)
+        self.keys[:0] = keys
+        self.has_before = has_more
+        overflow = len(self.keys) - self.max_rows
+        if overflow > 0:
+            self.tree.delete(*self.tree.get_children()[-overflow:])
+            del self.keys[-overflow:]
+            self.has_after = True
+        self.tree.yview_moveto((top + len(rows)) / max(len(self.keys), 1))
@@ -0,0 +1,142 @@
+import sys
+from common import db_session
+from clearance import MISSING_ITEMS_SQL
+
+# ==================================================================
+# HIRING PIPELINE AGGREGATES
+# ==================================================================
+# The dashboard KPIs used to count Candidates (and the cleared-hires view) on every
+# refresh. Instead, three small tables hold running counts that triggers on
+# Candidates keep up to date on every insert, update and delete:
+#   Pipeline_Status_Counts   candidates per status
+#   Pipeline_Monthly_Counts  candidates per interview month and status
+#   Pipeline_Class_Counts    candidates per hiring class and status, plus how many are
+#                            fully cleared to start (the V_Cleared_Hires_Next_Week rules)
+# The KPI queries in queries.py read these tables directly.
+#
+# Command line:
+#   python pipeline_stats.py check      Compares the tables with a full recompute.
+#   python pipeline_stats.py rebuild    Recomputes the tables from Candidates.
+
+# The is_cleared rule from clearance.py. The triggers spell out the expression rather than
+# reading {row}is_cleared, because they are created (migration 4) before that column exists.
+CLEARED_SQL = f"CASE WHEN {MISSING_ITEMS_SQL} = 0 THEN 1 ELSE 0 END"
+MONTH_SQL = "strftime('%Y-%m', {row}interview_date)"
+
+PIPELINE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS Pipeline_Status_Counts (
+    candidate_status TEXT PRIMARY KEY,
+    candidate_count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;""",
+    """CREATE TABLE IF NOT EXISTS Pipeline_Monthly_Counts (
+    interview_month TEXT NOT NULL,
+    candidate_status TEXT NOT NULL,
+    candidate_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (interview_month, candidate_status)
+) WITHOUT ROWID;""",
+    """CREATE TABLE IF NOT EXISTS Pipeline_Class_Counts (
+    fk_class_id INTEGER NOT NULL,
+    candidate_status TEXT NOT NULL,
+    candidate_count INTEGER NOT NULL DEFAULT 0,
+    cleared_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (fk_class_id, candidate_status)
+) WITHOUT ROWID;""",
+]
+
+def build_count_statements(row, delta):
+    """Trigger statements that add delta (+1 or -1) to every count the given row ('new.' or 'old.') falls in."""
+    month = MONTH_SQL.format(row=row)
+    cleared = CLEARED_SQL.format(row=row)
+    return [
+        f"INSERT INTO Pipeline_Status_Counts (candidate_status, candidate_count) VALUES ({row}candidate_status, {delta}) "
+        "ON CONFLICT (candidate_status) DO UPDATE SET candidate_count = candidate_count + excluded.candidate_count;",
+        f"INSERT INTO Pipeline_Monthly_Counts (interview_month, candidate_status, candidate_count) SELECT {month}, {row}candidate_status, {delta} WHERE {month} IS NOT NULL "
+        "ON CONFLICT (interview_month, candidate_status) DO UPDATE SET candidate_count = candidate_count + excluded.candidate_count;",
+        f"INSERT INTO Pipeline_Class_Counts (fk_class_id, candidate_status, candidate_count, cleared_count) SELECT {row}fk_class_id, {row}candidate_status, {delta}, {delta} * {cleared} WHERE {row}fk_class_id IS NOT NULL "
+        "ON CONFLICT (fk_class_id, candidate_status) DO UPDATE SET candidate_count = candidate_count + excluded.candidate_count, cleared_count = cleared_count + excluded.cleared_count;",
+    ]
+
+def build_trigger(name, event, statements):
+    body = "\n    ".join(statements)
+    return f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON Candidates BEGIN\n    {body}\nEND;"
+
+# Only the columns the counts depend on fire the update trigger.
+COUNTED_COLUMNS = "candidate_status, interview_date, fk_class_id, fk_job_id, bg_ds_clear, pre_board_complete, myinfo_ready, pn_number, euid"
+
+PIPELINE_TRIGGERS = [
+    build_trigger("trg_candidates_pipeline_insert", "INSERT", build_count_statements("new.", 1)),
+    build_trigger("trg_candidates_pipeline_delete", "DELETE", build_count_statements("old.", -1)),
+    build_trigger("trg_candidates_pipeline_update", f"UPDATE OF {COUNTED_COLUMNS}", build_count_statements("old.", -1) + build_count_statements("new.", 1)),
+]
+
+# Full recomputes from Candidates, used to populate the tables and by the checker.
+RECOMPUTE_STATUS_COUNTS = "SELECT candidate_status, COUNT(*) FROM Candidates GROUP BY candidate_status"
+RECOMPUTE_MONTHLY_COUNTS = f"SELECT {MONTH_SQL.format(row='')} AS interview_month, candidate_status, COUNT(*) FROM Candidates WHERE interview_month IS NOT NULL GROUP BY interview_month, candidate_status"
+RECOMPUTE_CLASS_COUNTS = f"SELECT fk_class_id, candidate_status, COUNT(*), SUM({CLEARED_SQL.format(row='')}) FROM Candidates WHERE fk_class_id IS NOT NULL GROUP BY fk_class_id, candidate_status"
+
+POPULATE_PIPELINE_TABLES = [
+    "DELETE FROM Pipeline_Status_Counts;",
+    "DELETE FROM Pipeline_Monthly_Counts;",
+    "DELETE FROM Pipeline_Class_Counts;",
+    f"INSERT INTO Pipeline_Status_Counts (candidate_status, candidate_count) {RECOMPUTE_STATUS_COUNTS};",
+    f"INSERT INTO Pipeline_Monthly_Counts (interview_month, candidate_status, candidate_count) {RECOMPUTE_MONTHLY_COUNTS};",
+    f"INSERT INTO Pipeline_Class_Counts (fk_class_id, candidate_status, candidate_count, cleared_count) {RECOMPUTE_CLASS_COUNTS};",
+]
+
+# Add the counts of the candidates with candidate_id BETWEEN ? AND ?, for bulk loads
+# that bypass the insert trigger. Same upserts as the trigger, one per group instead of per row.
+RANGE_WHERE = "candidate_id BETWEEN ? AND ?"
+ADD_RANGE_COUNTS = [
+    f"INSERT INTO Pipeline_Status_Counts (candidate_status, candidate_count) SELECT candidate_status, COUNT(*) FROM Candidates WHERE {RANGE_WHERE} GROUP BY candidate_status "
+    "ON CONFLICT (candidate_status) DO UPDATE SET candidate_count = candidate_count + excluded.candidate_count;",
+    f"INSERT INTO Pipeline_Monthly_Counts (interview_month, candidate_status, candidate_count) SELECT {MONTH_SQL.format(row='')} AS interview_month, candidate_status, COUNT(*) FROM Candidates WHERE {RANGE_WHERE} AND interview_month IS NOT NULL GROUP BY interview_month, candidate_status "
+    "ON CONFLICT (interview_month, candidate_status) DO UPDATE SET candidate_count = candidate_count + excluded.candidate_count;",
+    f"INSERT INTO Pipeline_Class_Counts (fk_class_id, candidate_status, candidate_count, cleared_count) SELECT fk_class_id, candidate_status, COUNT(*), SUM({CLEARED_SQL.format(row='')}) FROM Candidates WHERE {RANGE_WHERE} AND fk_class_id IS NOT NULL GROUP BY fk_class_id, candidate_status "
+    "ON CONFLICT (fk_class_id, candidate_status) DO UPDATE SET candidate_count = candidate_count + excluded.candidate_count, cleared_count = cleared_count + excluded.cleared_count;",
+]
+
+# (table, stored counts query, recomputed counts query, number of key columns)
+CONSISTENCY_CHECKS = [
+    ("Pipeline_Status_Counts", "SELECT candidate_status, candidate_count FROM Pipeline_Status_Counts", RECOMPUTE_STATUS_COUNTS, 1),
+    ("Pipeline_Monthly_Counts", "SELECT interview_month, candidate_status, candidate_count FROM Pipeline_Monthly_Counts", RECOMPUTE_MONTHLY_COUNTS, 2),
+    ("Pipeline_Class_Counts", "SELECT fk_class_id, candidate_status, candidate_count, cleared_count FROM Pipeline_Class_Counts", RECOMPUTE_CLASS_COUNTS, 2),
+]
+
+def rebuild_pipeline_stats(conn):
+    """Recomputes all three tables from Candidates."""
+    for statement in POPULATE_PIPELINE_TABLES:
+        conn.execute(statement)
+
+def check_pipeline_stats(conn):
+    """Compares the stored counts with a full recompute. Returns (table, key, stored, expected) for each mismatch."""
+    return find_count_mismatches(conn, CONSISTENCY_CHECKS)
+
+def find_count_mismatches(conn, checks):
+    """Runs (table, stored counts query, recomputed counts query, number of key columns) checks."""
+    mismatches = []
+    for table, stored_sql, expected_sql, key_size in checks:
+        stored = {tuple(row[:key_size]): tuple(row[key_size:]) for row in conn.execute(stored_sql)}
+        expected = {tuple(row[:key_size]): tuple(row[key_size:]) for row in conn.execute(expected_sql)}
+        for key in sorted(stored.keys() | expected.keys(), key=repr):
+            stored_counts, expected_counts = stored.get(key), expected.get(key)
+            # A bucket whose rows have all moved elsewhere is left behind at zero.
+            zero = (0,) * len(stored_counts or expected_counts)
+            if (stored_counts or zero) != (expected_counts or zero):
+                mismatches.append((table, key, stored_counts, expected_counts))
+    return mismatches
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "check":
+        with db_session() as conn:
+            mismatches = check_pipeline_stats(conn)
+        for table, key, stored, expected in mismatches:
+            print(f"{table} {key}: stored {stored}, expected {expected}")
+        print(f"{len(mismatches)} mismatch(es) found." if mismatches else "Pipeline aggregates match Candidates.")
+        sys.exit(1 if mismatches else 0)
+    elif command == "rebuild":
+        with db_session() as conn:
+            rebuild_pipeline_stats(conn)
+        print("Pipeline aggregates rebuilt.")
+    else:
+        print("Usage: python pipeline_stats.py check | rebuild")
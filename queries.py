@@ -0,0 +1,144 @@
+import json
+import sqlite3
+
+# ==================================================================
+# SHARED SQL QUERIES
+# ==================================================================
+# The hot-path queries used by the UI modules live here so that the same SQL text
+# can be checked against the query planner (see db_migrations.py) and reused by
+# anything that needs the same data without building a window. The small fetch_*
+# tasks shared by a window and the JSON API (see api_server.py) live here too, so the
+# API never has to import tkinter.
+#
+# Queries that fill a list view are written without ORDER BY. Each one has a matching
+# *_ORDER tuple of (column, direction) pairs that ends in a unique column, and
+# build_page_query() adds the ORDER BY and LIMIT so a PagedTreeview (see
+# paged_treeview.py) can fetch one page at a time.
+
+# --- HR Dashboard ---
+# The KPIs read the trigger-maintained counts in the Pipeline_* tables (see
+# pipeline_stats.py) instead of counting Candidates on every refresh.
+DASHBOARD_MONTH_ACTIVITY_COUNT = "SELECT COALESCE(SUM(candidate_count), 0) FROM Pipeline_Monthly_Counts WHERE interview_month = strftime('%Y-%m', 'now') AND candidate_status != 'Rejected';"
+DASHBOARD_PENDING_COUNT = "SELECT COALESCE(SUM(candidate_count), 0) FROM Pipeline_Status_Counts WHERE candidate_status = 'Pending';"
+DASHBOARD_CLEARED_NEXT_WEEK_COUNT = "SELECT COALESCE(SUM(pc.cleared_count), 0) FROM Hiring_Classes hc JOIN Pipeline_Class_Counts pc ON pc.fk_class_id = hc.class_id WHERE hc.class_date BETWEEN date('now', 'weekday 1') AND date('now', 'weekday 1', '+6 days');"
+DASHBOARD_PENDING_HOT_LIST = "SELECT c.candidate_id, c.last_name, c.first_name, hc.class_date, c.screening_status, c.notes FROM Candidates c JOIN Hiring_Classes hc ON c.fk_class_id = hc.class_id WHERE c.candidate_status = 'Pending' AND hc.class_date >= date('now')"
+DASHBOARD_PENDING_HOT_LIST_ORDER = (('class_date', 'ASC'), ('last_name', 'ASC'), ('candidate_id', 'ASC'))
+
+def fetch_kpis(conn):
+    """Returns the three dashboard KPIs: this month's activity, pending candidates and those cleared for next week."""
+    return [conn.execute(query).fetchone()[0] for query in (DASHBOARD_MONTH_ACTIVITY_COUNT, DASHBOARD_PENDING_COUNT, DASHBOARD_CLEARED_NEXT_WEEK_COUNT)]
+
+# --- Class Roster Viewer ---
+# is_cleared and missing_items are generated columns (see clearance.py).
+CLASS_ROSTER = "SELECT c.candidate_id, c.first_name, c.last_name, c.candidate_status, c.rejection_reason, c.notes, c.is_cleared, c.missing_items, j.department, j.shift FROM Candidates c LEFT JOIN Jobs j ON c.fk_job_id = j.job_id WHERE c.fk_class_id = ? ORDER BY c.last_name, c.first_name;"
+
+def fetch_class_roster(conn, class_id):
+    """Background task: returns the roster rows (sqlite3.Row) for a hiring class."""
+    conn.row_factory = sqlite3.Row
+    return conn.execute(CLASS_ROSTER, (class_id,)).fetchall()
+
+# --- Search and Update ---
+ORIENTATION_LETTER_UPDATE = "UPDATE Candidates SET orientation_letter_sent = 1 WHERE is_cleared = 1 AND fk_class_id IN (SELECT class_id FROM Hiring_Classes WHERE class_date BETWEEN date('now', 'weekday 1') AND date('now', 'weekday 1', '+6 days'));"
+
+# --- Reports ---
+REFERRAL_LEADERBOARD = "SELECT referred_by, COUNT(*) AS total_referrals FROM Candidates WHERE referred_by IS NOT NULL AND referred_by != '' GROUP BY referred_by"
+REFERRAL_LEADERBOARD_ORDER = (('total_referrals', 'DESC'), ('referred_by', 'ASC'))
+REFERRER_SEARCH = "SELECT c.candidate_id, c.last_name, c.first_name, j.department, c.candidate_status FROM Candidates c LEFT JOIN Jobs j ON c.fk_job_id = j.job_id WHERE c.referred_by LIKE ?"
+REFERRER_SEARCH_ORDER = (('last_name', 'ASC'), ('candidate_id', 'ASC'))
+LAST_WEEK_REFERRALS = "SELECT c.candidate_id, c.last_name, c.first_name, j.department, c.candidate_status, c.referred_by FROM Candidates c LEFT JOIN Jobs j ON c.fk_job_id = j.job_id WHERE c.interview_date BETWEEN date('now', 'weekday 1', '-7 days') AND date('now', 'weekday 1', '-1 day')"
+CLASS_WEEK_REFERRALS = "SELECT c.candidate_id, c.last_name, c.first_name, j.department, c.candidate_status, c.referred_by FROM Candidates c LEFT JOIN Jobs j ON c.fk_job_id = j.job_id JOIN Hiring_Classes hc ON c.fk_class_id = hc.class_id WHERE hc.class_date = ?"
+REFERRALS_ORDER = (('last_name', 'ASC'), ('first_name', 'ASC'), ('candidate_id', 'ASC'))
+# The two referral reports are split into "with" and "without" lists by these filters.
+HAS_REFERRER = "referred_by IS NOT NULL AND referred_by != ''"
+HAS_NO_REFERRER = "referred_by IS NULL OR referred_by = ''"
+
+HIRES_BY_DEPARTMENT_ORDER = (('total_hires', 'DESC'), ('department', 'ASC'))
+DEPARTMENT_COUNTS = "SELECT j.department, c.candidate_status, COUNT(*) AS candidates FROM Candidates c LEFT JOIN Jobs j ON c.fk_job_id = j.job_id GROUP BY j.department, c.candidate_status ORDER BY j.department, c.candidate_status;"
+CLASS_BREAKDOWN = "SELECT hc.class_date, pc.candidate_status, pc.candidate_count AS candidates, pc.cleared_count AS cleared FROM Pipeline_Class_Counts pc JOIN Hiring_Classes hc ON hc.class_id = pc.fk_class_id WHERE pc.candidate_count > 0 ORDER BY hc.class_date DESC, pc.candidate_status;"
+
+def build_hires_by_department_query(start_date=None, end_date=None):
+    """Builds the 'Hires by Department' query with its optional date filters."""
+    query = "SELECT j.department, COUNT(*) AS total_hires FROM Candidates c JOIN Jobs j ON c.fk_job_id = j.job_id WHERE c.candidate_status = 'Hired'"
+    params = []
+    if start_date:
+        query += " AND c.interview_date >= ?"
+        params.append(start_date)
+    if end_date:
+        query += " AND c.interview_date <= ?"
+        params.append(end_date)
+    query += " GROUP BY j.department"
+    return query, params
+
+# ==================================================================
+# KEYSET PAGING
+# ==================================================================
+# Paging with OFFSET makes SQLite step over every skipped row, so later pages get
+# slower. Instead, each page starts after (or before) the sort key of the last row
+# already shown, which the indexes can seek to directly.
+
+PAGE_SIZE = 200
+
+def build_keyset_condition(order_by, key, backwards=False):
+    """Returns (sql, params) matching rows that sort after key (or before it, if backwards)."""
+    def operator(direction):
+        return '>' if (direction == 'ASC') != backwards else '<'
+    directions = {direction for _, direction in order_by}
+    if len(directions) == 1:
+        # All columns sort the same way, so a single row-value comparison does it.
+        columns = ", ".join(column for column, _ in order_by)
+        placeholders = ", ".join("?" for _ in order_by)
+        return f"({columns}) {operator(directions.pop())} ({placeholders})", list(key)
+    # Mixed directions: (a > ?) OR (a = ? AND b < ?) OR ...
+    clauses = []
+    params = []
+    for i, (column, direction) in enumerate(order_by):
+        clause = [f"{prefix} = ?" for prefix, _ in order_by[:i]] + [f"{column} {operator(direction)} ?"]
+        clauses.append("(" + " AND ".join(clause) + ")")
+        params.extend(key[:i + 1])
+    return "(" + " OR ".join(clauses) + ")", params
+
+def build_page_query(query, order_by, where=None, after=None, before=None):
+    """Wraps a list query so it returns one page. The caller appends the page size as the last parameter.
+
+    Returns (sql, key_params); key_params go after the query's own parameters.
+    """
+    backwards = before is not None
+    conditions = [f"({where})"] if where else []
+    key_params = []
+    if after is not None or before is not None:
+        condition, key_params = build_keyset_condition(order_by, before if backwards else after, backwards)
+        conditions.append(condition)
+    if backwards:
+        # Read the previous page in reverse; fetch_page() flips it back.
+        order_by = [(column, 'DESC' if direction == 'ASC' else 'ASC') for column, direction in order_by]
+    sql = f"SELECT * FROM ({query.strip().rstrip(';')}) AS page_source"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY " + ", ".join(f"{column} {direction}" for column, direction in order_by) + " LIMIT ?;"
+    return sql, key_params
+
+def fetch_page(conn, query, params, order_by, where=None, after=None, before=None, page_size=PAGE_SIZE):
+    """Fetches one page of a list query. Returns (rows, keys, has_more), in display order.
+
+    keys holds the sort key of each row, used to ask for the page after or before it.
+    This only touches the database, so it is safe to call from a worker thread.
+    """
+    sql, key_params = build_page_query(query, order_by, where, after, before)
+    cursor = conn.execute(sql, (*params, *key_params, page_size + 1))
+    names = [column[0] for column in cursor.description]
+    key_indexes = [names.index(column) for column, _ in order_by]
+    rows = cursor.fetchall()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if before is not None:
+        rows.reverse()
+    keys = [tuple(row[i] for i in key_indexes) for row in rows]
+    return rows, keys, has_more
+
+def fetch_rows(conn, query, params, order_by, id_column, ids):
+    """Runs a list query for just the rows whose id_column is in ids. Returns (rows, keys) as fetch_page does.
+
+    Used with PagedTreeview.patch; ids that no longer match the query are simply missing from rows."""
+    where = f"{id_column} IN (SELECT value FROM json_each(?))"
+    rows, keys, _ = fetch_page(conn, query, (*params, json.dumps(list(ids))), order_by, where, page_size=len(ids))
+    return rows, keys
@@ -0,0 +1,364 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from common import DB_POOL, PooledConnection, script_dir
+from report_writer import open_output
+
+# ==================================================================
+# QUERY PROFILING
+# ==================================================================
+# Records how long every query takes, grouped by query text and by the module and
+# method that ran it, so slow spots can be found on a real workstation. When enabled,
+# the pool hands out ProfiledConnections: their cursors time each query from
+# execute() until its last row has been read (including the fetches), count the rows,
+# and count the statements SQLite actually ran for it through set_trace_callback (so
+# trigger work shows up). Statements that do not go through a cursor at all, such as
+# the implicit COMMIT, are counted too.
+#
+# A query slower than the threshold is written to slow_queries.log together with its
+# EXPLAIN QUERY PLAN (captured once per query text). The statistics are shown on the
+# "Query Stats" tab in AdminApp and can be exported as JSON.
+#
+# Profiling is off by default and costs nothing then. Turn it on from AdminApp, or for
+# a whole session by starting the application with HR_PROFILE_QUERIES=1 set
+# (HR_SLOW_QUERY_MS changes the threshold). batch_reports.py takes --profile FILE.
+
+SLOW_QUERY_MS = float(os.environ.get("HR_SLOW_QUERY_MS", 250))
+SLOW_QUERY_LOG = os.path.join(script_dir, "slow_queries.log")
+# Upper bounds of the latency histogram buckets, in ms; the last bucket is everything slower.
+HISTOGRAM_BOUNDS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+UNTIMED_CALLER = "(outside a cursor)"
+
+# Frames from these modules are plumbing; the caller reported is the first frame outside them.
+PLUMBING_MODULES = frozenset({__name__, "common", "db_tasks", "write_queue", "queries", "paged_treeview", "change_log", "contextlib", "threading", "concurrent.futures.thread", "tkinter"})
+
+# Comprehensions run in frames of their own; report the function they are in.
+COMPREHENSION_NAMES = frozenset({"<listcomp>", "<dictcomp>", "<setcomp>", "<genexpr>"})
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+@lru_cache(maxsize=2048)
+def sql_template(sql):
+    """The query text used to group statistics: whitespace collapsed, at most 500 characters."""
+    return WHITESPACE_PATTERN.sub(" ", sql).strip()[:500]
+
+_local = threading.local()
+
+@contextmanager
+def query_label(label):
+    """Adds ":label" to the caller recorded for the queries run inside the block, e.g. the report name."""
+    previous = getattr(_local, 'label', None)
+    _local.label = label
+    try:
+        yield
+    finally:
+        _local.label = previous
+
+def find_caller():
+    """Returns "module.Class.method" for the code that ran the query, plus any query_label."""
+    frame = sys._getframe(1)
+    while frame is not None and (frame.f_globals.get("__name__") in PLUMBING_MODULES or frame.f_code.co_name in COMPREHENSION_NAMES):
+        frame = frame.f_back
+    if frame is None:
+        caller = "(unknown)"
+    else:
+        code = frame.f_code
+        caller = f"{frame.f_globals.get('__name__')}.{getattr(code, 'co_qualname', code.co_name)}"
+    label = getattr(_local, 'label', None)
+    return f"{caller}:{label}" if label else caller
+
+
+class ActiveQuery:
+    """A query whose rows are still being read."""
+    __slots__ = ('sql', 'params', 'caller', 'elapsed', 'rows', 'statements', 'explained')
+
+    def __init__(self, sql, params, caller):
+        self.sql = sql
+        self.params = params
+        self.caller = caller
+        self.elapsed = 0.0
+        self.rows = 0
+        self.statements = 0
+        self.explained = False
+
+
+class QueryStats:
+    """Running totals for one query text run from one caller."""
+    __slots__ = ('count', 'total_ms', 'max_ms', 'rows', 'statements', 'slow', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.statements = 0
+        self.slow = 0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+
+    def add(self, elapsed_ms, rows, statements, slow):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += rows
+        self.statements += statements
+        self.slow += slow
+        bucket = next((i for i, bound in enumerate(HISTOGRAM_BOUNDS_MS) if elapsed_ms <= bound), len(HISTOGRAM_BOUNDS_MS))
+        self.histogram[bucket] += 1
+
+    def percentile_ms(self, fraction):
+        """Upper bound of the histogram bucket holding the given fraction of calls (None if beyond the last bound)."""
+        seen = 0
+        for bound, count in zip(HISTOGRAM_BOUNDS_MS + (None,), self.histogram):
+            seen += count
+            if seen >= fraction * self.count:
+                return bound
+        return None
+
+
+class QueryProfiler:
+    """Collects QueryStats from every ProfiledConnection."""
+    def __init__(self, pool=DB_POOL, slow_query_ms=SLOW_QUERY_MS, log_path=SLOW_QUERY_LOG):
+        self.pool = pool
+        self.slow_query_ms = slow_query_ms
+        self.log_path = log_path
+        self.enabled = False
+        self.started_at = None
+        self._lock = threading.Lock()
+        self.stats = {}   # (template, caller) -> QueryStats
+        self.plans = {}   # template -> EXPLAIN QUERY PLAN lines
+        self.log = logging.getLogger("hr.slow_queries")
+        self.log.propagate = False
+
+    def enable(self):
+        """Starts recording. Connections already handed out are replaced as they come back to the pool."""
+        if self.enabled:
+            return
+        if not self.log.handlers:
+            handler = logging.FileHandler(self.log_path, encoding='utf-8', delay=True)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.log.addHandler(handler)
+            self.log.setLevel(logging.INFO)
+        self.enabled = True
+        self.started_at = time.time()
+        self.pool.set_connection_factory(ProfiledConnection)
+
+    def disable(self):
+        """Stops recording; the statistics collected so far are kept."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.pool.set_connection_factory(PooledConnection)
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.plans.clear()
+        self.started_at = time.time() if self.enabled else None
+
+    def is_slow(self, query):
+        return query.elapsed * 1000 >= self.slow_query_ms
+
+    def capture_plan(self, conn, query):
+        """Runs EXPLAIN QUERY PLAN for a slow query, once per query text, on the connection that ran it."""
+        query.explained = True
+        template = sql_template(query.sql)
+        if template in self.plans or query.params is None:
+            return
+        # Keep the EXPLAIN itself out of the statistics.
+        _local.active = ActiveQuery(query.sql, None, None)
+        try:
+            plan = [row[3] for row in sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {query.sql}", query.params)]
+        except sqlite3.Error as e:
+            plan = [f"(no plan: {e})"]
+        finally:
+            _local.active = None
+        with self._lock:
+            self.plans[template] = plan
+
+    def record(self, query):
+        """Adds a finished query to the statistics, logging it if it was slow."""
+        elapsed_ms = query.elapsed * 1000
+        slow = elapsed_ms >= self.slow_query_ms
+        template = sql_template(query.sql)
+        with self._lock:
+            stats = self.stats.get((template, query.caller))
+            if stats is None:
+                stats = self.stats[(template, query.caller)] = QueryStats()
+            stats.add(elapsed_ms, query.rows, query.statements, slow)
+            plan = self.plans.get(template)
+        if slow:
+            lines = [f"{elapsed_ms:.1f} ms, {query.rows} row(s), {query.statements} statement(s): {query.caller}", f"    {template}"]
+            lines.extend(f"    | {detail}" for detail in (["(plan not captured)"] if plan is None else plan))
+            self.log.info("\n".join(lines))
+
+    def record_untimed(self, sql):
+        """Counts a statement SQLite ran that did not come through a profiled cursor (e.g. COMMIT)."""
+        with self._lock:
+            stats = self.stats.get((sql_template(sql), UNTIMED_CALLER))
+            if stats is None:
+                stats = self.stats[(sql_template(sql), UNTIMED_CALLER)] = QueryStats()
+            stats.add(0.0, 0, 1, False)
+
+    def snapshot(self):
+        """Returns the statistics as a list of dicts, slowest total time first."""
+        with self._lock:
+            items = [(template, caller, stats) for (template, caller), stats in self.stats.items()]
+            plans = dict(self.plans)
+        rows = []
+        for template, caller, stats in sorted(items, key=lambda item: item[2].total_ms, reverse=True):
+            rows.append({
+                'caller': caller,
+                'query': template,
+                'count': stats.count,
+                'total_ms': round(stats.total_ms, 3),
+                'mean_ms': round(stats.total_ms / stats.count, 3),
+                'max_ms': round(stats.max_ms, 3),
+                'p95_ms': stats.percentile_ms(0.95),
+                'rows': stats.rows,
+                'statements': stats.statements,
+                'slow': stats.slow,
+                'histogram': {f"<={bound}ms" if bound is not None else f">{HISTOGRAM_BOUNDS_MS[-1]}ms": count
+                              for bound, count in zip(HISTOGRAM_BOUNDS_MS + (None,), stats.histogram)},
+                'plan': plans.get(template),
+            })
+        return rows
+
+    def export_json(self, filename):
+        """Writes the snapshot, with the threshold and collection period, to a JSON file."""
+        data = {
+            'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at)) if self.started_at else None,
+            'exported_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'slow_query_ms': self.slow_query_ms,
+            'queries': self.snapshot(),
+        }
+        with open_output(filename) as file:
+            json.dump(data, file, indent=2)
+
+
+QUERY_PROFILER = QueryProfiler()
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """A cursor that reports each query to QUERY_PROFILER once its rows have been read."""
+    query = None
+
+    def timed(self, method, *args):
+        query = self.query
+        _local.active = query
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            query.elapsed += time.perf_counter() - started
+            _local.active = None
+            if not query.explained and query.params is not None and QUERY_PROFILER.is_slow(query):
+                QUERY_PROFILER.capture_plan(self.connection, query)
+
+    def execute(self, sql, parameters=()):
+        self.finish_query()
+        self.query = ActiveQuery(sql, parameters, find_caller())
+        try:
+            self.timed(super().execute, sql, parameters)
+        except BaseException:
+            self.finish_query()
+            raise
+        if self.description is None:
+            # Not a SELECT: it has done all its work already.
+            self.query.rows = max(self.rowcount, 0)
+            self.finish_query()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self.finish_query()
+        # The parameters may be a generator, so the plan is not captured for these.
+        self.query = ActiveQuery(sql, None, find_caller())
+        try:
+            self.timed(super().executemany, sql, seq_of_parameters)
+            self.query.rows = max(self.rowcount, 0)
+        finally:
+            self.finish_query()
+        return self
+
+    def fetchone(self):
+        if self.query is None:
+            return super().fetchone()
+        row = self.timed(super().fetchone)
+        if row is None:
+            self.finish_query()
+        else:
+            self.query.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+        if self.query is None:
+            return super().fetchmany(size)
+        rows = self.timed(super().fetchmany, size)
+        self.query.rows += len(rows)
+        if len(rows) < size:
+            self.finish_query()
+        return rows
+
+    def fetchall(self):
+        if self.query is None:
+            return super().fetchall()
+        rows = self.timed(super().fetchall)
+        self.query.rows += len(rows)
+        self.finish_query()
+        return rows
+
+    def __next__(self):
+        if self.query is None:
+            return super().__next__()
+        try:
+            row = self.timed(super().__next__)
+        except StopIteration:
+            self.finish_query()
+            raise
+        self.query.rows += 1
+        return row
+
+    def close(self):
+        self.finish_query()
+        super().close()
+
+    def __del__(self):
+        # Queries read with a single fetchone() never reach the end of their rows.
+        self.finish_query()
+
+    def finish_query(self):
+        query, self.query = self.query, None
+        if query is not None:
+            QUERY_PROFILER.record(query)
+
+
+class ProfiledConnection(PooledConnection):
+    """A pooled connection whose queries are recorded by QUERY_PROFILER."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(self.on_statement)
+
+    def on_statement(self, sql):
+        # Runs for every statement SQLite starts, including those inside triggers.
+        query = getattr(_local, 'active', None)
+        if query is not None:
+            query.statements += 1
+        else:
+            QUERY_PROFILER.record_untimed(sql)
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or ProfiledCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
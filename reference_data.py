@@ -0,0 +1,70 @@
+import threading
+import time
+from common import db_session
+
+# ==================================================================
+# REFERENCE DATA CACHE
+# ==================================================================
+# Jobs, Hiring_Classes and Interviewers are small lookup tables that only change
+# through the Admin window, yet every form used to re-query them when it opened and
+# again on every department change. This module loads them once per process and
+# shares the result across windows. AdminApp calls REFERENCE_DATA.invalidate()
+# after each add, edit or delete, which bumps a version counter so the next reader
+# reloads. Edits made on another workstation are picked up after
+# REFERENCE_DATA_MAX_AGE seconds.
+
+REFERENCE_DATA_MAX_AGE = 300
+
+class ReferenceData:
+    """One loaded copy of the lookup tables. Shared between windows, so treat it as read-only."""
+    def __init__(self, jobs, classes, interviewers):
+        # department -> {"shift | employment type | pay structure": job_id}, in shift order.
+        self.job_details_by_department = {}
+        for department, shift, employment_type, pay_structure, job_id in jobs:
+            self.job_details_by_department.setdefault(department, {})[f"{shift or 'N/A'} | {employment_type} | {pay_structure}"] = job_id
+        self.departments = sorted(self.job_details_by_department)
+        # "YYYY-MM-DD" -> class_id, newest first.
+        self.classes_map = {date_str: class_id for date_str, class_id in classes}
+        # interviewer name -> interviewer_id, alphabetical.
+        self.interviewers_map = {name: interviewer_id for name, interviewer_id in interviewers}
+
+    def get_job_details(self, department):
+        """Returns the {label: job_id} map for a department (empty if it has no jobs)."""
+        return self.job_details_by_department.get(department, {})
+
+
+class ReferenceDataStore:
+    """Thread-safe, versioned cache of the reference data."""
+    def __init__(self, max_age=REFERENCE_DATA_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._version = 0
+        self._data = None
+        self._loaded_version = None
+        self._loaded_at = 0.0
+
+    def invalidate(self):
+        """Marks the cached data as stale. Call after any change to Jobs, Hiring_Classes or Interviewers."""
+        with self._lock:
+            self._version += 1
+
+    def get(self):
+        """Returns the current ReferenceData, reloading it only if it was invalidated or has expired."""
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > self.max_age
+            if self._data is None or self._loaded_version != self._version or expired:
+                version = self._version
+                self._data = self._load()
+                self._loaded_version = version
+                self._loaded_at = time.monotonic()
+            return self._data
+
+    def _load(self):
+        with db_session() as conn:
+            jobs = conn.execute("SELECT department, shift, employment_type, pay_structure, job_id FROM Jobs ORDER BY department, shift;").fetchall()
+            classes = conn.execute("SELECT strftime('%Y-%m-%d', class_date), class_id FROM Hiring_Classes ORDER BY class_date DESC;").fetchall()
+            interviewers = conn.execute("SELECT interviewer_name, interviewer_id FROM Interviewers ORDER BY interviewer_name;").fetchall()
+        return ReferenceData(jobs, classes, interviewers)
+
+
+REFERENCE_DATA = ReferenceDataStore()
@@ -0,0 +1,70 @@
+import html
+import os
+from contextlib import contextmanager
+from operator import itemgetter
+
+# ==================================================================
+# STREAMING HTML REPORT WRITER
+# ==================================================================
+# Reports used to build their HTML by concatenating strings around a fetchall(),
+# so memory and time grew with every row. HtmlReportWriter instead writes each
+# row to a buffered file as it comes off the cursor. The page header and footer
+# are fixed templates, and each table's row template is built once, so a row costs
+# a single format() and write().
+
+REPORT_BUFFER_SIZE = 64 * 1024
+
+PAGE_HEADER = '<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><title>{title}</title>\n<style>\n{css}\n</style></head><body><div class="container">\n'
+PAGE_FOOTER = '</div></body></html>\n'
+
+def escape_cell(value):
+    """Escapes a cell value for an HTML table."""
+    return html.escape(str(value), quote=False)
+
+class HtmlReportWriter:
+    """Writes an HTML report to an open text file, one row at a time."""
+    def __init__(self, file):
+        self.file = file
+
+    def begin(self, title, css):
+        self.file.write(PAGE_HEADER.format(title=escape_cell(title), css=css))
+
+    def write(self, markup):
+        """Writes trusted markup as-is (paragraphs, rules, etc.)."""
+        self.file.write(markup)
+
+    def write_table(self, headers, rows, columns=None):
+        """Streams rows (any iterable, e.g. a cursor) into a table. columns, if given, picks which indexes to show."""
+        if columns is not None:
+            headers = [headers[i] for i in columns]
+            # itemgetter with one index returns a bare value, so wrap that case in a tuple.
+            pick = itemgetter(*columns) if len(columns) > 1 else (lambda row: (row[columns[0]],))
+        write = self.file.write
+        write("<table><thead><tr>" + "".join(f"<th>{escape_cell(header)}</th>" for header in headers) + "</tr></thead><tbody>\n")
+        row_template = "<tr>" + "<td>{}</td>" * len(headers) + "</tr>\n"
+        for row in rows:
+            if columns is not None:
+                row = pick(row)
+            write(row_template.format(*map(escape_cell, row)))
+        write("</tbody></table>\n")
+
+    def end(self):
+        self.file.write(PAGE_FOOTER)
+
+@contextmanager
+def open_output(filename, newline=None):
+    """Opens a buffered text file for a report. It only replaces filename once the report is complete."""
+    temp_filename = filename + ".tmp"
+    try:
+        with open(temp_filename, 'w', encoding='utf-8', newline=newline, buffering=REPORT_BUFFER_SIZE) as file:
+            yield file
+        os.replace(temp_filename, filename)
+    finally:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+
+@contextmanager
+def open_report(filename):
+    """Opens a buffered HtmlReportWriter on filename (see open_output)."""
+    with open_output(filename) as file:
+        yield HtmlReportWriter(file)
@@ -1,10 +1,19 @@
 import sqlite3
 import tkinter as tk
 from tkinter import ttk, messagebox
-import datetime
 import webbrowser
 import os
-from common import get_db_connection, center_window
+import datetime
+from common import db_session, center_window
+from paged_treeview import PagedTreeview
+from reference_data import REFERENCE_DATA
+from report_writer import open_report
+from batch_reports import write_weekly_activity_report
+from funnel_trend import FUNNEL_TREND_HEADERS, FUNNEL_DEFAULT_WEEKS, get_funnel_trend
+from query_profiler import query_label
+from queries import (REFERRAL_LEADERBOARD, REFERRAL_LEADERBOARD_ORDER, REFERRER_SEARCH, REFERRER_SEARCH_ORDER, LAST_WEEK_REFERRALS,
+                     CLASS_WEEK_REFERRALS, REFERRALS_ORDER, HAS_REFERRER, HAS_NO_REFERRER, HIRES_BY_DEPARTMENT_ORDER,
+                     build_hires_by_department_query)
 
 # ==================================================================
 # REPORTS MODULE
@@ -30,7 +39,7 @@ class ReportsApp(tk.Toplevel):
         controls_frame.pack(fill=tk.X, pady=(0, 15))
         ttk.Label(controls_frame, text="Select Report:").pack(side=tk.LEFT, padx=(0, 10))
         self.report_var = tk.StringVar()
-        report_options = ["Weekly Activity Snapshot", "Referral Leaderboard", "Hires by Department", "Search by Referrer", "Last Week's Referrals", "Referrals by Class Week"]
+        report_options = ["Weekly Activity Snapshot", "Applicant Funnel Trend", "Referral Leaderboard", "Hires by Department", "Search by Referrer", "Last Week's Referrals", "Referrals by Class Week"]
         self.report_combo = ttk.Combobox(controls_frame, textvariable=self.report_var, values=report_options, state="readonly", width=30)
         self.report_combo.pack(side=tk.LEFT, padx=5)
         self.report_combo.bind("<<ComboboxSelected>>", self.on_report_select)
@@ -41,27 +50,27 @@ class ReportsApp(tk.Toplevel):
         
         self.results_frame = ttk.Frame(main_frame)
         self.results_frame.pack(fill=tk.BOTH, expand=True)
-        self.single_tree_frame, self.single_tree = self.create_single_results_tree(self.results_frame)
+        self.single_tree_frame, self.single_tree, self.single_pager = self.create_single_results_tree(self.results_frame)
         self.referral_paned_window = ttk.PanedWindow(self.results_frame, orient=tk.VERTICAL)
         self.referrals_frame = ttk.LabelFrame(self.referral_paned_window, text="Candidates WITH Referrals", padding="10")
         self.referral_paned_window.add(self.referrals_frame, weight=1)
-        self.referrals_tree = self.create_referral_tree(self.referrals_frame)
+        self.referrals_tree, self.referrals_pager = self.create_referral_tree(self.referrals_frame)
         self.no_referrals_frame = ttk.LabelFrame(self.referral_paned_window, text="Candidates WITHOUT Referrals", padding="10")
         self.referral_paned_window.add(self.no_referrals_frame, weight=1)
-        self.no_referrals_tree = self.create_referral_tree(self.no_referrals_frame, show_referrer=False)
+        self.no_referrals_tree, self.no_referrals_pager = self.create_referral_tree(self.no_referrals_frame, show_referrer=False)
         
     def create_single_results_tree(self, parent):
         """Reusable helper function to create a generic Treeview for single-table reports."""
         frame = ttk.Frame(parent)
         tree = ttk.Treeview(frame, show='headings')
         v_scroll = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
-        tree.configure(yscroll=v_scroll.set)
+        pager = PagedTreeview(tree, v_scroll)
         h_scroll = ttk.Scrollbar(frame, orient=tk.HORIZONTAL, command=tree.xview)
         tree.configure(xscroll=h_scroll.set)
         v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         h_scroll.pack(side=tk.BOTTOM, fill=tk.X)
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        return frame, tree
+        return frame, tree, pager
 
     def create_referral_tree(self, parent, show_referrer=True):
         """Reusable helper function to create the specific Treeview for referral reports."""
@@ -70,13 +79,13 @@ class ReportsApp(tk.Toplevel):
         for col in cols:
             tree.heading(col, text=col.replace('_', ' ').title())
         v_scroll = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=tree.yview)
-        tree.configure(yscroll=v_scroll.set)
+        pager = PagedTreeview(tree, v_scroll, empty_values=("No candidates found for this period.",))
         h_scroll = ttk.Scrollbar(parent, orient=tk.HORIZONTAL, command=tree.xview)
         tree.configure(xscroll=h_scroll.set)
         v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         h_scroll.pack(side=tk.BOTTOM, fill=tk.X)
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        return tree
+        return tree, pager
 
     def on_report_select(self, event):
         """Event handler that shows/hides the correct input fields based on the selected report."""
@@ -100,6 +109,18 @@ class ReportsApp(tk.Toplevel):
             self.end_date_entry = ttk.Entry(self.dynamic_controls_frame, width=12)
             self.end_date_entry.pack(side=tk.LEFT)
             self.single_tree_frame.pack(fill=tk.BOTH, expand=True)
+        elif report_type == "Applicant Funnel Trend":
+            end_date = datetime.date.today()
+            start_date = end_date - datetime.timedelta(weeks=FUNNEL_DEFAULT_WEEKS - 1)
+            ttk.Label(self.dynamic_controls_frame, text="Start Date (YYYY-MM-DD):").pack(side=tk.LEFT)
+            self.start_date_entry = ttk.Entry(self.dynamic_controls_frame, width=12)
+            self.start_date_entry.insert(0, start_date.isoformat())
+            self.start_date_entry.pack(side=tk.LEFT, padx=(0, 5))
+            ttk.Label(self.dynamic_controls_frame, text="End Date:").pack(side=tk.LEFT)
+            self.end_date_entry = ttk.Entry(self.dynamic_controls_frame, width=12)
+            self.end_date_entry.insert(0, end_date.isoformat())
+            self.end_date_entry.pack(side=tk.LEFT)
+            self.single_tree_frame.pack(fill=tk.BOTH, expand=True)
         elif report_type == "Last Week's Referrals" or report_type == "Referrals by Class Week":
             self.referral_paned_window.pack(fill=tk.BOTH, expand=True)
             if report_type == "Referrals by Class Week":
@@ -107,11 +128,7 @@ class ReportsApp(tk.Toplevel):
                 self.class_report_combo = ttk.Combobox(self.dynamic_controls_frame, state="readonly")
                 self.class_report_combo.pack(side=tk.LEFT)
                 try:
-                    conn = get_db_connection()
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT strftime('%Y-%m-%d', class_date) FROM Hiring_Classes ORDER BY class_date DESC;")
-                    self.class_report_combo['values'] = [row[0] for row in cursor.fetchall()]
-                    conn.close()
+                    self.class_report_combo['values'] = list(REFERENCE_DATA.get().classes_map.keys())
                 except Exception as e:
                     messagebox.showerror("DB Error", f"Could not load class dates: {e}", parent=self)
         else:
@@ -124,101 +141,59 @@ class ReportsApp(tk.Toplevel):
         if not report_type:
             messagebox.showwarning("Selection Error", "Please select a report to run.", parent=self)
             return
-        
-        try:
-            conn = get_db_connection()
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            if report_type == "Weekly Activity Snapshot":
-                self.generate_weekly_activity_report(cursor)
-            elif report_type == "Referral Leaderboard":
-                for item in self.single_tree.get_children():
-                    self.single_tree.delete(item)
-                self.setup_treeview(self.single_tree, ['Referrer', 'Total Referrals'])
-                query = "SELECT referred_by, COUNT(*) FROM Candidates WHERE referred_by IS NOT NULL AND referred_by != '' GROUP BY referred_by ORDER BY COUNT(*) DESC;"
-                cursor.execute(query)
-                results = cursor.fetchall()
-                if not results:
-                    self.single_tree.insert('', tk.END, values=("No results found.",))
-                else:
-                    for row in results:
-                        self.single_tree.insert('', tk.END, values=tuple(row))
 
-            elif report_type == "Hires by Department":
-                for item in self.single_tree.get_children():
-                    self.single_tree.delete(item)
-                self.setup_treeview(self.single_tree, ['Department', 'Total Hires'])
-                start_date = self.start_date_entry.get().strip()
-                end_date = self.end_date_entry.get().strip()
-                query = "SELECT j.department, COUNT(*) FROM Candidates c JOIN Jobs j ON c.fk_job_id = j.job_id WHERE c.candidate_status = 'Hired'"
-                params = []
-                if start_date:
-                    query += " AND c.interview_date >= ?"
-                    params.append(start_date)
-                if end_date:
-                    query += " AND c.interview_date <= ?"
-                    params.append(end_date)
-                query += " GROUP BY j.department ORDER BY COUNT(*) DESC;"
-                cursor.execute(query, params)
-                results = cursor.fetchall()
-                if not results:
-                    self.single_tree.insert('', tk.END, values=("No results found.",))
-                else:
-                    for row in results:
-                        self.single_tree.insert('', tk.END, values=tuple(row))
+        # Labels the queries below in the query statistics (see query_profiler.py).
+        with query_label(report_type):
+            try:
+                if report_type == "Weekly Activity Snapshot":
+                    self.generate_weekly_activity_report()
+
+                elif report_type == "Applicant Funnel Trend":
+                    self.show_funnel_trend(self.start_date_entry.get().strip(), self.end_date_entry.get().strip())
+
+                elif report_type == "Referral Leaderboard":
+                    self.setup_treeview(self.single_tree, ['Referrer', 'Total Referrals'])
+                    self.single_pager.load(REFERRAL_LEADERBOARD, order_by=REFERRAL_LEADERBOARD_ORDER)
 
-            elif report_type == "Search by Referrer":
-                for item in self.single_tree.get_children():
-                    self.single_tree.delete(item)
-                self.setup_treeview(self.single_tree, ['Last Name', 'First Name', 'Department', 'Status'])
-                referrer_name = self.referrer_search_entry.get().strip()
-                if not referrer_name:
-                    messagebox.showwarning("Input Error", "Please enter a referrer name to search.", parent=self)
-                    conn.close()
-                    return
-                query = "SELECT c.last_name, c.first_name, j.department, c.candidate_status FROM Candidates c LEFT JOIN Jobs j ON c.fk_job_id = j.job_id WHERE c.referred_by LIKE ? ORDER BY c.last_name;"
-                cursor.execute(query, (f"%{referrer_name}%",))
-                results = cursor.fetchall()
-                if not results:
-                    self.single_tree.insert('', tk.END, values=("No results found.",))
-                else:
-                    for row in results:
-                        self.single_tree.insert('', tk.END, values=tuple(row))
-            
-            elif report_type == "Last Week's Referrals" or report_type == "Referrals by Class Week":
-                for tree in [self.referrals_tree, self.no_referrals_tree]:
-                    for item in tree.get_children():
-                        tree.delete(item)
-                
-                if report_type == "Last Week's Referrals":
-                    query = "SELECT c.last_name, c.first_name, j.department, c.candidate_status, c.referred_by FROM Candidates c LEFT JOIN Jobs j ON c.fk_job_id = j.job_id WHERE c.interview_date BETWEEN date('now', 'weekday 1', '-7 days') AND date('now', 'weekday 1', '-1 day');"
-                    cursor.execute(query)
-                else: # Referrals by Class Week
-                    class_date = self.class_report_combo.get()
-                    if not class_date:
-                        messagebox.showwarning("Input Error", "Please select a class date.", parent=self)
-                        conn.close()
+                elif report_type == "Hires by Department":
+                    self.setup_treeview(self.single_tree, ['Department', 'Total Hires'])
+                    start_date = self.start_date_entry.get().strip()
+                    end_date = self.end_date_entry.get().strip()
+                    query, params = build_hires_by_department_query(start_date, end_date)
+                    self.single_pager.load(query, params, HIRES_BY_DEPARTMENT_ORDER)
+
+                elif report_type == "Search by Referrer":
+                    self.single_pager.clear()
+                    self.setup_treeview(self.single_tree, ['Last Name', 'First Name', 'Department', 'Status'])
+                    referrer_name = self.referrer_search_entry.get().strip()
+                    if not referrer_name:
+                        messagebox.showwarning("Input Error", "Please enter a referrer name to search.", parent=self)
                         return
-                    query = "SELECT c.last_name, c.first_name, j.department, c.candidate_status, c.referred_by FROM Candidates c LEFT JOIN Jobs j ON c.fk_job_id = j.job_id JOIN Hiring_Classes hc ON c.fk_class_id = hc.class_id WHERE hc.class_date = ?;"
-                    cursor.execute(query, (class_date,))
+                    self.single_pager.load(REFERRER_SEARCH, (f"%{referrer_name}%",), REFERRER_SEARCH_ORDER, row_to_values=lambda row: row[1:])
+
+                elif report_type == "Last Week's Referrals" or report_type == "Referrals by Class Week":
+                    self.referrals_pager.clear()
+                    self.no_referrals_pager.clear()
+
+                    if report_type == "Last Week's Referrals":
+                        query, params = LAST_WEEK_REFERRALS, ()
+                    else: # Referrals by Class Week
+                        class_date = self.class_report_combo.get()
+                        if not class_date:
+                            messagebox.showwarning("Input Error", "Please select a class date.", parent=self)
+                            return
+                        query, params = CLASS_WEEK_REFERRALS, (class_date,)
 
-                results = cursor.fetchall()
-                if not results: 
-                    self.referrals_tree.insert('', tk.END, values=("No candidates found for this period.",))
-                    self.no_referrals_tree.insert('', tk.END, values=("No candidates found for this period.",))
-                else:
-                    for row in results:
-                        if row['referred_by']:
-                            self.referrals_tree.insert('', tk.END, values=(row['last_name'], row['first_name'], row['referred_by'], row['department'], row['candidate_status']))
-                        else:
-                            self.no_referrals_tree.insert('', tk.END, values=(row['last_name'], row['first_name'], row['department'], row['candidate_status']))
+                    # Rows are (candidate_id, last_name, first_name, department, candidate_status, referred_by).
+                    self.referrals_pager.load(query, params, REFERRALS_ORDER, where=HAS_REFERRER,
+                                              row_to_values=lambda row: (row[1], row[2], row[5], row[3], row[4]))
+                    self.no_referrals_pager.load(query, params, REFERRALS_ORDER, where=HAS_NO_REFERRER,
+                                                 row_to_values=lambda row: (row[1], row[2], row[3], row[4]))
 
-            conn.close()
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Failed to run report: {e}", parent=self)
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {e}", parent=self)
+            except sqlite3.Error as e:
+                messagebox.showerror("Database Error", f"Failed to run report: {e}", parent=self)
+            except Exception as e:
+                messagebox.showerror("Error", f"An unexpected error occurred: {e}", parent=self)
 
     def setup_treeview(self, tree, columns):
         """Configures a Treeview's columns and headings."""
@@ -227,72 +202,27 @@ class ReportsApp(tk.Toplevel):
             tree.heading(col, text=col.replace('_', ' ').title())
             tree.column(col, width=150, anchor=tk.W)
 
-    def generate_weekly_activity_report(self, cursor):
-        """Generates the HTML report for the Weekly Activity Snapshot."""
-        today = datetime.date.today()
-        # weekday() is Monday=0...Sunday=6. To get to last Saturday, we subtract (today.weekday() + 2) days.
-        last_saturday = today - datetime.timedelta(days=today.weekday() + 2)
-        last_sunday = last_saturday - datetime.timedelta(days=6)
-        
-        date_range_str = f"{last_sunday.strftime('%B %d, %Y')} - {last_saturday.strftime('%B %d, %Y')}"
-        
-        # --- Fetch Data ---
-        cursor.execute("SELECT SUM(apps_reviewed), SUM(interviews_scheduled), SUM(hires_confirmed) FROM Daily_Metrics WHERE metric_date BETWEEN ? AND ?", (last_sunday, last_saturday))
-        metrics = cursor.fetchone()
-        
-        cursor.execute("SELECT category, reason, SUM(count) FROM Daily_Breakdowns db JOIN Daily_Metrics dm ON db.fk_metric_id = dm.metric_id WHERE dm.metric_date BETWEEN ? AND ? GROUP BY category, reason", (last_sunday, last_saturday))
-        breakdowns = cursor.fetchall()
-
-        # --- Process Data ---
-        data = {
-            "Apps Received": metrics['SUM(apps_reviewed)'] or 0,
-            "Interviews": metrics['SUM(interviews_scheduled)'] or 0,
-            "Offers": metrics['SUM(hires_confirmed)'] or 0,
-            "Withdrew": 0,
-            "Decline": 0,
-            "NCNS": 0
-        }
-        for category, reason, count in breakdowns:
-            if 'withdrawal' in category:
-                data["Withdrew"] += count
-            elif 'rejection' in category:
-                if reason == 'NCNS':
-                    data["NCNS"] += count
-                else:
-                    data["Decline"] += count
+    def show_funnel_trend(self, start_date, end_date):
+        """Shows the weekly funnel counts and conversion rates, with a total row at the bottom."""
+        try:
+            with db_session() as conn:
+                rows = get_funnel_trend(conn, start_date or None, end_date or None)
+        except ValueError:
+            messagebox.showwarning("Input Error", "Please enter the dates as YYYY-MM-DD, with the start date first.", parent=self)
+            return
+        self.single_pager.clear()
+        self.setup_treeview(self.single_tree, FUNNEL_TREND_HEADERS)
+        for column in FUNNEL_TREND_HEADERS:
+            self.single_tree.heading(column, text=column)
+            self.single_tree.column(column, width=95, anchor=tk.W if column == "Week Of" else tk.E)
+        for row in rows:
+            self.single_tree.insert('', tk.END, values=['' if value is None else value for value in row])
 
-        # --- Generate HTML ---
-        html_content = f"""
-        <!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><title>Weekly Activity Snapshot</title>
-        <style>
-            body {{ font-family: 'Segoe UI', sans-serif; color: #333; }}
-            .container {{ padding: 20px; border: 1px solid #6b92c2; width: 350px; margin: 20px; box-shadow: 0 2px 5px rgba(0,0,0,0.1); background-color: #cedbeb; }}
-            h2 {{ color: #084999; text-align: center; }}
-            p {{ text-align: center; margin-top: -10px; color: #396dad; }}
-            table {{ border-collapse: collapse; width: 100%; margin-top: 20px; }}
-            th, td {{ border: 1px solid #6b92c2; text-align: left; padding: 10px; font-size: 1.1em; }}
-            th {{ background-color: #396dad; color: white; }}
-            td:nth-child(2) {{ text-align: center; font-weight: bold; }}
-            tbody tr:nth-child(even) {{ background-color: #ffffff; }}
-            tbody tr:nth-child(odd) {{ background-color: #e8eef4; }}
-        </style></head><body><div class="container">
-        <h2>Weekly Activity Snapshot</h2><p>{date_range_str}</p>
-        <table>
-            <thead><tr><th>Categories</th><th>Total</th></tr></thead>
-            <tbody>
-                <tr><td>Apps Received</td><td>{data['Apps Received']}</td></tr>
-                <tr><td>Interviews</td><td>{data['Interviews']}</td></tr>
-                <tr><td>Offers</td><td>{data['Offers']}</td></tr>
-                <tr><td>Withdrew</td><td>{data['Withdrew']}</td></tr>
-                <tr><td>Decline</td><td>{data['Decline']}</td></tr>
-                <tr><td>NCNS</td><td>{data['NCNS']}</td></tr>
-            </tbody>
-        </table></div></body></html>
-        """
-        
+    def generate_weekly_activity_report(self):
+        """Generates the HTML report for the Weekly Activity Snapshot."""
         output_filename = 'weekly_activity_snapshot.html'
-        with open(output_filename, 'w', encoding='utf-8') as file:
-            file.write(html_content)
+        with db_session() as conn, open_report(output_filename) as report:
+            write_weekly_activity_report(conn, report)
         full_path = os.path.abspath(output_filename)
         webbrowser.open_new_tab(f"file://{full_path}")
         messagebox.showinfo("Success", f"Report generated successfully and opened in your browser!\n\nSaved as: {full_path}", parent=self)
@@ -1,13 +1,35 @@
 import sqlite3
 import tkinter as tk
 from tkinter import ttk, messagebox
-from common import get_db_connection, center_window
+from common import db_session, center_window
+from candidate_search import SEARCH_QUERY, SEARCH_ORDER, build_match_query
+from paged_treeview import PagedTreeview
+from reference_data import REFERENCE_DATA
+from queries import ORIENTATION_LETTER_UPDATE, fetch_page
+from db_tasks import TkTaskRunner
+from write_queue import execute_statement
+from candidate_bulk_update import BULK_UPDATE_FIELDS, FLAG_FIELDS, CANDIDATE_STATUSES, SCREENING_STATUSES, REJECTION_REASONS, BulkUpdateError, bulk_update_candidates
 
 # ==================================================================
 # SEARCH AND UPDATE MODULE
 # ==================================================================
 # This module provides the main interface for finding and managing existing candidates.
-# It consists of a primary search window (SearchApp) and a pop-up form for editing (EditWindow).
+# It consists of a primary search window (SearchApp), a pop-up form for editing (EditWindow),
+# and a form that applies the same changes to many candidates at once (BulkEditWindow).
+#
+# Searches run as background database tasks (see db_tasks.py) so a slow query never
+# freezes the window. With "Search as you type" on, keystrokes are debounced, and
+# each new search cancels the one still running, interrupting its query.
+
+SEARCH_DEBOUNCE_MS = 250    # Quiet time after the last keystroke before searching.
+SEARCH_MIN_CHARS = 2        # Shorter terms match too much to be useful while typing.
+
+def fetch_first_search_page(conn, match_query):
+    """Runs on a worker thread. Only the first page is fetched here; PagedTreeview fetches the rest as the user scrolls."""
+    if match_query is None:
+        return [], [], False
+    return fetch_page(conn, SEARCH_QUERY, (match_query,), SEARCH_ORDER)
+
 class SearchApp(tk.Toplevel):
     def __init__(self, parent):
         super().__init__(parent)
@@ -16,7 +38,9 @@ class SearchApp(tk.Toplevel):
         self.geometry("950x600")
         self.transient(parent)
         self.grab_set()
+        self.debounce_id = None
         self.create_search_widgets()
+        self.tasks = TkTaskRunner(self, self.status_var)
         center_window(self, parent)
 
     def create_search_widgets(self):
@@ -33,6 +57,11 @@ class SearchApp(tk.Toplevel):
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
         self.search_entry.bind("<Return>", self.search_candidates)
         ttk.Button(search_frame, text="Search", command=self.search_candidates).pack(side=tk.LEFT, padx=(10, 0))
+        self.incremental_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(search_frame, text="Search as you type", variable=self.incremental_var).pack(side=tk.LEFT, padx=(10, 0))
+        self.search_var.trace_add('write', self.on_search_typed)
+        self.status_var = tk.StringVar()
+        ttk.Label(main_frame, textvariable=self.status_var, foreground="gray").pack(anchor=tk.W)
         
         # --- Results Table ---
         results_frame = ttk.Frame(main_frame)
@@ -43,7 +72,7 @@ class SearchApp(tk.Toplevel):
         for col in columns:
             self.results_tree.heading(col, text=col.replace('_', ' ').title())
         v_scroll = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.results_tree.yview)
-        self.results_tree.configure(yscroll=v_scroll.set)
+        self.results_pager = PagedTreeview(self.results_tree, v_scroll, self.tasks, empty_values=("No candidates found.", "", "", "", ""))
         h_scroll = ttk.Scrollbar(results_frame, orient=tk.HORIZONTAL, command=self.results_tree.xview)
         self.results_tree.configure(xscroll=h_scroll.set)
         v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
@@ -56,31 +85,66 @@ class SearchApp(tk.Toplevel):
         action_frame.pack(fill=tk.X, pady=10)
         ttk.Button(action_frame, text="Edit Selected", command=self.open_edit_window).pack(side=tk.LEFT, expand=True, padx=5)
         ttk.Button(action_frame, text="Delete Selected", command=self.delete_candidate).pack(side=tk.LEFT, expand=True, padx=5)
+        ttk.Button(action_frame, text="Bulk Edit...", command=self.open_bulk_edit_window).pack(side=tk.LEFT, expand=True, padx=5)
         ttk.Button(action_frame, text="Bulk Update Orientation Letter", command=self.bulk_update_orientation_letter).pack(side=tk.LEFT, expand=True, padx=5)
 
     def search_candidates(self, event=None):
-        """Performs a database search based on the user's input and populates the results table."""
+        """Searches right away for the current term (Search button, <Return>, and refreshes after edits)."""
+        self.cancel_debounce()
         search_term = self.search_var.get().strip()
         if not search_term:
             messagebox.showwarning("Search Error", "Please enter a search term.", parent=self)
             return
-        for item in self.results_tree.get_children():
-            self.results_tree.delete(item)
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            query = "SELECT candidate_id, last_name, first_name, phone_number, pn_number, euid FROM Candidates WHERE first_name LIKE ? OR last_name LIKE ? OR pn_number LIKE ? OR euid LIKE ? OR phone_number LIKE ? ORDER BY last_name, first_name;"
-            like_term = f"%{search_term}%"
-            cursor.execute(query, (like_term, like_term, like_term, like_term, like_term))
-            results = cursor.fetchall()
-            conn.close()
-            if not results:
-                self.results_tree.insert('', tk.END, values=("No candidates found.", "", "", "", ""))
-            else:
-                for row in results:
-                    self.results_tree.insert('', tk.END, iid=row[0], values=(row[1], row[2], (row[3] or 'N/A'), (row[4] or 'N/A'), (row[5] or 'N/A')))
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Search failed: {e}", parent=self)
+        self.start_search(search_term, explicit=True)
+
+    def on_search_typed(self, *args):
+        """Restarts the debounce timer on every change to the search box."""
+        if not self.incremental_var.get():
+            return
+        self.cancel_debounce()
+        self.debounce_id = self.after(SEARCH_DEBOUNCE_MS, self.run_incremental_search)
+
+    def run_incremental_search(self):
+        """Searches for the term once typing has paused. Too-short terms just clear the results."""
+        self.debounce_id = None
+        search_term = self.search_var.get().strip()
+        if len(search_term) < SEARCH_MIN_CHARS:
+            self.tasks.cancel("search")
+            self.results_pager.clear()
+            self.status_var.set("")
+            return
+        self.start_search(search_term, explicit=False)
+
+    def cancel_debounce(self):
+        if self.debounce_id is not None:
+            self.after_cancel(self.debounce_id)
+            self.debounce_id = None
+
+    def start_search(self, search_term, explicit):
+        """Starts a background search; any search still running is now stale and gets cancelled."""
+        match_query = build_match_query(search_term)
+        self.tasks.run("search", fetch_first_search_page, match_query, message="Searching...",
+                       on_done=lambda first_page: self.show_search_results(match_query, first_page),
+                       on_error=lambda error: self.show_search_error(error, explicit))
+
+    def show_search_results(self, match_query, first_page):
+        """Shows the first page of a finished search."""
+        shown, has_more = self.results_pager.load(SEARCH_QUERY, (match_query,), SEARCH_ORDER, first_page=first_page,
+                                                  row_to_values=lambda row: (row[1], row[2], (row[3] or 'N/A'), (row[4] or 'N/A'), (row[5] or 'N/A')),
+                                                  row_to_iid=lambda row: row[0])
+        self.status_var.set(f"More than {shown} candidates found. Scroll down for more." if has_more else f"{shown} candidate(s) found.")
+
+    def show_search_error(self, error, explicit):
+        """Clears the results of a failed search. Only searches the user asked for get a message box."""
+        self.results_pager.clear()
+        self.status_var.set("Search failed.")
+        if explicit:
+            messagebox.showerror("Database Error", f"Search failed: {error}", parent=self)
+
+    def destroy(self):
+        """Stops the debounce timer before the window goes away; its tasks are cancelled on <Destroy>."""
+        self.cancel_debounce()
+        super().destroy()
 
     def get_selected_candidate_id(self):
         """Helper function to get the ID of the currently selected candidate in the results tree."""
@@ -96,6 +160,12 @@ class SearchApp(tk.Toplevel):
         if candidate_id:
             EditWindow(self, candidate_id)
 
+    def open_bulk_edit_window(self):
+        """Opens the BulkEditWindow for the selected candidates (Ctrl/Shift-click to pick several)."""
+        # Skip the "No candidates found." row, the only item whose id is not a candidate_id.
+        candidate_ids = [iid for iid in self.results_tree.selection() if iid.isdigit()]
+        BulkEditWindow(self, candidate_ids)
+
     def delete_candidate(self):
         """Deletes the selected candidate and all related records after confirmation."""
         candidate_id = self.get_selected_candidate_id()
@@ -104,33 +174,21 @@ class SearchApp(tk.Toplevel):
         item_values = self.results_tree.item(candidate_id, 'values')
         candidate_name = f"{item_values[1]} {item_values[0]}"
         if messagebox.askyesno("Confirm Deletion", f"WARNING: This will permanently delete '{candidate_name}' and all related records (interviews) from the database.\n\nThis action CANNOT be undone.\n\nAre you absolutely sure you want to proceed?", icon='warning', parent=self):
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                # Because of "ON DELETE CASCADE", deleting the candidate will also delete their links in Candidate_Interviewers.
-                cursor.execute("DELETE FROM Candidates WHERE candidate_id = ?;", (candidate_id,))
-                conn.commit()
-                conn.close()
+            def on_deleted(rowcount):
                 messagebox.showinfo("Success", f"'{candidate_name}' has been permanently deleted.", parent=self)
                 self.search_candidates()
-            except sqlite3.Error as e:
-                messagebox.showerror("Database Error", f"Failed to delete candidate: {e}", parent=self)
+            # Because of "ON DELETE CASCADE", deleting the candidate will also delete their links in Candidate_Interviewers.
+            self.tasks.run(f"delete {candidate_id}", execute_statement, "DELETE FROM Candidates WHERE candidate_id = ?;", (candidate_id,),
+                           on_done=on_deleted, error_message="Failed to delete candidate", message="Deleting...", interruptible=False)
 
     def bulk_update_orientation_letter(self):
         """Updates the 'orientation_letter_sent' flag for all fully cleared candidates starting next week."""
         if not messagebox.askyesno("Confirm Bulk Update", "This will mark 'Orientation Letter Sent' for ALL fully cleared candidates starting next week.\n\nAre you sure you want to proceed?", parent=self):
             return
-        sql = """UPDATE Candidates SET orientation_letter_sent = 1 WHERE candidate_id IN (SELECT c.candidate_id FROM Candidates c JOIN Hiring_Classes hc ON c.fk_class_id = hc.class_id WHERE hc.class_date BETWEEN date('now', 'weekday 1') AND date('now', 'weekday 1', '+6 days') AND c.bg_ds_clear = 1 AND c.pre_board_complete = 1 AND c.myinfo_ready = 1 AND c.pn_number IS NOT NULL AND c.pn_number != '' AND c.euid IS NOT NULL AND c.euid != '');"""
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql)
-            updated_count = cursor.rowcount
-            conn.commit()
-            conn.close()
+        def on_updated(updated_count):
             messagebox.showinfo("Success", f"'Orientation Letter Sent' status was successfully updated for {updated_count} candidate(s).", parent=self)
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Bulk update failed: {e}", parent=self)
+        self.tasks.run("orientation letters", execute_statement, ORIENTATION_LETTER_UPDATE,
+                       on_done=on_updated, error_message="Bulk update failed", message="Saving...", interruptible=False)
 
 # ==================================================================
 # EDIT CANDIDATE WINDOW
@@ -164,6 +222,7 @@ class EditWindow(tk.Toplevel):
         self.job_detail_var = tk.StringVar()
         self.job_details_map = {}
         
+        self.tasks = TkTaskRunner(self)
         self.create_edit_widgets()
         self.load_candidate_data()
         center_window(self, parent)
@@ -199,13 +258,13 @@ class EditWindow(tk.Toplevel):
         row_counter += 1
 
         ttk.Label(main_frame, text="Candidate Status:").grid(row=row_counter, column=0, sticky=tk.W, pady=5)
-        ttk.Combobox(main_frame, textvariable=self.status_var, values=['Pending', 'Hired', 'Rejected', 'On Hold'], state="readonly").grid(row=row_counter, column=1, sticky=tk.EW, pady=5)
+        ttk.Combobox(main_frame, textvariable=self.status_var, values=CANDIDATE_STATUSES, state="readonly").grid(row=row_counter, column=1, sticky=tk.EW, pady=5)
         row_counter += 1
         ttk.Label(main_frame, text="Screening Status:").grid(row=row_counter, column=0, sticky=tk.W, pady=5)
-        ttk.Combobox(main_frame, textvariable=self.screen_status_var, values=['', 'BG', 'DS', 'elink', 'DS/BG']).grid(row=row_counter, column=1, sticky=tk.EW, pady=5)
+        ttk.Combobox(main_frame, textvariable=self.screen_status_var, values=SCREENING_STATUSES).grid(row=row_counter, column=1, sticky=tk.EW, pady=5)
         row_counter += 1
         ttk.Label(main_frame, text="Rejection Reason:").grid(row=row_counter, column=0, sticky=tk.W, pady=5)
-        ttk.Combobox(main_frame, textvariable=self.reject_reason_var, values=['', 'DS', 'BG', 'NCNS', 'elink', 'Other']).grid(row=row_counter, column=1, sticky=tk.EW, pady=5)
+        ttk.Combobox(main_frame, textvariable=self.reject_reason_var, values=REJECTION_REASONS).grid(row=row_counter, column=1, sticky=tk.EW, pady=5)
         row_counter += 1
         ttk.Label(main_frame, text="PN Number:").grid(row=row_counter, column=0, sticky=tk.W, pady=5)
         ttk.Entry(main_frame, textvariable=self.pn_var).grid(row=row_counter, column=1, sticky=tk.EW, pady=5)
@@ -231,13 +290,7 @@ class EditWindow(tk.Toplevel):
         self.job_detail_combobox.set('')
         self.job_detail_combobox['state'] = 'readonly'
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            query = "SELECT shift, employment_type, pay_structure, job_id FROM Jobs WHERE department = ? ORDER BY shift;"
-            cursor.execute(query, (selected_dept,))
-            job_details_data = cursor.fetchall()
-            conn.close()
-            self.job_details_map = {f"{row[0] or 'N/A'} | {row[1]} | {row[2]}": row[3] for row in job_details_data}
+            self.job_details_map = REFERENCE_DATA.get().get_job_details(selected_dept)
             self.job_detail_combobox['values'] = list(self.job_details_map.keys())
         except Exception as e:
             messagebox.showerror("Database Error", f"Failed to load job details: {e}", parent=self)
@@ -245,43 +298,42 @@ class EditWindow(tk.Toplevel):
     def load_candidate_data(self):
         """Fetches all data for the selected candidate and populates the form fields."""
         try:
-            conn = get_db_connection()
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT DISTINCT department FROM Jobs ORDER BY department;")
-            self.department_combobox['values'] = [row['department'] for row in cursor.fetchall()]
-            cursor.execute("SELECT strftime('%Y-%m-%d', class_date), class_id FROM Hiring_Classes ORDER BY class_date DESC;")
-            self.classes_map = {date_str: class_id for date_str, class_id in cursor.fetchall()}
+            # The dropdowns come from the shared reference-data cache, so the candidate
+            # row is the only query here.
+            reference = REFERENCE_DATA.get()
+            self.department_combobox['values'] = reference.departments
+            self.classes_map = reference.classes_map
             self.class_combobox['values'] = list(self.classes_map.keys())
-            
-            query = "SELECT c.*, j.department, j.shift, j.employment_type, j.pay_structure, hc.class_date FROM Candidates c LEFT JOIN Jobs j ON c.fk_job_id = j.job_id LEFT JOIN Hiring_Classes hc ON c.fk_class_id = hc.class_id WHERE c.candidate_id = ?;"
-            cursor.execute(query, (self.candidate_id,))
-            data = cursor.fetchone()
-            conn.close()
-            
-            if data:
-                self.name_label.config(text=f"Editing Candidate: {data['first_name']} {data['last_name']}")
-                self.job_label.config(text=f"Current Job: {data['department'] or 'N/A'} | {data['shift'] or 'N/A'}")
+
+            with db_session() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                query = "SELECT c.*, j.department, j.shift, j.employment_type, j.pay_structure, hc.class_date FROM Candidates c LEFT JOIN Jobs j ON c.fk_job_id = j.job_id LEFT JOIN Hiring_Classes hc ON c.fk_class_id = hc.class_id WHERE c.candidate_id = ?;"
+                cursor.execute(query, (self.candidate_id,))
+                data = cursor.fetchone()
+
+                if data:
+                    self.name_label.config(text=f"Editing Candidate: {data['first_name']} {data['last_name']}")
+                    self.job_label.config(text=f"Current Job: {data['department'] or 'N/A'} | {data['shift'] or 'N/A'}")
                 
-                if data['department']:
-                    self.department_var.set(data['department'])
-                    self.on_department_select(None)
-                    current_job_text = f"{data['shift'] or 'N/A'} | {data['employment_type']} | {data['pay_structure']}"
-                    self.job_detail_var.set(current_job_text)
-
-                if data['class_date']:
-                    self.class_var.set(data['class_date'])
-                self.status_var.set(data['candidate_status'] or '')
-                self.screen_status_var.set(data['screening_status'] or '')
-                self.reject_reason_var.set(data['rejection_reason'] or '')
-                self.bg_clear_var.set(bool(data['bg_ds_clear']))
-                self.preboard_var.set(bool(data['pre_board_complete']))
-                self.myinfo_var.set(bool(data['myinfo_ready']))
-                self.letter_sent_var.set(bool(data['orientation_letter_sent']))
-                self.pn_var.set(data['pn_number'] or '')
-                self.euid_var.set(data['euid'] or '')
-                self.notes_var.set(data['notes'] or '')
+                    if data['department']:
+                        self.department_var.set(data['department'])
+                        self.on_department_select(None)
+                        current_job_text = f"{data['shift'] or 'N/A'} | {data['employment_type']} | {data['pay_structure']}"
+                        self.job_detail_var.set(current_job_text)
+
+                    if data['class_date']:
+                        self.class_var.set(data['class_date'])
+                    self.status_var.set(data['candidate_status'] or '')
+                    self.screen_status_var.set(data['screening_status'] or '')
+                    self.reject_reason_var.set(data['rejection_reason'] or '')
+                    self.bg_clear_var.set(bool(data['bg_ds_clear']))
+                    self.preboard_var.set(bool(data['pre_board_complete']))
+                    self.myinfo_var.set(bool(data['myinfo_ready']))
+                    self.letter_sent_var.set(bool(data['orientation_letter_sent']))
+                    self.pn_var.set(data['pn_number'] or '')
+                    self.euid_var.set(data['euid'] or '')
+                    self.notes_var.set(data['notes'] or '')
         except sqlite3.Error as e:
             messagebox.showerror("Load Error", f"Could not load candidate data: {e}", parent=self)
             self.destroy()
@@ -298,16 +350,124 @@ class EditWindow(tk.Toplevel):
             self.euid_var.get().strip() or None, self.notes_var.get().strip(), 
             new_fk_class_id, new_fk_job_id, self.candidate_id
         )
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql, data)
-            conn.commit()
-            conn.close()
+        if self.tasks.is_running("save"):
+            return
+        def on_saved(rowcount):
             messagebox.showinfo("Success", "Candidate details updated successfully.", parent=self)
             # This is a key part of the interaction: it tells the parent SearchApp to refresh its results.
             if hasattr(self.master, 'search_candidates'):
                 self.master.search_candidates()
             self.destroy()
-        except sqlite3.Error as e:
+        def on_error(e):
             messagebox.showerror("Save Error", f"Could not save changes: {e}", parent=self)
+        self.tasks.run("save", execute_statement, sql, data, on_done=on_saved, on_error=on_error, message="Saving...", interruptible=False)
+
+# ==================================================================
+# BULK EDIT WINDOW
+# ==================================================================
+# Applies the ticked field changes to the candidates selected in the search results,
+# or to everyone in a hiring class, in a single transaction (see candidate_bulk_update.py).
+class BulkEditWindow(tk.Toplevel):
+    def __init__(self, parent, candidate_ids):
+        super().__init__(parent)
+        self.withdraw()
+        self.candidate_ids = candidate_ids
+        self.title("Bulk Edit Candidates")
+        self.geometry("520x520")
+        self.transient(parent)
+        self.grab_set()
+        self.tasks = TkTaskRunner(self)
+        self.classes_map = REFERENCE_DATA.get().classes_map
+        self.scope_var = tk.StringVar(value="selected" if candidate_ids else "class")
+        self.scope_class_var = tk.StringVar()
+        # column -> (BooleanVar "change this field", StringVar new value)
+        self.field_vars = {column: (tk.BooleanVar(), tk.StringVar()) for column in BULK_UPDATE_FIELDS}
+        self.create_bulk_widgets()
+        center_window(self, parent)
+
+    def create_bulk_widgets(self):
+        """Builds the scope choice and one "change" checkbox plus value box per field."""
+        main_frame = ttk.Frame(self, padding="20")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        main_frame.columnconfigure(1, weight=1)
+
+        scope_frame = ttk.LabelFrame(main_frame, text="Apply To", padding="10")
+        scope_frame.grid(row=0, column=0, columnspan=2, sticky=tk.EW, pady=(0, 15))
+        selected_radio = ttk.Radiobutton(scope_frame, text=f"Selected candidates ({len(self.candidate_ids)})", variable=self.scope_var, value="selected")
+        selected_radio.grid(row=0, column=0, columnspan=2, sticky=tk.W)
+        if not self.candidate_ids:
+            selected_radio['state'] = 'disabled'
+        ttk.Radiobutton(scope_frame, text="Everyone in hiring class:", variable=self.scope_var, value="class").grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        ttk.Combobox(scope_frame, textvariable=self.scope_class_var, values=list(self.classes_map.keys()), state="readonly", width=14).grid(row=1, column=1, sticky=tk.W, padx=(10, 0), pady=(5, 0))
+
+        ttk.Label(main_frame, text="Tick each field to change:", foreground="gray").grid(row=1, column=0, columnspan=2, sticky=tk.W)
+        choices = {'candidate_status': CANDIDATE_STATUSES, 'screening_status': SCREENING_STATUSES,
+                   'rejection_reason': REJECTION_REASONS, 'fk_class_id': list(self.classes_map.keys())}
+        for row_counter, (column, label) in enumerate(BULK_UPDATE_FIELDS.items(), start=2):
+            change_var, value_var = self.field_vars[column]
+            ttk.Checkbutton(main_frame, text=label, variable=change_var).grid(row=row_counter, column=0, sticky=tk.W, pady=5)
+            values = ['Yes', 'No'] if column in FLAG_FIELDS else choices[column]
+            ttk.Combobox(main_frame, textvariable=value_var, values=values, state="readonly").grid(row=row_counter, column=1, sticky=tk.EW, pady=5)
+            # Picking a value ticks the field, which is nearly always what was meant.
+            value_var.trace_add('write', lambda *args, change_var=change_var: change_var.set(True))
+
+        self.apply_button = ttk.Button(main_frame, text="Apply Changes", command=self.apply_changes)
+        self.apply_button.grid(row=len(BULK_UPDATE_FIELDS) + 2, column=0, columnspan=2, pady=20)
+
+    def get_changes(self):
+        """Returns {column: value} for the ticked fields, or None after warning about a missing value."""
+        changes = {}
+        for column, (change_var, value_var) in self.field_vars.items():
+            if not change_var.get():
+                continue
+            value = value_var.get()
+            if column in FLAG_FIELDS:
+                if not value:
+                    messagebox.showwarning("Input Error", f"Please choose Yes or No for '{BULK_UPDATE_FIELDS[column]}'.", parent=self)
+                    return None
+                value = value == 'Yes'
+            elif column == 'fk_class_id':
+                if not value:
+                    messagebox.showwarning("Input Error", "Please choose the hiring class to move the candidates to.", parent=self)
+                    return None
+                value = self.classes_map[value]
+            changes[column] = value
+        return changes
+
+    def apply_changes(self):
+        """Confirms, then runs the bulk update on a background thread."""
+        changes = self.get_changes()
+        if changes is None:
+            return
+        if not changes:
+            messagebox.showwarning("Input Error", "Please tick at least one field to change.", parent=self)
+            return
+        if self.scope_var.get() == "selected":
+            selection = {'candidate_ids': self.candidate_ids}
+            description = f"the {len(self.candidate_ids)} selected candidate(s)"
+        else:
+            class_date = self.scope_class_var.get()
+            if not class_date:
+                messagebox.showwarning("Input Error", "Please choose a hiring class.", parent=self)
+                return
+            selection = {'class_id': self.classes_map[class_date]}
+            description = f"everyone in the {class_date} hiring class"
+        fields = ", ".join(BULK_UPDATE_FIELDS[column] for column in changes)
+        if not messagebox.askyesno("Confirm Bulk Update", f"This will change {fields} for {description}.\n\nAre you sure you want to proceed?", parent=self):
+            return
+        self.apply_button['state'] = 'disabled'
+        self.tasks.run("bulk update", lambda conn: bulk_update_candidates(conn, changes, **selection),
+                       on_done=self.on_applied, on_error=self.on_failed, message="Updating...",
+                       interruptible=False, grouped=False, errors=(sqlite3.Error, BulkUpdateError))
+
+    def on_applied(self, counts):
+        unchanged = counts['selected'] - counts['updated']
+        note = f"\n{unchanged} already had these values." if unchanged else ""
+        messagebox.showinfo("Success", f"{counts['updated']} of {counts['selected']} candidate(s) updated.{note}", parent=self)
+        if self.master.search_var.get().strip():
+            self.master.search_candidates()
+        self.destroy()
+
+    def on_failed(self, error):
+        self.apply_button['state'] = 'normal'
+        messagebox.showerror("Database Error", f"Bulk update failed: {error}", parent=self)
@@ -0,0 +1,111 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+# ==================================================================
+# START-UP PROFILING
+# ==================================================================
+# Measures how long the application takes to start, to keep the main menu quick to
+# appear as modules are added. main.pyw only imports a window's module when its
+# button is first pressed (see WINDOW_CLASSES), so anything imported at the top of
+# main.pyw, or by common.py and db_migrations.py, is paid for on every start.
+#
+#   python startup_profile.py imports [--top N] [--with-windows]
+#       Runs main.pyw's imports under "python -X importtime" and lists the slowest
+#       top-level imports. --with-windows also imports every window module, to show
+#       what is deferred until the buttons are pressed.
+#   python startup_profile.py startup [--runs N]
+#       Starts the application N times with --startup-benchmark and reports the
+#       time-to-first-window (needs a display).
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = os.path.join(APP_DIR, "main.pyw")
+IMPORTS_MARKER = "startup_profile: main.pyw imports"
+
+# Runs main.pyw without its __main__ block, so only the module-level imports happen.
+IMPORT_MAIN_CODE = f"""import pkgutil, runpy, sys  # run_path itself imports pkgutil
+sys.stderr.write({IMPORTS_MARKER!r} + "\\n")
+namespace = runpy.run_path({MAIN_SCRIPT!r}, run_name="startup_profile")
+"""
+IMPORT_WINDOWS_CODE = """import importlib
+for module_name, _ in namespace["WINDOW_CLASSES"].values():
+    try:
+        importlib.import_module(module_name)
+    except ImportError as e:
+        print(f"Could not import {module_name}: {e}")
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+FIRST_WINDOW_LINE = re.compile(r"time-to-first-window ([\d.]+)")
+
+def parse_importtime(stderr):
+    """Returns (module, self_us, cumulative_us) for each top-level import after the marker line."""
+    imports = []
+    lines = stderr.splitlines()
+    if IMPORTS_MARKER in lines:
+        lines = lines[lines.index(IMPORTS_MARKER) + 1:]
+    for line in lines:
+        match = IMPORTTIME_LINE.match(line)
+        # Nested imports are indented under the module that imported them.
+        if match and len(match.group(3)) == 1:
+            imports.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return imports
+
+def profile_imports(top=15, with_windows=False):
+    code = IMPORT_MAIN_CODE + (IMPORT_WINDOWS_CODE if with_windows else "")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=APP_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr[-2000:], file=sys.stderr)
+        return 1
+    if result.stdout:
+        print(result.stdout, end="")
+    imports = parse_importtime(result.stderr)
+    total_us = sum(cumulative for _, _, cumulative in imports)
+    print(f"{len(imports)} top-level imports, {total_us / 1000:.1f} ms in total")
+    print(f"{'cumulative ms':>13}  {'self ms':>8}  module")
+    for module, self_us, cumulative_us in sorted(imports, key=lambda item: item[2], reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:13.1f}  {self_us / 1000:8.1f}  {module}")
+    return 0
+
+def has_display():
+    if sys.platform in ("win32", "darwin"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+def benchmark_startup(runs=5):
+    """Starts main.pyw runs times. Reports the median time from launch to the main menu being drawn, and to the process exiting."""
+    if not has_display():
+        print("startup needs a display to open the main window (no DISPLAY is set).", file=sys.stderr)
+        return 1
+    wall_times, first_window_times = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, MAIN_SCRIPT, "--startup-benchmark", repr(time.time())], cwd=APP_DIR, capture_output=True, text=True)
+        wall_times.append(time.perf_counter() - started)
+        match = FIRST_WINDOW_LINE.search(result.stdout)
+        if result.returncode != 0 or not match:
+            print(f"main.pyw did not start cleanly:\n{result.stderr[-2000:]}", file=sys.stderr)
+            return 1
+        first_window_times.append(float(match.group(1)))
+    print(f"{runs} runs")
+    print(f"time-to-first-window:        median {statistics.median(first_window_times) * 1000:.1f} ms, worst {max(first_window_times) * 1000:.1f} ms")
+    print(f"wall clock (incl. shutdown): median {statistics.median(wall_times) * 1000:.1f} ms, worst {max(wall_times) * 1000:.1f} ms")
+    return 0
+
+def get_option(args, name, default):
+    if name in args:
+        return int(args[args.index(name) + 1])
+    return default
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    args = sys.argv[2:]
+    if command == "imports":
+        sys.exit(profile_imports(get_option(args, "--top", 15), "--with-windows" in args))
+    elif command == "startup":
+        sys.exit(benchmark_startup(get_option(args, "--runs", 5)))
+    else:
+        print("Usage: python startup_profile.py imports [--top N] [--with-windows] | startup [--runs N]")
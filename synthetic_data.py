@@ -0,0 +1,273 @@
+import argparse
+import datetime
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+from db_migrations import run_migrations
+from candidate_import import BULK_INSERT_TRIGGERS
+from candidate_search import FIRST_NAMES, SYLLABLES
+from candidate_bulk_update import SCREENING_STATUSES, REJECTION_REASONS
+
+# ==================================================================
+# SYNTHETIC DATA
+# ==================================================================
+# Builds a throw-away database, with the current schema, that looks like a real one
+# that has been in use for years, so queries can be timed at sizes the office copy has
+# not reached yet (see benchmark.py):
+#
+#   python synthetic_data.py bench.db --candidates 1000000 --years 5
+#
+# The data is skewed the way real hiring data is, since the query plans depend on it:
+# - a few departments, jobs, interviewers, referrers and surnames account for most
+#   candidates (Zipf-like weights);
+# - interviews grow year on year, peak before the holidays and stop on Sundays;
+# - a candidate's hiring class is one to three weeks after the interview, so classes
+#   in the past are mostly Hired/Rejected and the upcoming ones mostly Pending, with
+#   clearance flags that fill in as the class date gets closer;
+# - Daily_Metrics has a row for every working day, with breakdowns for a few reasons.
+# Dates are relative to today, so the dashboard and the "last week" reports have data.
+# The same --seed always produces the same database (for the same day).
+#
+# Rows are inserted with executemany. As in candidate_import.py, the Candidates insert
+# triggers are dropped for the load and their bookkeeping is done once at the end.
+
+SYNTHETIC_BATCH_SIZE = 20000
+FUTURE_CLASS_WEEKS = 8
+
+DEPARTMENTS = ["Grocery", "Perishables", "Freezer", "Produce", "Maintenance", "Sanitation", "Inventory Control", "Transportation"]
+SHIFTS = ["1st Shift", "2nd Shift", "3rd Shift", "Weekend"]
+EMPLOYMENT_TYPES = ["Full-Time", "Part-Time"]
+PAY_STRUCTURES = ["Hourly", "Incentive"]
+INTERVIEWER_COUNT = 40
+REFERRER_COUNT = 3000
+SURNAME_COUNT = 8000
+NOTES = ["Left voicemail", "Prefers nights", "Needs bus route", "Rehire - check term reason", "Waiting on DS result", "Requested weekend shift", "Bilingual"]
+
+# (status, weight) for candidates whose class has already started, and for the rest.
+PAST_STATUS_WEIGHTS = [('Hired', 50), ('Rejected', 40), ('On Hold', 6), ('Pending', 4)]
+UPCOMING_STATUS_WEIGHTS = [('Pending', 78), ('Rejected', 16), ('On Hold', 6)]
+
+# Applicant tracker breakdown category -> reasons (as in ApplicantTrackerApp).
+BREAKDOWN_REASONS = {
+    'pre_interview_rejection': ["Not eligible for Rehire", "Background", "Not a good Fit"],
+    'post_interview_rejection': ["Not eligible for Rehire", "Background", "Not a good Fit", "NCNS"],
+    'pre_interview_withdrawal': ["Schedule", "Other Job Offer", "Pay", "Other"],
+    'post_interview_withdrawal': ["Schedule", "Other Job Offer", "Pay", "Other"],
+}
+
+INSERT_JOB = "INSERT INTO Jobs (job_id, department, shift, employment_type, pay_structure) VALUES (?, ?, ?, ?, ?);"
+INSERT_INTERVIEWER = "INSERT INTO Interviewers (interviewer_id, interviewer_name) VALUES (?, ?);"
+INSERT_CLASS = "INSERT INTO Hiring_Classes (class_id, class_date) VALUES (?, ?);"
+INSERT_CANDIDATE = """INSERT INTO Candidates (candidate_id, first_name, last_name, phone_number, is_spanish_only, candidate_status, screening_status, rejection_reason, interview_date, bg_ds_clear, pre_board_complete, myinfo_ready, orientation_letter_sent, coc_number, pn_number, euid, rehire_date, original_term_date, referred_by, notes, fk_job_id, fk_class_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);"""
+INSERT_INTERVIEWER_LINK = "INSERT INTO Candidate_Interviewers (fk_candidate_id, fk_interviewer_id) VALUES (?, ?);"
+INSERT_METRICS = "INSERT INTO Daily_Metrics (metric_id, metric_date, apps_reviewed, interviews_scheduled, hires_confirmed) VALUES (?, ?, ?, ?, ?);"
+INSERT_BREAKDOWN = "INSERT INTO Daily_Breakdowns (fk_metric_id, category, reason, count) VALUES (?, ?, ?, ?);"
+
+def zipf_weights(count, exponent=1.1):
+    """Cumulative weights where item i is picked in proportion to 1 / (i + 1) ** exponent."""
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+def daily_weight(day, start):
+    """How busy interviewing is on a day: growing over the years, peaking in Oct-Nov, none on Sundays."""
+    if day.weekday() == 6:
+        return 0.0
+    growth = 1 + 0.15 * (day - start).days / 365
+    season = 1.4 if day.month in (10, 11) else 0.8 if day.month in (1, 12) else 1.0
+    return growth * season * (0.6 if day.weekday() == 5 else 1.0)
+
+class SyntheticDataGenerator:
+    """Produces the rows for each table from one seeded random generator."""
+    def __init__(self, candidates, years, seed=7, today=None):
+        self.rng = random.Random(seed)
+        self.candidate_count = candidates
+        self.today = today or datetime.date.today()
+        self.start = self.today - datetime.timedelta(days=round(365.25 * years))
+        self.days = [self.start + datetime.timedelta(days=offset) for offset in range((self.today - self.start).days)]
+        self.day_weights = list(itertools.accumulate(daily_weight(day, self.start) for day in self.days))
+
+        rng = self.rng
+        self.jobs = [(department, shift, employment_type, pay_structure)
+                     for department in DEPARTMENTS for shift in SHIFTS for employment_type in EMPLOYMENT_TYPES for pay_structure in PAY_STRUCTURES]
+        # Popular departments first, so the Zipf weights favour them.
+        self.job_weights = zipf_weights(len(self.jobs), 0.9)
+        self.interviewers = [f"{rng.choice(FIRST_NAMES)} {self.make_surname()}" for _ in range(INTERVIEWER_COUNT)]
+        self.interviewers = list(dict.fromkeys(self.interviewers))
+        self.interviewer_weights = zipf_weights(len(self.interviewers), 1.2)
+        self.surnames = list(dict.fromkeys(self.make_surname() for _ in range(SURNAME_COUNT)))
+        self.surname_weights = zipf_weights(len(self.surnames), 0.8)
+        self.referrers = list(dict.fromkeys(f"{rng.choice(FIRST_NAMES)} {self.make_surname()}" for _ in range(REFERRER_COUNT)))
+        self.referrer_weights = zipf_weights(len(self.referrers), 1.1)
+
+        # Weekly classes on Mondays, from before the first interview to FUTURE_CLASS_WEEKS ahead.
+        first_monday = self.start - datetime.timedelta(days=self.start.weekday())
+        week_count = (self.today - first_monday).days // 7 + FUTURE_CLASS_WEEKS + 1
+        self.class_dates = [first_monday + datetime.timedelta(weeks=week) for week in range(week_count)]
+        self.interviews_per_day = {}
+
+    def make_surname(self):
+        return "".join(self.rng.choice(SYLLABLES) for _ in range(self.rng.choice((2, 3, 3)))).title()
+
+    def class_for(self, interview_day):
+        """Returns (class_id, class_date) one to three weeks after the interview."""
+        week = (interview_day - self.class_dates[0]).days // 7 + self.rng.choice((1, 2, 2, 3))
+        week = min(week, len(self.class_dates) - 1)
+        return week + 1, self.class_dates[week]
+
+    def candidate_rows(self):
+        """Yields (candidate row, interviewer ids) for every candidate, in interview-date order."""
+        rng = self.rng
+        interview_days = sorted(rng.choices(self.days, cum_weights=self.day_weights, k=self.candidate_count))
+        for candidate_id, interview_day in enumerate(interview_days, start=1):
+            self.interviews_per_day[interview_day] = self.interviews_per_day.get(interview_day, 0) + 1
+            class_id, class_date = self.class_for(interview_day)
+            weights = PAST_STATUS_WEIGHTS if class_date <= self.today else UPCOMING_STATUS_WEIGHTS
+            status = rng.choices([status for status, _ in weights], [weight for _, weight in weights])[0]
+            rejection_reason = ''
+            if status == 'Rejected':
+                rejection_reason = rng.choice(REJECTION_REASONS[1:])
+                if rng.random() < 0.5:
+                    # Rejected before being placed in a class.
+                    class_id = None
+            if status == 'Hired':
+                flags = (1, 1, 1, 1)
+            else:
+                # Clearance fills in as the class gets closer.
+                progress = 0.9 if class_date <= self.today else max(0.1, 0.9 - (class_date - self.today).days / 60)
+                flags = tuple(int(rng.random() < progress) for _ in range(3))
+                flags += (int(all(flags) and rng.random() < 0.5),)
+            has_ids = status == 'Hired' or rng.random() < flags[0] * 0.8
+            is_rehire = rng.random() < 0.1
+            term_date = interview_day - datetime.timedelta(days=rng.randint(90, 1500)) if is_rehire else None
+            row = (
+                candidate_id,
+                rng.choice(FIRST_NAMES),
+                rng.choices(self.surnames, cum_weights=self.surname_weights)[0],
+                f"({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+                int(rng.random() < 0.08),
+                status,
+                rng.choice(SCREENING_STATUSES),
+                rejection_reason,
+                interview_day.isoformat(),
+                *flags,
+                f"COC{rng.randint(10000, 99999)}" if rng.random() < 0.3 else None,
+                str(rng.randint(10_000_000, 99_999_999)) if has_ids else None,
+                f"E{rng.randint(100_000, 999_999)}" if has_ids else None,
+                (term_date - datetime.timedelta(days=rng.randint(180, 2000))).isoformat() if is_rehire else None,
+                term_date.isoformat() if is_rehire else None,
+                rng.choices(self.referrers, cum_weights=self.referrer_weights)[0] if rng.random() < 0.35 else '',
+                rng.choice(NOTES) if rng.random() < 0.2 else None,
+                # A few candidates are still waiting for a job to be picked.
+                None if status == 'Pending' and rng.random() < 0.1 else rng.choices(range(1, len(self.jobs) + 1), cum_weights=self.job_weights)[0],
+                class_id,
+            )
+            interviewers = {rng.choices(range(1, len(self.interviewers) + 1), cum_weights=self.interviewer_weights)[0] for _ in range(rng.choice((1, 1, 2)))}
+            yield row, interviewers
+
+    def metrics_rows(self):
+        """Yields (Daily_Metrics row, breakdown rows) for every day. Run after candidate_rows."""
+        rng = self.rng
+        for metric_id, day in enumerate(self.days, start=1):
+            interviews = self.interviews_per_day.get(day, 0)
+            if day.weekday() == 6 and not interviews:
+                continue
+            apps = interviews * 3 + rng.randint(0, 10)
+            hires = round(interviews * rng.uniform(0.3, 0.6))
+            breakdowns = [(metric_id, category, reason, rng.randint(1, max(1, interviews // 10)))
+                          for category, reasons in BREAKDOWN_REASONS.items()
+                          for reason in rng.sample(reasons, rng.randint(0, len(reasons)))]
+            yield (metric_id, day.isoformat(), apps, interviews, hires), breakdowns
+
+def insert_in_batches(conn, sql, rows, batch_size=SYNTHETIC_BATCH_SIZE):
+    count = 0
+    for batch in iter(lambda: list(itertools.islice(rows, batch_size)), []):
+        conn.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+def generate_database(path, candidates=100_000, years=3, seed=7, progress=print):
+    """Creates a new database at path filled with synthetic data. Returns the row count per table."""
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists.")
+    generator = SyntheticDataGenerator(candidates, years, seed)
+    conn = sqlite3.connect(path)
+    try:
+        run_migrations(conn)
+        # Nothing else can be using a new file, so the load does not need to be crash-safe.
+        conn.execute("PRAGMA journal_mode = OFF;")
+        conn.execute("PRAGMA synchronous = OFF;")
+        conn.execute("BEGIN")
+        conn.executemany(INSERT_JOB, [(job_id, *job) for job_id, job in enumerate(generator.jobs, start=1)])
+        conn.executemany(INSERT_INTERVIEWER, list(enumerate(generator.interviewers, start=1)))
+        conn.executemany(INSERT_CLASS, [(class_id, class_date.isoformat()) for class_id, class_date in enumerate(generator.class_dates, start=1)])
+
+        bypassed = []
+        for name, statements in BULK_INSERT_TRIGGERS:
+            row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)).fetchone()
+            if row is not None:
+                conn.execute(f"DROP TRIGGER {name}")
+                bypassed.append((row[0], statements))
+        links = []
+        def candidates_with_progress():
+            started = time.perf_counter()
+            for row, interviewer_ids in generator.candidate_rows():
+                links.extend((row[0], interviewer_id) for interviewer_id in interviewer_ids)
+                if row[0] % 100_000 == 0:
+                    progress(f"  {row[0]:,} candidates ({time.perf_counter() - started:.0f}s)")
+                yield row
+        insert_in_batches(conn, INSERT_CANDIDATE, candidates_with_progress())
+        progress("Updating the search index, pipeline counts and change log...")
+        for trigger_sql, statements in bypassed:
+            for statement in statements:
+                conn.execute(statement, (1, candidates))
+            conn.execute(trigger_sql)
+        insert_in_batches(conn, INSERT_INTERVIEWER_LINK, iter(links))
+        links.clear()
+
+        breakdowns = []
+        def metrics_with_breakdowns():
+            for metrics, day_breakdowns in generator.metrics_rows():
+                breakdowns.extend(day_breakdowns)
+                yield metrics
+        insert_in_batches(conn, INSERT_METRICS, metrics_with_breakdowns())
+        insert_in_batches(conn, INSERT_BREAKDOWN, iter(breakdowns))
+        conn.commit()
+        conn.execute("PRAGMA journal_mode = WAL;")
+        return count_rows(conn)
+    except BaseException:
+        conn.close()
+        os.remove(path)
+        raise
+    finally:
+        conn.close()
+
+SYNTHETIC_TABLES = ("Candidates", "Jobs", "Interviewers", "Hiring_Classes", "Candidate_Interviewers", "Daily_Metrics", "Daily_Breakdowns")
+
+def count_rows(conn):
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0] for table in SYNTHETIC_TABLES}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Creates a database filled with synthetic, realistically skewed HR data.")
+    parser.add_argument("path", help="Database file to create (must not exist yet).")
+    parser.add_argument("--candidates", type=int, default=100_000, help="Number of candidates. Default: 100000.")
+    parser.add_argument("--years", type=float, default=3, help="Years of interviews and daily metrics, up to today. Default: 3.")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed. Default: 7.")
+    options = parser.parse_args(argv)
+    if options.candidates < 1 or options.years <= 0:
+        parser.error("--candidates and --years must be positive")
+    started = time.perf_counter()
+    print(f"Generating {options.candidates:,} candidates over {options.years:g} years into {options.path}...")
+    try:
+        counts = generate_database(options.path, options.candidates, options.years, options.seed)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Could not generate the database: {e}", file=sys.stderr)
+        return 1
+    for table, count in counts.items():
+        print(f"  {table:<24}{count:>12,}")
+    print(f"Done in {time.perf_counter() - started:.1f}s.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+import os
+import sys
+import pytest
+
+# The application is a set of flat modules in the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import common
+from db_migrations import run_migrations
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Points the shared connection pool at a fresh, fully migrated database file."""
+    path = str(tmp_path / "test.db")
+    common.DB_POOL.close_all()
+    monkeypatch.setattr(common.DB_POOL, "db_path", path)
+    run_migrations()
+    yield path
+    common.DB_POOL.close_all()
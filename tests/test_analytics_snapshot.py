@@ -0,0 +1,96 @@
+import random
+from types import SimpleNamespace
+import pytest
+import common
+from common import db_session
+from analytics_snapshot import ANALYTICS_SNAPSHOT, CandidateSnapshot
+from batch_reports import get_class_breakdown, get_department_counts, get_hires_by_department, get_referral_leaderboard
+from synthetic_data import generate_database
+
+HIRE_RANGES = [(None, None), ("2025-01-01", None), (None, "2025-06-30"), ("2025-03-01", "2025-03-31")]
+
+
+@pytest.fixture
+def candidates_db(tmp_path, monkeypatch):
+    """A migrated database with a few thousand synthetic candidates, used by the shared pool."""
+    path = str(tmp_path / "candidates.db")
+    generate_database(path, candidates=3000, years=2, progress=lambda message: None)
+    common.DB_POOL.close_all()
+    monkeypatch.setattr(common.DB_POOL, "db_path", path)
+    yield path
+    common.DB_POOL.close_all()
+
+
+def as_tuples(rows):
+    return [tuple(row) for row in rows]
+
+
+def assert_matches_sql(conn, snapshot):
+    # The shared snapshot is never loaded here, so the batch reports run their SQL.
+    assert ANALYTICS_SNAPSHOT.version is None
+    assert snapshot.referral_leaderboard() == as_tuples(get_referral_leaderboard(conn)[1])
+    for start, end in HIRE_RANGES:
+        assert snapshot.hires_by_department(start, end) == as_tuples(get_hires_by_department(conn, SimpleNamespace(start=start, end=end))[1])
+    assert snapshot.department_counts() == as_tuples(get_department_counts(conn)[1])
+    assert snapshot.class_breakdown() == as_tuples(get_class_breakdown(conn)[1])
+    candidate_ids = [row[0] for row in conn.execute("SELECT candidate_id FROM Candidates ORDER BY candidate_id;")]
+    assert list(snapshot.candidate_ids) == candidate_ids
+
+
+def make_random_changes(conn, rng, count=200):
+    """Edits, deletes and inserts candidates the way the windows and the importer do."""
+    candidate_ids = [row[0] for row in conn.execute("SELECT candidate_id FROM Candidates;")]
+    job_ids = [row[0] for row in conn.execute("SELECT job_id FROM Jobs;")]
+    class_ids = [row[0] for row in conn.execute("SELECT class_id FROM Hiring_Classes;")]
+    for candidate_id in rng.sample(candidate_ids, count):
+        change = rng.choice(["status", "job", "class", "referrer", "interview_date", "cleared", "delete"])
+        if change == "status":
+            conn.execute("UPDATE Candidates SET candidate_status = ? WHERE candidate_id = ?;", (rng.choice(["Pending", "Hired", "Rejected", "On Hold"]), candidate_id))
+        elif change == "job":
+            conn.execute("UPDATE Candidates SET fk_job_id = ? WHERE candidate_id = ?;", (rng.choice(job_ids + [None]), candidate_id))
+        elif change == "class":
+            conn.execute("UPDATE Candidates SET fk_class_id = ? WHERE candidate_id = ?;", (rng.choice(class_ids + [None]), candidate_id))
+        elif change == "referrer":
+            conn.execute("UPDATE Candidates SET referred_by = ? WHERE candidate_id = ?;", (rng.choice(["", None, "New Referrer", "Another One"]), candidate_id))
+        elif change == "interview_date":
+            conn.execute("UPDATE Candidates SET interview_date = ? WHERE candidate_id = ?;", (f"2025-03-{rng.randint(1, 31):02d}", candidate_id))
+        elif change == "cleared":
+            conn.execute("UPDATE Candidates SET bg_ds_clear = 1, pre_board_complete = 1, myinfo_ready = 1, screening_status = 'DS/BG', pn_number = 'PN', euid = 'E' WHERE candidate_id = ?;", (candidate_id,))
+        else:
+            conn.execute("DELETE FROM Candidate_Interviewers WHERE fk_candidate_id = ?;", (candidate_id,))
+            conn.execute("DELETE FROM Candidates WHERE candidate_id = ?;", (candidate_id,))
+    for i in range(count // 4):
+        conn.execute("INSERT INTO Candidates (first_name, last_name, candidate_status, interview_date, referred_by, fk_job_id, fk_class_id) VALUES (?, ?, ?, ?, ?, ?, ?);",
+                     (f"New{i}", "Candidate", rng.choice(["Pending", "Hired"]), "2025-03-15", rng.choice(["", "Brand New Referrer"]), rng.choice(job_ids), rng.choice(class_ids)))
+    # A department nobody was in before.
+    conn.execute("UPDATE Jobs SET department = 'Renamed' WHERE job_id = ?;", (job_ids[0],))
+
+
+def test_loaded_snapshot_matches_sql(candidates_db):
+    with db_session() as conn:
+        snapshot = CandidateSnapshot().refresh(conn)
+        assert len(snapshot) == 3000
+        assert_matches_sql(conn, snapshot)
+
+
+@pytest.mark.parametrize("reload_limit", [10_000, 50])
+def test_refresh_after_changes_matches_sql(candidates_db, reload_limit):
+    rng = random.Random(reload_limit)
+    with db_session() as conn:
+        snapshot = CandidateSnapshot(reload_limit=reload_limit).refresh(conn)
+    for _ in range(3):
+        with db_session() as conn:
+            make_random_changes(conn, rng)
+        with db_session() as conn:
+            version = snapshot.version
+            snapshot.refresh(conn)
+            assert snapshot.version > version
+            assert_matches_sql(conn, snapshot)
+
+
+def test_refresh_without_changes_keeps_the_snapshot(candidates_db):
+    with db_session() as conn:
+        snapshot = CandidateSnapshot().refresh(conn)
+        candidate_ids, version = snapshot.candidate_ids, snapshot.version
+        snapshot.refresh(conn)
+    assert snapshot.candidate_ids is candidate_ids and snapshot.version == version
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import sqlite3
+from http import HTTPStatus
+import pytest
+import api_server
+from api_server import API_MAX_COUNT, ApiServer, HttpError, Request, decode_cursor, encode_cursor, parse_day
+
+
+@pytest.fixture
+def server(db_path):
+    server = ApiServer(db_path)
+    yield server
+    server.close()
+
+
+def call(server, method, target, body=None):
+    request = Request(method, target, "HTTP/1.1", {}, json.dumps(body).encode() if body is not None else b"")
+    status, headers, body = asyncio.run(server.respond(request))
+    return status, json.loads(body) if body else None
+
+
+def test_parse_day_bounds_the_counts():
+    assert parse_day({"date": "2025-03-03", "apps_reviewed": API_MAX_COUNT})[2] == [API_MAX_COUNT, 0, 0]
+    for day in ({"date": "2025-03-03", "apps_reviewed": API_MAX_COUNT + 1},
+                {"date": "2025-03-03", "breakdowns": [{"category": "pre_interview_rejection", "reason": "Pay", "count": 10 ** 30}]},
+                {"date": "2025-03-03", "hires_confirmed": -1},
+                {"date": "2025-03-03", "hires_confirmed": 1.5}):
+        with pytest.raises(HttpError):
+            parse_day(day)
+
+
+@pytest.mark.parametrize("key", [[{}, 2, 3, 4], [[1], 2, 3, 4], [1, 2, 3], "abcd"])
+def test_decode_cursor_refuses_other_keys(key):
+    with pytest.raises(HttpError) as error:
+        decode_cursor(encode_cursor(key), ("a", "b", "c", "d"))
+    assert error.value.status == HTTPStatus.BAD_REQUEST
+
+
+def test_decode_cursor_round_trip():
+    key = ["Garcia", 2.5, None, 7]
+    assert decode_cursor(encode_cursor(key), ("a", "b", "c", "d")) == key
+
+
+def test_huge_count_is_a_bad_request(server):
+    status, body = call(server, "POST", "/api/metrics", {"date": "2025-03-03", "apps_reviewed": 10 ** 30})
+    assert status == HTTPStatus.BAD_REQUEST and "counts" in body["error"]
+
+
+def test_save_and_read_metrics(server):
+    status, body = call(server, "POST", "/api/metrics", {"date": "2025-03-03", "apps_reviewed": 12})
+    assert status == HTTPStatus.OK and body["apps_reviewed"] == 12
+    status, body = call(server, "GET", "/api/metrics?date=2025-03-03")
+    assert status == HTTPStatus.OK and body["apps_reviewed"] == 12
+
+
+@pytest.mark.parametrize("error, expected", [
+    (sqlite3.OperationalError("database is locked"), HTTPStatus.SERVICE_UNAVAILABLE),
+    (sqlite3.OperationalError("no such table: Daily_Metrics"), HTTPStatus.INTERNAL_SERVER_ERROR),
+    (sqlite3.IntegrityError("NOT NULL constraint failed"), HTTPStatus.INTERNAL_SERVER_ERROR),
+    (OverflowError("Python int too large to convert to SQLite INTEGER"), HTTPStatus.INTERNAL_SERVER_ERROR),
+])
+def test_errors_are_answered(server, monkeypatch, capsys, error, expected):
+    def fail(conn, *args):
+        raise error
+    monkeypatch.setattr(api_server, "get_daily_metrics", fail)
+    status, body = call(server, "GET", "/api/metrics?date=2025-03-03")
+    assert status == expected and "error" in body
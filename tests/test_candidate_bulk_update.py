@@ -0,0 +1,53 @@
+import pytest
+from common import db_session
+from candidate_bulk_update import BulkUpdateError, bulk_update_candidates
+from pipeline_stats import check_pipeline_stats
+from reference_data import REFERENCE_DATA
+
+
+@pytest.fixture
+def candidates(db_path):
+    with db_session() as conn:
+        conn.execute("INSERT INTO Hiring_Classes (class_id, class_date) VALUES (1, '2025-03-10');")
+        conn.executemany("INSERT INTO Candidates (candidate_id, first_name, last_name, candidate_status, fk_class_id, bg_ds_clear) VALUES (?, ?, ?, 'Pending', ?, ?);",
+                         [(1, "Maria", "Garcia", 1, 0), (2, "James", "Wilson", 1, 1), (3, "Ana", "Lopez", None, 0)])
+    yield
+
+
+def flags(conn):
+    return conn.execute("SELECT candidate_id, bg_ds_clear, candidate_status FROM Candidates ORDER BY candidate_id;").fetchall()
+
+
+def test_update_a_class_leaves_unchanged_rows_alone(candidates):
+    with db_session() as conn:
+        result = bulk_update_candidates(conn, {"bg_ds_clear": True}, class_id=1)
+        assert result == {"selected": 2, "updated": 1}
+        assert flags(conn) == [(1, 1, "Pending"), (2, 1, "Pending"), (3, 0, "Pending")]
+
+
+def test_update_selected_ids(candidates):
+    with db_session() as conn:
+        result = bulk_update_candidates(conn, {"candidate_status": "Hired", "bg_ds_clear": 1}, candidate_ids=["1", 3])
+        assert result == {"selected": 2, "updated": 2}
+        assert flags(conn) == [(1, 1, "Hired"), (2, 1, "Pending"), (3, 1, "Hired")]
+        assert check_pipeline_stats(conn) == []
+
+
+def test_update_after_a_nested_session_on_the_same_connection(candidates):
+    REFERENCE_DATA.invalidate()
+    with db_session() as conn:
+        # Reloading the cache runs a nested db_session, which leaves a transaction open.
+        REFERENCE_DATA.get()
+        assert bulk_update_candidates(conn, {"bg_ds_clear": 1}, candidate_ids=[3]) == {"selected": 1, "updated": 1}
+    REFERENCE_DATA.invalidate()
+
+
+@pytest.mark.parametrize("changes, selection", [
+    ({"bg_ds_clear": 1}, {}),
+    ({}, {"class_id": 1}),
+    ({"first_name": "X"}, {"class_id": 1}),
+])
+def test_bad_requests_are_refused(candidates, changes, selection):
+    with db_session() as conn:
+        with pytest.raises(BulkUpdateError):
+            bulk_update_candidates(conn, changes, **selection)
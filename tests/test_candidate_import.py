@@ -0,0 +1,84 @@
+import csv
+import sqlite3
+import pytest
+from common import db_session
+from candidate_import import import_candidates, main
+from candidate_search import find_candidates
+from pipeline_stats import check_pipeline_stats
+from reference_data import REFERENCE_DATA
+
+HEADER = ["First Name", "Last Name", "Phone", "Interview Date", "Department", "Shift", "Class", "Interviewers", "Spanish"]
+
+
+@pytest.fixture
+def reference(db_path):
+    with db_session() as conn:
+        conn.executemany("INSERT INTO Jobs (job_id, department, shift, pay_structure, employment_type) VALUES (?, ?, ?, ?, ?);",
+                         [(1, "Warehouse", "Days", "Hourly", "Full-Time"), (2, "Warehouse", "Nights", "Hourly", "Full-Time")])
+        conn.execute("INSERT INTO Hiring_Classes (class_id, class_date) VALUES (1, '2025-03-10');")
+        conn.executemany("INSERT INTO Interviewers (interviewer_id, interviewer_name) VALUES (?, ?);", [(1, "Pat Lee"), (2, "Sam Ortiz")])
+    # The import must also work when it is the one loading the reference data.
+    REFERENCE_DATA.invalidate()
+    yield
+    REFERENCE_DATA.invalidate()
+
+
+def write_sheet(path, rows):
+    with open(path, "w", newline="") as file:
+        csv.writer(file).writerows([HEADER, *rows])
+    return str(path)
+
+
+ROWS = [
+    ["Maria", "Garcia", "(555) 123-4567", "3/4/2025", "Warehouse", "Days", "03/10/2025", "Pat Lee; Sam Ortiz", "yes"],
+    ["James", "Wilson", "", "", "", "", "", "", ""],
+    ["Ana", "Lopez", "555-1234", "", "", "", "", "", ""],
+    ["Luis", "Ramirez", "", "", "Warehouse", "", "", "", ""],
+    ["Rosa", "Moore", "", "", "", "", "", "Nobody", ""],
+    ["", "", "", "", "", "", "", "", ""],
+    ["Kevin", "Clark", "5550001111", "", "Warehouse", "Nights", "", "sam ortiz", "no"],
+]
+
+
+def test_import_with_a_cold_reference_cache(reference, tmp_path):
+    path = write_sheet(tmp_path / "applicants.csv", ROWS)
+    rejects_path = str(tmp_path / "rejected.csv")
+    with db_session() as conn:
+        summary = import_candidates(conn, path, rejects_path, chunk_size=2)
+    assert summary["imported"] == 3
+    assert summary["rejected"] == 3
+    assert [row_number for row_number, _ in summary["rejected_samples"]] == [4, 5, 6]
+    with open(rejects_path, newline="") as file:
+        assert [row[:2] for row in csv.reader(file)][1:] == [["4", summary["rejected_samples"][0][1]], ["5", summary["rejected_samples"][1][1]], ["6", summary["rejected_samples"][2][1]]]
+
+    with db_session() as conn:
+        candidates = conn.execute("SELECT first_name, phone_number, interview_date, fk_job_id, fk_class_id, is_spanish_only, candidate_status FROM Candidates ORDER BY candidate_id;").fetchall()
+        links = conn.execute("SELECT fk_candidate_id, fk_interviewer_id FROM Candidate_Interviewers ORDER BY 1, 2;").fetchall()
+        # The bookkeeping done in place of the dropped triggers, and the triggers themselves, are back.
+        assert [row[2] for row in find_candidates(conn, "garcia")] == ["Maria"]
+        assert check_pipeline_stats(conn) == []
+        triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger';")}
+    assert candidates == [
+        ("Maria", "(555) 123-4567", "2025-03-04", 1, 1, 1, "Pending"),
+        ("James", "", None, None, None, 0, "Pending"),
+        ("Kevin", "(555) 000-1111", None, 2, None, 0, "Pending"),
+    ]
+    assert links == [(1, 1), (1, 2), (3, 2)]
+    assert {"trg_candidates_fts_insert", "trg_candidates_pipeline_insert", "trg_candidates_changes_insert"} <= triggers
+
+
+def test_main_imports_into_a_fresh_database(reference, tmp_path, capsys):
+    path = write_sheet(tmp_path / "applicants.csv", ROWS[:2])
+    assert main([path]) == 0
+    assert "Imported 2 candidate(s), rejected 0." in capsys.readouterr().out
+    # Nothing was rejected, so no rejects file is left behind.
+    assert not (tmp_path / "applicants_rejected.csv").exists()
+    with db_session() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM Candidates;").fetchone()[0] == 2
+
+
+def test_missing_name_column_is_refused(reference, tmp_path, capsys):
+    path = tmp_path / "applicants.csv"
+    path.write_text("Surname,Phone\nGarcia,5551234567\n")
+    assert main([str(path)]) == 1
+    assert "no First Name or Last Name column" in capsys.readouterr().err
@@ -0,0 +1,129 @@
+import threading
+import pytest
+from common import DB_POOL, ConnectionPool, db_session
+
+
+def count_rows(table="Interviewers"):
+    with db_session() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]
+
+
+def add_interviewer(conn, name):
+    conn.execute("INSERT INTO Interviewers (interviewer_name) VALUES (?);", (name,))
+
+
+def test_pool_reuses_connections(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=2)
+    conn = pool.acquire()
+    conn.close()
+    assert pool.acquire() is conn
+    conn.close()
+    assert pool.get_stats()["opens"] == 1
+
+
+def test_nested_acquire_shares_the_thread_connection(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    outer = pool.acquire()
+    inner = pool.acquire()
+    assert inner is outer
+    inner.close()
+    # Still held by the outer caller, so not back in the idle list yet.
+    assert pool.get_stats()["idle"] == 0
+    outer.close()
+    assert pool.get_stats()["idle"] == 1
+
+
+def test_release_discards_uncommitted_work(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER);")
+    conn.execute("INSERT INTO t VALUES (1);")
+    conn.close()
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM t;").fetchone()[0] == 0
+    conn.close()
+
+
+def test_release_from_another_thread_raises(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    conn = pool.acquire()
+    errors = []
+
+    def release_elsewhere():
+        try:
+            pool.release(conn)
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=release_elsewhere)
+    thread.start()
+    thread.join()
+    assert len(errors) == 1
+    conn.close()
+    with pytest.raises(RuntimeError):
+        conn.close()
+
+
+def test_pool_blocks_when_full(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=1)
+    conn = pool.acquire()
+    acquired = threading.Event()
+
+    def acquire_elsewhere():
+        other = pool.acquire()
+        acquired.set()
+        other.close()
+
+    thread = threading.Thread(target=acquire_elsewhere)
+    thread.start()
+    assert not acquired.wait(0.2)
+    conn.close()
+    thread.join(5)
+    assert acquired.is_set()
+    assert pool.get_stats()["waits"] == 1
+
+
+def test_session_commits_on_success(db_path):
+    with db_session() as conn:
+        add_interviewer(conn, "Alice")
+    assert count_rows() == 1
+
+
+def test_session_rolls_back_on_error(db_path):
+    with pytest.raises(ValueError):
+        with db_session() as conn:
+            add_interviewer(conn, "Alice")
+            raise ValueError
+    assert count_rows() == 0
+
+
+def test_nested_session_does_not_commit_the_outer_one(db_path):
+    with pytest.raises(ValueError):
+        with db_session() as conn:
+            add_interviewer(conn, "Alice")
+            with db_session() as inner:
+                add_interviewer(inner, "Bob")
+            assert conn.in_transaction
+            raise ValueError
+    assert count_rows() == 0
+
+
+def test_nested_session_error_only_undoes_its_own_work(db_path):
+    with db_session() as conn:
+        add_interviewer(conn, "Alice")
+        with pytest.raises(ValueError):
+            with db_session() as inner:
+                add_interviewer(inner, "Bob")
+                raise ValueError
+        assert conn.in_transaction
+    with db_session() as conn:
+        assert [row[0] for row in conn.execute("SELECT interviewer_name FROM Interviewers;")] == ["Alice"]
+
+
+def test_nested_session_without_outer_transaction_is_committed_by_the_outer_one(db_path):
+    with db_session() as conn:
+        with db_session() as inner:
+            add_interviewer(inner, "Alice")
+        assert conn.in_transaction
+    assert count_rows() == 1
+    assert not DB_POOL.holds_connection()
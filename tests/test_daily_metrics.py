@@ -0,0 +1,114 @@
+import datetime
+import sqlite3
+import common
+import db_migrations
+from common import db_session
+from daily_metrics import fetch_daily_log, fetch_daily_logs, save_daily_log, save_daily_logs, invalidate_funnel_weeks
+from funnel_trend import FUNNEL_CACHE
+from metric_rollups import check_metric_rollups
+
+MONDAY = "2025-03-03"
+TUESDAY = "2025-03-04"
+WEEK = datetime.date(2025, 3, 2)
+
+
+def day(date, department, apps=0, interviews=0, hires=0, breakdowns=()):
+    return (date, department, apps, interviews, hires, list(breakdowns))
+
+
+def test_save_and_fetch_a_week(db_path):
+    with db_session() as conn:
+        metric_ids = save_daily_logs(conn, [
+            day(MONDAY, "", 10, 4, 1, [("pre_interview_rejection", "Background", 2)]),
+            day(MONDAY, "Warehouse", 5, 2, 0),
+            day(TUESDAY, "Warehouse", 7, 3, 2, [("post_interview_withdrawal", "Pay", 1), ("post_interview_rejection", "NCNS", 0)]),
+        ])
+    with db_session() as conn:
+        days = fetch_daily_logs(conn, "2025-03-02", "2025-03-08")
+    assert set(days) == set(metric_ids) == {(MONDAY, ""), (MONDAY, "Warehouse"), (TUESDAY, "Warehouse")}
+    assert days[(MONDAY, "")]["apps_reviewed"] == 10
+    assert days[(MONDAY, "")]["breakdowns"] == {("pre_interview_rejection", "Background"): 2}
+    assert days[(MONDAY, "Warehouse")]["breakdowns"] == {}
+    # A count of 0 is not stored.
+    assert days[(TUESDAY, "Warehouse")]["breakdowns"] == {("post_interview_withdrawal", "Pay"): 1}
+    assert days[(TUESDAY, "Warehouse")]["metric_id"] == metric_ids[(TUESDAY, "Warehouse")]
+
+
+def test_fetch_only_the_given_departments(db_path):
+    with db_session() as conn:
+        save_daily_logs(conn, [day(MONDAY, "", 1), day(MONDAY, "Warehouse", 2), day(MONDAY, "Office", 3)])
+        days = fetch_daily_logs(conn, MONDAY, MONDAY, ["Warehouse", "Office"])
+    assert {department: values["apps_reviewed"] for (_, department), values in days.items()} == {"Warehouse": 2, "Office": 3}
+
+
+def test_saving_again_updates_the_day_in_place(db_path):
+    with db_session() as conn:
+        first_id = save_daily_log(conn, MONDAY, "Warehouse", 5, 2, 1, [("pre_interview_rejection", "Background", 2),
+                                                                        ("pre_interview_withdrawal", "Pay", 1)])
+    with db_session() as conn:
+        second_id = save_daily_log(conn, MONDAY, "Warehouse", 6, 2, 1, [("pre_interview_rejection", "Background", 3)])
+    assert second_id == first_id
+    with db_session() as conn:
+        metrics, breakdowns = fetch_daily_log(conn, MONDAY, "Warehouse")
+        assert metrics["apps_reviewed"] == 6
+        assert [(row["category"], row["reason"], row["count"]) for row in breakdowns] == [("pre_interview_rejection", "Background", 3)]
+        assert conn.execute("SELECT COUNT(*) FROM Daily_Metrics;").fetchone()[0] == 1
+
+
+def test_the_last_entry_for_a_day_wins(db_path):
+    with db_session() as conn:
+        save_daily_logs(conn, [day(MONDAY, "", 1), day(MONDAY, "", 9)])
+        assert fetch_daily_logs(conn, MONDAY, MONDAY)[(MONDAY, "")]["apps_reviewed"] == 9
+
+
+def test_rollups_follow_inserts_updates_and_removed_reasons(db_path):
+    with db_session() as conn:
+        save_daily_logs(conn, [
+            day(MONDAY, "", 10, 4, 1, [("pre_interview_rejection", "Background", 2)]),
+            day("2025-03-31", "Warehouse", 3, 1, 0, [("pre_interview_withdrawal", "Pay", 4)]),
+            day("2025-04-01", "Warehouse", 3, 1, 0, [("pre_interview_withdrawal", "Pay", 1)]),
+        ])
+        save_daily_logs(conn, [day(MONDAY, "", 8, 4, 1), day("2025-04-01", "Warehouse", 5, 1, 1, [("pre_interview_withdrawal", "Other", 2)])])
+        assert check_metric_rollups(conn) == []
+        assert conn.execute("SELECT apps_reviewed FROM Metrics_Weekly WHERE period_start = '2025-03-30';").fetchone()[0] == 8
+
+
+def test_saving_refreshes_the_funnel_cache(db_path):
+    FUNNEL_CACHE.clear()
+    reader = sqlite3.connect(db_path)
+    try:
+        with db_session() as conn:
+            [(_, before)] = FUNNEL_CACHE.get_weeks(reader, WEEK, WEEK)
+            save_daily_log(conn, MONDAY, "", 10, 4, 1, [("post_interview_rejection", "NCNS", 2)])
+            # Read by another connection before the commit: the old counts are cached again.
+            FUNNEL_CACHE.get_weeks(reader, WEEK, WEEK)
+        invalidate_funnel_weeks([MONDAY])
+        [(_, after)] = FUNNEL_CACHE.get_weeks(reader, WEEK, WEEK)
+    finally:
+        reader.close()
+    assert before["Apps Received"] == 0
+    assert after["Apps Received"] == 10 and after["NCNS"] == 2
+
+
+def test_department_migration_keeps_days_and_merges_duplicate_reasons(tmp_path, monkeypatch):
+    common.DB_POOL.close_all()
+    monkeypatch.setattr(common.DB_POOL, "db_path", str(tmp_path / "old.db"))
+    with monkeypatch.context() as before_migration_8:
+        before_migration_8.setattr(db_migrations, "MIGRATIONS", [m for m in db_migrations.MIGRATIONS if m[0] < 8])
+        db_migrations.run_migrations()
+    try:
+        # Before migration 8 a day had one row for all departments, and a reason could be stored twice.
+        with db_session() as conn:
+            conn.execute("INSERT INTO Daily_Metrics (metric_id, metric_date, apps_reviewed, interviews_scheduled, hires_confirmed) VALUES (7, ?, 4, 2, 1);", (MONDAY,))
+            conn.executemany("INSERT INTO Daily_Breakdowns (fk_metric_id, category, reason, count) VALUES (7, ?, ?, ?);",
+                             [("pre_interview_rejection", "Background", 1), ("pre_interview_rejection", "Background", 2), ("pre_interview_withdrawal", "Pay", 1)])
+        assert 8 in db_migrations.run_migrations()
+        with db_session() as conn:
+            days = fetch_daily_logs(conn, MONDAY, MONDAY)
+            assert days == {(MONDAY, ""): {"metric_id": 7, "apps_reviewed": 4, "interviews_scheduled": 2, "hires_confirmed": 1,
+                                           "breakdowns": {("pre_interview_rejection", "Background"): 3, ("pre_interview_withdrawal", "Pay"): 1}}}
+            assert check_metric_rollups(conn) == []
+            save_daily_log(conn, MONDAY, "Warehouse", 1, 0, 0, [])
+            assert len(fetch_daily_logs(conn, MONDAY, MONDAY)) == 2
+    finally:
+        common.DB_POOL.close_all()
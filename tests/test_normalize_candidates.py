@@ -0,0 +1,51 @@
+import sqlite3
+import pytest
+import normalize_candidates
+from common import db_session
+from normalize_candidates import find_changes, main
+
+ROWS = [
+    (1, "3/4/25", "555.123.4567"),
+    (2, "2025-03-04", "(555) 123-4567"),
+    (3, "someday", "555-1234"),
+]
+
+
+@pytest.fixture
+def candidates(db_path):
+    with db_session() as conn:
+        conn.executemany("INSERT INTO Candidates (candidate_id, first_name, last_name, candidate_status, interview_date, phone_number) VALUES (?, 'A', 'B', 'Pending', ?, ?);", ROWS)
+    yield db_path
+
+
+def stored(conn):
+    return conn.execute("SELECT candidate_id, interview_date, phone_number FROM Candidates ORDER BY candidate_id;").fetchall()
+
+
+def test_dry_run_changes_nothing(candidates, capsys):
+    assert main([]) == 0
+    assert "1 candidate(s) to update, 2 value(s) not understood." in capsys.readouterr().out
+    with db_session() as conn:
+        assert stored(conn) == ROWS
+
+
+def test_apply(candidates, capsys):
+    assert main(["--apply"]) == 0
+    assert "Updated 1 candidate(s)." in capsys.readouterr().out
+    with db_session() as conn:
+        assert stored(conn) == [(1, "2025-03-04", "(555) 123-4567"), ROWS[1], ROWS[2]]
+
+
+def test_apply_holds_the_write_lock_from_the_first_read(candidates, monkeypatch):
+    other = sqlite3.connect(candidates, timeout=0)
+    def find_changes_then_edit(conn):
+        found = find_changes(conn)
+        # An edit saved now would be overwritten with the value just read, so it must wait.
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            other.execute("UPDATE Candidates SET phone_number = '(555) 999-0000' WHERE candidate_id = 1;")
+        return found
+    monkeypatch.setattr(normalize_candidates, "find_changes", find_changes_then_edit)
+    try:
+        assert main(["--apply"]) == 0
+    finally:
+        other.close()
@@ -0,0 +1,90 @@
+import random
+import sqlite3
+import pytest
+from queries import build_keyset_condition, build_page_query, fetch_page, fetch_rows
+
+ITEMS = "SELECT item_id, name, score FROM Items"
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE Items (item_id INTEGER PRIMARY KEY, name TEXT NOT NULL, score INTEGER NOT NULL);")
+    rng = random.Random(7)
+    # Few distinct names and scores, so the sort keys have plenty of ties to break.
+    conn.executemany("INSERT INTO Items (item_id, name, score) VALUES (?, ?, ?);",
+                     [(i, rng.choice("ABCDE"), rng.randint(0, 5)) for i in range(1, 501)])
+    yield conn
+    conn.close()
+
+
+def expected_ids(conn, order_by):
+    order = ", ".join(f"{column} {direction}" for column, direction in order_by)
+    return [row[0] for row in conn.execute(f"{ITEMS} ORDER BY {order};")]
+
+
+def test_keyset_condition_same_direction_uses_a_row_value():
+    sql, params = build_keyset_condition((("name", "ASC"), ("item_id", "ASC")), ("B", 7))
+    assert sql == "(name, item_id) > (?, ?)"
+    assert params == ["B", 7]
+    sql, _ = build_keyset_condition((("name", "ASC"), ("item_id", "ASC")), ("B", 7), backwards=True)
+    assert sql == "(name, item_id) < (?, ?)"
+
+
+def test_keyset_condition_mixed_directions():
+    sql, params = build_keyset_condition((("score", "DESC"), ("name", "ASC"), ("item_id", "ASC")), (3, "B", 7))
+    assert sql == "((score < ?) OR (score = ? AND name > ?) OR (score = ? AND name = ? AND item_id > ?))"
+    assert params == [3, 3, "B", 3, "B", 7]
+
+
+def test_page_query_without_key():
+    sql, key_params = build_page_query(ITEMS + ";", (("name", "ASC"), ("item_id", "ASC")), where="score > ?")
+    assert sql == f"SELECT * FROM ({ITEMS}) AS page_source WHERE (score > ?) ORDER BY name ASC, item_id ASC LIMIT ?;"
+    assert key_params == []
+
+
+def test_page_query_backwards_reverses_the_order():
+    sql, key_params = build_page_query(ITEMS, (("score", "DESC"), ("item_id", "ASC")), before=(3, 7))
+    assert sql.endswith("ORDER BY score ASC, item_id DESC LIMIT ?;")
+    assert key_params == [3, 3, 7]
+
+
+@pytest.mark.parametrize("order_by", [
+    (("name", "ASC"), ("item_id", "ASC")),
+    (("score", "DESC"), ("name", "ASC"), ("item_id", "DESC")),
+])
+def test_paging_forwards_and_backwards_matches_a_full_query(conn, order_by):
+    expected = expected_ids(conn, order_by)
+    pages = []
+    rows, keys, has_more = fetch_page(conn, ITEMS, (), order_by, page_size=37)
+    pages.append((rows, keys))
+    while has_more:
+        rows, keys, has_more = fetch_page(conn, ITEMS, (), order_by, after=keys[-1], page_size=37)
+        pages.append((rows, keys))
+    assert [row[0] for rows, _ in pages for row in rows] == expected
+
+    # Walk back from the last page, as PagedTreeview does when the user scrolls up.
+    rows, keys = pages[-1]
+    seen = [row[0] for row in rows]
+    has_more = True
+    while has_more:
+        rows, keys_before, has_more = fetch_page(conn, ITEMS, (), order_by, before=keys[0], page_size=37)
+        seen = [row[0] for row in rows] + seen
+        keys = keys_before
+    assert seen == expected
+
+
+def test_paging_keeps_the_query_parameters_first(conn):
+    order_by = (("name", "ASC"), ("item_id", "ASC"))
+    expected = [row[0] for row in conn.execute(f"{ITEMS} WHERE score = ? ORDER BY name, item_id;", (2,))]
+    rows, keys, _ = fetch_page(conn, ITEMS + " WHERE score = ?", (2,), order_by, page_size=10)
+    rows_after, _, _ = fetch_page(conn, ITEMS + " WHERE score = ?", (2,), order_by, after=keys[-1], page_size=10)
+    assert [row[0] for row in rows + rows_after] == expected[:20]
+
+
+def test_fetch_rows_returns_only_matching_ids_in_order(conn):
+    order_by = (("name", "ASC"), ("item_id", "ASC"))
+    ids = [5, 400, 17, 999]
+    rows, keys = fetch_rows(conn, ITEMS, (), order_by, "item_id", ids)
+    assert [row[0] for row in rows] == [i for i in expected_ids(conn, order_by) if i in ids]
+    assert keys == [(row[1], row[0]) for row in rows]
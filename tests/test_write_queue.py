@@ -0,0 +1,129 @@
+import sqlite3
+import threading
+import pytest
+from common import ConnectionPool
+from write_queue import WriteQueue, execute_statement, is_busy_error
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "writes.db"))
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE Log (entry TEXT NOT NULL UNIQUE);")
+    conn.commit()
+    conn.close()
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def writes(pool):
+    write_queue = WriteQueue(pool)
+    yield write_queue
+    write_queue.shutdown()
+
+
+def add_entry(conn, entry):
+    conn.execute("INSERT INTO Log (entry) VALUES (?);", (entry,))
+    return entry
+
+
+def read_entries(pool):
+    conn = pool.acquire()
+    try:
+        return [row[0] for row in conn.execute("SELECT entry FROM Log ORDER BY rowid;")]
+    finally:
+        conn.close()
+
+
+def hold_writer(writes):
+    """Queues a task that keeps the writer busy until the returned event is set, so later tasks pile up."""
+    started, release = threading.Event(), threading.Event()
+    def wait(conn):
+        started.set()
+        release.wait(5)
+    future = writes.submit(wait)
+    assert started.wait(5)
+    return release, future
+
+
+def test_submit_returns_the_task_result_once_committed(pool, writes):
+    assert writes.submit(add_entry, "a").result(5) == "a"
+    assert writes.submit(execute_statement, "UPDATE Log SET entry = 'b';").result(5) == 1
+    assert read_entries(pool) == ["b"]
+
+
+def test_queued_writes_commit_together_in_order(pool, writes):
+    release, first = hold_writer(writes)
+    futures = [writes.submit(add_entry, str(i)) for i in range(10)]
+    release.set()
+    assert [future.result(5) for future in futures] == [str(i) for i in range(10)]
+    first.result(5)
+    assert read_entries(pool) == [str(i) for i in range(10)]
+    stats = writes.get_stats()
+    assert stats["groups"] == 2 and stats["largest_group"] == 10
+
+
+def test_failed_task_only_rolls_back_its_own_work(pool, writes):
+    def add_then_fail(conn):
+        add_entry(conn, "doomed")
+        raise ValueError("bad input")
+
+    release, _ = hold_writer(writes)
+    before = writes.submit(add_entry, "before")
+    failing = writes.submit(add_then_fail)
+    duplicate = writes.submit(add_entry, "before")
+    after = writes.submit(add_entry, "after")
+    release.set()
+    assert before.result(5) == "before"
+    with pytest.raises(ValueError):
+        failing.result(5)
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result(5)
+    assert after.result(5) == "after"
+    assert read_entries(pool) == ["before", "after"]
+
+
+def test_ungrouped_task_runs_alone_between_groups(pool, writes):
+    def commit_twice(conn):
+        add_entry(conn, "alone 1")
+        conn.commit()
+        add_entry(conn, "alone 2")
+        conn.commit()
+
+    release, _ = hold_writer(writes)
+    first = writes.submit(add_entry, "grouped 1")
+    alone = writes.submit(commit_twice, grouped=False)
+    last = writes.submit(add_entry, "grouped 2")
+    release.set()
+    for future in (first, alone, last):
+        future.result(5)
+    assert read_entries(pool) == ["grouped 1", "alone 1", "alone 2", "grouped 2"]
+
+
+def test_shutdown_applies_queued_writes_then_refuses_new_ones(pool):
+    writes = WriteQueue(pool)
+    release, _ = hold_writer(writes)
+    futures = [writes.submit(add_entry, str(i)) for i in range(3)]
+    release.set()
+    writes.shutdown()
+    assert all(future.done() for future in futures)
+    assert read_entries(pool) == ["0", "1", "2"]
+    with pytest.raises(RuntimeError):
+        writes.submit(add_entry, "late")
+
+
+def test_writes_wait_for_another_connection_holding_the_lock(pool, writes):
+    blocker = sqlite3.connect(pool.db_path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE;")
+    future = writes.submit(add_entry, "a")
+    assert not future.done()
+    blocker.execute("ROLLBACK;")
+    blocker.close()
+    assert future.result(10) == "a"
+
+
+def test_is_busy_error():
+    assert is_busy_error(sqlite3.OperationalError("database is locked"))
+    assert not is_busy_error(sqlite3.OperationalError("no such table: Log"))
+    assert not is_busy_error(ValueError("database is locked"))
@@ -0,0 +1,241 @@
+import datetime
+import sqlite3
+import tkinter as tk
+from tkinter import ttk, messagebox
+from tkcalendar import DateEntry
+from common import center_window
+from db_tasks import TkTaskRunner
+from daily_metrics import ALL_DEPARTMENTS, ALL_DEPARTMENTS_LABEL, BREAKDOWN_CATEGORIES, fetch_daily_logs, save_daily_logs, invalidate_funnel_weeks
+from metric_rollups import METRIC_COLUMNS, week_start
+from reference_data import REFERENCE_DATA
+
+METRIC_LABELS = {"apps_reviewed": "Apps Reviewed", "interviews_scheduled": "Interviews Scheduled", "hires_confirmed": "Hires Confirmed"}
+CATEGORY_TITLES = {
+    "pre_interview_rejection": "Pre-Interview Rejections",
+    "post_interview_rejection": "Post-Interview Rejections",
+    "pre_interview_withdrawal": "Pre-Interview Withdrawals",
+    "post_interview_withdrawal": "Post-Interview Withdrawals",
+}
+
+# ==================================================================
+# WEEK GRID MODULE
+# ==================================================================
+# This class defines the "Week Grid" window, opened from the Applicant Tracker, for
+# entering a whole week at once: a tab per department, and in each tab a row per count
+# (the daily metrics, then every breakdown reason) with a column per day, Sunday to
+# Saturday.
+#
+# The week is loaded for every department with one query (fetch_daily_logs) and saved
+# with one write task (save_daily_logs), which commits every changed day in a single
+# transaction. Only the days whose counts were changed are sent. A tab's entry fields
+# are created the first time it is shown, so opening the window stays quick however
+# many departments there are.
+#
+# A cell is identified by (day of the week 0-6, department, field), where field is a
+# Daily_Metrics column or a (category, reason) breakdown.
+class WeekGridApp(tk.Toplevel):
+    def __init__(self, parent, day=None, department=ALL_DEPARTMENTS):
+        super().__init__(parent)
+        self.withdraw()
+        self.title("Applicant Tracker - Week Grid")
+        self.geometry("1050x780")
+        self.transient(parent)
+        self.grab_set()
+
+        self.week = week_start(day or datetime.date.today())
+        try:
+            departments = REFERENCE_DATA.get().departments
+        except sqlite3.Error as e:
+            messagebox.showerror("Database Error", f"Failed to load departments: {e}", parent=self)
+            departments = []
+        self.departments = [ALL_DEPARTMENTS, *departments]
+        if department not in self.departments:
+            self.departments.append(department)
+        self.fields = [*METRIC_COLUMNS, *((category, reason) for category, reasons in BREAKDOWN_CATEGORIES for reason in reasons)]
+
+        # --- Variable Holders ---
+        # The week as loaded, {(date, department): {field: count}}, for the days that have been entered.
+        self.loaded = {}
+        # The Sunday of the week in self.loaded; None until it has loaded.
+        self.loaded_week = None
+        # The Tkinter variables of the tabs built so far, and the last valid value of each, by cell.
+        self.cell_vars = {}
+        self.previous_values = {}
+        self.tab_frames = {}
+        self.built_tabs = set()
+        self.day_header_vars = [tk.StringVar() for _ in range(7)]
+
+        self.tasks = TkTaskRunner(self)
+        self.create_widgets()
+        self.notebook.select(self.tab_frames[department])
+        self.build_tab(department)
+        self.load_week()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        center_window(self, parent)
+
+    def create_widgets(self):
+        """Builds the week selection, one empty tab per department and the buttons."""
+        main_frame = ttk.Frame(self, padding="20")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        # --- Week Selection ---
+        week_frame = ttk.Frame(main_frame)
+        week_frame.pack(fill=tk.X, pady=(0, 15))
+        ttk.Label(week_frame, text="Week Of:", font=("Segoe UI", 11, 'bold')).pack(side=tk.LEFT, padx=(0, 10))
+        self.date_entry = DateEntry(week_frame, width=12, background='darkblue', foreground='white', borderwidth=2, date_pattern='yyyy-mm-dd')
+        self.date_entry.set_date(self.week)
+        self.date_entry.pack(side=tk.LEFT)
+        self.date_entry.bind("<<DateEntrySelected>>", lambda event: self.change_week(self.date_entry.get_date()))
+        ttk.Button(week_frame, text="< Previous Week", command=lambda: self.change_week(self.week - datetime.timedelta(weeks=1))).pack(side=tk.LEFT, padx=(20, 5))
+        ttk.Button(week_frame, text="Next Week >", command=lambda: self.change_week(self.week + datetime.timedelta(weeks=1))).pack(side=tk.LEFT)
+
+        # --- Department Tabs ---
+        self.notebook = ttk.Notebook(main_frame)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+        for department in self.departments:
+            frame = ttk.Frame(self.notebook, padding="10")
+            self.notebook.add(frame, text=department or ALL_DEPARTMENTS_LABEL)
+            self.tab_frames[department] = frame
+        self.notebook.bind("<<NotebookTabChanged>>", lambda event: self.build_tab(self.get_selected_department()))
+
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(pady=(15, 0))
+        ttk.Button(button_frame, text="Save Week", command=self.save_week).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Close", command=self.close).pack(side=tk.LEFT, padx=5)
+        self.show_day_headers()
+
+    def get_selected_department(self):
+        return self.departments[self.notebook.index(self.notebook.select())]
+
+    def build_tab(self, department):
+        """Creates a department's entry fields the first time its tab is shown."""
+        if department in self.built_tabs:
+            return
+        self.built_tabs.add(department)
+        frame = self.tab_frames[department]
+        for day_index, header_var in enumerate(self.day_header_vars):
+            ttk.Label(frame, textvariable=header_var, font=("Segoe UI", 9, 'bold'), anchor='center').grid(row=0, column=day_index + 1, padx=3, pady=(0, 5))
+
+        row = 1
+        category = None
+        for field in self.fields:
+            if isinstance(field, tuple):
+                if field[0] != category:
+                    category = field[0]
+                    ttk.Label(frame, text=CATEGORY_TITLES[category], font=("Segoe UI", 10, 'bold')).grid(row=row, column=0, sticky='w', pady=(8, 2))
+                    row += 1
+                label = field[1]
+            else:
+                label = METRIC_LABELS[field]
+            ttk.Label(frame, text=label, width=25).grid(row=row, column=0, sticky='w')
+            for day_index in range(7):
+                key = (day_index, department, field)
+                var = self.cell_vars[key] = tk.StringVar(value=str(self.get_loaded_value(day_index, department, field)))
+                self.previous_values[key] = var.get()
+                entry = ttk.Entry(frame, textvariable=var, width=7, justify='center')
+                entry.bind("<FocusOut>", lambda event, k=key: self._validate_and_revert(k))
+                entry.grid(row=row, column=day_index + 1, padx=3, pady=1)
+            row += 1
+
+    def _validate_and_revert(self, key):
+        """Puts back the last valid value of a cell that does not hold a whole number, 0 or more."""
+        var = self.cell_vars[key]
+        try:
+            val = int(var.get())
+            if val < 0:
+                var.set(self.previous_values[key])
+            else:
+                var.set(str(val))
+                self.previous_values[key] = var.get()
+        except (ValueError, TypeError):
+            var.set(self.previous_values[key])
+
+    def get_days(self):
+        """The week's dates, "YYYY-MM-DD", Sunday first."""
+        return [(self.week + datetime.timedelta(days=i)).isoformat() for i in range(7)]
+
+    def get_loaded_value(self, day_index, department, field):
+        return self.loaded.get((self.get_days()[day_index], department), {}).get(field, 0)
+
+    def show_day_headers(self):
+        for header_var, day in zip(self.day_header_vars, self.get_days()):
+            header_var.set(datetime.date.fromisoformat(day).strftime("%a %m/%d"))
+
+    def load_week(self):
+        """Fetches the week for every department in the background, with one query."""
+        days = self.get_days()
+        week = self.week
+        self.tasks.run("load", fetch_daily_logs, days[0], days[-1], self.departments,
+                       on_done=lambda result: self.show_week(result, week), error_message="Failed to load the week")
+
+    def show_week(self, days, week=None):
+        """Displays the results of fetch_daily_logs for the week starting on week."""
+        self.loaded_week = week
+        self.loaded = {key: {**{column: day[column] or 0 for column in METRIC_COLUMNS}, **day["breakdowns"]} for key, day in days.items()}
+        for (day_index, department, field), var in self.cell_vars.items():
+            var.set(str(self.get_loaded_value(day_index, department, field)))
+            self.previous_values[(day_index, department, field)] = var.get()
+
+    def get_changed_days(self):
+        """Returns the days whose counts differ from the ones loaded, as save_daily_logs takes them."""
+        changed = []
+        days = self.get_days()
+        for department in self.built_tabs:
+            for day_index, day in enumerate(days):
+                loaded = self.loaded.get((day, department), {})
+                values = {field: int(self.cell_vars[(day_index, department, field)].get()) for field in self.fields}
+                if all(values[field] == loaded.get(field, 0) for field in self.fields):
+                    continue
+                # Reasons the grid does not show (entered some other way) are kept as they are.
+                breakdowns = {field: count for field, count in loaded.items() if isinstance(field, tuple)}
+                breakdowns.update({field: count for field, count in values.items() if isinstance(field, tuple)})
+                changed.append((day, department, *(values[column] for column in METRIC_COLUMNS),
+                                [(category, reason, count) for (category, reason), count in breakdowns.items()]))
+        return changed
+
+    def confirm_discard(self):
+        """True if nothing was changed or the user agrees to lose the changes."""
+        for key in self.cell_vars:
+            self._validate_and_revert(key)
+        if not self.get_changed_days():
+            return True
+        return messagebox.askyesno("Unsaved Changes", "This week has changes that have not been saved. Discard them?", parent=self)
+
+    def change_week(self, day):
+        if week_start(day) == self.week:
+            return
+        if not self.confirm_discard():
+            self.date_entry.set_date(self.week)
+            return
+        self.week = week_start(day)
+        self.date_entry.set_date(self.week)
+        self.loaded = {}
+        self.show_day_headers()
+        self.show_week({})
+        self.load_week()
+
+    def save_week(self):
+        """Saves every changed day of every department in the background, as one transaction."""
+        # Until the week has loaded, the grid does not hold its counts and every day would look changed.
+        if self.tasks.is_running("load") or self.loaded_week != self.week:
+            messagebox.showwarning("Still Loading", "This week has not loaded yet. Please try again in a moment.", parent=self)
+            return
+        for key in self.cell_vars:
+            self._validate_and_revert(key)
+        days = self.get_changed_days()
+        if not days:
+            messagebox.showinfo("Nothing to Save", "No counts have been changed this week.", parent=self)
+            return
+
+        week_label = self.week.strftime("%m/%d/%Y")
+        def on_saved(result):
+            invalidate_funnel_weeks(day[0] for day in days)
+            messagebox.showinfo("Success", f"Saved {len(days)} day(s) for the week of {week_label}.", parent=self)
+            self.load_week()
+
+        # A save is never cancelled, so it finishes even if the window is closed straight away.
+        self.tasks.run("save", save_daily_logs, days, on_done=on_saved, error_message="Failed to save the week", message="Saving...", interruptible=False)
+
+    def close(self):
+        if self.confirm_discard():
+            self.destroy()
@@ -0,0 +1,210 @@
+import atexit
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from common import DB_POOL
+
+# ==================================================================
+# WRITE QUEUE
+# ==================================================================
+# Every write in the application goes through one writer thread. Each write is a
+# task -- a plain function that takes a connection, as in db_tasks.py -- and submit()
+# returns a Future for its result. The writer takes whatever tasks have queued up
+# while it was busy and applies them together, in the order submitted, in a single
+# transaction:
+#
+#   BEGIN IMMEDIATE; SAVEPOINT; task 1; RELEASE; SAVEPOINT; task 2; RELEASE; ...; COMMIT
+#
+# so ten saves arriving at once cost one lock and one commit (one fsync) instead of
+# ten, and the commit rate keeps up as more people save at the same time. A task that
+# fails is rolled back to its savepoint and only its own future gets the exception;
+# the rest of the group still commits. The futures are only completed once the group
+# has committed.
+#
+# BEGIN IMMEDIATE takes the write lock before any task runs, so a task never fails
+# half-way because another workstation holds the lock. If the lock stays busy beyond
+# the connection's busy timeout (DB_BUSY_TIMEOUT_MS), BEGIN and COMMIT are retried
+# WRITE_BUSY_RETRIES more times, backing off exponentially with some jitter.
+#
+# Grouped tasks must not commit or roll back themselves. Tasks that manage their own
+# transactions (the bulk update, the importer) are submitted with grouped=False and
+# run on their own, between the groups, inside a plain db_session()-style commit.
+
+WRITE_BATCH_MAX = 64
+WRITE_BUSY_RETRIES = 5
+WRITE_BUSY_BACKOFF = 0.05   # Seconds before the first retry; doubled for each one after.
+
+# Put on the queue by shutdown(): the writer stops once it reaches it.
+STOP_WRITER = object()
+
+def is_busy_error(error):
+    """True for SQLITE_BUSY (and its extended codes), i.e. "database is locked"."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff == sqlite3.SQLITE_BUSY
+    return "locked" in str(error)
+
+
+class WriteRequest:
+    def __init__(self, task, args, grouped):
+        self.task = task
+        self.args = args
+        self.grouped = grouped
+        self.future = Future()
+
+
+class WriteQueue:
+    """Applies write tasks on a single thread, grouping the ones that queue up into one transaction."""
+    def __init__(self, pool=DB_POOL, max_batch=WRITE_BATCH_MAX):
+        self.pool = pool
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.stats = {'requests': 0, 'groups': 0, 'largest_group': 0, 'busy_retries': 0}
+
+    def submit(self, task, *args, grouped=True):
+        """Queues task(conn, *args). Returns a concurrent.futures.Future for its return value.
+
+        Pass grouped=False for a task that commits on its own; it then runs by itself."""
+        request = WriteRequest(task, args, grouped)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The write queue has been shut down.")
+            if self._thread is None:
+                # A daemon thread, so a stuck write cannot keep the application open; shutdown() drains the queue at exit.
+                self._thread = threading.Thread(target=self._run, name="db-write", daemon=True)
+                self._thread.start()
+            self._queue.put(request)
+        return request.future
+
+    def shutdown(self):
+        """Applies the writes already queued, then stops the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            self._queue.put(STOP_WRITER)
+        if thread is not None:
+            thread.join()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def _run(self):
+        pending = None
+        while True:
+            request = pending if pending is not None else self._queue.get()
+            pending = None
+            if request is STOP_WRITER:
+                return
+            if not request.grouped:
+                self._run_alone(request)
+                continue
+            group = [request]
+            while len(group) < self.max_batch:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is STOP_WRITER or not request.grouped:
+                    # Keeps the order: the group commits first, then this one runs (or the thread stops).
+                    pending = request
+                    break
+                group.append(request)
+            self._run_group(group)
+
+    def _retry_busy(self, statement):
+        """Runs statement(), retrying with backoff while the database is locked."""
+        for attempt in range(WRITE_BUSY_RETRIES + 1):
+            try:
+                return statement()
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt == WRITE_BUSY_RETRIES:
+                    raise
+            with self._lock:
+                self.stats['busy_retries'] += 1
+            delay = WRITE_BUSY_BACKOFF * 2 ** attempt
+            time.sleep(delay * random.uniform(0.5, 1.5))
+
+    def _run_alone(self, request):
+        if not request.future.set_running_or_notify_cancel():
+            return
+        with self._lock:
+            self.stats['requests'] += 1
+        conn = None
+        try:
+            conn = self.pool.acquire()
+            result = request.task(conn, *request.args)
+            conn.commit()
+        except BaseException as e:
+            if conn is not None:
+                conn.rollback()
+            request.future.set_exception(e)
+        else:
+            request.future.set_result(result)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _run_group(self, group):
+        group = [request for request in group if request.future.set_running_or_notify_cancel()]
+        if not group:
+            return
+        with self._lock:
+            self.stats['requests'] += len(group)
+            self.stats['groups'] += 1
+            self.stats['largest_group'] = max(self.stats['largest_group'], len(group))
+        outcomes = []
+        conn = None
+        try:
+            conn = self.pool.acquire()
+            self._retry_busy(lambda: conn.execute("BEGIN IMMEDIATE;"))
+            try:
+                for request in group:
+                    conn.execute("SAVEPOINT write_request;")
+                    try:
+                        result = request.task(conn, *request.args)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write_request;")
+                        conn.execute("RELEASE write_request;")
+                        outcomes.append((request, None, e))
+                    else:
+                        conn.execute("RELEASE write_request;")
+                        outcomes.append((request, result, None))
+                self._retry_busy(conn.commit)
+            except BaseException:
+                conn.rollback()
+                raise
+        except BaseException as e:
+            # Nothing was committed, so every task in the group failed.
+            for request in group:
+                request.future.set_exception(e)
+            return
+        finally:
+            if conn is not None:
+                conn.close()
+        for request, result, error in outcomes:
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(result)
+
+
+WRITE_QUEUE = WriteQueue()
+atexit.register(WRITE_QUEUE.shutdown)
+
+def execute_statement(conn, sql, params=()):
+    """A write task that runs one INSERT, UPDATE or DELETE. Returns the number of rows changed.
+
+    Windows submit it with TkTaskRunner.run(..., interruptible=False) rather than waiting
+    on WRITE_QUEUE themselves, which would freeze the UI while the database is busy."""
+    return conn.execute(sql, params).rowcount